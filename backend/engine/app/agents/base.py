@@ -4,26 +4,52 @@ Agent 基类 - 定义 invoke 接口规范
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Type
+from typing import Dict, Any, Optional, Type
 
 
 class BaseAgent(ABC):
     """Agent 基类 - 定义统一的接口规范"""
 
+    # LLM 响应缓存命名空间（决定 TTL 与统计归属）；None 表示不缓存
+    cache_namespace: Optional[str] = None
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.client = self._create_client()
+        self._async_client = None
 
     @abstractmethod
     def _create_client(self):
         """创建客户端"""
         pass
 
+    def _create_async_client(self):
+        """创建异步客户端（默认按 config 中的 provider 从工厂获取）"""
+        from ..core.llm import LLMClientFactory
+        return LLMClientFactory.get_async_client(
+            provider=self.config.get("provider", "deepseek"),
+            api_key=self.config.get("api_key"),
+            base_url=self.config.get("base_url"),
+            cache_namespace=self.cache_namespace,
+        )
+
+    @property
+    def async_client(self):
+        """异步客户端（首次访问时创建，避免无需异步路径时的额外开销）"""
+        if self._async_client is None:
+            self._async_client = self._create_async_client()
+        return self._async_client
+
     @abstractmethod
     def invoke(self, *args, **kwargs) -> Dict[str, Any]:
         """调用 Agent（统一接口）"""
         pass
 
+    @abstractmethod
+    async def ainvoke(self, *args, **kwargs) -> Dict[str, Any]:
+        """异步调用 Agent（统一接口）"""
+        pass
+
 
 class AgentFactory:
     """Agent 工厂类 - 负责创建和管理 Agent 实例"""
@@ -1,14 +1,22 @@
 """
 Critic Agent - 双路审核（JSON 结构审核 + 视觉审核）
 
+Path 0: 规则预审（rule_critic，无 LLM），结论明确时直接返回，不进入 Path 1 / Path 2
 Path 1: 基于 poster JSON 数据做结构合理性检查（快、省 token）
-Path 2: 调用渲染服务生成图片，通过 Vision LLM 做视觉质量检查
+Path 2: 生成海报图片（默认引擎内 Pillow 光栅化，CRITIC_VISUAL_RENDERER=node 时调用渲染服务），
+        通过 Vision LLM 做视觉质量检查
 
 级联策略：Path 1 通过后才执行 Path 2，任一路 REJECT 则最终 REJECT。
+推测模式（CRITIC_SPECULATIVE_VISUAL_REVIEW=true）：两路同时启动，Path 1 REJECT 时取消 Path 2，
+审核延迟从 path1 + path2 降为 max(path1, path2)，合并规则不变。
+同步版本（工作流节点）的 Path 2 在共享线程池中执行，已开始的渲染无法中断，仅跳过后续 Vision 调用；
+HTTP 接口使用的异步版本可以真正取消。
 """
 
+import asyncio
 import json
-import base64
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, Optional
 from ..core.config import settings, ERROR_FALLBACKS
 from ..core.llm import LLMClientFactory
@@ -16,6 +24,7 @@ from ..core.logger import get_logger
 from ..core.utils import parse_llm_json_response
 from ..prompts import critic as critic_prompt
 from .base import BaseAgent
+from .rule_critic import run_rule_critic
 
 logger = get_logger(__name__)
 
@@ -23,11 +32,14 @@ logger = get_logger(__name__)
 class CriticAgent(BaseAgent):
     """Critic Agent 实现类（用于 Path 1 JSON 结构审核）"""
 
+    cache_namespace = "critic"
+
     def _create_client(self):
         return LLMClientFactory.get_client(
             provider=self.config.get("provider", "deepseek"),
             api_key=self.config.get("api_key"),
             base_url=self.config.get("base_url"),
+            cache_namespace=self.cache_namespace,
         )
 
     def invoke(self, messages: list, **kwargs) -> Dict[str, Any]:
@@ -41,31 +53,34 @@ class CriticAgent(BaseAgent):
         )
         return response
 
+    async def ainvoke(self, messages: list, **kwargs) -> Dict[str, Any]:
+        """调用 Critic Agent（异步）"""
+        response = await self.async_client.chat.completions.create(
+            model=self.config["model"],
+            messages=messages,
+            temperature=self.config["temperature"],
+            response_format=self.config.get("response_format"),
+            **kwargs,
+        )
+        return response
+
 
 # =============================================================================
 # Path 1: JSON 结构审核
 # =============================================================================
 
-def _run_json_review(
+def _build_json_review_messages(
     poster_data: Dict[str, Any],
     design_brief: Optional[Dict[str, Any]] = None,
-) -> Dict[str, Any]:
-    """
-    Path 1 —— 基于 JSON 数据的结构审核。
-    """
+) -> list:
     prompts = critic_prompt.get_prompt(poster_data, design_brief=design_brief)
+    return [
+        {"role": "system", "content": prompts["system"]},
+        {"role": "user", "content": prompts["user"]},
+    ]
 
-    from .base import AgentFactory
-    agent = AgentFactory.get_critic_agent()
-
-    response = agent.invoke(
-        messages=[
-            {"role": "system", "content": prompts["system"]},
-            {"role": "user", "content": prompts["user"]},
-        ]
-    )
 
-    content = response.choices[0].message.content
+def _parse_json_review(content: str) -> Dict[str, Any]:
     if "```json" in content:
         content = content.replace("```json", "").replace("```", "")
 
@@ -78,42 +93,55 @@ def _run_json_review(
     return feedback
 
 
+def _run_json_review(
+    poster_data: Dict[str, Any],
+    design_brief: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Path 1 —— 基于 JSON 数据的结构审核。
+    """
+    from .base import AgentFactory
+    agent = AgentFactory.get_critic_agent()
+
+    response = agent.invoke(messages=_build_json_review_messages(poster_data, design_brief))
+    return _parse_json_review(response.choices[0].message.content)
+
+
+async def _arun_json_review(
+    poster_data: Dict[str, Any],
+    design_brief: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Path 1 —— 结构审核（异步）"""
+    from .base import AgentFactory
+    agent = AgentFactory.get_critic_agent()
+
+    response = await agent.ainvoke(messages=_build_json_review_messages(poster_data, design_brief))
+    return _parse_json_review(response.choices[0].message.content)
+
+
 # =============================================================================
 # Path 2: 视觉审核（渲染图片 + Vision LLM）
 # =============================================================================
 
 VISION_LLM_TIMEOUT = 45.0
 
+_VISION_FAILED_REVIEW = {"status": "PASS", "feedback": "Vision LLM 超时/失败，跳过视觉审核", "issues": []}
 
-def _run_visual_review(poster_data: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Path 2 —— 调用渲染服务生成图片，再用 Vision LLM 审核。
 
-    Returns:
-        与 Path 1 格式一致的审核字典 {status, feedback, issues}
-    """
-    from ..tools.render_client import render_poster_to_image
+def _vision_client_params() -> Dict[str, str]:
+    return {
+        "provider": (settings.critic.VISION_PROVIDER or settings.critic.PROVIDER).value,
+        "api_key": settings.critic.VISION_API_KEY or settings.critic.API_KEY,
+        "base_url": settings.critic.VISION_BASE_URL or settings.critic.BASE_URL,
+    }
 
-    logger.info("🖼️ [Path 2] 开始视觉审核：调用渲染服务...")
-    image_bytes = render_poster_to_image(poster_data)
 
-    image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+def _build_vision_messages(image_bytes: bytes) -> list:
+    from ..tools.vision import image_to_vision_data_url
 
+    image_url = image_to_vision_data_url(image_bytes)
     prompts = critic_prompt.get_visual_prompt()
-
-    vision_provider = (settings.critic.VISION_PROVIDER or settings.critic.PROVIDER).value
-    vision_api_key = settings.critic.VISION_API_KEY or settings.critic.API_KEY
-    vision_base_url = settings.critic.VISION_BASE_URL or settings.critic.BASE_URL
-
-    client = LLMClientFactory.get_client(
-        provider=vision_provider,
-        api_key=vision_api_key,
-        base_url=vision_base_url,
-    )
-
-    logger.info(f"👁️ [Path 2] 调用 Vision LLM ({settings.critic.VISION_MODEL} @ {vision_provider})...")
-
-    vision_messages = [
+    return [
         {"role": "system", "content": prompts["system"]},
         {
             "role": "user",
@@ -122,13 +150,86 @@ def _run_visual_review(poster_data: Dict[str, Any]) -> Dict[str, Any]:
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/png;base64,{image_b64}",
+                        "url": image_url,
                     },
                 },
             ],
         },
     ]
 
+
+def _parse_visual_review(content: Optional[str]) -> Dict[str, Any]:
+    logger.info(f"📝 [Path 2] Vision LLM 原始响应 (前300字): {content[:300] if content else '(empty)'}")
+
+    fallback = {"status": "PASS", "feedback": "视觉审核无法解析，默认通过", "issues": []}
+    feedback = parse_llm_json_response(content, fallback=fallback, context="视觉审核")
+
+    feedback.setdefault("status", "PASS")
+    feedback.setdefault("feedback", "视觉审核通过")
+    feedback.setdefault("issues", [])
+
+    return feedback
+
+
+def _rasterize_for_review(poster_data: Dict[str, Any]) -> bytes:
+    """引擎内光栅化（审核分辨率，直接编码为 Vision 请求使用的格式）"""
+    from ..services.renderer.rasterizer import rasterize_poster_to_bytes
+
+    return rasterize_poster_to_bytes(
+        poster_data,
+        max_edge=settings.critic.VISUAL_RENDER_MAX_EDGE,
+        fmt=settings.llm.VISION_IMAGE_FORMAT,
+        quality=settings.llm.VISION_IMAGE_QUALITY,
+    )
+
+
+def _render_for_review(poster_data: Dict[str, Any]) -> bytes:
+    if settings.critic.VISUAL_RENDERER == "python":
+        logger.info("🖼️ [Path 2] 开始视觉审核：引擎内光栅化...")
+        return _rasterize_for_review(poster_data)
+
+    from ..tools.render_client import render_poster_to_image
+
+    logger.info("🖼️ [Path 2] 开始视觉审核：调用渲染服务...")
+    return render_poster_to_image(poster_data)
+
+
+async def _arender_for_review(poster_data: Dict[str, Any]) -> bytes:
+    if settings.critic.VISUAL_RENDERER == "python":
+        logger.info("🖼️ [Path 2] 开始视觉审核：引擎内光栅化（线程池）...")
+        return await asyncio.to_thread(_rasterize_for_review, poster_data)
+
+    from ..tools.render_client import arender_poster_to_image
+
+    logger.info("🖼️ [Path 2] 开始视觉审核：调用渲染服务（async）...")
+    return await arender_poster_to_image(poster_data)
+
+
+def _run_visual_review(
+    poster_data: Dict[str, Any],
+    cancelled: Optional[threading.Event] = None,
+) -> Dict[str, Any]:
+    """
+    Path 2 —— 生成海报图片（引擎内光栅化或调用渲染服务），再用 Vision LLM 审核。
+
+    Args:
+        cancelled: 推测模式下由调用方置位；渲染完成后若已置位则不再调用 Vision LLM
+
+    Returns:
+        与 Path 1 格式一致的审核字典 {status, feedback, issues}
+    """
+    image_bytes = _render_for_review(poster_data)
+    if cancelled is not None and cancelled.is_set():
+        logger.info("🛑 [Path 2] 推测执行的视觉审核已取消，跳过 Vision 调用")
+        return dict(_VISION_FAILED_REVIEW)  # 调用方已放弃该结果
+
+    vision_params = _vision_client_params()
+    client = LLMClientFactory.get_client(**vision_params, cache_namespace="visual_review")
+
+    logger.info(f"👁️ [Path 2] 调用 Vision LLM ({settings.critic.VISION_MODEL} @ {vision_params['provider']})...")
+
+    vision_messages = _build_vision_messages(image_bytes)
+
     try:
         response = client.chat.completions.create(
             model=settings.critic.VISION_MODEL,
@@ -148,19 +249,44 @@ def _run_visual_review(poster_data: Dict[str, Any]) -> Dict[str, Any]:
             )
         except Exception as e2:
             logger.warning(f"⚠️ [Path 2] Vision LLM 调用失败: {type(e2).__name__}: {e2}")
-            return {"status": "PASS", "feedback": f"Vision LLM 超时/失败，跳过视觉审核", "issues": []}
+            return dict(_VISION_FAILED_REVIEW)
 
-    content = response.choices[0].message.content
-    logger.info(f"📝 [Path 2] Vision LLM 原始响应 (前300字): {content[:300] if content else '(empty)'}")
+    return _parse_visual_review(response.choices[0].message.content)
 
-    fallback = {"status": "PASS", "feedback": "视觉审核无法解析，默认通过", "issues": []}
-    feedback = parse_llm_json_response(content, fallback=fallback, context="视觉审核")
 
-    feedback.setdefault("status", "PASS")
-    feedback.setdefault("feedback", "视觉审核通过")
-    feedback.setdefault("issues", [])
+async def _arun_visual_review(poster_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Path 2 —— 视觉审核（异步：Vision LLM 为原生协程，光栅化放到线程池）"""
+    image_bytes = await _arender_for_review(poster_data)
 
-    return feedback
+    vision_params = _vision_client_params()
+    client = LLMClientFactory.get_async_client(**vision_params, cache_namespace="visual_review")
+
+    logger.info(f"👁️ [Path 2] 调用 Vision LLM ({settings.critic.VISION_MODEL} @ {vision_params['provider']})...")
+
+    vision_messages = _build_vision_messages(image_bytes)
+
+    try:
+        response = await client.chat.completions.create(
+            model=settings.critic.VISION_MODEL,
+            messages=vision_messages,
+            temperature=0.0,
+            response_format={"type": "json_object"},
+            timeout=VISION_LLM_TIMEOUT,
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ [Path 2] json_object 模式失败 ({type(e).__name__}), 降级重试...")
+        try:
+            response = await client.chat.completions.create(
+                model=settings.critic.VISION_MODEL,
+                messages=vision_messages,
+                temperature=0.0,
+                timeout=VISION_LLM_TIMEOUT,
+            )
+        except Exception as e2:
+            logger.warning(f"⚠️ [Path 2] Vision LLM 调用失败: {type(e2).__name__}: {e2}")
+            return dict(_VISION_FAILED_REVIEW)
+
+    return _parse_visual_review(response.choices[0].message.content)
 
 
 # =============================================================================
@@ -212,6 +338,69 @@ def _merge_reviews(
 # 对外统一入口
 # =============================================================================
 
+# 同步推测模式共用的线程池（进程级，按需创建）
+_VISUAL_REVIEW_WORKERS = 4
+_visual_executor: Optional[ThreadPoolExecutor] = None
+_visual_executor_lock = threading.Lock()
+
+
+def _get_visual_executor() -> ThreadPoolExecutor:
+    global _visual_executor
+    if _visual_executor is None:
+        with _visual_executor_lock:
+            if _visual_executor is None:
+                _visual_executor = ThreadPoolExecutor(
+                    max_workers=_VISUAL_REVIEW_WORKERS, thread_name_prefix="critic-visual"
+                )
+    return _visual_executor
+
+
+def _speculative_enabled() -> bool:
+    """是否推测式地提前启动 Path 2（需同时开启视觉审核）"""
+    return settings.critic.ENABLE_VISUAL_REVIEW and settings.critic.SPECULATIVE_VISUAL_REVIEW
+
+
+def _rule_prereview(poster_data: Dict[str, Any], mode: str = "") -> Optional[Dict[str, Any]]:
+    """Path 0：规则预审，结论明确时返回审核结果（调用方直接返回，不再调用 LLM）"""
+    logger.info(f"⚖️ Critic Agent 正在审核海报质量（双路审核{mode}）...")
+    return run_rule_critic(poster_data)
+
+
+def _needs_visual_review(json_review: Dict[str, Any]) -> bool:
+    """记录 Path 1 结果，并判断是否执行 / 采纳 Path 2"""
+    status_emoji = "✅" if json_review["status"] == "PASS" else "❌"
+    logger.info(f"{status_emoji} [Path 1] 结构审核: {json_review['status']} - {json_review.get('feedback', '')}")
+
+    if json_review["status"] == "REJECT":
+        logger.info("⏭️ [Path 2] 跳过视觉审核（结构审核已 REJECT）")
+        return False
+    if not settings.critic.ENABLE_VISUAL_REVIEW:
+        logger.info("⏭️ [Path 2] 视觉审核已关闭（ENABLE_VISUAL_REVIEW=False）")
+        return False
+    return True
+
+
+def _log_visual_review(visual_review: Dict[str, Any]) -> None:
+    ve = "✅" if visual_review["status"] == "PASS" else "❌"
+    logger.info(f"{ve} [Path 2] 视觉审核: {visual_review['status']} - {visual_review.get('feedback', '')}")
+
+
+def _finalize_review(
+    json_review: Dict[str, Any],
+    visual_review: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """合并双路结果并记录最终结论"""
+    merged = _merge_reviews(json_review, visual_review)
+
+    final_emoji = "✅" if merged["status"] == "PASS" else "❌"
+    logger.info(f"{final_emoji} 最终审核结果 ({merged.get('review_path', 'unknown')}): {merged['status']} - {merged['feedback']}")
+
+    if merged.get("issues"):
+        logger.info(f"📋 问题列表: {', '.join(merged['issues'])}")
+
+    return merged
+
+
 def run_critic_agent(
     poster_data: Dict[str, Any],
     design_brief: Optional[Dict[str, Any]] = None,
@@ -219,51 +408,103 @@ def run_critic_agent(
     """
     运行 Critic Agent（双路审核）。
 
+    0. 规则预审：明确 PASS / REJECT 时直接返回（review_path="rule"）
     1. Path 1: JSON 结构审核（含设计意图对照）
     2. 如果 Path 1 PASS 且启用了视觉审核，执行 Path 2
+       （推测模式下 Path 2 已在共享线程池中与 Path 1 同时启动，这里只等待结果）
     3. 合并两路结果返回
+
+    推测模式下 Path 1 REJECT 时：Path 2 尚未开始则直接取消；已开始的渲染无法中断，
+    渲染完成后跳过 Vision 调用。需要真正取消时使用 arun_critic_agent。
     """
-    logger.info("⚖️ Critic Agent 正在审核海报质量（双路审核）...")
+    rule_review = _rule_prereview(poster_data)
+    if rule_review is not None:
+        return rule_review
+
+    visual_future: Optional[Future] = None
+    visual_cancelled = threading.Event()
+    if _speculative_enabled():
+        logger.info("🚀 [Path 2] 推测模式：与结构审核同时启动视觉审核")
+        visual_future = _get_visual_executor().submit(_run_visual_review, poster_data, visual_cancelled)
 
     try:
         # ---- Path 1: JSON 结构审核 ----
         logger.info("📋 [Path 1] JSON 结构审核...")
         json_review = _run_json_review(poster_data, design_brief=design_brief)
 
-        status_emoji = "✅" if json_review["status"] == "PASS" else "❌"
-        logger.info(f"{status_emoji} [Path 1] 结构审核: {json_review['status']} - {json_review.get('feedback', '')}")
-
+        # ---- Path 2: 视觉审核（仅在 Path 1 通过时执行 / 采纳） ----
         visual_review = None
-
-        # ---- Path 2: 视觉审核（仅在 Path 1 通过时执行） ----
-        if json_review["status"] == "REJECT":
-            logger.info("⏭️ [Path 2] 跳过视觉审核（结构审核已 REJECT）")
-        elif not settings.critic.ENABLE_VISUAL_REVIEW:
-            logger.info("⏭️ [Path 2] 视觉审核已关闭（ENABLE_VISUAL_REVIEW=False）")
-        else:
+        if _needs_visual_review(json_review):
             try:
-                visual_review = _run_visual_review(poster_data)
-                ve = "✅" if visual_review["status"] == "PASS" else "❌"
-                logger.info(f"{ve} [Path 2] 视觉审核: {visual_review['status']} - {visual_review.get('feedback', '')}")
+                if visual_future is not None:
+                    visual_review = visual_future.result()
+                else:
+                    visual_review = _run_visual_review(poster_data)
+                _log_visual_review(visual_review)
             except Exception as e:
                 logger.warning(f"⚠️ [Path 2] 视觉审核失败，降级为 PASS: {e}")
                 visual_review = None
 
         # ---- 合并结果 ----
-        merged = _merge_reviews(json_review, visual_review)
+        return _finalize_review(json_review, visual_review)
+
+    except Exception as e:
+        logger.error(f"❌ Critic Agent 出错: {e}")
+        return ERROR_FALLBACKS["critic"]
 
-        final_emoji = "✅" if merged["status"] == "PASS" else "❌"
-        logger.info(f"{final_emoji} 最终审核结果 ({merged.get('review_path', 'unknown')}): {merged['status']} - {merged['feedback']}")
+    finally:
+        # 未开始的任务直接取消；已在执行的任务渲染完成后不再调用 Vision，结果被丢弃，不阻塞返回
+        if visual_future is not None and not visual_future.done():
+            visual_cancelled.set()
+            visual_future.cancel()
 
-        if merged.get("issues"):
-            logger.info(f"📋 问题列表: {', '.join(merged['issues'])}")
 
-        return merged
+async def arun_critic_agent(
+    poster_data: Dict[str, Any],
+    design_brief: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    运行 Critic Agent（双路审核，异步版本）。
+
+    级联策略与 run_critic_agent 完全一致，两路 LLM 调用均为原生协程。
+    推测模式下 Path 2 作为后台任务与 Path 1 并发，Path 1 REJECT 时直接 cancel。
+    """
+    rule_review = _rule_prereview(poster_data, ", async")
+    if rule_review is not None:
+        return rule_review
+
+    visual_task: Optional[asyncio.Task] = None
+    if _speculative_enabled():
+        logger.info("🚀 [Path 2] 推测模式：与结构审核同时启动视觉审核")
+        visual_task = asyncio.create_task(_arun_visual_review(poster_data))
+
+    try:
+        logger.info("📋 [Path 1] JSON 结构审核...")
+        json_review = await _arun_json_review(poster_data, design_brief=design_brief)
+
+        visual_review = None
+        if _needs_visual_review(json_review):
+            try:
+                if visual_task is not None:
+                    visual_review = await visual_task
+                else:
+                    visual_review = await _arun_visual_review(poster_data)
+                _log_visual_review(visual_review)
+            except Exception as e:
+                logger.warning(f"⚠️ [Path 2] 视觉审核失败，降级为 PASS: {e}")
+                visual_review = None
+
+        return _finalize_review(json_review, visual_review)
 
     except Exception as e:
         logger.error(f"❌ Critic Agent 出错: {e}")
         return ERROR_FALLBACKS["critic"]
 
+    finally:
+        if visual_task is not None and not visual_task.done():
+            visual_task.cancel()
+            logger.info("🛑 [Path 2] 已取消推测执行的视觉审核")
+
 
 def critic_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
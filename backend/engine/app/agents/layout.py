@@ -5,15 +5,25 @@ Layout Agent - 语义 DSL 生成 + OOP 布局引擎
     1. LLM 输出语义 DSL 指令（无坐标）+ layout_strategy
     2. OOP 布局引擎根据 strategy 动态计算所有元素坐标
     3. 转换为 Pydantic Schema
+
+多策略模式（run_layout_agent_multi）：一次 LLM 调用得到 DSL，
+本地按不同 layout_strategy × font_style 排出多个候选版式。
+
+多尺寸派生（derive_poster_sizes）：海报携带 DSL，本地按其他画布尺寸重新排版。
 """
 
+import copy
 import json
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from ..core.config import settings, ERROR_FALLBACKS
 from ..core.llm import LLMClientFactory
+from ..core.llm_cache import unwrap_client
 from ..core.logger import get_logger
 from ..prompts import layout as layout_prompt
-from ..services.renderer import RendererService, VALID_STRATEGIES
+from ..services.renderer import LayoutBuilder, RendererService, VALID_STRATEGIES
+from ..services.renderer.font_registry import DEFAULT_FONT_STYLE, VALID_FONT_STYLES
+from ..services.renderer.resize import aspect_class, crop_background, resize_strategy, scale_instructions
 from .base import BaseAgent
 
 logger = get_logger(__name__)
@@ -22,11 +32,14 @@ logger = get_logger(__name__)
 class LayoutAgent(BaseAgent):
     """Layout Agent 实现类"""
 
+    cache_namespace = "layout"
+
     def _create_client(self):
         return LLMClientFactory.get_client(
             provider=self.config.get("provider", "gemini"),
             api_key=self.config.get("api_key"),
             base_url=self.config.get("base_url"),
+            cache_namespace=self.cache_namespace,
         )
 
     def invoke(self, contents: str, **kwargs) -> Dict[str, Any]:
@@ -34,8 +47,6 @@ class LayoutAgent(BaseAgent):
         provider = self.config.get("provider", "gemini").lower()
 
         if provider == "gemini":
-            from google.genai import types
-
             if not hasattr(self.client, "models"):
                 raise ValueError(f"Gemini Client {type(self.client)} does not have 'models' attribute")
 
@@ -43,29 +54,51 @@ class LayoutAgent(BaseAgent):
             if not hasattr(models, "generate_content"):
                 raise ValueError(f"Gemini Models object {type(models)} does not have 'generate_content' method")
 
-            response = models.generate_content(
-                model=self.config["model"],
-                contents=contents,
-                config=types.GenerateContentConfig(response_mime_type=self.config["response_mime_type"]),
-                **kwargs,
-            )
-            return response
+            return models.generate_content(**self._gemini_request(contents), **kwargs)
         else:
             from openai import OpenAI
 
-            if not isinstance(self.client, OpenAI):
+            if not isinstance(unwrap_client(self.client), OpenAI):
                 raise ValueError(f"Expected OpenAI client, got {type(self.client)}")
 
-            response = self.client.chat.completions.create(
-                model=self.config["model"],
-                messages=[{"role": "user", "content": contents}],
-                temperature=self.config.get("temperature", 0.1),
-                response_format=(
-                    {"type": "json_object"} if self.config.get("response_mime_type") == "application/json" else None
-                ),
-                **kwargs,
+            return self.client.chat.completions.create(**self._openai_request(contents), **kwargs)
+
+    async def ainvoke(self, contents: str, **kwargs) -> Dict[str, Any]:
+        """调用 Layout Agent（异步）"""
+        provider = self.config.get("provider", "gemini").lower()
+
+        if provider == "gemini":
+            return await self.async_client.models.generate_content(
+                **self._gemini_request(contents), **kwargs
+            )
+        else:
+            from openai import AsyncOpenAI
+
+            if not isinstance(unwrap_client(self.async_client), AsyncOpenAI):
+                raise ValueError(f"Expected AsyncOpenAI client, got {type(self.async_client)}")
+
+            return await self.async_client.chat.completions.create(
+                **self._openai_request(contents), **kwargs
             )
-            return response
+
+    def _gemini_request(self, contents: str) -> Dict[str, Any]:
+        from google.genai import types
+
+        return {
+            "model": self.config["model"],
+            "contents": contents,
+            "config": types.GenerateContentConfig(response_mime_type=self.config["response_mime_type"]),
+        }
+
+    def _openai_request(self, contents: str) -> Dict[str, Any]:
+        return {
+            "model": self.config["model"],
+            "messages": [{"role": "user", "content": contents}],
+            "temperature": self.config.get("temperature", 0.1),
+            "response_format": (
+                {"type": "json_object"} if self.config.get("response_mime_type") == "application/json" else None
+            ),
+        }
 
 
 def run_layout_agent(
@@ -91,112 +124,370 @@ def run_layout_agent(
         logger.info(f"📝 收到审核反馈: {review_feedback.get('feedback', '')}")
 
     try:
-        # 1. 生成 Prompt
-        prompts = layout_prompt.get_prompt(
-            design_brief=design_brief,
-            asset_list=asset_list,
-            canvas_width=canvas_width,
-            canvas_height=canvas_height,
-            review_feedback=review_feedback,
-            style_hint=style_hint,
+        contents = _build_layout_contents(
+            design_brief, asset_list, canvas_width, canvas_height, review_feedback, style_hint,
         )
 
-        # 2. 调用 LLM
         from .base import AgentFactory
         agent = AgentFactory.get_layout_agent()
 
         logger.debug("📤 发送语义 DSL Prompt 到 LLM...")
-        response = agent.invoke(contents=f"{prompts['system']}\n\n{prompts['user']}")
+        response = agent.invoke(contents=contents)
 
-        # 3. 解析 LLM 响应
-        if hasattr(response, "text"):
-            content = response.text
-        elif hasattr(response, "choices") and len(response.choices) > 0:
-            content = response.choices[0].message.content
-        else:
-            raise ValueError(f"Unknown response format: {type(response)}")
+        return _build_poster_from_response(
+            response, design_brief, asset_list, canvas_width, canvas_height,
+        )
 
-        if "```json" in content:
-            content = content.replace("```json", "").replace("```", "")
-        content = content.strip()
+    except json.JSONDecodeError as e:
+        logger.error(f"❌ DSL JSON 解析失败: {e}")
+        return ERROR_FALLBACKS["layout"]
+    except Exception as e:
+        logger.error(f"❌ Layout Error: {type(e).__name__}: {e}")
+        import traceback
+        logger.error(f"   堆栈:\n{traceback.format_exc()}")
+        return ERROR_FALLBACKS["layout"]
 
-        dsl_response = json.loads(content)
-        dsl_instructions = dsl_response.get("dsl_instructions", [])
 
-        # 4. 提取 layout_strategy 和 font_style
-        layout_strategy = dsl_response.get("layout_strategy", "centered")
-        if layout_strategy not in VALID_STRATEGIES:
-            logger.warning(
-                f"⚠️ LLM 返回了无效的 layout_strategy: '{layout_strategy}'，回退到 centered"
-            )
-            layout_strategy = "centered"
+async def arun_layout_agent(
+    design_brief: Dict[str, Any],
+    asset_list: Dict[str, Any],
+    canvas_width: int,
+    canvas_height: int,
+    review_feedback: Optional[Dict[str, Any]] = None,
+    style_hint: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    运行 Layout Agent（异步版本）
 
-        font_style = dsl_response.get("font_style")
+    与 run_layout_agent 流程一致，LLM 调用走 AsyncOpenAI / genai aio，
+    不占用线程池；布局计算为纯 CPU 且耗时毫秒级，直接在协程内执行。
+    """
+    logger.info("📐 Layout Agent 正在规划布局（async）...")
+
+    if review_feedback and review_feedback.get("status") == "REJECT":
+        logger.info(f"📝 收到审核反馈: {review_feedback.get('feedback', '')}")
 
-        logger.info(
-            f"📋 收到 {len(dsl_instructions)} 条语义 DSL 指令, "
-            f"strategy={layout_strategy}, font_style={font_style}"
+    try:
+        contents = _build_layout_contents(
+            design_brief, asset_list, canvas_width, canvas_height, review_feedback, style_hint,
         )
 
-        # 5. 替换图片 src 占位符
-        for instr in dsl_instructions:
-            if instr.get("command") == "add_image":
-                src = instr.get("src", "")
-                layer_type = instr.get("layer_type", "background")
-
-                if "ASSET_BG" in src or layer_type == "background":
-                    if asset_list.get("background_layer"):
-                        instr["src"] = asset_list["background_layer"].get("src", "")
-                elif "ASSET_FG" in src or layer_type == "subject":
-                    if asset_list.get("subject_layer"):
-                        instr["src"] = asset_list["subject_layer"].get("src", "")
-
-        # 6. OOP 布局引擎计算坐标
-        renderer = RendererService()
-
-        elements = renderer.parse_dsl_and_build_layout(
-            dsl_instructions=dsl_instructions,
-            layout_strategy=layout_strategy,
-            canvas_width=canvas_width,
-            canvas_height=canvas_height,
-            design_brief=design_brief,
-            font_style=font_style,
+        from .base import AgentFactory
+        agent = AgentFactory.get_layout_agent()
+
+        logger.debug("📤 发送语义 DSL Prompt 到 LLM（async）...")
+        response = await agent.ainvoke(contents=contents)
+
+        return _build_poster_from_response(
+            response, design_brief, asset_list, canvas_width, canvas_height,
         )
 
-        # 7. 转换为 Pydantic Schema
-        poster_data = renderer.convert_to_pydantic_schema(
-            elements=elements,
-            design_brief=design_brief,
-            canvas_width=canvas_width,
-            canvas_height=canvas_height,
+    except json.JSONDecodeError as e:
+        logger.error(f"❌ DSL JSON 解析失败: {e}")
+        return ERROR_FALLBACKS["layout"]
+    except Exception as e:
+        logger.error(f"❌ Layout Error: {type(e).__name__}: {e}")
+        import traceback
+        logger.error(f"   堆栈:\n{traceback.format_exc()}")
+        return ERROR_FALLBACKS["layout"]
+
+
+def _build_layout_contents(
+    design_brief: Dict[str, Any],
+    asset_list: Dict[str, Any],
+    canvas_width: int,
+    canvas_height: int,
+    review_feedback: Optional[Dict[str, Any]],
+    style_hint: Optional[str],
+) -> str:
+    """生成发送给 LLM 的完整 Prompt 文本"""
+    prompts = layout_prompt.get_prompt(
+        design_brief=design_brief,
+        asset_list=asset_list,
+        canvas_width=canvas_width,
+        canvas_height=canvas_height,
+        review_feedback=review_feedback,
+        style_hint=style_hint,
+    )
+    return f"{prompts['system']}\n\n{prompts['user']}"
+
+
+def _parse_dsl_response(response: Any) -> Dict[str, Any]:
+    """解析 LLM 响应文本为 DSL JSON（去掉 ```json 代码块标记）"""
+    if hasattr(response, "text"):
+        content = response.text
+    elif hasattr(response, "choices") and len(response.choices) > 0:
+        content = response.choices[0].message.content
+    else:
+        raise ValueError(f"Unknown response format: {type(response)}")
+
+    if "```json" in content:
+        content = content.replace("```json", "").replace("```", "")
+    content = content.strip()
+
+    return json.loads(content)
+
+
+def _resolve_strategy(dsl_response: Dict[str, Any]) -> str:
+    layout_strategy = dsl_response.get("layout_strategy", "centered")
+    if layout_strategy not in VALID_STRATEGIES:
+        logger.warning(
+            f"⚠️ LLM 返回了无效的 layout_strategy: '{layout_strategy}'，回退到 centered"
         )
+        layout_strategy = "centered"
+    return layout_strategy
 
-        # 8. 合并素材数据
-        poster_data = renderer.merge_with_design_brief(
-            poster_data=poster_data,
-            design_brief=design_brief,
-            asset_list=asset_list,
+
+def _replace_asset_placeholders(dsl_instructions: List[Dict[str, Any]], asset_list: Dict[str, Any]) -> None:
+    """替换图片 src 占位符（ASSET_BG / ASSET_FG）"""
+    for instr in dsl_instructions:
+        if instr.get("command") == "add_image":
+            src = instr.get("src", "")
+            layer_type = instr.get("layer_type", "background")
+
+            if "ASSET_BG" in src or layer_type == "background":
+                if asset_list.get("background_layer"):
+                    instr["src"] = asset_list["background_layer"].get("src", "")
+            elif "ASSET_FG" in src or layer_type == "subject":
+                if asset_list.get("subject_layer"):
+                    instr["src"] = asset_list["subject_layer"].get("src", "")
+
+
+def _build_poster_from_dsl(
+    dsl_response: Dict[str, Any],
+    design_brief: Dict[str, Any],
+    asset_list: Dict[str, Any],
+    canvas_width: int,
+    canvas_height: int,
+    layout_strategy: str,
+    font_style: Optional[str],
+) -> Dict[str, Any]:
+    """
+    DSL 指令（已替换占位符）→ OOP 布局 → Pydantic Schema → poster JSON
+
+    布局引擎会改写指令字典，这里先深拷贝，同一份 DSL 可以按不同策略 / 字体重复排版。
+    """
+    dsl_instructions = copy.deepcopy(dsl_response.get("dsl_instructions", []))
+
+    # 1. OOP 布局 → Pydantic Schema → 合并素材（相同输入命中排版结果缓存）
+    poster_data = RendererService().build_poster(
+        dsl_instructions=dsl_instructions,
+        layout_strategy=layout_strategy,
+        canvas_width=canvas_width,
+        canvas_height=canvas_height,
+        design_brief=design_brief,
+        font_style=font_style,
+        asset_list=asset_list,
+    )
+
+    # 2. 输出
+    poster_json = poster_data.model_dump()
+    poster_json["layout_strategy"] = layout_strategy
+    poster_json["layout_tree"] = LayoutBuilder().describe_tree(dsl_instructions, layout_strategy).model_dump()
+    poster_json["dsl_instructions"] = dsl_instructions
+    if font_style:
+        poster_json["font_style"] = font_style
+
+    layout_style = dsl_response.get("layout_style")
+    if layout_style:
+        poster_json["layout_style"] = layout_style
+
+    return poster_json
+
+
+def _build_poster_from_response(
+    response: Any,
+    design_brief: Dict[str, Any],
+    asset_list: Dict[str, Any],
+    canvas_width: int,
+    canvas_height: int,
+) -> Dict[str, Any]:
+    """
+    解析 LLM 响应 → 替换图片占位符 → OOP 布局 → Pydantic Schema → poster JSON
+    """
+    dsl_response = _parse_dsl_response(response)
+    layout_strategy = _resolve_strategy(dsl_response)
+    font_style = dsl_response.get("font_style")
+
+    logger.info(
+        f"📋 收到 {len(dsl_response.get('dsl_instructions', []))} 条语义 DSL 指令, "
+        f"strategy={layout_strategy}, font_style={font_style}"
+    )
+
+    _replace_asset_placeholders(dsl_response.get("dsl_instructions", []), asset_list)
+    poster_json = _build_poster_from_dsl(
+        dsl_response, design_brief, asset_list, canvas_width, canvas_height,
+        layout_strategy, font_style,
+    )
+
+    logger.info(f"✅ Layout 完成，生成了 {len(poster_json.get('layers', []))} 个图层")
+    return poster_json
+
+
+# ============================================================================
+# 多策略模式：一次 DSL 生成，本地按 策略 × 字体风格 排出多个候选
+# ============================================================================
+
+def plan_layout_variants(
+    layout_strategy: str,
+    font_style: Optional[str],
+    count: int,
+) -> List[Tuple[str, str]]:
+    """
+    规划 count 个 (layout_strategy, font_style) 组合
+
+    顺序：LLM 选择的组合 → 其余策略（沿用 LLM 的字体）→ 其余字体风格 × 全部策略，
+    保证前 len(STRATEGIES) 个候选的布局策略互不相同。
+    """
+    font_style = font_style if font_style in VALID_FONT_STYLES else DEFAULT_FONT_STYLE
+    fonts = [font_style] + [f for f in VALID_FONT_STYLES if f != font_style]
+    strategies = [layout_strategy] + [s for s in VALID_STRATEGIES if s != layout_strategy]
+    combos = [(s, f) for f in fonts for s in strategies]
+    return combos[:max(count, 0)]
+
+
+def _build_poster_variants(
+    response: Any,
+    design_brief: Dict[str, Any],
+    asset_list: Dict[str, Any],
+    canvas_width: int,
+    canvas_height: int,
+    count: int,
+) -> List[Dict[str, Any]]:
+    """解析一次 LLM 响应，按 plan_layout_variants 的组合逐个排版"""
+    dsl_response = _parse_dsl_response(response)
+    layout_strategy = _resolve_strategy(dsl_response)
+    plan = plan_layout_variants(layout_strategy, dsl_response.get("font_style"), count)
+
+    _replace_asset_placeholders(dsl_response.get("dsl_instructions", []), asset_list)
+
+    start = time.perf_counter()
+    posters = [
+        _build_poster_from_dsl(
+            dsl_response, design_brief, asset_list, canvas_width, canvas_height, strategy, font,
+        )
+        for strategy, font in plan
+    ]
+    logger.info(
+        f"✅ 多策略排版完成: {len(posters)} 个候选, "
+        f"耗时 {(time.perf_counter() - start) * 1000:.0f}ms"
+    )
+    return posters
+
+
+def run_layout_agent_multi(
+    design_brief: Dict[str, Any],
+    asset_list: Dict[str, Any],
+    canvas_width: int,
+    canvas_height: int,
+    count: int,
+    review_feedback: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    运行 Layout Agent（多策略模式）
+
+    只调用一次 LLM 生成语义 DSL，再由布局引擎按不同 layout_strategy / font_style
+    排出 count 个候选版式。失败时返回空列表（调用方可退回逐策略生成）。
+    """
+    logger.info(f"📐 Layout Agent 正在规划布局（多策略 × {count}）...")
+
+    try:
+        contents = _build_layout_contents(
+            design_brief, asset_list, canvas_width, canvas_height, review_feedback, None,
         )
 
-        # 9. 输出
-        poster_json = poster_data.model_dump()
-        poster_json["layout_strategy"] = layout_strategy
+        from .base import AgentFactory
+        agent = AgentFactory.get_layout_agent()
 
-        layout_style = dsl_response.get("layout_style")
-        if layout_style:
-            poster_json["layout_style"] = layout_style
+        response = agent.invoke(contents=contents)
 
-        logger.info(f"✅ Layout 完成，生成了 {len(poster_json.get('layers', []))} 个图层")
-        return poster_json
+        return _build_poster_variants(
+            response, design_brief, asset_list, canvas_width, canvas_height, count,
+        )
 
     except json.JSONDecodeError as e:
         logger.error(f"❌ DSL JSON 解析失败: {e}")
-        return ERROR_FALLBACKS["layout"]
+        return []
     except Exception as e:
         logger.error(f"❌ Layout Error: {type(e).__name__}: {e}")
-        import traceback
-        logger.error(f"   堆栈:\n{traceback.format_exc()}")
-        return ERROR_FALLBACKS["layout"]
+        return []
+
+
+async def arun_layout_agent_multi(
+    design_brief: Dict[str, Any],
+    asset_list: Dict[str, Any],
+    canvas_width: int,
+    canvas_height: int,
+    count: int,
+    review_feedback: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """运行 Layout Agent（多策略模式，异步版本）"""
+    logger.info(f"📐 Layout Agent 正在规划布局（多策略 × {count}, async）...")
+
+    try:
+        contents = _build_layout_contents(
+            design_brief, asset_list, canvas_width, canvas_height, review_feedback, None,
+        )
+
+        from .base import AgentFactory
+        agent = AgentFactory.get_layout_agent()
+
+        response = await agent.ainvoke(contents=contents)
+
+        return _build_poster_variants(
+            response, design_brief, asset_list, canvas_width, canvas_height, count,
+        )
+
+    except json.JSONDecodeError as e:
+        logger.error(f"❌ DSL JSON 解析失败: {e}")
+        return []
+    except Exception as e:
+        logger.error(f"❌ Layout Error: {type(e).__name__}: {e}")
+        return []
+
+
+# ============================================================================
+# 多尺寸派生：沿用 DSL 与布局策略，本地按目标尺寸重新排版
+# ============================================================================
+
+def derive_poster_sizes(
+    poster: Dict[str, Any],
+    design_brief: Dict[str, Any],
+    sizes: List[Tuple[int, int]],
+) -> List[Dict[str, Any]]:
+    """
+    将已生成的海报派生到多个画布尺寸（不调用 LLM）
+
+    每个尺寸：布局策略按宽高比映射、DSL 字号按短边换算、背景图做主体感知裁剪，
+    再走与首次生成相同的 OOP 布局 → Schema 流程。
+
+    Args:
+        poster: Layout Agent 输出的海报 JSON（需含 dsl_instructions）
+        design_brief: 设计简报
+        sizes: 目标画布尺寸 [(宽, 高)]
+
+    Returns:
+        与 sizes 一一对应的海报 JSON（附带 aspect 字段）
+    """
+    canvas = poster.get("canvas", {})
+    source_size = (canvas.get("width", 1080), canvas.get("height", 1920))
+    dsl = poster.get("dsl_instructions", [])
+
+    posters = []
+    for width, height in sizes:
+        strategy = resize_strategy(poster.get("layout_strategy"), width, height)
+        instructions = scale_instructions(dsl, source_size, (width, height))
+        for instr in instructions:
+            if instr.get("command") == "add_image" and instr.get("layer_type", "background") == "background":
+                instr["src"] = crop_background(instr.get("src", ""), width, height)
+
+        poster_json = _build_poster_from_dsl(
+            {"dsl_instructions": instructions, "layout_style": poster.get("layout_style")},
+            design_brief, {}, width, height, strategy, poster.get("font_style"),
+        )
+        poster_json["aspect"] = aspect_class(width, height)
+        posters.append(poster_json)
+    return posters
 
 
 def layout_node(state: Dict[str, Any]) -> Dict[str, Any]:
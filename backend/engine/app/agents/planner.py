@@ -24,11 +24,14 @@ logger = get_logger(__name__)
 class PlannerAgent(BaseAgent):
     """Planner Agent 实现类（LLM 调用层，供 DesignBriefSkill 使用）"""
 
+    cache_namespace = "planner"
+
     def _create_client(self):
         return LLMClientFactory.get_client(
             provider=self.config.get("provider", "deepseek"),
             api_key=self.config.get("api_key"),
             base_url=self.config.get("base_url"),
+            cache_namespace=self.cache_namespace,
         )
 
     def invoke(self, messages: list, **kwargs) -> Dict[str, Any]:
@@ -42,6 +45,17 @@ class PlannerAgent(BaseAgent):
         )
         return response
 
+    async def ainvoke(self, messages: list, **kwargs) -> Dict[str, Any]:
+        """调用 LLM（异步）"""
+        response = await self.async_client.chat.completions.create(
+            model=self.config["model"],
+            messages=messages,
+            temperature=self.config["temperature"],
+            response_format=self.config.get("response_format"),
+            **kwargs,
+        )
+        return response
+
 
 def run_planner_agent(
     user_prompt: str,
@@ -0,0 +1,437 @@
+"""
+Rule Critic - 规则预审（纯几何 / 配色计算，无 LLM）
+
+在 Critic Agent 的 LLM 双路审核之前执行，检查：
+- 结构：图层为空、尺寸无效、缺少文字
+- 文字互相重叠
+- 阅读顺序（主标题应位于文字流的开头）
+- 文字与下方遮罩 / 画布背景色的对比度（WCAG）
+- 字号层级与最小可读字号
+- 页边距与画布溢出
+- CTA 位置
+
+结论：
+- REJECT：存在严重问题（error），直接驳回，不调用 LLM
+- PASS：没有任何问题且所有文字的背景色都可确定，直接通过，不调用 LLM
+- UNSURE：只有警告或背景色未知（文字压在图片上），交给 LLM 审核
+
+阈值见 settings.rule_critic（RULE_CRITIC_*）。
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.logger import get_logger
+
+logger = get_logger(__name__)
+
+RGB = Tuple[float, float, float]
+
+ERROR = "error"
+WARNING = "warning"
+
+
+# =============================================================================
+# 结果结构
+# =============================================================================
+
+@dataclass
+class RuleIssue:
+    """单条规则问题"""
+    rule: str
+    severity: str
+    message: str
+    layer_id: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rule": self.rule,
+            "severity": self.severity,
+            "message": self.message,
+            "layer_id": self.layer_id,
+        }
+
+
+@dataclass
+class RuleReview:
+    """规则预审结果"""
+    issues: List[RuleIssue] = field(default_factory=list)
+    contrast_known: bool = True
+
+    @property
+    def has_errors(self) -> bool:
+        return any(i.severity == ERROR for i in self.issues)
+
+    @property
+    def verdict(self) -> str:
+        if self.has_errors:
+            return "REJECT"
+        if not self.issues and self.contrast_known:
+            return "PASS"
+        return "UNSURE"
+
+    def to_review(self) -> Dict[str, Any]:
+        """转换为与 _run_json_review 一致的 {status, feedback, issues} 结构"""
+        verdict = self.verdict
+        if verdict == "REJECT":
+            feedback = "；".join(i.message for i in self.issues if i.severity == ERROR)
+        elif verdict == "PASS":
+            feedback = "规则预审通过"
+        else:
+            feedback = "；".join(i.message for i in self.issues) or "文字背景色无法确定，需要人工/LLM 审核"
+        return {
+            "status": verdict,
+            "feedback": feedback,
+            "issues": [i.message for i in self.issues],
+            "rule_issues": [i.to_dict() for i in self.issues],
+            "review_path": "rule",
+        }
+
+
+# =============================================================================
+# 颜色工具
+# =============================================================================
+
+def _parse_color(value: Any) -> Optional[Tuple[RGB, float]]:
+    """解析 #RGB / #RRGGBB / #RRGGBBAA，返回 ((r, g, b), alpha)；无法解析返回 None"""
+    if not isinstance(value, str):
+        return None
+    text = value.strip().lower()
+    if not text.startswith("#"):
+        return None
+    hex_part = text[1:]
+    if len(hex_part) in (3, 4):
+        hex_part = "".join(c * 2 for c in hex_part)
+    if len(hex_part) not in (6, 8):
+        return None
+    try:
+        channels = [int(hex_part[i:i + 2], 16) for i in range(0, len(hex_part), 2)]
+    except ValueError:
+        return None
+    alpha = channels[3] / 255 if len(channels) == 4 else 1.0
+    return (channels[0], channels[1], channels[2]), alpha
+
+
+def _blend(top: RGB, bottom: RGB, alpha: float) -> RGB:
+    return tuple(t * alpha + b * (1 - alpha) for t, b in zip(top, bottom))
+
+
+def _relative_luminance(rgb: RGB) -> float:
+    def channel(c: float) -> float:
+        c = c / 255
+        return c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
+
+    r, g, b = (channel(c) for c in rgb)
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def contrast_ratio(fg: RGB, bg: RGB) -> float:
+    """WCAG 对比度（1 ~ 21）"""
+    l1, l2 = _relative_luminance(fg), _relative_luminance(bg)
+    hi, lo = max(l1, l2), min(l1, l2)
+    return (hi + 0.05) / (lo + 0.05)
+
+
+# =============================================================================
+# 几何工具
+# =============================================================================
+
+def _box(layer: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    x, y = float(layer.get("x", 0)), float(layer.get("y", 0))
+    return x, y, x + float(layer.get("width", 0)), y + float(layer.get("height", 0))
+
+
+def _area(box: Tuple[float, float, float, float]) -> float:
+    return max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+
+
+def _intersection(a, b) -> float:
+    return _area((max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])))
+
+
+def _contains(box, px: float, py: float) -> bool:
+    return box[0] <= px <= box[2] and box[1] <= py <= box[3]
+
+
+def _label(layer: Dict[str, Any]) -> str:
+    content = str(layer.get("content", ""))
+    return f"'{content[:10]}'" if content else str(layer.get("id", "?"))
+
+
+# =============================================================================
+# 各项检查
+# =============================================================================
+
+def _check_structure(layers: List[Dict[str, Any]], texts: List[Dict[str, Any]]) -> List[RuleIssue]:
+    if not layers:
+        return [RuleIssue("structure", ERROR, "无图层")]
+    issues = []
+    for layer in layers:
+        w, h = layer.get("width", 0), layer.get("height", 0)
+        if w <= 0 or h <= 0:
+            issues.append(RuleIssue("structure", ERROR, f"图层 {layer.get('id', '?')} 尺寸无效 ({w}x{h})",
+                                    layer.get("id")))
+    if not texts:
+        issues.append(RuleIssue("structure", ERROR, "缺少文字图层"))
+    return issues
+
+
+def _check_truncation(texts: List[Dict[str, Any]]) -> List[RuleIssue]:
+    return [
+        RuleIssue("truncation", WARNING, f"文字 {_label(t)} 放不下，已被截断", t.get("id"))
+        for t in texts if t.get("truncated")
+    ]
+
+
+def _check_overlap(texts: List[Dict[str, Any]]) -> List[RuleIssue]:
+    cfg = settings.rule_critic
+    issues = []
+    for i, a in enumerate(texts):
+        box_a = _box(a)
+        for b in texts[i + 1:]:
+            box_b = _box(b)
+            smaller = min(_area(box_a), _area(box_b))
+            if smaller <= 0:
+                continue
+            ratio = _intersection(box_a, box_b) / smaller
+            if ratio >= cfg.OVERLAP_REJECT_RATIO:
+                severity = ERROR
+            elif ratio >= cfg.OVERLAP_WARN_RATIO:
+                severity = WARNING
+            else:
+                continue
+            issues.append(RuleIssue(
+                "overlap", severity, f"文字 {_label(a)} 与 {_label(b)} 重叠 {ratio:.0%}", a.get("id"),
+            ))
+    return issues
+
+
+def _reading_order(texts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(texts, key=lambda t: (float(t.get("y", 0)), float(t.get("x", 0))))
+
+
+def _title(texts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return max(texts, key=lambda t: t.get("fontSize", 24))
+
+
+def _check_reading_order(ordered: List[Dict[str, Any]], title: Dict[str, Any]) -> List[RuleIssue]:
+    # 允许主标题上方有一行小标签（如 eyebrow / 日期），再往后就是阅读顺序颠倒
+    if len(ordered) >= 3 and ordered.index(title) > 1:
+        return [RuleIssue("reading_order", WARNING, f"主标题 {_label(title)} 不在文字流开头，阅读顺序混乱",
+                          title.get("id"))]
+    return []
+
+
+def _check_hierarchy(texts: List[Dict[str, Any]], canvas_width: float) -> List[RuleIssue]:
+    cfg = settings.rule_critic
+    issues = []
+    min_px = cfg.MIN_FONT_SIZE * canvas_width / 1080
+    for t in texts:
+        if t.get("fontSize", 24) < min_px:
+            issues.append(RuleIssue("font_size", WARNING,
+                                    f"文字 {_label(t)} 字号 {t.get('fontSize')}px 过小", t.get("id")))
+    sizes = [t.get("fontSize", 24) for t in texts]
+    if len(sizes) >= 2 and min(sizes) > 0 and max(sizes) / min(sizes) < cfg.HIERARCHY_MIN_RATIO:
+        issues.append(RuleIssue("hierarchy", WARNING,
+                                f"字号层级不明显（最大 {max(sizes)}px / 最小 {min(sizes)}px）"))
+    return issues
+
+
+def _check_margins(texts: List[Dict[str, Any]], cw: float, ch: float) -> List[RuleIssue]:
+    cfg = settings.rule_critic
+    margin = cfg.MARGIN_MIN_RATIO * cw
+    issues = []
+    for t in texts:
+        x0, y0, x1, y1 = _box(t)
+        overflow = max(-x0, -y0, x1 - cw, y1 - ch)
+        if overflow > cfg.OVERFLOW_REJECT_PX:
+            issues.append(RuleIssue("margin", ERROR, f"文字 {_label(t)} 严重溢出画布", t.get("id")))
+        elif overflow > 0:
+            issues.append(RuleIssue("margin", WARNING, f"文字 {_label(t)} 超出画布边缘", t.get("id")))
+        elif min(x0, y0, cw - x1, ch - y1) < margin:
+            issues.append(RuleIssue("margin", WARNING, f"文字 {_label(t)} 距画布边缘过近", t.get("id")))
+    return issues
+
+
+def _is_bold(layer: Dict[str, Any]) -> bool:
+    weight = str(layer.get("fontWeight", "normal")).lower()
+    return weight == "bold" or (weight.isdigit() and int(weight) >= 600)
+
+
+def _check_cta(ordered: List[Dict[str, Any]], title: Dict[str, Any], ch: float) -> List[RuleIssue]:
+    """CTA：标题之外、字数很短的粗体文字；应在标题之后，且位于画布下部或文字流末尾"""
+    cfg = settings.rule_critic
+    candidates = [
+        t for t in ordered
+        if t is not title and _is_bold(t) and 0 < len(str(t.get("content", "")).strip()) <= cfg.CTA_MAX_CHARS
+    ]
+    if not candidates:
+        return []
+    cta = candidates[-1]
+    _, y0, _, y1 = _box(cta)
+    if ordered.index(cta) < ordered.index(title):
+        return [RuleIssue("cta", WARNING, f"CTA {_label(cta)} 位于主标题之前", cta.get("id"))]
+    if cta is not ordered[-1] and (y0 + y1) / 2 < cfg.CTA_MIN_Y_RATIO * ch:
+        return [RuleIssue("cta", WARNING, f"CTA {_label(cta)} 位置过高且不在文字流末尾", cta.get("id"))]
+    return []
+
+
+def _background_at(
+    layers: List[Dict[str, Any]], below_index: int, px: float, py: float, canvas_color: Optional[RGB],
+) -> Optional[RGB]:
+    """计算 (px, py) 处位于 layers[below_index] 下方的背景色；被图片 / 渐变覆盖时返回 None"""
+    cfg = settings.rule_critic
+    for i in range(below_index - 1, -1, -1):
+        layer = layers[i]
+        if layer.get("type") == "text" or not _contains(_box(layer), px, py):
+            continue
+        if layer.get("type") != "rect" or layer.get("gradient"):
+            return None
+        parsed = _parse_color(layer.get("backgroundColor"))
+        if parsed is None:
+            continue  # transparent 等
+        fill, alpha = parsed
+        alpha *= float(layer.get("opacity", 1.0))
+        if alpha <= 0:
+            continue
+        below = _background_at(layers, i, px, py, canvas_color)
+        if below is None:
+            return fill if alpha >= cfg.OVERLAY_OPAQUE_MIN else None
+        return _blend(fill, below, alpha)
+    return canvas_color
+
+
+def _check_contrast(
+    layers: List[Dict[str, Any]], canvas: Dict[str, Any],
+) -> Tuple[List[RuleIssue], bool]:
+    cfg = settings.rule_critic
+    canvas_parsed = _parse_color(canvas.get("backgroundColor", "#FFFFFF"))
+    canvas_color = canvas_parsed[0] if canvas_parsed else None
+    issues: List[RuleIssue] = []
+    all_known = True
+
+    for idx, layer in enumerate(layers):
+        if layer.get("type") != "text":
+            continue
+        fg = _parse_color(layer.get("color", "#000000"))
+        x0, y0, x1, y1 = _box(layer)
+        bg = _background_at(layers, idx, (x0 + x1) / 2, (y0 + y1) / 2, canvas_color)
+        if fg is None or bg is None:
+            all_known = False
+            continue
+
+        ratio = contrast_ratio(fg[0], bg)
+        large = layer.get("fontSize", 24) >= cfg.LARGE_TEXT_PX
+        minimum = cfg.CONTRAST_MIN_LARGE if large else cfg.CONTRAST_MIN
+        if ratio < cfg.CONTRAST_REJECT:
+            issues.append(RuleIssue("contrast", ERROR,
+                                    f"文字 {_label(layer)} 与背景几乎同色（对比度 {ratio:.2f}）", layer.get("id")))
+        elif ratio < minimum:
+            issues.append(RuleIssue("contrast", WARNING,
+                                    f"文字 {_label(layer)} 对比度不足（{ratio:.2f} < {minimum}）", layer.get("id")))
+    return issues, all_known
+
+
+# =============================================================================
+# 对外入口
+# =============================================================================
+
+def evaluate_layout(poster_data: Dict[str, Any]) -> RuleReview:
+    """对海报数据执行全部规则检查"""
+    layers = poster_data.get("layers", []) or []
+    canvas = poster_data.get("canvas", {}) or {}
+    cw = float(canvas.get("width", 1080))
+    ch = float(canvas.get("height", 1920))
+    texts = [layer for layer in layers if layer.get("type") == "text"]
+
+    review = RuleReview(issues=_check_structure(layers, texts))
+    if review.has_errors:
+        return review
+
+    ordered = _reading_order(texts)
+    title = _title(texts)
+    contrast_issues, contrast_known = _check_contrast(layers, canvas)
+
+    review.issues.extend(_check_truncation(texts))
+    review.issues.extend(_check_overlap(texts))
+    review.issues.extend(_check_reading_order(ordered, title))
+    review.issues.extend(contrast_issues)
+    review.issues.extend(_check_hierarchy(texts, cw))
+    review.issues.extend(_check_margins(texts, cw, ch))
+    review.issues.extend(_check_cta(ordered, title, ch))
+    review.contrast_known = contrast_known
+    return review
+
+
+class _RuleCriticStats:
+    """统计规则预审替代了多少次 LLM 审核"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = {"evaluated": 0, "pass": 0, "reject": 0, "deferred": 0}
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._counts["evaluated"] += 1
+            self._counts[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        avoided = counts["pass"] + counts["reject"]
+        counts["llm_calls_avoided"] = avoided
+        counts["llm_avoided_ratio"] = round(avoided / counts["evaluated"], 4) if counts["evaluated"] else 0.0
+        return counts
+
+
+_stats = _RuleCriticStats()
+
+
+def get_rule_critic_stats() -> Dict[str, Any]:
+    """规则预审统计（评估次数、直接 PASS / REJECT 次数、LLM 审核调用节省比例）"""
+    return _stats.snapshot()
+
+
+def reset_rule_critic_stats() -> None:
+    _stats.reset()
+
+
+def run_rule_critic(poster_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    规则预审入口：结论明确时返回审核结果（跳过 LLM），否则返回 None 交给 LLM 审核。
+    """
+    cfg = settings.rule_critic
+    if not cfg.ENABLED:
+        return None
+
+    try:
+        review = evaluate_layout(poster_data)
+    except Exception as e:
+        logger.warning(f"⚠️ [Rule] 规则预审出错，交给 LLM 审核: {e}")
+        return None
+
+    verdict = review.verdict
+    decisive = (
+        (verdict == "REJECT" and cfg.SHORT_CIRCUIT_REJECT)
+        or (verdict == "PASS" and cfg.SHORT_CIRCUIT_PASS)
+    )
+    _stats.record(verdict.lower() if decisive else "deferred")
+    stats = _stats.snapshot()
+
+    if not decisive:
+        if review.issues:
+            logger.info(f"📐 [Rule] 规则预审存疑（{len(review.issues)} 项警告），交给 LLM 审核")
+        return None
+
+    emoji = "✅" if verdict == "PASS" else "❌"
+    logger.info(
+        f"{emoji} [Rule] 规则预审直接 {verdict}，跳过 LLM 审核 "
+        f"(累计节省 {stats['llm_calls_avoided']}/{stats['evaluated']} = {stats['llm_avoided_ratio']:.0%})"
+    )
+    return review.to_review()
@@ -4,9 +4,13 @@ API 路由模块
 包含：
 - steps.py: 分步生成路由 /api/step/*
 - knowledge.py: 知识模块路由 /api/kg/*, /api/brand/*
+- assets.py: 图片资源路由 /api/assets/*
+- layout.py: 版式编辑路由 /api/layout/*
 """
 
+from .assets import router as assets_router
 from .knowledge import router as knowledge_router
+from .layout import router as layout_router
 from .steps import router as steps_router
 
-__all__ = ["knowledge_router", "steps_router"]
+__all__ = ["assets_router", "knowledge_router", "layout_router", "steps_router"]
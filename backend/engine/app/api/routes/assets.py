@@ -0,0 +1,39 @@
+"""
+图片资源路由
+
+GET /api/assets/{sha256} —— 按内容摘要返回图片字节（asset://<sha256> 引用的 HTTP 入口），
+供前端 <img> 与 Node.js 渲染服务解析图层中的 asset:// 引用。
+只按原类型返回栅格图片，其余类型以 application/octet-stream 返回；
+响应带 nosniff 与 default-src 'none' 的 CSP，浏览器不会把内容当作页面或脚本执行。
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ...core.blob_store import get_blob_store, is_raster_mime, is_valid_digest
+from ...core.exceptions import NotFoundException, ValidationException
+
+router = APIRouter(prefix="/api/assets", tags=["assets"])
+
+
+@router.get("/{digest}")
+async def get_asset(digest: str):
+    """按 SHA-256 摘要返回图片（内容寻址，响应可被永久缓存）"""
+    if not is_valid_digest(digest):
+        raise ValidationException("非法的资源摘要", detail={"digest": digest})
+
+    blob = get_blob_store().get(digest)
+    if blob is None:
+        raise NotFoundException("资源不存在或已过期", detail={"digest": digest})
+
+    data, mime_type = blob
+    return Response(
+        content=data,
+        media_type=mime_type if is_raster_mime(mime_type) else "application/octet-stream",
+        headers={
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "ETag": f'"{digest}"',
+            "X-Content-Type-Options": "nosniff",
+            "Content-Security-Policy": "default-src 'none'",
+        },
+    )
@@ -9,8 +9,12 @@ Author: VibePoster Team
 Date: 2025-01
 """
 
+import time
+
 from fastapi import APIRouter, Form, Request
-from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 from ...core.exceptions import ValidationException, ServiceException
 from ...core.dependencies import (
@@ -25,6 +29,7 @@ from ...models.response import (
     KGInferResult,
     BrandSearchResult,
     BrandUploadResult,
+    BrandBatchUploadResult,
     BrandDocumentItem,
     BrandDocumentListResult,
     StatsResult,
@@ -70,14 +75,13 @@ async def upload_brand_document(request: Request) -> APIResponse[BrandUploadResu
         
         knowledge_base = get_knowledge_base()
         
-        doc_id = f"{brand_name}_{category}_{hash(text) % 10000}"
         metadata = {
             "brand": brand_name,
             "category": category,
             "type": "user_upload"
         }
         
-        knowledge_base.add_document(text, metadata, doc_id)
+        doc_id = knowledge_base.add_document(text, metadata)
         
         logger.info(f"📚 品牌文档上传成功: {brand_name} - {category}")
         
@@ -102,6 +106,78 @@ async def upload_brand_document(request: Request) -> APIResponse[BrandUploadResu
         )
 
 
+class BrandDocumentInput(BaseModel):
+    """批量上传中的单条品牌文档"""
+    text: str = Field(..., min_length=1, description="品牌规范文本内容")
+    brand_name: str = Field(..., min_length=1, description="品牌名称")
+    category: str = Field(default="通用", description="文档类别")
+
+
+class BrandBatchUploadRequest(BaseModel):
+    """批量上传品牌文档请求"""
+    documents: List[BrandDocumentInput] = Field(..., min_length=1, max_length=5000, description="文档列表")
+
+
+@router.post("/brand/upload-batch", summary="批量上传企业品牌文档")
+async def upload_brand_documents(request: BrandBatchUploadRequest) -> APIResponse[BrandBatchUploadResult]:
+    """
+    批量上传品牌文档（如整本品牌手册拆分后的段落）
+    
+    嵌入按 RAG_EMBED_BATCH_SIZE 分批计算，比逐条调用 /brand/upload 快得多。
+    """
+    blank = [i for i, doc in enumerate(request.documents) if not doc.text.strip()]
+    if blank:
+        raise ValidationException(
+            message="文档内容为空",
+            detail={"detail": "请提供品牌规范内容", "indexes": blank}
+        )
+
+    try:
+        knowledge_base = get_knowledge_base()
+        items = [
+            {
+                "text": doc.text,
+                "metadata": {
+                    "brand": doc.brand_name,
+                    "category": doc.category,
+                    "type": "user_upload"
+                },
+            }
+            for doc in request.documents
+        ]
+
+        started = time.perf_counter()
+        doc_ids = await run_in_threadpool(knowledge_base.add_documents, items)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        logger.info(f"📚 品牌文档批量上传成功: {len(doc_ids)} 条, {elapsed_ms:.0f}ms")
+
+        return APIResponse(
+            success=True,
+            data=BrandBatchUploadResult(
+                documents=[
+                    BrandUploadResult(
+                        doc_id=doc_id,
+                        brand_name=doc.brand_name,
+                        category=doc.category,
+                        text_length=len(doc.text)
+                    )
+                    for doc_id, doc in zip(doc_ids, request.documents)
+                ],
+                count=len(doc_ids),
+                elapsed_ms=round(elapsed_ms, 2)
+            ),
+            message=f"批量上传 {len(doc_ids)} 条品牌文档"
+        )
+
+    except Exception as e:
+        logger.error(f"品牌文档批量上传失败: {e}", exc_info=True)
+        raise ServiceException(
+            message="品牌文档批量上传失败",
+            detail={"detail": str(e)}
+        )
+
+
 @router.get("/brand/documents", summary="列出品牌知识库中的所有文档")
 async def list_brand_documents() -> APIResponse[BrandDocumentListResult]:
     """返回知识库中所有文档的摘要列表"""
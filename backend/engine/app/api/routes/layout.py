@@ -0,0 +1,43 @@
+"""
+版式编辑路由
+
+POST /api/layout/patch —— 单字段编辑（文字内容 / 字号 / 颜色）后的增量重排，
+无需重新调用 Layout Agent 或完整构建；无服务端状态，海报与布局树由前端随请求提交。
+"""
+
+from typing import Any, Dict, List
+
+from fastapi import APIRouter
+from pydantic import BaseModel, Field
+
+from ...core.logger import get_logger
+from ...models.layout_tree import LayerEdit, LayoutTree
+from ...services.renderer.layout_patch import patch_layout
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/api/layout", tags=["layout"])
+
+
+class LayoutPatchRequest(BaseModel):
+    poster: Dict[str, Any] = Field(..., description="当前海报 JSON（Step 3 返回的版式）")
+    layout_tree: LayoutTree = Field(..., description="版式的布局树（Step 3 返回的 layout_tree）")
+    edits: List[LayerEdit] = Field(..., min_length=1, max_length=100)
+
+
+@router.post("/patch")
+def layout_patch(req: LayoutPatchRequest):
+    """
+    应用编辑并只重排受影响的容器，返回变化图层的 JSON Patch（RFC 6902）。
+
+    - patch:   [{op: "replace", path: "/layers/{序号}/{字段}", value}]，按顺序应用到原海报即可
+    - changed: 发生变化的图层 ID
+    - relayout: 被重排的容器（content / cta），仅改颜色时为空
+    """
+    result = patch_layout(req.poster, req.layout_tree, req.edits)
+    return {
+        "patch": result.patch,
+        "changed": result.changed,
+        "relayout": result.relayout,
+        "elapsed_ms": round(result.elapsed_ms, 3),
+    }
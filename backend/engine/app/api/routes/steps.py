@@ -4,20 +4,29 @@
 Step 1: /api/step/plan     — 意图理解，返回设计简报供用户编辑
 Step 2: /api/step/assets   — 素材搜索，返回多张候选背景图（及主体素材）供用户选择
 Step 3: /api/step/layouts  — 版式生成 + 双路审核，仅返回通过审核的版式
+        /api/step/layouts/stream — 同上，NDJSON 流式推送（每个版式通过审核即推送）
 Step 4: /api/step/finalize — 确认选择，直接返回（已审核通过）
+Step 5: /api/step/resize   — 多尺寸派生，沿用 DSL 本地重新排版，仅规则审核不通过的尺寸调用 LLM
 """
 
 import asyncio
 import json
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Literal, Tuple
 
 from fastapi import APIRouter, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from ...agents.planner import run_planner_agent
-from ...agents.layout import run_layout_agent
-from ...agents.critic import run_critic_agent
+from ...agents.layout import arun_layout_agent, arun_layout_agent_multi, derive_poster_sizes
+from ...agents.critic import arun_critic_agent
+from ...agents.rule_critic import evaluate_layout
 from ...models.design_brief import DesignBrief, AssetLayer, AssetList
+from ...core.blob_store import intern_data_url, pin_asset_refs
+from ...core.config import settings
+from ...core.llm import llm_slots
+from ...core.exceptions import ValidationException
 from ...core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -114,6 +123,8 @@ async def step_assets(
     - Style Reference:  image_bg（无 image_subject）→ 分析风格后搜索/生成匹配的新背景
     - With Material:    image_subject（必选）+ image_bg（可选）→ 直接使用主体素材；
                         若有 image_bg 则直接作为背景，否则搜索/生成背景
+
+    素材抓取在应用事件循环上并发执行（复用异步连接池），Vision 分析等阻塞调用由素材服务放到线程池。
     """
     from ...services.asset_service import AssetService
 
@@ -127,7 +138,7 @@ async def step_assets(
     if has_subject:
         subject_bytes = await image_subject.read()
         bg_bytes = (await image_bg.read()) if has_bg else None
-        result = service.process_with_material(
+        result = await service.process_with_material(
             design_brief=design_brief,
             subject_bytes=subject_bytes,
             bg_bytes=bg_bytes,
@@ -136,13 +147,13 @@ async def step_assets(
         )
     elif has_bg:
         bg_bytes = await image_bg.read()
-        result = service.process_style_reference(
+        result = await service.process_style_reference(
             design_brief=design_brief,
             bg_bytes=bg_bytes,
             count=count,
         )
     else:
-        result = service.process_text_only(
+        result = await service.process_text_only(
             design_brief=design_brief,
             count=count,
         )
@@ -156,8 +167,8 @@ async def step_assets(
 
 class LayoutsRequest(BaseModel):
     design_brief: DesignBrief
-    selected_asset_url: str = Field(..., description="用户选中的背景图 URL/base64")
-    subject_asset_url: Optional[str] = Field(None, description="主体素材（透明 PNG）")
+    selected_asset_url: str = Field(..., description="用户选中的背景图（asset:// 引用 / URL / base64）")
+    subject_asset_url: Optional[str] = Field(None, description="主体素材（透明 PNG，asset:// 引用 / base64）")
     subject_width: Optional[int] = Field(None, description="主体素材原始宽度")
     subject_height: Optional[int] = Field(None, description="主体素材原始高度")
     canvas_width: int = Field(default=1080)
@@ -165,6 +176,11 @@ class LayoutsRequest(BaseModel):
     count: int = Field(default=6, ge=1, le=10)
     image_analyses: Optional[List[Dict[str, Any]]] = Field(None, description="图像分析结果")
     color_suggestions: Optional[Dict[str, Any]] = Field(None, description="配色建议")
+    mode: Optional[Literal["multi_strategy", "per_strategy"]] = Field(
+        None,
+        description="multi_strategy: 一次 LLM 调用 + 本地多策略排版；per_strategy: 每个候选单独调用 LLM；"
+                    "默认取 LAYOUT_MULTI_STRATEGY",
+    )
 
 
 _STYLE_HINTS = [
@@ -180,92 +196,107 @@ _STYLE_HINTS = [
 ]
 
 
+def _strategy_hint(layout_strategy: Optional[str]) -> str:
+    """多策略模式重试时沿用该候选的布局策略"""
+    for hint in _STYLE_HINTS:
+        if layout_strategy and f" {layout_strategy} " in hint:
+            return hint
+    return _STYLE_HINTS[-1]
+
+
+def _is_multi_strategy(req: "LayoutsRequest") -> bool:
+    if req.mode is None:
+        return settings.layout.MULTI_STRATEGY
+    return req.mode == "multi_strategy"
+
+
 @router.post("/layouts")
 async def step_layouts(req: LayoutsRequest):
     """
     Step 3: 生成 → 快速校验 → 双路 Critic 审核 → 仅返回通过的版式。
 
-    流程：
-    1. 并行生成 N 个版式
+    流程（每个候选版式独立流水线，互不等待）：
+    1. 生成 N 个版式（多策略模式：一次 LLM 调用 + 本地按各布局策略排版；
+       逐策略模式：N 次并行 LLM 调用）
     2. 快速规则校验，剔除结构异常的
-    3. 对通过的版式并行运行双路 Critic（JSON + 视觉）
+    3. 对通过的版式运行双路 Critic（JSON + 视觉）
     4. REJECT 的自动带反馈重试一次
-    5. 只返回最终 PASS 的版式供用户选择
+    5. 只返回最终 PASS 的版式供用户选择（按候选序号排序，与完成先后无关）
+
+    所有 LLM 调用均为原生协程（AsyncOpenAI / genai aio），不占用线程池；
+    并发数受进程级的 settings.llm.MAX_CONCURRENCY 限制（按供应商，所有请求共享）。
+    需要逐个拿到结果时请使用 /layouts/stream。
     """
     logger.info(f"📐 [Step 3] 版式生成 + 审核，方案数: {req.count}")
 
-    asset_list = _build_asset_list(req)
-    brief_dict = req.design_brief.model_dump()
+    passed: List[Tuple[int, Dict[str, Any]]] = []
+    async for event in _run_layout_pipeline(req):
+        if event["event"] == "layout":
+            passed.append((event["index"], event["poster"]))
+    passed.sort(key=lambda item: item[0])
 
-    # ---- Phase 1: 并行生成 ----
-    async def _gen(idx: int) -> Dict[str, Any]:
-        hint = _STYLE_HINTS[idx % len(_STYLE_HINTS)]
-        logger.info(f"  📐 生成版式 {idx + 1}/{req.count} ({hint[:15]}...)")
-        return await asyncio.to_thread(
-            run_layout_agent,
-            design_brief=brief_dict,
-            asset_list=asset_list,
-            canvas_width=req.canvas_width,
-            canvas_height=req.canvas_height,
-            style_hint=hint,
-        )
+    logger.info(f"✅ [Step 3] 最终通过审核的版式: {len(passed)} 个")
 
-    gen_results = await asyncio.gather(
-        *[_gen(i) for i in range(req.count)],
-        return_exceptions=True,
-    )
+    return {
+        "step": "layouts",
+        "layouts": [poster for _, poster in passed],
+    }
 
-    # ---- Phase 2: 快速规则校验 ----
-    candidates: List[Dict[str, Any]] = []
-    for i, r in enumerate(gen_results):
-        if isinstance(r, Exception):
-            logger.error(f"  ❌ 版式 {i + 1} 生成失败: {r}")
-            continue
-        issue = _quick_validate_layout(r)
-        if issue:
-            logger.warning(f"  ⚠️ 版式 {i + 1} 规则校验不通过: {issue}")
-        else:
-            candidates.append(r)
 
-    logger.info(f"📋 规则校验后剩余 {len(candidates)}/{req.count} 个版式，进入双路审核...")
+@router.post("/layouts/stream")
+async def step_layouts_stream(req: LayoutsRequest):
+    """
+    Step 3（流式）: 与 /layouts 相同的流水线，以 NDJSON 逐行推送事件。
+
+    每个版式通过规则校验和双路审核后立即以 layout 事件推送，
+    首个版式的等待时间取决于最快的候选，而不是最慢的。
+
+    事件类型（每行一个 JSON 对象，字段 event 区分）：
+    - generated:  {index, attempt}            版式生成完成
+    - validated:  {index, attempt}            规则校验通过，进入审核
+    - rejected:   {index, attempt, stage, reason}  stage 为 rule / critic
+    - retrying:   {index}                     带审核反馈重新生成
+    - layout:     {index, attempt, poster}    审核通过的版式
+    - error:      {index, message}            该候选流水线异常
+    - done:       {total, passed}             全部候选处理完毕
+    """
+    logger.info(f"📐 [Step 3] 流式版式生成 + 审核，方案数: {req.count}")
 
-    # ---- Phase 3: 并行双路 Critic 审核 ----
-    async def _review(poster: Dict[str, Any]) -> Dict[str, Any]:
-        review = await asyncio.to_thread(
-            run_critic_agent, poster, design_brief=brief_dict
-        )
-        return {"poster": poster, "review": review}
+    async def _ndjson() -> AsyncIterator[bytes]:
+        passed = 0
+        async for event in _run_layout_pipeline(req):
+            if event["event"] == "layout":
+                passed += 1
+            yield _encode_event(event)
+        logger.info(f"✅ [Step 3] 流式输出完成，通过审核的版式: {passed} 个")
+        yield _encode_event({"event": "done", "total": req.count, "passed": passed})
 
-    review_results = await asyncio.gather(
-        *[_review(c) for c in candidates],
-        return_exceptions=True,
-    )
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
 
-    passed: List[Dict[str, Any]] = []
-    to_retry: List[Dict[str, Any]] = []
-
-    for i, r in enumerate(review_results):
-        if isinstance(r, Exception):
-            logger.error(f"  ❌ 审核版式 {i + 1} 出错: {r}")
-            continue
-        if r["review"].get("status") == "PASS":
-            logger.info(f"  ✅ 版式 {i + 1} 审核通过")
-            poster = r["poster"]
-            poster["_review"] = r["review"]
-            passed.append(poster)
-        else:
-            fb = r["review"].get("feedback", "")
-            logger.warning(f"  ❌ 版式 {i + 1} 审核不通过: {fb}")
-            to_retry.append(r["review"])
-
-    # ---- Phase 4: 对 REJECT 的重试一次（带反馈重新生成 + 审核） ----
-    if to_retry:
-        logger.info(f"🔄 {len(to_retry)} 个版式被 REJECT，带反馈重试...")
-
-        async def _retry(review_feedback: Dict[str, Any], idx: int) -> Optional[Dict[str, Any]]:
-            hint = _STYLE_HINTS[(req.count + idx) % len(_STYLE_HINTS)]
-            poster = await asyncio.to_thread(
-                run_layout_agent,
+
+def _encode_event(event: Dict[str, Any]) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+_PIPELINE_DONE = object()
+
+
+async def _run_layout_pipeline(req: LayoutsRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Step 3 核心流水线：每个候选版式独立执行 生成 → 校验 → 审核 → (重试)，
+    事件按发生顺序产出。消费方提前退出（如客户端断开）时取消所有未完成的候选。
+
+    多策略模式下首次生成共用一次 LLM 调用的结果（候选 i 取第 i 个排版），
+    该调用失败时各候选退回逐策略生成；审核 REJECT 的重试仍单独调用 LLM。
+    """
+    asset_list = _build_asset_list(req)
+    brief_dict = req.design_brief.model_dump()
+    events: asyncio.Queue = asyncio.Queue()
+    variants: List[Dict[str, Any]] = []
+
+    async def _generate(idx: int, hint: str, review_feedback: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        async with llm_slots(settings.layout.PROVIDER):
+            return await arun_layout_agent(
                 design_brief=brief_dict,
                 asset_list=asset_list,
                 canvas_width=req.canvas_width,
@@ -273,46 +304,100 @@ async def step_layouts(req: LayoutsRequest):
                 review_feedback=review_feedback,
                 style_hint=hint,
             )
-            issue = _quick_validate_layout(poster)
-            if issue:
-                return None
-            review = await asyncio.to_thread(
-                run_critic_agent, poster, design_brief=brief_dict
-            )
-            if review.get("status") == "PASS":
-                poster["_review"] = review
-                return poster
-            return None
 
-        retry_results = await asyncio.gather(
-            *[_retry(fb, i) for i, fb in enumerate(to_retry)],
-            return_exceptions=True,
-        )
-        for r in retry_results:
-            if isinstance(r, Exception):
-                continue
-            if r is not None:
-                passed.append(r)
+    async def _review(poster: Dict[str, Any]) -> Dict[str, Any]:
+        async with llm_slots(settings.critic.PROVIDER):
+            return await arun_critic_agent(poster, design_brief=brief_dict)
+
+    async def _attempt(idx: int, attempt: int, hint: str,
+                       review_feedback: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """执行一次 生成 → 校验 → 审核；PASS 返回 None，REJECT 返回审核结果供重试"""
+        if attempt == 1 and idx < len(variants):
+            poster = variants[idx]
+        else:
+            poster = await _generate(idx, hint, review_feedback)
+        await events.put({"event": "generated", "index": idx, "attempt": attempt})
 
-    logger.info(f"✅ [Step 3] 最终通过审核的版式: {len(passed)} 个")
+        issue = _quick_validate_layout(poster)
+        if issue:
+            logger.warning(f"  ⚠️ 版式 {idx + 1} 规则校验不通过: {issue}")
+            await events.put({"event": "rejected", "index": idx, "attempt": attempt,
+                              "stage": "rule", "reason": issue})
+            return None
+        await events.put({"event": "validated", "index": idx, "attempt": attempt})
+
+        review = await _review(poster)
+        if review.get("status") == "PASS":
+            logger.info(f"  ✅ 版式 {idx + 1} 审核通过")
+            poster["_review"] = review
+            pin_asset_refs(poster)
+            await events.put({"event": "layout", "index": idx, "attempt": attempt, "poster": poster})
+            return None
 
-    return {
-        "step": "layouts",
-        "layouts": passed,
-    }
+        fb = review.get("feedback", "")
+        logger.warning(f"  ❌ 版式 {idx + 1} 审核不通过: {fb}")
+        await events.put({"event": "rejected", "index": idx, "attempt": attempt,
+                          "stage": "critic", "reason": fb})
+        return review
+
+    async def _candidate(idx: int) -> None:
+        try:
+            hint = _STYLE_HINTS[idx % len(_STYLE_HINTS)]
+            logger.info(f"  📐 生成版式 {idx + 1}/{req.count} ({hint[:15]}...)")
+            review = await _attempt(idx, 1, hint)
+
+            # 审核 REJECT 的带反馈重试一次（规则校验不通过的不重试）
+            if review is not None:
+                logger.info(f"  🔄 版式 {idx + 1} 被 REJECT，带反馈重试...")
+                await events.put({"event": "retrying", "index": idx})
+                if idx < len(variants):
+                    retry_hint = _strategy_hint(variants[idx].get("layout_strategy"))
+                else:
+                    retry_hint = _STYLE_HINTS[(req.count + idx) % len(_STYLE_HINTS)]
+                await _attempt(idx, 2, retry_hint, review_feedback=review)
+        except Exception as e:
+            logger.error(f"  ❌ 版式 {idx + 1} 处理出错: {e}")
+            await events.put({"event": "error", "index": idx, "message": str(e)})
+        finally:
+            events.put_nowait(_PIPELINE_DONE)
+
+    if _is_multi_strategy(req):
+        async with llm_slots(settings.layout.PROVIDER):
+            variants = await arun_layout_agent_multi(
+                design_brief=brief_dict,
+                asset_list=asset_list,
+                canvas_width=req.canvas_width,
+                canvas_height=req.canvas_height,
+                count=req.count,
+            )
+        if not variants:
+            logger.warning("  ⚠️ 多策略生成失败，退回逐策略生成")
+
+    tasks = [asyncio.create_task(_candidate(i)) for i in range(req.count)]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            event = await events.get()
+            if event is _PIPELINE_DONE:
+                remaining -= 1
+                continue
+            yield event
+    finally:
+        for t in tasks:
+            t.cancel()
 
 
 def _build_asset_list(req: LayoutsRequest) -> Dict[str, Any]:
-    """从 LayoutsRequest 构建 asset_list"""
+    """从 LayoutsRequest 构建 asset_list（旧客户端传来的 base64 先转为 asset:// 引用）"""
     asset_list = AssetList(
         background_layer=AssetLayer(
             type="image",
-            src=req.selected_asset_url,
+            src=intern_data_url(req.selected_asset_url),
             source_type="selected",
         ),
         subject_layer=AssetLayer(
             type="image",
-            src=req.subject_asset_url,
+            src=intern_data_url(req.subject_asset_url),
             source_type="user_upload",
             width=req.subject_width,
             height=req.subject_height,
@@ -340,9 +425,101 @@ async def step_finalize(req: FinalizeRequest):
     此步骤仅作为流程终点，不再重复审核。
     """
     logger.info("✅ [Step 4] 确认选择（版式已通过审核）")
+    pin_asset_refs(req.poster_data)
 
     return {
         "step": "finalize",
         "poster": req.poster_data,
         "review": {"status": "PASS", "feedback": "版式已在 Step 3 通过双路审核"},
     }
+
+
+# ============================================================================
+# Step 5: 多尺寸派生
+# ============================================================================
+
+class CanvasSize(BaseModel):
+    width: int = Field(..., ge=100, le=10000)
+    height: int = Field(..., ge=100, le=10000)
+
+
+class ResizeRequest(BaseModel):
+    poster: Dict[str, Any] = Field(..., description="已确认的版式 JSON（需含 dsl_instructions）")
+    design_brief: DesignBrief
+    sizes: Optional[List[CanvasSize]] = Field(
+        None, min_length=1, max_length=12, description="目标画布尺寸，默认取 RESIZE_SIZES",
+    )
+
+
+@router.post("/resize")
+async def step_resize(req: ResizeRequest):
+    """
+    Step 5: 把确认的版式派生为多个画布尺寸，一次请求返回整套尺寸。
+
+    1. 每个尺寸本地重新排版（布局策略按宽高比映射、字号按短边换算、背景主体感知裁剪），不调用 LLM
+    2. 逐个尺寸运行规则审核（纯规则，无 LLM）
+    3. 仅规则审核 REJECT 的尺寸带反馈调用 Layout Agent 重新生成（RESIZE_REGENERATE_FLAGGED），
+       重新生成失败时保留本地派生结果
+    """
+    if not req.poster.get("dsl_instructions"):
+        raise ValidationException("版式缺少 dsl_instructions，无法派生尺寸")
+
+    sizes = [(s.width, s.height) for s in req.sizes] if req.sizes else settings.resize.size_list
+    brief_dict = req.design_brief.model_dump()
+    logger.info(f"📏 [Step 5] 多尺寸派生: {', '.join(f'{w}x{h}' for w, h in sizes)}")
+
+    derived = await run_in_threadpool(derive_poster_sizes, req.poster, brief_dict, sizes)
+
+    async def _review_size(poster: Dict[str, Any]) -> Dict[str, Any]:
+        review = evaluate_layout(poster).to_review()
+        regenerated = False
+        canvas = poster["canvas"]
+
+        if review["status"] == "REJECT" and settings.resize.REGENERATE_FLAGGED:
+            logger.info(f"  🔄 {canvas['width']}x{canvas['height']} 规则审核不通过，带反馈重新生成: {review['feedback']}")
+            async with llm_slots(settings.layout.PROVIDER):
+                retry = await arun_layout_agent(
+                    design_brief=brief_dict,
+                    asset_list=_resize_asset_list(poster),
+                    canvas_width=canvas["width"],
+                    canvas_height=canvas["height"],
+                    review_feedback=review,
+                    style_hint=_strategy_hint(poster.get("layout_strategy")),
+                )
+            if _quick_validate_layout(retry) is None:
+                retry["aspect"] = poster["aspect"]
+                poster, review, regenerated = retry, evaluate_layout(retry).to_review(), True
+
+        pin_asset_refs(poster)
+        return {
+            "width": canvas["width"],
+            "height": canvas["height"],
+            "aspect": poster["aspect"],
+            "layout_strategy": poster.get("layout_strategy"),
+            "poster": poster,
+            "review": {"status": review["status"], "feedback": review["feedback"]},
+            "regenerated": regenerated,
+        }
+
+    results = await asyncio.gather(*(_review_size(p) for p in derived))
+    llm_calls = sum(1 for r in results if r["regenerated"])
+    logger.info(f"✅ [Step 5] 派生 {len(results)} 个尺寸，重新生成 {llm_calls} 个")
+
+    return {
+        "step": "resize",
+        "sizes": results,
+    }
+
+
+def _resize_asset_list(poster: Dict[str, Any]) -> Dict[str, Any]:
+    """从派生版式的 DSL 还原 asset_list（背景为该尺寸的裁剪图），供重新生成使用"""
+    images = [i for i in poster.get("dsl_instructions", []) if i.get("command") == "add_image"]
+    background = next((i for i in images if i.get("layer_type", "background") == "background"), {})
+    subject = next((i for i in images if i.get("layer_type") == "subject"), None)
+    asset_list = AssetList(
+        background_layer=AssetLayer(type="image", src=background.get("src", ""), source_type="selected"),
+        subject_layer=AssetLayer(
+            type="image", src=subject.get("src", ""), source_type="user_upload",
+        ) if subject else None,
+    )
+    return asset_list.model_dump(exclude_none=True)
@@ -0,0 +1,397 @@
+"""
+内容寻址图片存储 - 用 asset://<sha256> 引用代替内联 base64 data URL
+
+Flux / Pexels 背景、用户上传的主体素材动辄数 MB，以 data URL 形式会被复制进
+asset_list、DSL、每个 PosterData 图层、每个 /api/step/layouts 响应以及每次渲染请求。
+这里把字节存一次，图层只携带 64 位十六进制摘要引用：
+
+- 引擎通过 GET /api/assets/{sha256} 提供原始字节（前端 <img> 与渲染服务都从这里取）
+- 两种后端：filesystem（默认，BLOB_DIR 下按摘要分目录，跨重启可用；定期清理超过 TTL 未访问的内容，
+  总量超过 MAX_DISK_MB 时按访问时间淘汰）/ memory（进程内，按总字节数 LRU 淘汰）
+- 已返回给客户端的海报引用的图片被钉住 PIN_TTL_HOURS 小时，期间不淘汰；过期后恢复可淘汰，再次引用时续期
+
+Author: VibePoster Team
+Date: 2025-01
+"""
+
+import base64
+import hashlib
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+ASSET_SCHEME = "asset://"
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+# 允许入库 / 按原类型返回的栅格图片格式（SVG、HTML 等可执行脚本的类型一律不入库）
+RASTER_MIME_TYPES = frozenset({"image/png", "image/jpeg", "image/webp", "image/gif"})
+
+_DATA_URL_RE = re.compile(r"^data:(?P<mime>[\w/+.-]+)?(?P<params>(;[^,;]+)*?);base64,(?P<data>.*)$", re.S)
+
+
+# ============================================================================
+# 引用工具
+# ============================================================================
+
+def is_asset_ref(src: Optional[str]) -> bool:
+    """是否为 asset:// 引用"""
+    return bool(src) and src.startswith(ASSET_SCHEME)
+
+
+def make_asset_ref(digest: str) -> str:
+    return f"{ASSET_SCHEME}{digest}"
+
+
+def digest_from_ref(ref: str) -> Optional[str]:
+    """从 asset://<sha256> 中取出摘要（格式不合法返回 None）"""
+    if not is_asset_ref(ref):
+        return None
+    digest = ref[len(ASSET_SCHEME):]
+    return digest if is_valid_digest(digest) else None
+
+
+def is_valid_digest(digest: str) -> bool:
+    return bool(_DIGEST_RE.match(digest))
+
+
+def is_raster_mime(mime_type: Optional[str]) -> bool:
+    """是否为允许入库的栅格图片类型（png / jpeg / webp / gif）"""
+    return bool(mime_type) and mime_type.lower() in RASTER_MIME_TYPES
+
+
+# ============================================================================
+# 存储后端
+# ============================================================================
+
+class BlobStore(ABC):
+    """内容寻址存储基类"""
+
+    def __init__(self, pin_ttl: float = 24 * 3600):
+        self.pin_ttl = pin_ttl
+        self._pinned: Dict[str, float] = {}   # 摘要 → 钉住到期时间（time.time()）
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes, mime_type: str = "application/octet-stream") -> str:
+        """写入字节，返回 asset://<sha256> 引用（重复内容只存一份）"""
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.contains(digest):
+            self._write(digest, data, mime_type)
+        else:
+            self._touch(digest)
+        return make_asset_ref(digest)
+
+    @abstractmethod
+    def get(self, digest: str) -> Optional[Tuple[bytes, str]]:
+        """按摘要读取 (bytes, mime_type)，不存在返回 None"""
+
+    @abstractmethod
+    def contains(self, digest: str) -> bool:
+        """是否已存在"""
+
+    @abstractmethod
+    def _write(self, digest: str, data: bytes, mime_type: str) -> None:
+        """写入新内容"""
+
+    def _touch(self, digest: str) -> None:
+        """重复写入已有内容时刷新访问时间"""
+
+    def pin(self, digest: str) -> None:
+        """标记为仍被海报引用，pin_ttl 秒内不参与淘汰（重复调用续期）"""
+        with self._lock:
+            if self.contains(digest):
+                self._pinned[digest] = time.time() + self.pin_ttl
+
+    def _is_pinned(self, digest: str, now: float) -> bool:
+        """是否仍在钉住期内（过期的钉住顺便移除；调用方持有 _lock）"""
+        expiry = self._pinned.get(digest)
+        if expiry is None:
+            return False
+        if expiry <= now:
+            del self._pinned[digest]
+            return False
+        return True
+
+
+class MemoryBlobStore(BlobStore):
+    """进程内存储，超过 max_bytes 时按最近最少使用淘汰（钉住期内的内容除外）"""
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, pin_ttl: float = 24 * 3600):
+        super().__init__(pin_ttl)
+        self.max_bytes = max_bytes
+        self._blobs: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._size = 0
+        self._over_budget_warned = False
+
+    def get(self, digest: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is not None:
+                self._blobs.move_to_end(digest)
+            return blob
+
+    def contains(self, digest: str) -> bool:
+        return digest in self._blobs
+
+    def _write(self, digest: str, data: bytes, mime_type: str) -> None:
+        with self._lock:
+            if digest in self._blobs:
+                return
+            self._blobs[digest] = (data, mime_type)
+            self._size += len(data)
+            self._evict(keep=digest)
+
+    def _touch(self, digest: str) -> None:
+        with self._lock:
+            if digest in self._blobs:
+                self._blobs.move_to_end(digest)
+
+    def _evict(self, keep: str) -> None:
+        """按 LRU 顺序淘汰钉住期外的内容，直到总字节数回到上限以内"""
+        now = time.time()
+        for victim in list(self._blobs):
+            if self._size <= self.max_bytes:
+                return
+            if victim == keep or self._is_pinned(victim, now):
+                continue
+            evicted, _ = self._blobs.pop(victim)
+            self._size -= len(evicted)
+        if self._size > self.max_bytes and not self._over_budget_warned:
+            self._over_budget_warned = True
+            logger.warning(
+                f"⚠️ 内存图片存储超出上限（{self._size / 1024 / 1024:.0f}MB），剩余内容均在钉住期内；"
+                "钉住到期后恢复淘汰"
+            )
+
+
+class FileSystemBlobStore(BlobStore):
+    """
+    文件系统存储：<root>/<sha[:2]>/<sha>，MIME 类型写在同名 .mime 文件中
+
+    文件 mtime 即最近访问时间（读取、重复写入、钉住时刷新）。写入时每隔 sweep_interval 秒清理一次：
+    先删除超过 ttl 秒未访问的内容，总量仍超过 max_bytes 时按访问时间从旧到新删除（钉住期内的除外）。
+    """
+
+    _STALE_TMP_SECONDS = 3600
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = 0,
+        ttl: float = 0,
+        pin_ttl: float = 24 * 3600,
+        sweep_interval: float = 300
+    ):
+        """
+        Args:
+            root: 存储目录
+            max_bytes: 总字节数上限（0 表示不限）
+            ttl: 未访问内容的保留秒数（0 表示不过期）
+            pin_ttl: 钉住时长（秒）
+            sweep_interval: 两次清理的最小间隔（秒）
+        """
+        super().__init__(pin_ttl)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = float("-inf")
+        self._sweep_lock = threading.Lock()
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def get(self, digest: str) -> Optional[Tuple[bytes, str]]:
+        path = self._path(digest)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        self._touch(digest)
+        try:
+            mime_type = path.with_suffix(".mime").read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            mime_type = "application/octet-stream"
+        return data, mime_type
+
+    def contains(self, digest: str) -> bool:
+        return self._path(digest).exists()
+
+    def _write(self, digest: str, data: bytes, mime_type: str) -> None:
+        path = self._path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.with_suffix(".mime").write_text(mime_type, encoding="utf-8")
+        # 先写临时文件再原子替换，并发写同一内容也不会读到半个文件
+        tmp = path.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._maybe_sweep()
+
+    def _touch(self, digest: str) -> None:
+        try:
+            os.utime(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def pin(self, digest: str) -> None:
+        super().pin(digest)
+        self._touch(digest)
+
+    # ------------------------------------------------------------------------
+    # 清理
+    # ------------------------------------------------------------------------
+
+    def _maybe_sweep(self) -> None:
+        if not (self.max_bytes or self.ttl):
+            return
+        if time.monotonic() - self._last_sweep < self.sweep_interval:
+            return
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = time.monotonic()
+            self.sweep()
+        finally:
+            self._sweep_lock.release()
+
+    def sweep(self) -> int:
+        """删除过期内容并把总量压回上限以内，返回删除的内容数"""
+        now = time.time()
+        entries: List[Tuple[float, int, Path]] = []
+        for path in self.root.glob("*/*"):
+            if path.suffix == ".mime":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.suffix == ".tmp":
+                # 写入中途崩溃留下的临时文件
+                if now - stat.st_mtime > self._STALE_TMP_SECONDS:
+                    path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        with self._lock:
+            for mtime, size, path in entries:
+                expired = self.ttl and now - mtime > self.ttl
+                over_budget = self.max_bytes and total > self.max_bytes
+                if not (expired or over_budget):
+                    break   # 按访问时间升序，之后的内容都未过期
+                if self._is_pinned(path.name, now):
+                    continue
+                path.unlink(missing_ok=True)
+                path.with_suffix(".mime").unlink(missing_ok=True)
+                total -= size
+                removed += 1
+
+        if removed:
+            logger.info(f"🧹 图片存储清理: 删除 {removed} 个文件，剩余 {total / 1024 / 1024:.0f}MB")
+        if self.max_bytes and total > self.max_bytes:
+            logger.warning(f"⚠️ 图片存储超出上限（{total / 1024 / 1024:.0f}MB），剩余内容均在钉住期内")
+        return removed
+
+
+# ============================================================================
+# 全局单例 & data URL 转换
+# ============================================================================
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """获取全局存储（BLOB_BACKEND=filesystem | memory）"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from .config import settings
+                cfg = settings.blob
+                pin_ttl = cfg.PIN_TTL_HOURS * 3600
+                if cfg.BACKEND == "filesystem":
+                    _store = FileSystemBlobStore(
+                        cfg.DIR,
+                        max_bytes=cfg.MAX_DISK_MB * 1024 * 1024,
+                        ttl=cfg.TTL_HOURS * 3600,
+                        pin_ttl=pin_ttl,
+                        sweep_interval=cfg.SWEEP_INTERVAL_SECONDS,
+                    )
+                else:
+                    _store = MemoryBlobStore(max_bytes=cfg.MAX_MEMORY_MB * 1024 * 1024, pin_ttl=pin_ttl)
+                logger.info(f"🗄️ 图片存储后端: {cfg.BACKEND}")
+    return _store
+
+
+def reset_blob_store() -> None:
+    """重置全局存储（用于测试）"""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def store_bytes(data: bytes, mime_type: str = "image/png") -> str:
+    """存入全局存储，返回 asset:// 引用"""
+    return get_blob_store().put(data, mime_type)
+
+
+def pin_asset_refs(obj: Any) -> None:
+    """钉住（或续期）海报（任意嵌套的 dict / list）中出现的全部 asset:// 引用"""
+    if isinstance(obj, str):
+        digest = digest_from_ref(obj)
+        if digest is not None:
+            get_blob_store().pin(digest)
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            pin_asset_refs(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            pin_asset_refs(value)
+
+
+def intern_data_url(src: Optional[str]) -> Optional[str]:
+    """
+    把 base64 data URL 转成 asset:// 引用；其他值（http URL、已是引用、空值）原样返回
+
+    只入库栅格图片（png / jpeg / webp / gif）：客户端传入的 text/html、image/svg+xml 等
+    data URL 原样返回，避免经 /api/assets 以可执行类型对外提供（存储型 XSS）。
+    """
+    if not src or not src.startswith("data:"):
+        return src
+    match = _DATA_URL_RE.match(src)
+    if match is None or not is_raster_mime(match.group("mime")):
+        return src
+    try:
+        data = base64.b64decode(match.group("data"), validate=False)
+    except (ValueError, TypeError):
+        return src
+    return store_bytes(data, match.group("mime").lower())
+
+
+def resolve_asset_ref(ref: str) -> Optional[Tuple[bytes, str]]:
+    """读取 asset:// 引用对应的 (bytes, mime_type)"""
+    digest = digest_from_ref(ref)
+    if digest is None:
+        return None
+    return get_blob_store().get(digest)
+
+
+def asset_ref_to_data_url(src: str) -> str:
+    """把 asset:// 引用还原为 data URL（找不到时原样返回）"""
+    blob = resolve_asset_ref(src) if is_asset_ref(src) else None
+    if blob is None:
+        return src
+    data, mime_type = blob
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"
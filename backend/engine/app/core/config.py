@@ -9,7 +9,7 @@
 
 from enum import Enum
 from pathlib import Path
-from typing import Dict, Any, List, Final, Optional
+from typing import Dict, Any, List, Final, Literal, Optional, Tuple
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
@@ -107,6 +107,15 @@ class VisualAgentConfig(BaseSettings):
         default="gemini-2.0-flash", description="图像理解使用的模型（需支持 Vision）"
     )
 
+    # 图像理解结果缓存（键 = 图片 SHA-256 + user_prompt 摘要）
+    IMAGE_CACHE_ENABLED: bool = Field(default=True, description="是否缓存图像理解结果")
+    IMAGE_CACHE_MAX_ENTRIES: int = Field(default=256, ge=1, description="内存中缓存的最大结果数")
+    IMAGE_CACHE_DIR: str = Field(
+        default=str(BASE_DIR.parent / "data" / "image_analysis_cache"),
+        description="磁盘缓存目录（留空则只用内存）",
+    )
+    IMAGE_CACHE_MAX_DISK_ENTRIES: int = Field(default=2048, ge=1, description="磁盘缓存最大文件数")
+
     # 素材搜索配置
     PEXELS_API_KEY: str = Field(default="", description="Pexels 素材库 API Key（备选）")
     
@@ -118,6 +127,11 @@ class VisualAgentConfig(BaseSettings):
     )
     FLUX_MODEL: str = Field(default="flux-kontext-pro", description="Flux 模型名称")
 
+    # 候选背景并发获取的总时限（秒），超时返回已到达的结果
+    ASSET_SEARCH_DEADLINE: float = Field(
+        default=45.0, gt=0, description="Step 2 候选背景获取的 deadline（秒）"
+    )
+
 
 class LayoutAgentConfig(BaseSettings):
     """Layout Agent 配置"""
@@ -137,6 +151,10 @@ class LayoutAgentConfig(BaseSettings):
     TEMPERATURE: float = Field(
         default=0.1, ge=0.0, le=2.0, description="Layout Agent 的温度参数（非常低以确保精确性）"
     )
+    MULTI_STRATEGY: bool = Field(
+        default=True,
+        description="分步生成默认使用多策略模式（一次 LLM 生成 DSL，本地按各布局策略 / 字体排出候选）",
+    )
 
     def to_agent_config(self) -> Dict[str, Any]:
         """转换为 Agent 构造函数所需的配置字典"""
@@ -176,6 +194,17 @@ class CriticAgentConfig(BaseSettings):
     ENABLE_VISUAL_REVIEW: bool = Field(
         default=True, description="是否启用视觉审核（Path 2）"
     )
+    VISUAL_RENDERER: Literal["python", "node"] = Field(
+        default="python",
+        description="视觉审核出图方式：python（引擎内 Pillow 光栅化）/ node（调用渲染服务）",
+    )
+    VISUAL_RENDER_MAX_EDGE: int = Field(
+        default=1024, ge=64, description="python 光栅化的审核分辨率（最长边像素）"
+    )
+    SPECULATIVE_VISUAL_REVIEW: bool = Field(
+        default=False,
+        description="推测式视觉审核：Path 2 与 Path 1 同时启动，Path 1 REJECT 时取消 Path 2",
+    )
     RENDER_SERVICE_URL: str = Field(
         default="http://localhost:3000", description="Node.js 渲染服务地址"
     )
@@ -212,6 +241,45 @@ class CriticAgentConfig(BaseSettings):
         }
 
 
+class RuleCriticConfig(BaseSettings):
+    """规则预审（无 LLM 的几何 / 配色检查，明确的情况直接给出 PASS / REJECT）"""
+
+    model_config = SettingsConfigDict(env_prefix="RULE_CRITIC_", env_file=".env", extra="ignore")
+
+    ENABLED: bool = Field(default=True, description="是否在 LLM 审核前执行规则预审")
+    SHORT_CIRCUIT_REJECT: bool = Field(default=True, description="出现严重问题时直接 REJECT，不调用 LLM")
+    SHORT_CIRCUIT_PASS: bool = Field(
+        default=True, description="无任何问题且所有文字对比度可计算时直接 PASS，不调用 LLM"
+    )
+
+    # 阈值
+    OVERLAP_WARN_RATIO: float = Field(
+        default=0.05, ge=0.0, le=1.0, description="文字互相重叠面积占较小图层的比例（警告）"
+    )
+    OVERLAP_REJECT_RATIO: float = Field(
+        default=0.3, ge=0.0, le=1.0, description="文字互相重叠面积占较小图层的比例（直接 REJECT）"
+    )
+    CONTRAST_MIN: float = Field(default=4.5, ge=1.0, le=21.0, description="正文最低对比度（WCAG AA）")
+    CONTRAST_MIN_LARGE: float = Field(default=3.0, ge=1.0, le=21.0, description="大字号最低对比度")
+    CONTRAST_REJECT: float = Field(default=1.5, ge=1.0, le=21.0, description="低于该对比度直接 REJECT")
+    LARGE_TEXT_PX: int = Field(default=36, ge=1, description="不小于该字号视为大字号")
+    OVERLAY_OPAQUE_MIN: float = Field(
+        default=0.85, ge=0.0, le=1.0, description="遮罩不透明度达到该值才视为可确定文字背景色"
+    )
+    MIN_FONT_SIZE: int = Field(default=16, ge=1, description="最小可读字号（px）")
+    HIERARCHY_MIN_RATIO: float = Field(
+        default=1.25, ge=1.0, description="最大字号 / 最小字号的最低比值（字号层级）"
+    )
+    MARGIN_MIN_RATIO: float = Field(
+        default=0.015, ge=0.0, le=0.5, description="文字距画布边缘的最小距离（占画布宽度比例）"
+    )
+    OVERFLOW_REJECT_PX: int = Field(default=40, ge=0, description="文字超出画布超过该像素直接 REJECT")
+    CTA_MAX_CHARS: int = Field(default=12, ge=1, description="按钮文案（CTA）的最大字数")
+    CTA_MIN_Y_RATIO: float = Field(
+        default=0.5, ge=0.0, le=1.0, description="CTA 中心点应位于画布高度该比例以下"
+    )
+
+
 # =============================================================================
 # 应用配置类
 # =============================================================================
@@ -226,6 +294,173 @@ class CanvasConfig(BaseSettings):
     HEIGHT: int = Field(default=1920, ge=100, le=10000, description="默认画布高度")
 
 
+class LayoutFitConfig(BaseSettings):
+    """排版自适应配置（LayoutBuilder 将内容容器调整到恰好放进布局策略的区域）"""
+
+    model_config = SettingsConfigDict(env_prefix="LAYOUT_FIT_", env_file=".env", extra="ignore")
+
+    ENABLED: bool = Field(default=True, description="是否启用排版自适应（关闭时仅按 LLM 给出的字号排版）")
+    MIN_FONT_SIZE: int = Field(
+        default=16, ge=1, description="压缩字号的下限（px，按 1080 宽画布换算；与规则预审的最小可读字号一致）"
+    )
+    HIERARCHY_RATIO: float = Field(
+        default=1.2, ge=1.0, description="相邻层级（标题 > 副标题 > 正文）字号的最小比值"
+    )
+    MAX_UPSCALE: float = Field(
+        default=1.25, ge=1.0, description="区域有余量时文字整体放大的上限倍数"
+    )
+    MIN_GAP_RATIO: float = Field(default=0.5, ge=0.0, le=1.0, description="间距压缩下限（相对策略间距）")
+    MAX_GAP_RATIO: float = Field(default=2.0, ge=1.0, description="间距拉伸上限（相对策略间距）")
+    TRUNCATE: bool = Field(
+        default=False,
+        description="字号到下限仍放不下时截断正文 / 副标题（标题与 CTA 从不截断）；关闭时保留全文，超出区域由 Critic 打回",
+    )
+
+
+class LayoutEngineConfig(BaseSettings):
+    """布局引擎配置（固定策略区域 / 约束求解）"""
+
+    model_config = SettingsConfigDict(env_prefix="LAYOUT_ENGINE_", env_file=".env", extra="ignore")
+
+    MODE: Literal["strategy", "constraint"] = Field(
+        default="strategy",
+        description="strategy: 按 STRATEGIES 的固定区域排版；constraint: 策略仅作为偏好，由约束求解器避让主体、适配任意宽高比",
+    )
+    SAFE_MARGIN_RATIO: float = Field(
+        default=0.045, ge=0.0, le=0.3, description="约束模式的安全边距（画布短边的比例）"
+    )
+    SUBJECT_MARGIN: int = Field(
+        default=24, ge=0, description="约束模式下文字与主体外接框的最小距离（px，按 1080 宽画布换算）"
+    )
+
+
+class ResizeConfig(BaseSettings):
+    """多尺寸派生配置（同一版式按 DSL + 策略映射重新排版到其他画布尺寸）"""
+
+    model_config = SettingsConfigDict(env_prefix="RESIZE_", env_file=".env", extra="ignore")
+
+    SIZES: str = Field(
+        default="1080x1920,1080x1080,1920x1080,1200x300",
+        description="请求未指定尺寸时派生的画布尺寸（宽x高，逗号分隔）",
+    )
+    REGENERATE_FLAGGED: bool = Field(
+        default=True, description="规则审核 REJECT 的尺寸带反馈调用 Layout Agent 重新生成（其余尺寸不调用 LLM）"
+    )
+
+    @property
+    def size_list(self) -> List[Tuple[int, int]]:
+        sizes = []
+        for item in self.SIZES.split(","):
+            w, _, h = item.strip().lower().partition("x")
+            if w.isdigit() and h.isdigit():
+                sizes.append((int(w), int(h)))
+        return sizes
+
+
+class LLMConfig(BaseSettings):
+    """LLM 调用公共配置（跨 Agent）"""
+
+    model_config = SettingsConfigDict(env_prefix="LLM_", env_file=".env", extra="ignore")
+
+    MAX_CONCURRENCY: int = Field(
+        default=16, ge=1, le=64, description="每个 LLM 供应商的进程级并发调用上限（所有请求共享）"
+    )
+
+    # 响应缓存（内容寻址：provider + model + messages + temperature + response_format）
+    CACHE_ENABLED: bool = Field(default=True, description="是否启用 LLM 响应缓存")
+    CACHE_MAX_ENTRIES: int = Field(default=512, ge=1, description="内存 LRU 最大条目数")
+    CACHE_SQLITE_PATH: str = Field(default="", description="SQLite 磁盘缓存路径（留空则只用内存）")
+    CACHE_DEFAULT_TTL: float = Field(default=3600.0, description="默认 TTL（秒）")
+    CACHE_TTLS: str = Field(
+        default="planner=1800,layout=1800,critic=86400,visual_review=86400,image_understanding=86400",
+        description="按 Agent 的 TTL（秒），格式 name=seconds，逗号分隔；<=0 表示该 Agent 不缓存",
+    )
+    CACHE_MAX_TEMPERATURE: float = Field(
+        default=0.7, description="temperature 高于该值时绕过缓存（追求多样性的采样不应复用结果）"
+    )
+
+    # Vision 请求图片预处理（缩放 + 重新编码，降低上传体积与 token 消耗）
+    VISION_IMAGE_MAX_EDGE: int = Field(
+        default=1024, ge=0, description="发送给 Vision LLM 前图片最长边（像素，0 表示不缩放）"
+    )
+    VISION_IMAGE_FORMAT: Literal["jpeg", "webp", "png"] = Field(
+        default="jpeg", description="重新编码格式（jpeg / webp / png）"
+    )
+    VISION_IMAGE_QUALITY: int = Field(default=85, ge=1, le=100, description="JPEG/WebP 编码质量")
+
+    @property
+    def cache_ttl_map(self) -> Dict[str, float]:
+        """将 CACHE_TTLS 解析为 {namespace: seconds}"""
+        ttls: Dict[str, float] = {}
+        for item in self.CACHE_TTLS.split(","):
+            name, sep, value = item.partition("=")
+            if not sep or not name.strip():
+                continue
+            try:
+                ttls[name.strip()] = float(value)
+            except ValueError:
+                continue
+        return ttls
+
+
+class HTTPConfig(BaseSettings):
+    """对外 HTTP 调用的共享连接池配置（渲染服务、Flux、Pexels、Vision LLM）"""
+
+    model_config = SettingsConfigDict(env_prefix="HTTP_", env_file=".env", extra="ignore")
+
+    MAX_CONNECTIONS: int = Field(default=100, ge=1, description="连接池最大连接数")
+    MAX_KEEPALIVE_CONNECTIONS: int = Field(default=20, ge=0, description="最大空闲 keep-alive 连接数")
+    MAX_CONNECTIONS_PER_HOST: int = Field(default=10, ge=1, description="单个主机的最大并发请求数")
+    KEEPALIVE_EXPIRY: float = Field(default=30.0, ge=0, description="空闲连接保活时间（秒）")
+    CONNECT_TIMEOUT: float = Field(default=5.0, gt=0, description="建立连接超时（秒）")
+    READ_TIMEOUT: float = Field(default=30.0, gt=0, description="默认读写超时（秒，调用方可按请求覆盖）")
+    HTTP2: bool = Field(default=True, description="是否启用 HTTP/2（需安装 h2：pip install 'httpx[http2]'）")
+
+
+class BlobConfig(BaseSettings):
+    """图片内容寻址存储配置（asset://<sha256> 引用）"""
+
+    model_config = SettingsConfigDict(env_prefix="BLOB_", env_file=".env", extra="ignore")
+
+    BACKEND: Literal["memory", "filesystem"] = Field(
+        default="filesystem",
+        description="存储后端：filesystem（落盘，跨重启、多进程共享）/ memory（进程内，重启后 asset:// 引用失效）"
+    )
+    DIR: str = Field(default=str(BASE_DIR.parent / "data" / "blobs"), description="filesystem 后端的存储目录")
+    MAX_MEMORY_MB: int = Field(default=512, ge=1, description="memory 后端的容量上限（MB），超出按 LRU 淘汰（钉住期内的图片不淘汰）")
+    MAX_DISK_MB: int = Field(default=4096, ge=0, description="filesystem 后端的容量上限（MB），超出按访问时间淘汰（0 表示不限）")
+    TTL_HOURS: float = Field(default=168, ge=0, description="filesystem 后端删除超过该时长未访问的图片（小时，0 表示不过期）")
+    PIN_TTL_HOURS: float = Field(default=24, gt=0, description="已返回的海报引用的图片钉住时长（小时），期间不淘汰，再次引用时续期")
+    SWEEP_INTERVAL_SECONDS: float = Field(default=300, ge=0, description="filesystem 后端两次清理的最小间隔（秒）")
+
+
+class RenderConfig(BaseSettings):
+    """引擎内渲染配置（Critic 视觉审核用的 Python 光栅化 / 文字测量 / 排版结果缓存）"""
+
+    model_config = SettingsConfigDict(env_prefix="RENDER_", env_file=".env", extra="ignore")
+
+    FONT_DIRS: str = Field(
+        default="", description="额外的字体目录（逗号分隔），优先于系统字体目录搜索"
+    )
+    IMAGE_CACHE_SIZE: int = Field(
+        default=32, ge=0, description="已解码并缩放的图片图层缓存条数（同一背景在多个候选版式间复用）"
+    )
+    GLYPH_TABLE_DIR: str = Field(
+        default=str(BASE_DIR.parent / "data" / "glyph_tables"),
+        description="预计算字形宽度表目录（python -m app.core.layout.glyph_tables 生成；缺失时直接读取字体文件测量）"
+    )
+    LAYOUT_MEMO_ENABLED: bool = Field(
+        default=True, description="缓存排版结果（相同 DSL + 策略 + 字体 + 画布直接复用 PosterData）"
+    )
+    LAYOUT_MEMO_MAX_ENTRIES: int = Field(
+        default=256, ge=1, description="排版结果缓存条数（LRU 淘汰）"
+    )
+
+    @property
+    def font_dirs(self) -> List[str]:
+        return [d.strip() for d in self.FONT_DIRS.split(",") if d.strip()]
+
+
 class KGConfig(BaseSettings):
     """Knowledge Graph 配置"""
 
@@ -258,6 +493,25 @@ class RAGConfig(BaseSettings):
         default=False,
         description="是否使用 ChromaDB（否则使用内存存储）"
     )
+    EMBED_BATCH_SIZE: int = Field(
+        default=32,
+        ge=1,
+        description="批量导入时每批编码的文档数"
+    )
+    STORE_DIR: str = Field(
+        default=str(BASE_DIR.parent / "data" / "rag_store"),
+        description="嵌入缓存与上传文档的持久化目录（留空则只用内存）"
+    )
+    PRELOAD: bool = Field(
+        default=True,
+        description="应用启动时创建知识库并在后台加载嵌入模型（否则首个 RAG 请求时创建）"
+    )
+    RETRIEVER: Literal["vector", "ivf"] = Field(
+        default="vector",
+        description="vector: 精确检索（全量矩阵乘积）；ivf: IVF-Flat 近似最近邻（数十万条文档时使用）"
+    )
+    IVF_NPROBE: int = Field(default=8, ge=1, description="IVF 每次查询扫描的簇数（越大召回越高、越慢）")
+    IVF_NLIST: int = Field(default=0, ge=0, description="IVF 簇数（0 表示按 2 * sqrt(文档数) 自动选择）")
 
 
 class CORSConfig(BaseSettings):
@@ -360,9 +614,17 @@ class Settings:
         self.visual = VisualAgentConfig()
         self.layout = LayoutAgentConfig()
         self.critic = CriticAgentConfig()
+        self.rule_critic = RuleCriticConfig()
 
         # 应用配置
         self.canvas = CanvasConfig()
+        self.layout_fit = LayoutFitConfig()
+        self.layout_engine = LayoutEngineConfig()
+        self.resize = ResizeConfig()
+        self.llm = LLMConfig()
+        self.http = HTTPConfig()
+        self.blob = BlobConfig()
+        self.render = RenderConfig()
         self.cors = CORSConfig()
         self.kg = KGConfig()
         self.rag = RAGConfig()
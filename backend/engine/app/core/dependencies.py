@@ -45,13 +45,21 @@ def get_knowledge_graph():
 
 
 def get_knowledge_base():
-    """获取品牌知识库实例（单例）"""
+    """获取品牌知识库实例（单例，嵌入模型在后台线程加载）"""
     def _factory():
         from ..knowledge import BrandKnowledgeBase
-        return BrandKnowledgeBase()
+        return BrandKnowledgeBase(background_load=True)
     return _get_or_create("knowledge_base", _factory)
 
 
+def get_knowledge_base_status() -> dict:
+    """品牌知识库就绪状态（不触发创建）"""
+    knowledge_base = _cache.get("knowledge_base")
+    if knowledge_base is None:
+        return {"ready": False, "embedder": "not_started", "backend": None, "documents": 0}
+    return knowledge_base.readiness()
+
+
 # ============================================================================
 # 海报服务依赖
 # ============================================================================
@@ -0,0 +1,252 @@
+"""
+共享 HTTP 连接池 - 所有对外 HTTP 调用（渲染服务、Flux、Pexels、Vision LLM）复用 keep-alive 连接
+
+- 同步：进程级单例 httpx.Client（线程安全）
+- 异步：每个事件循环一个 httpx.AsyncClient（httpx 异步连接绑定创建它的事件循环）
+- 按主机限制并发请求数（HTTP_MAX_CONNECTIONS_PER_HOST），避免单一上游占满连接池
+- 安装了 h2 时启用 HTTP/2（HTTP_HTTP2=true）
+- get_http_pool_stats() 导出连接数 / 请求数等监控指标
+
+Author: VibePoster Team
+Date: 2025-01
+"""
+
+import asyncio
+import threading
+import weakref
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx 的 HTTP/2 支持依赖 h2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# ============================================================================
+# 统计
+# ============================================================================
+
+class _PoolStats:
+    """按主机累计请求数 / 失败数 / 进行中的请求数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "errors": 0, "in_flight": 0}
+        )
+
+    def start(self, host: str) -> None:
+        with self._lock:
+            bucket = self._hosts[host]
+            bucket["requests"] += 1
+            bucket["in_flight"] += 1
+
+    def end(self, host: str, error: bool = False) -> None:
+        with self._lock:
+            bucket = self._hosts[host]
+            bucket["in_flight"] -= 1
+            if error:
+                bucket["errors"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {host: dict(v) for host, v in self._hosts.items()}
+
+
+_stats = _PoolStats()
+
+
+# ============================================================================
+# 按主机限流的 Transport
+# ============================================================================
+
+class _HostLimitedTransport(httpx.HTTPTransport):
+    """同步 Transport：同一主机的并发请求数不超过 per_host_limit"""
+
+    def __init__(self, per_host_limit: int, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._per_host_limit = per_host_limit
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self._per_host_limit)
+            return self._semaphores[host]
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        with self._semaphore(host):
+            _stats.start(host)
+            try:
+                response = super().handle_request(request)
+            except Exception:
+                _stats.end(host, error=True)
+                raise
+            _stats.end(host, error=response.status_code >= 500)
+            return response
+
+
+class _AsyncHostLimitedTransport(httpx.AsyncHTTPTransport):
+    """异步 Transport：同一主机的并发请求数不超过 per_host_limit"""
+
+    def __init__(self, per_host_limit: int, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._per_host_limit = per_host_limit
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self._per_host_limit))
+        async with semaphore:
+            _stats.start(host)
+            try:
+                response = await super().handle_async_request(request)
+            except Exception:
+                _stats.end(host, error=True)
+                raise
+            _stats.end(host, error=response.status_code >= 500)
+            return response
+
+
+# ============================================================================
+# 客户端
+# ============================================================================
+
+def _client_kwargs() -> Dict[str, Any]:
+    from .config import settings
+    cfg = settings.http
+    return {
+        "timeout": httpx.Timeout(cfg.READ_TIMEOUT, connect=cfg.CONNECT_TIMEOUT),
+        "follow_redirects": True,
+    }
+
+
+_http2_warned = False
+
+
+def _http2_enabled() -> bool:
+    """HTTP_HTTP2 开启且 h2 可用；开启但缺少 h2 时记录一次警告，而不是静默降级"""
+    global _http2_warned
+    from .config import settings
+    if not settings.http.HTTP2:
+        return False
+    if not HTTP2_AVAILABLE and not _http2_warned:
+        _http2_warned = True
+        logger.warning("⚠️ HTTP_HTTP2=true 但未安装 h2，使用 HTTP/1.1（pip install 'httpx[http2]'）")
+    return HTTP2_AVAILABLE
+
+
+def _transport_kwargs() -> Dict[str, Any]:
+    from .config import settings
+    cfg = settings.http
+    return {
+        "per_host_limit": cfg.MAX_CONNECTIONS_PER_HOST,
+        "http2": _http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=cfg.MAX_CONNECTIONS,
+            max_keepalive_connections=cfg.MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=cfg.KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+_sync_client: Optional[httpx.Client] = None
+_sync_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_client() -> httpx.Client:
+    """获取共享的同步 HTTP 客户端（进程级单例）"""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        with _sync_lock:
+            if _sync_client is None or _sync_client.is_closed:
+                _sync_client = httpx.Client(
+                    transport=_HostLimitedTransport(**_transport_kwargs()), **_client_kwargs()
+                )
+    return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """获取当前事件循环共享的异步 HTTP 客户端（必须在协程中调用）"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            transport=_AsyncHostLimitedTransport(**_transport_kwargs()), **_client_kwargs()
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def close_http_clients() -> None:
+    """关闭同步客户端（应用关闭 / 测试时调用）"""
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+
+async def aclose_http_clients() -> None:
+    """关闭当前事件循环的异步客户端"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+# ============================================================================
+# 监控
+# ============================================================================
+
+def _connection_counts(transport: Any) -> Dict[str, int]:
+    try:
+        connections = list(transport._pool.connections)
+    except AttributeError:
+        return {"connections": 0, "idle": 0}
+    idle = sum(1 for conn in connections if conn.is_idle())
+    return {"connections": len(connections), "idle": idle}
+
+
+def get_http_pool_stats() -> Dict[str, Any]:
+    """连接池监控指标（连接数、按主机的请求统计）"""
+    from .config import settings
+    cfg = settings.http
+
+    sync_pool = {"connections": 0, "idle": 0}
+    if _sync_client is not None and not _sync_client.is_closed:
+        sync_pool = _connection_counts(_sync_client._transport)
+
+    async_pools = [
+        _connection_counts(client._transport)
+        for client in list(_async_clients.values())
+        if not client.is_closed
+    ]
+
+    return {
+        "http2": cfg.HTTP2 and HTTP2_AVAILABLE,
+        "limits": {
+            "max_connections": cfg.MAX_CONNECTIONS,
+            "max_keepalive_connections": cfg.MAX_KEEPALIVE_CONNECTIONS,
+            "max_connections_per_host": cfg.MAX_CONNECTIONS_PER_HOST,
+        },
+        "sync": sync_pool,
+        "async": {
+            "clients": len(async_pools),
+            "connections": sum(p["connections"] for p in async_pools),
+            "idle": sum(p["idle"] for p in async_pools),
+        },
+        "hosts": _stats.snapshot(),
+    }
@@ -1,7 +1,8 @@
 """
 布局引擎模块 - OOP 动态布局
 
-提供"容器+组件"的流式布局逻辑（类似简易的 CSS Flexbox）。
+提供"容器+组件"的流式布局逻辑（类似简易的 CSS Flexbox），
+以及基于约束求解的 ConstraintContainer（安全区 / 间距 / 对齐 / 避让主体）。
 
 核心思想：
     元素的位置不是写死的，而是由容器自动计算的。
@@ -23,11 +24,17 @@ Date: 2025-01
 """
 
 from .styles import Style
-from .elements import Element, TextBlock, ImageBlock, ShapeBlock
+from .text_metrics import TextMetrics, measure_text, measure_text_width
+from .elements import Bounds, Element, TextBlock, ImageBlock, ShapeBlock
 from .containers import Container, VerticalContainer, HorizontalContainer
+from .constraints import ConstraintContainer, UnsatisfiableLayout
 
 __all__ = [
     "Style",
+    "TextMetrics",
+    "measure_text",
+    "measure_text_width",
+    "Bounds",
     "Element",
     "TextBlock",
     "ImageBlock",
@@ -35,5 +42,7 @@ __all__ = [
     "Container",
     "VerticalContainer",
     "HorizontalContainer",
+    "ConstraintContainer",
+    "UnsatisfiableLayout",
 ]
 
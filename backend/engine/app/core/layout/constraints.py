@@ -0,0 +1,363 @@
+"""
+布局引擎 - 约束布局容器
+
+与 VerticalContainer / HorizontalContainer 并列的容器类型：子元素仍按添加顺序自上而下排列，
+但位置由 Cassowary 增量线性约束求解器（kiwisolver）计算，约束包括：
+- 安全区：所有元素必须位于画布安全边距以内（required）
+- 最小间距：相邻元素间距不小于 min_gap（required），并尽量接近 gap（medium）
+- 对齐：left / center / right 对齐到文字栏（strong）
+- 避让：不与主体等禁入区域重叠（required）
+- 锚点：内容整体尽量靠近 anchor 指定的垂直位置（weak）
+
+避让是"在上方或下方"的析取约束，无法直接写成线性约束，因此先做组合选择：
+把元素序列按顺序分配到禁入区域之间的空闲区间（优先整体放在一个区间、其次拆成上下两组），
+空闲区间都放不下时，把文字栏收窄到禁入区域的左侧或右侧；选定后一次求解，无需 LLM 重试。
+
+Author: VibePoster Team
+Date: 2025-01
+"""
+
+import itertools
+import time
+from typing import Dict, List, Literal, NamedTuple, Optional, Sequence, Tuple
+
+from ..logger import get_logger
+from .containers import Container
+from .elements import Element, TextBlock
+from .styles import Style
+
+logger = get_logger(__name__)
+
+try:
+    import kiwisolver as kiwi
+    KIWI_AVAILABLE = True
+except ImportError:  # pragma: no cover - 依赖缺失时由调用方回退到固定区域布局
+    kiwi = None
+    KIWI_AVAILABLE = False
+
+
+Align = Literal["left", "center", "right"]
+
+
+class UnsatisfiableLayout(RuntimeError):
+    """硬约束互相冲突，求解器无解（调用方应回退到固定区域布局）"""
+
+# 文字栏收窄到禁入区域一侧时，栏宽不小于安全区宽度的该比例
+_MIN_COLUMN_RATIO = 0.35
+# 拆成多组时每多一组的评分惩罚（以安全区高度为单位）
+_SPLIT_PENALTY = 0.25
+
+
+class Rect(NamedTuple):
+    """轴对齐矩形（px）"""
+    x: float
+    y: float
+    width: float
+    height: float
+
+    @property
+    def right(self) -> float:
+        return self.x + self.width
+
+    @property
+    def bottom(self) -> float:
+        return self.y + self.height
+
+
+class ConstraintContainer(Container):
+    """
+    约束布局容器
+
+    与其他容器不同，构造参数给出的是可用区域（通常为整个画布）；
+    arrange() 之后 x / y / width / height 为内容实际占据的外接矩形，
+    可像 VerticalContainer 一样交给排版自适应（fit_container）和遮罩计算使用。
+    """
+
+    __slots__ = (
+        "area", "safe_margins", "min_gap", "align", "anchor",
+        "keep_outs", "placement", "solve_ms", "_natural_widths",
+    )
+
+    def __init__(
+        self,
+        x: float = 0,
+        y: float = 0,
+        width: float = 1080,
+        height: float = 1920,
+        safe_margins: Tuple[float, float, float, float] = (48, 48, 48, 48),
+        gap: float = 16,
+        min_gap: float = 8,
+        align: Align = "center",
+        anchor: float = 0.5,
+        style: Optional[Style] = None,
+    ):
+        """
+        初始化约束容器
+
+        Args:
+            x, y, width, height: 可用区域（px）
+            safe_margins: 安全边距（上, 右, 下, 左）
+            gap: 期望间距
+            min_gap: 最小间距（硬约束）
+            align: 文字栏内的水平对齐
+            anchor: 内容中心的期望垂直位置（区域高度的比例，0 为顶部）
+            style: 样式配置
+        """
+        super().__init__(x, y, width, height, 0, gap, style)
+        self.area = Rect(x, y, width, height)
+        self.safe_margins = safe_margins
+        self.min_gap = min(min_gap, gap)
+        self.align = align
+        self.anchor = anchor
+        self.keep_outs: List[Rect] = []
+        self.placement = "empty"
+        self.solve_ms = 0.0
+        self._natural_widths: Dict[int, float] = {}
+
+    # ------------------------------------------------------------------
+    # 约束声明
+    # ------------------------------------------------------------------
+
+    def add(self, element: Element) -> "ConstraintContainer":
+        self._natural_widths[id(element)] = element.width
+        super().add(element)
+        return self
+
+    def remove(self, element: Element):
+        self._natural_widths.pop(id(element), None)
+        super().remove(element)
+
+    def clear(self):
+        self._natural_widths.clear()
+        super().clear()
+
+    def avoid(self, x: float, y: float, width: float, height: float, margin: float = 0) -> "ConstraintContainer":
+        """添加禁入区域（如主体素材的外接框），margin 为额外留白"""
+        self.keep_outs.append(Rect(x - margin, y - margin, width + 2 * margin, height + 2 * margin))
+        return self
+
+    @property
+    def safe_rect(self) -> Rect:
+        top, right, bottom, left = self.safe_margins
+        a = self.area
+        return Rect(a.x + left, a.y + top, a.width - left - right, a.height - top - bottom)
+
+    # ------------------------------------------------------------------
+    # 区间规划（析取约束的组合选择）
+    # ------------------------------------------------------------------
+
+    def _free_intervals(self, col_left: float, col_right: float) -> List[Tuple[float, float]]:
+        """文字栏内未被禁入区域覆盖的垂直区间"""
+        safe = self.safe_rect
+        blocked = sorted(
+            (max(r.y, safe.y), min(r.bottom, safe.bottom))
+            for r in self.keep_outs
+            if r.x < col_right and r.right > col_left and r.y < safe.bottom and r.bottom > safe.y
+        )
+        intervals: List[Tuple[float, float]] = []
+        cursor = safe.y
+        for top, bottom in blocked:
+            if top > cursor:
+                intervals.append((cursor, top))
+            cursor = max(cursor, bottom)
+        if cursor < safe.bottom:
+            intervals.append((cursor, safe.bottom))
+        return intervals
+
+    def available_height(self) -> float:
+        """当前文字栏内最长的连续空闲高度（供排版自适应作为区域高度）"""
+        self._reset_widths()
+        safe = self.safe_rect
+        intervals = self._free_intervals(safe.x, safe.right)
+        best = max((b - a for a, b in intervals), default=0.0)
+        column = self._side_column()
+        if column is not None:
+            best = max(best, safe.height)
+        return best
+
+    def _stack_extent(self, heights: Sequence[float]) -> float:
+        return sum(heights) + max(len(heights) - 1, 0) * self.min_gap
+
+    def _plan_groups(
+        self, intervals: List[Tuple[float, float]], heights: List[float],
+    ) -> Optional[List[Tuple[int, int, Tuple[float, float]]]]:
+        """
+        把元素序列按顺序切分到各空闲区间，返回 [(起始下标, 结束下标, 区间)]
+
+        评分：组数越少越好，其次内容中心越接近锚点越好。
+        """
+        n, m = len(heights), len(intervals)
+        if m == 0:
+            return None
+        safe = self.safe_rect
+        anchor_y = self.area.y + self.anchor * self.area.height
+
+        best, best_score = None, float("inf")
+        # cuts[k] 为第 k 个区间的起始元素下标（单调不减）
+        for cuts in itertools.combinations_with_replacement(range(n + 1), m - 1):
+            bounds = (0,) + cuts + (n,)
+            groups = []
+            feasible = True
+            for k in range(m):
+                lo, hi = bounds[k], bounds[k + 1]
+                if lo == hi:
+                    continue
+                a, b = intervals[k]
+                if self._stack_extent(heights[lo:hi]) > b - a:
+                    feasible = False
+                    break
+                groups.append((lo, hi, intervals[k]))
+            if not feasible or not groups:
+                continue
+
+            centers = []
+            for lo, hi, (a, b) in groups:
+                extent = self._stack_extent(heights[lo:hi])
+                centers.append(min(max(anchor_y, a + extent / 2), b - extent / 2))
+            weights = [sum(heights[lo:hi]) for lo, hi, _ in groups]
+            center = sum(c * w for c, w in zip(centers, weights)) / max(sum(weights), 1e-6)
+            score = (len(groups) - 1) * _SPLIT_PENALTY + abs(center - anchor_y) / max(safe.height, 1)
+            if score < best_score:
+                best, best_score = groups, score
+        return best
+
+    def _side_column(self) -> Optional[Tuple[float, float]]:
+        """禁入区域左右两侧中较宽的一侧作为文字栏（宽度不足时返回 None）"""
+        safe = self.safe_rect
+        if not self.keep_outs:
+            return None
+        left_edge = min(r.x for r in self.keep_outs)
+        right_edge = max(r.right for r in self.keep_outs)
+        options = [(safe.x, left_edge), (right_edge, safe.right)]
+        col = max(options, key=lambda c: c[1] - c[0])
+        if col[1] - col[0] < safe.width * _MIN_COLUMN_RATIO:
+            return None
+        return col
+
+    def _reset_widths(self) -> None:
+        """恢复自然宽度，且不超过安全区宽度（否则 x >= 左边界、x + w <= 右边界无解）"""
+        limit = self.safe_rect.width
+        for e in self.elements:
+            self._set_width(e, min(self._natural_widths.get(id(e), e.width), limit))
+
+    @staticmethod
+    def _set_width(element: Element, width: float) -> None:
+        if isinstance(element, TextBlock):
+            if element.max_width != width:
+                element.max_width = width
+                element.width = width
+                element.height = element.calculate_height()
+        else:
+            element.width = width
+
+    # ------------------------------------------------------------------
+    # 求解
+    # ------------------------------------------------------------------
+
+    def arrange(self):
+        """规划区间后用 Cassowary 求解所有元素位置"""
+        if not self.elements:
+            safe = self.safe_rect
+            self.x, self.y, self.width, self.height = safe.x, safe.y, safe.width, 0
+            self.placement = "empty"
+            return
+        if not KIWI_AVAILABLE:
+            raise RuntimeError("约束布局需要 kiwisolver（pip install kiwisolver）")
+
+        start = time.perf_counter()
+        self._reset_widths()
+        safe = self.safe_rect
+        col_left, col_right = safe.x, safe.right
+
+        heights = [e.height for e in self.elements]
+        groups = self._plan_groups(self._free_intervals(col_left, col_right), heights)
+        placement = "stack" if groups and len(groups) == 1 else "split"
+
+        if groups is None:
+            column = self._side_column()
+            if column is not None:
+                col_left, col_right = column
+                for e in self.elements:
+                    self._set_width(e, min(self._natural_widths.get(id(e), e.width), col_right - col_left))
+                heights = [e.height for e in self.elements]
+                groups = self._plan_groups(self._free_intervals(col_left, col_right), heights)
+                placement = "column"
+
+        overflow = groups is None
+        if overflow:
+            intervals = self._free_intervals(col_left, col_right) or [(safe.y, safe.bottom)]
+            groups = [(0, len(self.elements), max(intervals, key=lambda iv: iv[1] - iv[0]))]
+            placement = "overflow"
+            logger.warning(
+                f"⚠️ 约束布局：内容高度 {self._stack_extent(heights):.0f}px 超出可用区域，尽量放置"
+            )
+
+        self._solve(groups, col_left, col_right, overflow)
+
+        self.x = min(e.x for e in self.elements)
+        self.y = min(e.y for e in self.elements)
+        self.width = max(e.x + e.width for e in self.elements) - self.x
+        self.height = max(e.y + e.height for e in self.elements) - self.y
+        self.placement = placement
+        self.solve_ms = (time.perf_counter() - start) * 1000
+
+    def _solve(
+        self,
+        groups: List[Tuple[int, int, Tuple[float, float]]],
+        col_left: float,
+        col_right: float,
+        overflow: bool,
+    ) -> None:
+        solver = kiwi.Solver()
+        elements = self.elements
+        ys = [kiwi.Variable(f"y{i}") for i in range(len(elements))]
+        xs = [kiwi.Variable(f"x{i}") for i in range(len(elements))]
+        try:
+            self._add_constraints(solver, groups, xs, ys, col_left, col_right, overflow)
+        except kiwi.UnsatisfiableConstraint as e:
+            raise UnsatisfiableLayout(f"约束布局无解: {e}") from e
+
+        solver.updateVariables()
+        for e, x, y in zip(elements, xs, ys):
+            e.set_position(x.value(), y.value())
+
+    def _add_constraints(
+        self,
+        solver: "kiwi.Solver",
+        groups: List[Tuple[int, int, Tuple[float, float]]],
+        xs: List["kiwi.Variable"],
+        ys: List["kiwi.Variable"],
+        col_left: float,
+        col_right: float,
+        overflow: bool,
+    ) -> None:
+        elements = self.elements
+        anchor_y = self.area.y + self.anchor * self.area.height
+        col_mid = (col_left + col_right) / 2
+        bound_strength = "strong" if overflow else "required"
+
+        for i, e in enumerate(elements):
+            x, w = xs[i], e.width
+            solver.addConstraint(x >= col_left)
+            solver.addConstraint(x + w <= col_right)
+            if self.align == "left":
+                solver.addConstraint((x == col_left) | "strong")
+            elif self.align == "right":
+                solver.addConstraint((x + w == col_right) | "strong")
+            else:
+                solver.addConstraint((x + w / 2 == col_mid) | "strong")
+
+        for lo, hi, (top, bottom) in groups:
+            solver.addConstraint((ys[lo] >= top) | bound_strength)
+            solver.addConstraint((ys[hi - 1] + elements[hi - 1].height <= bottom) | bound_strength)
+            for i in range(lo, hi - 1):
+                h = elements[i].height
+                solver.addConstraint((ys[i + 1] >= ys[i] + h + self.min_gap) | bound_strength)
+                solver.addConstraint((ys[i + 1] == ys[i] + h + self.gap) | "medium")
+            group_center = (ys[lo] + ys[hi - 1] + elements[hi - 1].height) / 2
+            solver.addConstraint((group_center == anchor_y) | "weak")
+
+        # 相邻组之间同样保持顺序与最小间距
+        for (_, hi, _), (lo, _, _) in zip(groups, groups[1:]):
+            solver.addConstraint(ys[lo] >= ys[hi - 1] + elements[hi - 1].height + self.min_gap)
+
@@ -23,6 +23,8 @@ class Container(Element):
     
     可以包含多个子元素，并负责排列它们的位置
     """
+
+    __slots__ = ("elements", "padding", "gap")
     
     def __init__(
         self,
@@ -97,15 +99,35 @@ class Container(Element):
             "elements": [element.render() for element in self.elements]
         }
     
+    def leaf_count(self) -> int:
+        """子树中非容器元素的数量"""
+        count = 0
+        for element in self.elements:
+            count += element.leaf_count() if isinstance(element, Container) else 1
+        return count
+    
     def get_all_elements(self) -> List[Dict[str, Any]]:
-        """获取所有子元素的扁平列表（用于导出）"""
-        result = []
+        """
+        获取所有子元素的扁平列表（用于导出）
+
+        先统计叶子数预分配输出列表，再按文档顺序原地写入，嵌套容器不再拼接中间列表。
+        """
+        elements = self.elements
+        if not any(isinstance(element, Container) for element in elements):
+            return [element.render() for element in elements]
+        result: List[Optional[Dict[str, Any]]] = [None] * self.leaf_count()
+        self._render_into(result, 0)
+        return result
+    
+    def _render_into(self, out: List[Optional[Dict[str, Any]]], index: int) -> int:
+        """将子树渲染写入 out[index:]，返回下一个写入位置"""
         for element in self.elements:
             if isinstance(element, Container):
-                result.extend(element.get_all_elements())
+                index = element._render_into(out, index)
             else:
-                result.append(element.render())
-        return result
+                out[index] = element.render()
+                index += 1
+        return index
 
 
 class VerticalContainer(Container):
@@ -114,6 +136,8 @@ class VerticalContainer(Container):
     
     子元素从上到下依次排列，自动计算每个元素的 y 坐标
     """
+
+    __slots__ = ()
     
     def __init__(
         self,
@@ -192,6 +216,8 @@ class HorizontalContainer(Container):
     
     子元素从左到右依次排列
     """
+
+    __slots__ = ()
     
     def arrange(self):
         """水平排列所有子元素"""
@@ -5,21 +5,39 @@
 - Element: 抽象基类
 - TextBlock: 文本块组件
 - ImageBlock: 图片块组件
+- ShapeBlock: 装饰形状组件
+
+所有元素类声明 __slots__（不创建实例 __dict__），每分钟构建上千个候选版式时
+显著降低对象内存与属性访问开销；子类新增属性需同步声明到 __slots__。
 
 Author: VibePoster Team
 Date: 2025-01
 """
 
-from typing import Dict, Any, Optional, TYPE_CHECKING
+from typing import Dict, Any, NamedTuple, Optional, TYPE_CHECKING
 from abc import ABC, abstractmethod
-import math
 
 from .styles import Style
+from .text_metrics import TextMetrics, measure_text
 
 if TYPE_CHECKING:
     from .containers import Container
 
 
+class Bounds(NamedTuple):
+    """元素边界框"""
+    x: float
+    y: float
+    width: float
+    height: float
+    right: float
+    bottom: float
+
+
+# 未传入样式的图片 / 形状 / 容器共享的默认样式（只读；需要修改时请传入独立的 Style）
+_DEFAULT_STYLE = Style()
+
+
 class Element(ABC):
     """
     抽象基类 - 所有布局元素的基类
@@ -29,6 +47,8 @@ class Element(ABC):
         width, height: 元素的尺寸
         style: 样式配置
     """
+
+    __slots__ = ("x", "y", "width", "height", "style", "_parent")
     
     def __init__(
         self,
@@ -42,7 +62,7 @@ class Element(ABC):
         self.y = y
         self.width = width
         self.height = height
-        self.style = style or Style()
+        self.style = style if style is not None else _DEFAULT_STYLE
         self._parent: Optional['Container'] = None
     
     @abstractmethod
@@ -60,16 +80,17 @@ class Element(ABC):
         self.x = x
         self.y = y
     
-    def get_bounds(self) -> Dict[str, float]:
-        """获取元素的边界框"""
-        return {
-            "x": self.x,
-            "y": self.y,
-            "width": self.width,
-            "height": self.height,
-            "right": self.x + self.width,
-            "bottom": self.y + self.height
-        }
+    @property
+    def right(self) -> float:
+        return self.x + self.width
+
+    @property
+    def bottom(self) -> float:
+        return self.y + self.height
+
+    def get_bounds(self) -> Bounds:
+        """获取元素的边界框（只需右 / 下边界时直接用 right / bottom 属性）"""
+        return Bounds(self.x, self.y, self.width, self.height, self.x + self.width, self.y + self.height)
     
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(x={self.x}, y={self.y}, w={self.width}, h={self.height})"
@@ -81,6 +102,8 @@ class TextBlock(Element):
     
     自动根据文本内容、字体大小、最大宽度计算高度
     """
+
+    __slots__ = ("content", "font_size", "max_width", "line_height", "role", "truncated")
     
     def __init__(
         self,
@@ -90,7 +113,8 @@ class TextBlock(Element):
         line_height: float = 1.5,
         x: float = 0,
         y: float = 0,
-        style: Optional[Style] = None
+        style: Optional[Style] = None,
+        role: Optional[str] = None
     ):
         """
         初始化文本块
@@ -102,33 +126,45 @@ class TextBlock(Element):
             line_height: 行高倍数
             x, y: 初始位置
             style: 样式配置
+            role: 语义角色（title / subtitle / body / cta），供排版自适应维持字号层级
         """
         self.content = content
         self.font_size = font_size
         self.max_width = max_width
         self.line_height = line_height
+        self.role = role
+        self.truncated = False  # 排版自适应截断过内容
         
-        # 自动计算高度
-        calculated_height = self.calculate_height()
-        
-        # 初始化基类
+        # 初始化基类（测量需要 style 中的字体信息）
         super().__init__(
             x=x,
             y=y,
             width=max_width,
-            height=calculated_height,
+            height=0,
             style=style or Style(font_size=font_size)
         )
+        
+        # 自动计算高度
+        self.height = self.calculate_height()
+    
+    def measure(self) -> TextMetrics:
+        """按当前字体 / 字号 / 宽度测量断行结果"""
+        return measure_text(
+            self.content,
+            font_size=self.font_size,
+            max_width=self.max_width,
+            font_family=self.style.font_family,
+            font_weight=self.style.font_weight,
+        )
     
     def calculate_height(self) -> float:
         """
         根据文本内容和字体大小自动计算高度
         
         算法：
-        1. 估算每个字符的平均宽度（约为 font_size * 0.6）
-        2. 计算总宽度
-        3. 除以 max_width 得到行数
-        4. 乘以 line_height 和 font_size 得到总高度
+        1. 按字体文件的真实字形宽度测量（见 text_metrics）
+        2. 按 CJK / 拉丁断行规则贪心断行，得到行数
+        3. 乘以 line_height 和 font_size 得到总高度
         
         Returns:
             计算后的高度
@@ -136,23 +172,12 @@ class TextBlock(Element):
         if not self.content:
             return self.font_size * self.line_height
         
-        # 估算字符宽度（中文约等于字体大小，英文约为字体大小的 0.6）
-        # 简化处理：统一使用 0.7 作为平均值
-        avg_char_width = self.font_size * 0.7
-        
-        # 计算总宽度
-        total_width = len(self.content) * avg_char_width
-        
-        # 计算行数（向上取整）
-        line_count = math.ceil(total_width / self.max_width)
-        
-        # 计算总高度
-        total_height = line_count * self.font_size * self.line_height
-        
-        return total_height
+        line_count = self.measure().line_count
+        return line_count * self.font_size * self.line_height
     
     def render(self) -> Dict[str, Any]:
         """渲染为字典"""
+        style = self.style
         return {
             "type": "text",
             "x": self.x,
@@ -160,13 +185,14 @@ class TextBlock(Element):
             "width": self.width,
             "height": self.height,
             "content": self.content,
-            "fontSize": self.style.font_size,
-            "fontFamily": self.style.font_family,
-            "fontWeight": self.style.font_weight,
-            "color": self.style.color,
-            "textAlign": self.style.text_align,
-            "opacity": self.style.opacity,
-            "rotation": self.style.rotation,
+            "fontSize": style.font_size,
+            "fontFamily": style.font_family,
+            "fontWeight": style.font_weight,
+            "color": style.color,
+            "textAlign": style.text_align,
+            "opacity": style.opacity,
+            "rotation": style.rotation,
+            "truncated": self.truncated,
         }
     
     def update_content(self, new_content: str):
@@ -181,11 +207,22 @@ class TextBlock(Element):
         # 通知父容器重新排列
         if self._parent:
             self._parent.arrange()
+    
+    def update_font_size(self, font_size: int):
+        """更新字号（同步到样式）并重新计算高度"""
+        self.font_size = font_size
+        self.style.font_size = font_size
+        self.height = self.calculate_height()
+        
+        if self._parent:
+            self._parent.arrange()
 
 
 class ImageBlock(Element):
     """图片块组件"""
 
+    __slots__ = ("src", "maintain_aspect_ratio")
+
     def __init__(
         self,
         src: str,
@@ -196,10 +233,7 @@ class ImageBlock(Element):
         maintain_aspect_ratio: bool = True,
         style: Optional[Style] = None
     ):
-        super().__init__(
-            x=x, y=y, width=width, height=height,
-            style=style or Style()
-        )
+        super().__init__(x=x, y=y, width=width, height=height, style=style)
         self.src = src
         self.maintain_aspect_ratio = maintain_aspect_ratio
 
@@ -230,6 +264,10 @@ class ImageBlock(Element):
 class ShapeBlock(Element):
     """装饰形状组件（分隔线、渐变遮罩、色块标签等）"""
 
+    __slots__ = (
+        "subtype", "background_color", "border_radius", "border_color", "border_width", "gradient",
+    )
+
     def __init__(
         self,
         width: float,
@@ -0,0 +1,272 @@
+"""
+布局引擎 - 预计算字形宽度表
+
+构建期为 FONT_REGISTRY 中每个字体族解析出的字体文件生成紧凑的字形步进表，
+运行时按需以内存映射方式加载，文字测量变为一次向量化 gather + sum：
+- <key>.blocks.npy    int16[0x1100]     码位块（cp >> 8）→ advances 行号，-1 表示未收录
+- <key>.advances.npy  float16[N, 256]   字形步进（em），字体缺字处预填兜底字宽
+- <key>.kerning.npy   float16[95, 95]   可打印 ASCII 字偶距调整（em）
+- manifest.json       字体文件名 → 表 key / 文件大小（校验运行环境的字体与构建时一致）
+
+构建（Dockerfile 中在安装字体后执行）：
+    python -m app.core.layout.glyph_tables [输出目录]
+
+Author: VibePoster Team
+Date: 2025-01
+"""
+
+import json
+import os
+import re
+import sys
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# ============================================================================
+# 表结构
+# ============================================================================
+
+MANIFEST_NAME = "manifest.json"
+TABLE_VERSION = 1
+
+_BLOCK_COUNT = 0x110000 >> 8
+_KERN_FIRST, _KERN_SIZE = 0x20, 95  # 可打印 ASCII
+
+# 收录的码位范围（按 256 对齐成块；其余码位运行时按兜底字宽计）
+_TABLE_RANGES: List[Tuple[int, int]] = [
+    (0x0000, 0x05FF),  # 拉丁 / 希腊 / 西里尔
+    (0x2000, 0x27FF),  # 通用标点 / 货币 / 符号 / 箭头 / 几何图形
+    (0x3000, 0x33FF),  # CJK 标点 / 假名 / 注音
+    (0x4E00, 0x9FFF),  # CJK 统一表意文字
+    (0xAC00, 0xD7FF),  # 谚文
+    (0xFE00, 0xFFFF),  # 竖排 / 兼容形式 / 全角
+]
+
+# 构建时的测量字号（步进除以该值得到 em）
+_BUILD_SIZE = 1000
+_MASK_SIZE = 24
+
+# 缺字时的兜底字宽（em）
+FALLBACK_WIDE_EM = 1.0
+FALLBACK_NARROW_EM = 0.55
+
+
+def _fallback_em(cp: int) -> float:
+    return FALLBACK_WIDE_EM if unicodedata.east_asian_width(chr(cp)) in ("W", "F") else FALLBACK_NARROW_EM
+
+
+@dataclass(frozen=True)
+class GlyphTable:
+    """单个字体文件的字形步进表（em 单位，与字号无关）"""
+    blocks: np.ndarray
+    advances: np.ndarray
+    kerning: np.ndarray
+
+    def char_advances(self, text: str) -> np.ndarray:
+        """
+        逐字符步进（em），字偶距计入左侧字符
+
+        Returns:
+            float32[len(text)]
+        """
+        cp = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        if cp.size == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        rows = self.blocks[cp >> 8]
+        adv = self.advances[rows, cp & 0xFF].astype(np.float32)
+        missing = rows < 0
+        if missing.any():
+            adv[missing] = [_fallback_em(int(c)) for c in cp[missing]]
+
+        if cp.size > 1:
+            left = cp[:-1] - _KERN_FIRST
+            right = cp[1:] - _KERN_FIRST
+            pair = (left < _KERN_SIZE) & (right < _KERN_SIZE)
+            if pair.any():
+                adv[:-1][pair] += self.kerning[left[pair], right[pair]]
+        return adv
+
+    def text_width(self, text: str, font_size: float) -> float:
+        """整串宽度（px）"""
+        return float(self.char_advances(text).sum(dtype=np.float64)) * font_size
+
+
+# ============================================================================
+# 运行时加载（惰性 + 内存映射）
+# ============================================================================
+
+def _table_dir() -> str:
+    from ..config import settings
+
+    return settings.render.GLYPH_TABLE_DIR
+
+
+@lru_cache(maxsize=1)
+def _load_manifest() -> Dict[str, Dict]:
+    path = os.path.join(_table_dir(), MANIFEST_NAME)
+    if not os.path.isfile(path):
+        logger.info(f"ℹ️ 未找到字形宽度表 [{path}]，文字测量直接读取字体文件")
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ 字形宽度表清单读取失败: {e}")
+        return {}
+    if manifest.get("version") != TABLE_VERSION:
+        logger.warning(f"⚠️ 字形宽度表版本不匹配（{manifest.get('version')} != {TABLE_VERSION}），忽略")
+        return {}
+    return manifest.get("fonts", {})
+
+
+@lru_cache(maxsize=32)
+def get_glyph_table(font_path: Optional[str]) -> Optional[GlyphTable]:
+    """
+    获取字体文件对应的字形宽度表
+
+    Returns:
+        GlyphTable；没有预构建表或字体文件与构建时不一致时返回 None
+    """
+    if not font_path:
+        return None
+    entry = _load_manifest().get(os.path.basename(font_path))
+    if not entry:
+        return None
+    try:
+        if os.path.getsize(font_path) != entry["bytes"]:
+            logger.warning(f"⚠️ 字体文件 [{font_path}] 与字形宽度表构建时不一致，忽略该表")
+            return None
+        prefix = os.path.join(_table_dir(), entry["key"])
+        # np.asarray 去掉 memmap 子类（避免每次索引的子类开销），底层仍是内存映射
+        table = GlyphTable(
+            blocks=np.asarray(np.load(f"{prefix}.blocks.npy", mmap_mode="r")),
+            advances=np.asarray(np.load(f"{prefix}.advances.npy", mmap_mode="r")),
+            kerning=np.asarray(np.load(f"{prefix}.kerning.npy", mmap_mode="r")),
+        )
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f"⚠️ 字形宽度表加载失败 [{font_path}]: {e}")
+        return None
+    logger.info(f"📐 已加载字形宽度表: {entry['key']}")
+    return table
+
+
+def clear_glyph_table_cache() -> None:
+    """重新读取字形宽度表（重新构建后 / 测试使用）"""
+    _load_manifest.cache_clear()
+    get_glyph_table.cache_clear()
+
+
+# ============================================================================
+# 构建
+# ============================================================================
+
+def _table_key(font_path: str) -> str:
+    stem = os.path.splitext(os.path.basename(font_path))[0]
+    return re.sub(r"[^a-z0-9]+", "-", stem.lower()).strip("-")
+
+
+def _build_table(font_path: str) -> GlyphTable:
+    from PIL import ImageFont
+
+    font = ImageFont.truetype(font_path, _BUILD_SIZE)
+    mask_font = ImageFont.truetype(font_path, _MASK_SIZE)
+
+    # 以私有区码位的渲染结果作为 .notdef（缺字方框）参照
+    notdef = chr(0x10FFFD)
+    notdef_len = font.getlength(notdef)
+    notdef_mask = bytes(mask_font.getmask(notdef))
+
+    blocks = np.full(_BLOCK_COUNT, -1, dtype=np.int16)
+    rows: List[np.ndarray] = []
+    for start, end in _TABLE_RANGES:
+        for block in range(start >> 8, (end >> 8) + 1):
+            row = np.empty(256, dtype=np.float32)
+            for low in range(256):
+                cp = (block << 8) | low
+                row[low] = _fallback_em(cp)
+                ch = chr(cp)
+                if unicodedata.category(ch) in ("Cc", "Cs", "Co", "Cn"):
+                    continue
+                length = font.getlength(ch)
+                if length == notdef_len and bytes(mask_font.getmask(ch)) == notdef_mask:
+                    continue
+                row[low] = length / _BUILD_SIZE
+            blocks[block] = len(rows)
+            rows.append(row)
+
+    # 最后一行留给未收录的码位块（-1 索引），命中后由运行时改写为兜底字宽
+    rows.append(np.full(256, FALLBACK_NARROW_EM, dtype=np.float32))
+    advances = np.stack(rows)
+
+    ascii_chars = [chr(_KERN_FIRST + i) for i in range(_KERN_SIZE)]
+    ascii_len = [font.getlength(c) for c in ascii_chars]
+    kerning = np.zeros((_KERN_SIZE, _KERN_SIZE), dtype=np.float32)
+    for i, a in enumerate(ascii_chars):
+        for j, b in enumerate(ascii_chars):
+            kerning[i, j] = (font.getlength(a + b) - ascii_len[i] - ascii_len[j]) / _BUILD_SIZE
+
+    return GlyphTable(
+        blocks=blocks,
+        advances=advances.astype(np.float16),
+        kerning=kerning.astype(np.float16),
+    )
+
+
+def build_glyph_tables(out_dir: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    为 FONT_REGISTRY 中所有字体族（常规 / 粗体）解析出的字体文件构建字形宽度表
+
+    Args:
+        out_dir: 输出目录（默认 RENDER_GLYPH_TABLE_DIR）
+
+    Returns:
+        写入 manifest.json 的字体条目
+    """
+    from ...services.renderer.font_registry import FONT_REGISTRY, resolve_font_file
+
+    out_dir = out_dir or _table_dir()
+    os.makedirs(out_dir, exist_ok=True)
+
+    fonts: Dict[str, Dict] = {}
+    families = sorted({entry["family"] for roles in FONT_REGISTRY.values() for entry in roles.values()})
+    for family in families:
+        for weight in ("normal", "bold"):
+            path = resolve_font_file(family, weight)
+            if not path:
+                logger.warning(f"⚠️ 字体族 [{family}/{weight}] 未找到字体文件，跳过")
+                continue
+            name = os.path.basename(path)
+            if name in fonts:
+                fonts[name]["families"].append(f"{family}/{weight}")
+                continue
+
+            key = _table_key(path)
+            table = _build_table(path)
+            prefix = os.path.join(out_dir, key)
+            np.save(f"{prefix}.blocks.npy", table.blocks)
+            np.save(f"{prefix}.advances.npy", table.advances)
+            np.save(f"{prefix}.kerning.npy", table.kerning)
+
+            size_kb = (table.blocks.nbytes + table.advances.nbytes + table.kerning.nbytes) / 1024
+            logger.info(f"✅ 字形宽度表 {key}: {table.advances.shape[0]} 块, {size_kb:.0f} KB")
+            fonts[name] = {"key": key, "bytes": os.path.getsize(path), "families": [f"{family}/{weight}"]}
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"version": TABLE_VERSION, "fonts": fonts}, f, ensure_ascii=False, indent=2)
+
+    clear_glyph_table_cache()
+    return fonts
+
+
+if __name__ == "__main__":
+    build_glyph_tables(sys.argv[1] if len(sys.argv) > 1 else None)
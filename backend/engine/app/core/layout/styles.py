@@ -9,9 +9,9 @@ from typing import Optional, Literal
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class Style:
-    """样式配置"""
+    """样式配置（slots：每个文字块都持有一份，大批量构建候选版式时省去实例 __dict__）"""
     font_size: int = 16
     font_family: str = "Arial"
     font_weight: Literal["normal", "bold"] = "normal"
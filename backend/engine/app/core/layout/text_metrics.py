@@ -0,0 +1,263 @@
+"""
+布局引擎 - 文字测量
+
+基于真实字体文件的字形宽度测量 + 贪心断行，供 TextBlock 计算高度：
+- 字体文件由 font_registry.resolve_font_file 解析（与引擎内光栅化使用同一套字体）
+- 有预计算字形宽度表（glyph_tables）时整段向量化查表，否则直接读取字体文件测量
+- CJK 表意文字 / 全角符号可在任意两字之间断行
+- 拉丁单词整体不拆分，超宽单词按字符强制断开（对应前端 overflow-wrap: break-word）
+- 避头尾：行首不出现闭合标点，行尾不出现开启标点
+- (字体, 字号, 字符串) → 宽度 使用 LRU 缓存
+
+Author: VibePoster Team
+Date: 2025-01
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..logger import get_logger
+from .glyph_tables import FALLBACK_NARROW_EM, clear_glyph_table_cache, get_glyph_table
+
+logger = get_logger(__name__)
+
+
+# ============================================================================
+# 字符分类
+# ============================================================================
+
+# 行首禁则：不能出现在行首的闭合标点
+_NO_LINE_START = frozenset(
+    "，。、；：？！）】》」』〕〉”’…—～·%,.;:?!)]}>"
+)
+# 行尾禁则：不能出现在行尾的开启标点
+_NO_LINE_END = frozenset("（【《「『〔〈“‘([{<$￥#")
+
+# 无字体文件时空白的兜底字宽（em）
+_FALLBACK_SPACE_EM = 0.28
+
+
+def _is_wide(ch: str) -> bool:
+    """东亚宽字符（汉字 / 假名 / 谚文 / 全角符号），字宽恒为 1em"""
+    return unicodedata.east_asian_width(ch) in ("W", "F")
+
+
+@lru_cache(maxsize=1)
+def _token_pattern() -> "re.Pattern[str]":
+    """断行单元正则：空白串 | 单个宽字符 | 连续的其他字符（宽字符类由 BMP 的 east_asian_width 生成）"""
+    ranges: List[Tuple[int, int]] = []
+    for cp in range(0x10000):
+        if 0xD800 <= cp <= 0xDFFF or not _is_wide(chr(cp)):
+            continue
+        if ranges and ranges[-1][1] == cp - 1:
+            ranges[-1] = (ranges[-1][0], cp)
+        else:
+            ranges.append((cp, cp))
+    ranges += [(0x1F300, 0x1FAFF), (0x20000, 0x3FFFD)]  # 表情符号 / CJK 扩展区
+    wide = "".join(
+        re.escape(chr(a)) if a == b else f"{re.escape(chr(a))}-{re.escape(chr(b))}" for a, b in ranges
+    )
+    return re.compile(rf"\s+|[{wide}]|[^\s{wide}]+")
+
+
+def _tokenize(text: str) -> List[str]:
+    """
+    切分为不可再分的断行单元：
+    宽字符逐字成段，拉丁字符连续成词，空白单独成段；再按避头尾规则合并。
+    """
+    tokens = _token_pattern().findall(text)
+
+    merged: List[str] = []
+    glue_next = False
+    for tok in tokens:
+        if merged and not tok.isspace() and (glue_next or tok[0] in _NO_LINE_START):
+            merged[-1] += tok
+        else:
+            merged.append(tok)
+        glue_next = not tok.isspace() and tok[-1] in _NO_LINE_END
+    return merged
+
+
+# ============================================================================
+# 宽度测量
+# ============================================================================
+
+@lru_cache(maxsize=64)
+def _load_font(path: str, size: int):
+    from PIL import ImageFont
+
+    return ImageFont.truetype(path, size)
+
+
+@lru_cache(maxsize=32)
+def _font_path(font_family: str, font_weight: str) -> Optional[str]:
+    from ...services.renderer.font_registry import resolve_font_file
+
+    path = resolve_font_file(font_family, font_weight)
+    if path is None:
+        logger.warning(f"⚠️ 未找到字体文件 [{font_family}]，文字宽度使用估算值")
+    return path
+
+
+@lru_cache(maxsize=8192)
+def _run_width(font_path: Optional[str], font_size: int, run: str) -> float:
+    """直接读取字体文件测量单个断行单元的宽度（px），宽字符按 1em 计"""
+    wide = sum(1 for ch in run if _is_wide(ch))
+    narrow = "".join(ch for ch in run if not _is_wide(ch))
+    width = wide * font_size
+    if not narrow:
+        return float(width)
+
+    if font_path:
+        try:
+            return width + _load_font(font_path, font_size).getlength(narrow)
+        except Exception as e:
+            logger.warning(f"⚠️ 字体测量失败 [{font_path}]: {e}")
+
+    spaces = sum(1 for ch in narrow if ch.isspace())
+    em = (len(narrow) - spaces) * FALLBACK_NARROW_EM + spaces * _FALLBACK_SPACE_EM
+    return width + em * font_size
+
+
+def measure_text_width(
+    text: str,
+    font_size: int,
+    font_family: str = "PingFang SC",
+    font_weight: str = "normal",
+) -> float:
+    """测量单行文字宽度（px）"""
+    path = _font_path(font_family, str(font_weight))
+    table = get_glyph_table(path)
+    if table is not None:
+        return table.text_width(text, font_size)
+    return sum(_run_width(path, font_size, tok) for tok in _tokenize(text))
+
+
+def _token_widths(path: Optional[str], font_size: int, tokens: List[str]) -> List[float]:
+    """批量测量断行单元宽度：查表时整段一次 gather，再按单元分段求和"""
+    if not tokens:
+        return []
+    table = get_glyph_table(path)
+    if table is None:
+        return [_run_width(path, font_size, tok) for tok in tokens]
+    advances = table.char_advances("".join(tokens)).astype(np.float64) * font_size
+    starts = np.cumsum([0] + [len(tok) for tok in tokens[:-1]])
+    return np.add.reduceat(advances, starts).tolist()
+
+
+# ============================================================================
+# 断行
+# ============================================================================
+
+@dataclass(frozen=True)
+class TextMetrics:
+    """文字块测量结果"""
+    lines: Tuple[str, ...]
+    line_widths: Tuple[float, ...]
+
+    @property
+    def line_count(self) -> int:
+        return len(self.lines)
+
+    @property
+    def width(self) -> float:
+        """最宽一行的宽度"""
+        return max(self.line_widths, default=0.0)
+
+
+def _break_paragraph(
+    paragraph: str, path: Optional[str], font_size: int, max_width: float,
+) -> List[Tuple[str, float]]:
+    tokens = _tokenize(paragraph.strip())
+    widths = _token_widths(path, font_size, tokens)
+    total = sum(widths)
+    if total <= max_width:
+        return [("".join(tokens), total)]
+
+    lines: List[Tuple[str, float]] = []
+    cur, cur_w, trail_w = "", 0.0, 0.0
+
+    def push(tok: str, tok_w: float):
+        nonlocal cur, cur_w, trail_w
+        cur, cur_w = cur + tok, cur_w + tok_w
+        trail_w = tok_w if tok.isspace() else 0.0
+
+    def flush():
+        nonlocal cur, cur_w, trail_w
+        lines.append((cur.rstrip(), cur_w - trail_w))
+        cur, cur_w, trail_w = "", 0.0, 0.0
+
+    for tok, tok_w in zip(tokens, widths):
+        if tok.isspace():
+            if cur:
+                push(tok, tok_w)
+            continue
+        if cur_w + tok_w <= max_width:
+            push(tok, tok_w)
+            continue
+        if cur:
+            flush()
+        if tok_w <= max_width:
+            push(tok, tok_w)
+            continue
+        # 单个断行单元超宽：按字符强制断开
+        chars = list(tok)
+        for ch, ch_w in zip(chars, _token_widths(path, font_size, chars)):
+            if cur and cur_w + ch_w > max_width:
+                flush()
+            push(ch, ch_w)
+
+    if cur or not lines:
+        flush()
+    return lines
+
+
+@lru_cache(maxsize=2048)
+def _measure_block(
+    text: str, font_size: int, max_width: float, font_family: str, font_weight: str,
+) -> TextMetrics:
+    path = _font_path(font_family, font_weight)
+    pairs: List[Tuple[str, float]] = []
+    for paragraph in text.split("\n"):
+        pairs.extend(_break_paragraph(paragraph, path, font_size, max_width))
+    return TextMetrics(
+        lines=tuple(line for line, _ in pairs),
+        line_widths=tuple(w for _, w in pairs),
+    )
+
+
+def measure_text(
+    text: str,
+    font_size: int,
+    max_width: float,
+    font_family: str = "PingFang SC",
+    font_weight: str = "normal",
+) -> TextMetrics:
+    """
+    测量文字在给定宽度内的断行结果
+
+    Args:
+        text: 文本内容（"\\n" 为强制换行）
+        font_size: 字号（px）
+        max_width: 最大行宽（px）
+        font_family: CSS 字体族（经 font_registry 解析为字体文件）
+        font_weight: 字重
+
+    Returns:
+        TextMetrics（各行文字与行宽）
+    """
+    return _measure_block(text or "", int(font_size), float(max_width), font_family, str(font_weight))
+
+
+def clear_text_metrics_cache() -> None:
+    """清空测量缓存（修改字体目录后 / 测试使用）"""
+    _measure_block.cache_clear()
+    _run_width.cache_clear()
+    _font_path.cache_clear()
+    _load_font.cache_clear()
+    clear_glyph_table_cache()
@@ -1,53 +1,159 @@
 """
 LLM Client 工厂 - 统一管理多供应商的 Client
-支持根据 PROVIDER 动态创建客户端
+支持根据 PROVIDER 动态创建客户端（同步 / 异步两套）
+传入 cache_namespace 时返回带响应缓存的客户端代理（见 llm_cache.py）
+异步调用的进程级并发上限见 llm_slots()
 """
-from typing import Dict, Any
-from openai import OpenAI
+import asyncio
+import weakref
+from typing import Dict, Any, Optional, Tuple
+from openai import OpenAI, AsyncOpenAI, DEFAULT_TIMEOUT
 from google import genai
 
+from .config import settings
+from .http_client import get_http_client
+from .llm_cache import CachedLLMClient, get_llm_cache
+
+
+# asyncio.Semaphore 绑定创建它的事件循环，因此按事件循环分组（循环关闭后随之回收）
+_llm_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, int], asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def llm_slots(provider: Any) -> asyncio.Semaphore:
+    """
+    获取供应商的进程级 LLM 并发信号量
+
+    所有请求共享同一个信号量，并发调用总数不超过 settings.llm.MAX_CONCURRENCY，
+    而不是每个请求各自一份上限。
+
+    Args:
+        provider: 供应商名称或 LLMProvider 枚举
+    """
+    name = str(getattr(provider, "value", provider)).lower()
+    limit = settings.llm.MAX_CONCURRENCY
+    slots = _llm_slots.setdefault(asyncio.get_running_loop(), {})
+    semaphore = slots.get((name, limit))
+    if semaphore is None:
+        semaphore = slots[(name, limit)] = asyncio.Semaphore(limit)
+    return semaphore
+
 
 class LLMClientFactory:
     """LLM Client 工厂类 - 支持多供应商"""
-    
+
     _clients: Dict[str, Any] = {}
-    
+    _async_clients: Dict[str, Any] = {}
+    _cached_clients: Dict[str, CachedLLMClient] = {}
+
+    @staticmethod
+    def _cache_key(provider: str, api_key: str) -> str:
+        return f"{provider.lower()}_{api_key[:10] if api_key else 'default'}"
+
+    @staticmethod
+    def _create_genai_client(api_key: str, base_url: str) -> genai.Client:
+        # 如果 base_url 包含代理地址，不使用 vertexai
+        use_vertexai = "openai-proxy.org" not in base_url if base_url else False
+        return genai.Client(
+            api_key=api_key,
+            vertexai=use_vertexai,
+            http_options={
+                "base_url": base_url,
+            } if base_url else None,
+        )
+
     @classmethod
-    def get_client(cls, provider: str, api_key: str, base_url: str) -> Any:
+    def _with_cache(
+        cls, client: Any, provider: str, cache_key: str,
+        cache_namespace: Optional[str], is_async: bool,
+    ) -> Any:
+        if cache_namespace is None:
+            return client
+        cache = get_llm_cache()
+        if cache is None:
+            return client
+        wrapper_key = f"{'async' if is_async else 'sync'}:{cache_key}:{cache_namespace}"
+        wrapper = cls._cached_clients.get(wrapper_key)
+        if wrapper is None or wrapper.raw is not client or wrapper.cache is not cache:
+            wrapper = CachedLLMClient(client, provider, cache, cache_namespace, is_async=is_async)
+            cls._cached_clients[wrapper_key] = wrapper
+        return wrapper
+
+    @classmethod
+    def get_client(
+        cls, provider: str, api_key: str, base_url: str, cache_namespace: Optional[str] = None
+    ) -> Any:
         """
         根据 provider 获取对应的 Client
-        
+
         Args:
             provider: 供应商名称 (deepseek, openai, gemini, moonshot 等)
             api_key: API Key
             base_url: Base URL
-            
+            cache_namespace: 缓存命名空间（通常为 Agent 名）；为 None 时不启用响应缓存
+
         Returns:
             对应的 Client 实例
         """
         provider_lower = provider.lower()
-        cache_key = f"{provider_lower}_{api_key[:10] if api_key else 'default'}"
-        
+        cache_key = cls._cache_key(provider_lower, api_key)
+
         if cache_key not in cls._clients:
             if provider_lower in ["deepseek", "openai", "moonshot"]:
-                # 使用 OpenAI 兼容接口
+                # 使用 OpenAI 兼容接口（复用共享 HTTP 连接池；显式保留 SDK 默认超时，
+                # 否则 SDK 会沿用连接池较短的默认超时）
                 cls._clients[cache_key] = OpenAI(
                     api_key=api_key,
                     base_url=base_url,
+                    http_client=get_http_client(),
+                    timeout=DEFAULT_TIMEOUT,
                 )
             elif provider_lower == "gemini":
                 # 使用 Gemini 客户端
-                # 如果 base_url 包含代理地址，不使用 vertexai
-                use_vertexai = "openai-proxy.org" not in base_url if base_url else False
-                cls._clients[cache_key] = genai.Client(
+                cls._clients[cache_key] = cls._create_genai_client(api_key, base_url)
+            else:
+                raise ValueError(f"Unsupported provider: {provider}")
+
+        return cls._with_cache(
+            cls._clients[cache_key], provider_lower, cache_key, cache_namespace, is_async=False
+        )
+
+    @classmethod
+    def get_async_client(
+        cls, provider: str, api_key: str, base_url: str, cache_namespace: Optional[str] = None
+    ) -> Any:
+        """
+        根据 provider 获取对应的异步 Client
+
+        OpenAI 兼容供应商返回 AsyncOpenAI；Gemini 返回 genai.Client.aio
+        （其 models.generate_content 为协程）。
+
+        Args:
+            provider: 供应商名称 (deepseek, openai, gemini, moonshot 等)
+            api_key: API Key
+            base_url: Base URL
+            cache_namespace: 缓存命名空间（通常为 Agent 名）；为 None 时不启用响应缓存
+
+        Returns:
+            对应的异步 Client 实例
+        """
+        provider_lower = provider.lower()
+        cache_key = cls._cache_key(provider_lower, api_key)
+
+        if cache_key not in cls._async_clients:
+            if provider_lower in ["deepseek", "openai", "moonshot"]:
+                cls._async_clients[cache_key] = AsyncOpenAI(
                     api_key=api_key,
-                    vertexai=use_vertexai,
-                    http_options={
-                        "base_url": base_url,
-                    } if base_url else None,
+                    base_url=base_url,
                 )
+            elif provider_lower == "gemini":
+                # 复用同步 Client 的配置，取其 aio 异步视图
+                sync_client = cls.get_client(provider_lower, api_key, base_url)
+                cls._async_clients[cache_key] = sync_client.aio
             else:
                 raise ValueError(f"Unsupported provider: {provider}")
-        
-        return cls._clients[cache_key]
 
+        return cls._with_cache(
+            cls._async_clients[cache_key], provider_lower, cache_key, cache_namespace, is_async=True
+        )
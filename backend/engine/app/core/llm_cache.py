@@ -0,0 +1,454 @@
+"""
+LLM 响应缓存 - 内容寻址（content-addressed）
+
+缓存键 = sha256(provider, model, messages/contents, temperature, response_format, ...)，
+请求参数字节级一致时直接复用上一次的响应文本，不再访问供应商。
+
+两级存储：
+1. 进程内 LRU（OrderedDict，容量受 LLM_CACHE_MAX_ENTRIES 限制）
+2. 可选 SQLite 磁盘层（LLM_CACHE_SQLITE_PATH 非空时启用，跨进程 / 重启复用）
+
+缓存挂在 LLMClientFactory 返回的客户端上（CachedLLMClient 代理），
+各 Agent 的调用代码无需改动即可受益。
+
+Author: VibePoster Team
+Date: 2025-01
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# 仅影响传输、不影响响应内容的参数，不参与缓存键计算
+_TRANSPORT_KWARGS = frozenset({"timeout", "extra_headers", "extra_query", "extra_body", "stream_options"})
+
+
+# ============================================================================
+# 缓存响应对象
+# ============================================================================
+
+class _CachedMessage:
+    __slots__ = ("content", "role")
+
+    def __init__(self, content: str):
+        self.content = content
+        self.role = "assistant"
+
+
+class _CachedChoice:
+    __slots__ = ("message", "finish_reason", "index")
+
+    def __init__(self, content: str):
+        self.message = _CachedMessage(content)
+        self.finish_reason = "stop"
+        self.index = 0
+
+
+class CachedResponse:
+    """
+    缓存命中时返回的响应对象
+
+    同时兼容 OpenAI（response.choices[0].message.content）
+    与 Gemini（response.text）两种读取方式。
+    """
+
+    cached = True
+
+    def __init__(self, content: str):
+        self.text = content
+        self.choices = [_CachedChoice(content)]
+
+
+def _extract_text(response: Any) -> Optional[str]:
+    """从 OpenAI / Gemini 响应中取出文本内容（取不到字符串时返回 None，不缓存）"""
+    try:
+        choices = getattr(response, "choices", None)
+        text = choices[0].message.content if choices else getattr(response, "text", None)
+    except Exception:
+        return None
+    return text if isinstance(text, str) else None
+
+
+def _expects_json(request: Dict[str, Any]) -> bool:
+    """请求是否要求 JSON 输出（OpenAI response_format / Gemini response_mime_type）"""
+    fmt = request.get("response_format")
+    if isinstance(fmt, dict) and fmt.get("type") in ("json_object", "json_schema"):
+        return True
+    config = request.get("config")
+    if isinstance(config, dict):
+        return config.get("response_mime_type") == "application/json"
+    return getattr(config, "response_mime_type", None) == "application/json"
+
+
+def _is_truncated(response: Any) -> bool:
+    """响应是否因长度上限被截断（OpenAI finish_reason=length / Gemini MAX_TOKENS）"""
+    try:
+        choices = getattr(response, "choices", None)
+        if choices:
+            reason = choices[0].finish_reason
+        else:
+            candidates = getattr(response, "candidates", None)
+            reason = candidates[0].finish_reason if candidates else None
+    except Exception:
+        return False
+    return str(getattr(reason, "name", reason)).lower() in ("length", "max_tokens")
+
+
+def _is_valid_json(text: str) -> bool:
+    """去掉 markdown 代码块后能否按 JSON 解析"""
+    content = re.sub(r"```(?:json)?", "", text).strip()
+    try:
+        json.loads(content)
+    except ValueError:
+        return False
+    return True
+
+
+# ============================================================================
+# 缓存键
+# ============================================================================
+
+def _json_default(obj: Any) -> Any:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(exclude_none=True)
+    if hasattr(obj, "value"):
+        return obj.value
+    return str(obj)
+
+
+def make_cache_key(provider: str, endpoint: str, request: Dict[str, Any]) -> str:
+    """
+    计算请求的内容寻址键
+
+    Args:
+        provider: 供应商名称
+        endpoint: 调用端点（chat.completions / models.generate_content）
+        request: 完整请求参数（model、messages、temperature 等）
+    """
+    payload = {k: v for k, v in request.items() if k not in _TRANSPORT_KWARGS}
+    canonical = json.dumps(
+        {"provider": str(provider).lower(), "endpoint": endpoint, "request": payload},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=_json_default,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ============================================================================
+# 两级缓存
+# ============================================================================
+
+class LLMResponseCache:
+    """
+    LLM 响应两级缓存（内存 LRU + 可选 SQLite）
+
+    线程安全：同步 Agent 运行在线程池中，异步 Agent 运行在事件循环中，
+    两者可能同时访问同一个缓存实例。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        sqlite_path: Optional[str] = None,
+        default_ttl: float = 3600.0,
+        namespace_ttls: Optional[Dict[str, float]] = None,
+        max_temperature: float = 0.7,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.namespace_ttls = namespace_ttls or {}
+        self.max_temperature = max_temperature
+
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        if sqlite_path:
+            self._open_sqlite(sqlite_path)
+
+    def _open_sqlite(self, sqlite_path: str) -> None:
+        try:
+            Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"LLM 响应缓存启用 SQLite 磁盘层: {sqlite_path}")
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ LLM 缓存 SQLite 初始化失败，仅使用内存层: {e}")
+            self._db = None
+
+    # ------------------------------------------------------------------
+    # 策略
+    # ------------------------------------------------------------------
+
+    def ttl_for(self, namespace: Optional[str]) -> float:
+        """获取命名空间（Agent）对应的 TTL（秒）"""
+        if namespace and namespace in self.namespace_ttls:
+            return self.namespace_ttls[namespace]
+        return self.default_ttl
+
+    def should_bypass(self, namespace: Optional[str], temperature: Optional[float]) -> bool:
+        """高温采样（追求多样性）或 TTL<=0 的命名空间不走缓存"""
+        if self.ttl_for(namespace) <= 0:
+            return True
+        return temperature is not None and temperature > self.max_temperature
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def get(self, key: str, namespace: Optional[str] = None) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._count(namespace, "hits")
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._put_memory(key, row[0], row[1])
+                    self._count(namespace, "hits")
+                    return row[0]
+
+            self._count(namespace, "misses")
+            return None
+
+    def set(self, key: str, value: str, namespace: Optional[str] = None) -> None:
+        expires_at = time.time() + self.ttl_for(namespace)
+        with self._lock:
+            self._put_memory(key, value, expires_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ LLM 缓存写入 SQLite 失败: {e}")
+
+    def _put_memory(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _count(self, namespace: Optional[str], field: str) -> None:
+        bucket = self._stats.setdefault(namespace or "default", {"hits": 0, "misses": 0, "bypassed": 0})
+        bucket[field] += 1
+
+    def record_bypass(self, namespace: Optional[str]) -> None:
+        with self._lock:
+            self._count(namespace, "bypassed")
+
+    def clear(self) -> None:
+        """清空缓存（含磁盘层）与统计"""
+        with self._lock:
+            self._memory.clear()
+            self._stats.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中统计（总计 + 按命名空间）"""
+        with self._lock:
+            per_ns = {ns: dict(v) for ns, v in self._stats.items()}
+            size = len(self._memory)
+        hits = sum(v["hits"] for v in per_ns.values())
+        misses = sum(v["misses"] for v in per_ns.values())
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "bypassed": sum(v["bypassed"] for v in per_ns.values()),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": size,
+            "sqlite_enabled": self._db is not None,
+            "namespaces": per_ns,
+        }
+
+
+# ============================================================================
+# 客户端代理
+# ============================================================================
+
+class _CachedCall:
+    """包装单个生成方法（chat.completions.create / models.generate_content）"""
+
+    def __init__(self, target: Any, method: str, endpoint: str, owner: "CachedLLMClient"):
+        self._target = target
+        self._method = method
+        self._endpoint = endpoint
+        self._owner = owner
+
+    def _lookup(self, kwargs: Dict[str, Any]) -> Tuple[Optional[str], Optional[CachedResponse]]:
+        owner = self._owner
+        cache = owner.cache
+        if kwargs.get("stream"):
+            return None, None
+        temperature = kwargs.get("temperature")
+        if temperature is None and kwargs.get("config") is not None:
+            temperature = getattr(kwargs["config"], "temperature", None)
+        if cache.should_bypass(owner.namespace, temperature):
+            cache.record_bypass(owner.namespace)
+            return None, None
+
+        key = make_cache_key(owner.provider, self._endpoint, kwargs)
+        hit = cache.get(key, owner.namespace)
+        if hit is not None:
+            logger.debug(f"💾 LLM 缓存命中 [{owner.namespace or 'default'}] {key[:12]}")
+            return key, CachedResponse(hit)
+        return key, None
+
+    def _store(self, key: Optional[str], response: Any, kwargs: Dict[str, Any]) -> None:
+        """
+        写入缓存（只缓存完整可用的响应）
+
+        被截断的响应、以及要求 JSON 输出却无法解析的响应不写入，
+        否则同一请求在整个 TTL 内都会重放这次失败的结果。
+        """
+        if key is None:
+            return
+        text = _extract_text(response)
+        if not text or _is_truncated(response):
+            return
+        if _expects_json(kwargs) and not _is_valid_json(text):
+            logger.warning(f"⚠️ LLM 响应不是有效 JSON，不写入缓存 [{self._owner.namespace or 'default'}]")
+            return
+        self._owner.cache.set(key, text, self._owner.namespace)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        key, hit = self._lookup(kwargs)
+        if hit is not None:
+            return hit
+        response = getattr(self._target, self._method)(*args, **kwargs)
+        self._store(key, response, kwargs)
+        return response
+
+
+class _AsyncCachedCall(_CachedCall):
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        key, hit = self._lookup(kwargs)
+        if hit is not None:
+            return hit
+        response = await getattr(self._target, self._method)(*args, **kwargs)
+        self._store(key, response, kwargs)
+        return response
+
+
+class _Namespace:
+    """把 attr 链（chat.completions / models）上的生成方法替换为带缓存版本"""
+
+    def __init__(self, target: Any, overrides: Dict[str, Any]):
+        self._target = target
+        self._overrides = overrides
+
+    def __getattr__(self, name: str) -> Any:
+        if name in self._overrides:
+            return self._overrides[name]
+        return getattr(self._target, name)
+
+
+class CachedLLMClient:
+    """
+    带响应缓存的 LLM 客户端代理
+
+    拦截 chat.completions.create（OpenAI 兼容）与 models.generate_content（Gemini），
+    其余属性全部透传给原始客户端。
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        provider: str,
+        cache: LLMResponseCache,
+        namespace: Optional[str] = None,
+        is_async: bool = False,
+    ):
+        self.raw = client
+        self.provider = str(provider).lower()
+        self.cache = cache
+        self.namespace = namespace
+        call_cls = _AsyncCachedCall if is_async else _CachedCall
+
+        self._overrides: Dict[str, Any] = {}
+        if hasattr(client, "chat"):
+            completions = client.chat.completions
+            self._overrides["chat"] = _Namespace(client.chat, {
+                "completions": _Namespace(completions, {
+                    "create": call_cls(completions, "create", "chat.completions", self),
+                }),
+            })
+        if hasattr(client, "models"):
+            models = client.models
+            self._overrides["models"] = _Namespace(models, {
+                "generate_content": call_cls(models, "generate_content", "models.generate_content", self),
+            })
+
+    def __getattr__(self, name: str) -> Any:
+        overrides = self.__dict__.get("_overrides", {})
+        if name in overrides:
+            return overrides[name]
+        return getattr(self.__dict__["raw"], name)
+
+
+def unwrap_client(client: Any) -> Any:
+    """返回被缓存代理包装的原始客户端（用于类型判断）"""
+    return client.raw if isinstance(client, CachedLLMClient) else client
+
+
+# ============================================================================
+# 全局单例
+# ============================================================================
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """获取全局 LLM 响应缓存（LLM_CACHE_ENABLED=false 时返回 None）"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from .config import settings
+                cfg = settings.llm
+                if not cfg.CACHE_ENABLED:
+                    return None
+                _cache = LLMResponseCache(
+                    max_entries=cfg.CACHE_MAX_ENTRIES,
+                    sqlite_path=cfg.CACHE_SQLITE_PATH or None,
+                    default_ttl=cfg.CACHE_DEFAULT_TTL,
+                    namespace_ttls=cfg.cache_ttl_map,
+                    max_temperature=cfg.CACHE_MAX_TEMPERATURE,
+                )
+    return _cache
+
+
+def reset_llm_cache() -> None:
+    """重置全局缓存（用于测试）"""
+    global _cache
+    with _cache_lock:
+        _cache = None
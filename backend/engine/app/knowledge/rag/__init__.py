@@ -7,11 +7,13 @@ RAG (Retrieval-Augmented Generation) 模块
     - types.py: 类型定义
     - embedder.py: 嵌入计算
     - retriever.py: 检索策略
+    - ann.py: 近似最近邻检索（IVF-Flat）
     - loader.py: 数据加载
+    - store.py: 嵌入 / 上传文档持久化
     - knowledge_base.py: 组合入口
 """
 
-from .knowledge_base import BrandKnowledgeBase
+from .knowledge_base import BrandKnowledgeBase, make_document_id
 from .types import Document, SearchResult, KnowledgeBaseStats, BackendType
 from .embedder import (
     BaseEmbedder,
@@ -27,11 +29,14 @@ from .retriever import (
     ChromaDBRetriever,
     CHROMADB_AVAILABLE
 )
+from .ann import IVFRetriever
 from .loader import BrandDataLoader
+from .store import EmbeddingStore, text_hash
 
 __all__ = [
     # 主入口
     "BrandKnowledgeBase",
+    "make_document_id",
     
     # 类型
     "Document",
@@ -51,8 +56,13 @@ __all__ = [
     "VectorRetriever",
     "KeywordRetriever",
     "ChromaDBRetriever",
+    "IVFRetriever",
     "CHROMADB_AVAILABLE",
     
     # 加载器
     "BrandDataLoader",
+    
+    # 持久化
+    "EmbeddingStore",
+    "text_hash",
 ]
@@ -0,0 +1,330 @@
+"""
+RAG 近似最近邻检索（IVF-Flat，纯 NumPy 实现）
+
+倒排文件索引：
+    1. 球面 k-means 把归一化向量划分为 nlist 个簇（质心即粗量化器）
+    2. 每个簇单独存一块连续的 float32 数组（容量按倍数增长），新增向量直接追加到最近的簇
+    3. 查询先与质心比较，只对最近的 nprobe 个簇做矩阵-向量乘积
+
+扫描量约为 nlist + nprobe * n / nlist 行，nlist 取 2 * sqrt(n) 时
+30 万条 384 维向量单次查询只读几 MB 内存。
+文档数少于 _MIN_TRAIN_SIZE 时所有向量在同一个簇中（精确检索）；
+文档数增长到上次训练时的 _RETRAIN_GROWTH 倍时重新训练质心并重新分簇。
+持久化：训练好的质心写入 persist_directory，重启后配合 EmbeddingStore 的嵌入缓存
+直接按已有质心分簇，不再重新编码和训练。
+并发：重建时质心与倒排列表先在局部构建，再整体替换 self._lists；
+检索开头取一次 self._lists 快照，不会读到训练中途的质心或半成品列表。
+
+Author: VibePoster Team
+Date: 2025-01
+"""
+
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .types import Document, BackendType
+from .embedder import BaseEmbedder
+from .retriever import VectorRetriever
+from ...core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _InvertedLists:
+    """倒排列表与所用质心（重建时整体替换，检索只读取同一份快照）"""
+
+    __slots__ = ("centroids", "vectors", "rows", "sizes", "row_list", "row_pos")
+
+    def __init__(self, centroids: Optional[np.ndarray]):
+        nlist = len(centroids) if centroids is not None else 1
+        self.centroids = centroids                                       # None 表示全部向量在同一个簇中（精确检索）
+        self.vectors: List[Optional[np.ndarray]] = [None] * nlist        # 簇 → (capacity, dim)
+        self.rows: List[Optional[np.ndarray]] = [None] * nlist           # 簇 → 行号
+        self.sizes = np.zeros(nlist, dtype=np.int64)
+        self.row_list = np.empty(0, dtype=np.int32)                      # 行号 → 簇
+        self.row_pos = np.empty(0, dtype=np.int64)                       # 行号 → 簇内位置
+
+    @property
+    def active(self) -> bool:
+        return self.centroids is not None
+
+
+class IVFRetriever(VectorRetriever):
+    """
+    IVF-Flat 近似最近邻检索器
+
+    行号、文档与元数据索引沿用 VectorRetriever 的约定（行号即写入顺序，不会变化），
+    向量不进入 VectorRetriever 的整体矩阵，而是按簇分块存放。
+    """
+
+    _MIN_TRAIN_SIZE = 2048
+    _RETRAIN_GROWTH = 4
+    _KMEANS_ITERS = 8
+    _KMEANS_SAMPLE_PER_LIST = 32
+    _ASSIGN_CHUNK = 8192
+    _LIST_CAPACITY = 16
+    _QUANTIZER_FILE = "ivf_quantizer.npz"
+
+    def __init__(
+        self,
+        embedder: BaseEmbedder,
+        nprobe: int = 8,
+        nlist: int = 0,
+        persist_directory: Optional[str] = None
+    ):
+        """
+        初始化检索器
+
+        Args:
+            embedder: 嵌入器
+            nprobe: 每次查询扫描的簇数
+            nlist: 簇数（0 表示按 2 * sqrt(文档数) 自动选择）
+            persist_directory: 质心持久化目录（None 表示不落盘）
+        """
+        super().__init__(embedder)
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.persist_directory = persist_directory
+        self._centroids: Optional[np.ndarray] = None   # 已训练（并持久化）的质心 (nlist, dim)
+        self._trained_size = 0
+        self._lists = _InvertedLists(None)
+
+        if persist_directory:
+            self._load_quantizer()
+
+    @property
+    def backend_type(self) -> BackendType:
+        return BackendType.IVF
+
+    def clear(self):
+        """清空文档与索引（保留已训练的质心，文档数回到训练规模附近时复用）"""
+        super().clear()
+        self._lists = _InvertedLists(None)
+
+    # ------------------------------------------------------------------------
+    # 倒排列表
+    # ------------------------------------------------------------------------
+
+    def _append_rows(self, documents: List[Document]):
+        """向量按最近质心追加到各簇，文档数跨过训练阈值时重建索引"""
+        documents, vectors = self._normalized(documents)
+        if not documents:
+            return
+        rows = np.arange(self._size, self._size + len(documents))
+        self._register(documents)
+        self._insert(self._lists, vectors, rows)
+
+        if self._needs_rebuild():
+            self._rebuild()
+
+    def _insert(self, lists: _InvertedLists, vectors: np.ndarray, rows: np.ndarray):
+        """把一批向量写入所属的簇"""
+        if self._size > lists.row_list.size:
+            capacity = max(self._size, 2 * lists.row_list.size)
+            lists.row_list = np.resize(lists.row_list, capacity)
+            lists.row_pos = np.resize(lists.row_pos, capacity)
+
+        if not lists.active:
+            assign = np.zeros(len(vectors), dtype=np.int64)
+        else:
+            assign = self._assign(vectors, lists.centroids)
+        order = np.argsort(assign, kind="stable")
+        clusters, starts = np.unique(assign[order], return_index=True)
+        for cluster, idx in zip(clusters, np.split(order, starts[1:])):
+            size = int(lists.sizes[cluster])
+            end = size + idx.size
+            store = lists.vectors[cluster]
+            if store is None or end > store.shape[0]:
+                capacity = max(self._LIST_CAPACITY, end, 2 * (0 if store is None else store.shape[0]))
+                grown = np.empty((capacity, self._dim), dtype=np.float32)
+                grown_rows = np.empty(capacity, dtype=np.int64)
+                if store is not None:
+                    grown[:size] = store[:size]
+                    grown_rows[:size] = lists.rows[cluster][:size]
+                lists.vectors[cluster], lists.rows[cluster] = grown, grown_rows
+            lists.vectors[cluster][size:end] = vectors[idx]
+            lists.rows[cluster][size:end] = rows[idx]
+            lists.row_list[rows[idx]] = cluster
+            lists.row_pos[rows[idx]] = np.arange(size, end)
+            lists.sizes[cluster] = end
+
+    def _all_vectors(self) -> np.ndarray:
+        """按行号顺序取回全部向量"""
+        lists = self._lists
+        vectors = np.empty((self._size, self._dim), dtype=np.float32)
+        for cluster, size in enumerate(lists.sizes):
+            if size:
+                vectors[lists.rows[cluster][:size]] = lists.vectors[cluster][:size]
+        return vectors
+
+    # ------------------------------------------------------------------------
+    # 质心训练
+    # ------------------------------------------------------------------------
+
+    def _quantizer_fits(self) -> bool:
+        """现有质心是否适用于当前文档数与维度"""
+        n = self._size
+        return (
+            self._centroids is not None
+            and self._centroids.shape[1] == self._dim
+            and n < self._trained_size * self._RETRAIN_GROWTH
+            and n * self._RETRAIN_GROWTH > self._trained_size
+        )
+
+    def _needs_rebuild(self) -> bool:
+        if self._size < self._MIN_TRAIN_SIZE:
+            return False
+        return not (self._lists.active and self._quantizer_fits())
+
+    def _rebuild(self):
+        """
+        把全部向量按质心重新分簇（质心不适用时先重新训练）
+
+        新质心与倒排列表在局部构建完成后一次性替换 self._lists，
+        并发检索要么看到旧索引，要么看到新索引。
+        """
+        vectors = self._all_vectors()
+        if self._quantizer_fits():
+            centroids = self._centroids
+        else:
+            centroids = self._train(vectors)
+            self._centroids, self._trained_size = centroids, len(vectors)
+            self._save_quantizer()
+        lists = _InvertedLists(centroids)
+        self._insert(lists, vectors, np.arange(self._size))
+        self._lists = lists
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """每行向量最近的质心（分块计算，控制中间矩阵大小）"""
+        assign = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), self._ASSIGN_CHUNK):
+            chunk = vectors[start:start + self._ASSIGN_CHUNK]
+            assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        return assign
+
+    def _train(self, vectors: np.ndarray) -> np.ndarray:
+        """在抽样上做球面 k-means，返回 nlist 个单位长度质心（不修改当前索引）"""
+        n = len(vectors)
+        nlist = min(self.nlist or max(16, int(2 * np.sqrt(n))), n)
+        rng = np.random.default_rng(0)
+        sample_size = min(n, nlist * self._KMEANS_SAMPLE_PER_LIST)
+        if sample_size < n:
+            sample = vectors[np.sort(rng.choice(n, sample_size, replace=False))]
+        else:
+            sample = vectors
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self._KMEANS_ITERS):
+            assign = self._assign(sample, centroids)
+            counts = np.bincount(assign, minlength=nlist)
+            order = np.argsort(assign, kind="stable")
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            sums = np.zeros_like(centroids)
+            sums[filled] = np.add.reduceat(sample[order], starts, axis=0)
+            # 空簇用随机样本重新播种
+            empty = np.flatnonzero(counts == 0)
+            if empty.size:
+                sums[empty] = sample[rng.choice(sample_size, empty.size, replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = (sums / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+        logger.info(f"🧭 IVF 质心训练完成: {n} 条文档, nlist={nlist}, 样本 {sample_size}")
+        return centroids
+
+    # ------------------------------------------------------------------------
+    # 检索
+    # ------------------------------------------------------------------------
+
+    def _probe(self, lists: _InvertedLists, q: np.ndarray, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """扫描最近的 nprobe 个簇，返回 (行号, 相似度)"""
+        nlist = len(lists.sizes)
+        if nprobe >= nlist:
+            probe = range(nlist)
+        else:
+            probe = np.argpartition(-(lists.centroids @ q), nprobe - 1)[:nprobe]
+
+        row_parts = []
+        score_parts = []
+        for cluster in probe:
+            size = lists.sizes[cluster]
+            if size:
+                row_parts.append(lists.rows[cluster][:size])
+                score_parts.append(lists.vectors[cluster][:size] @ q)
+        if not row_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(row_parts), np.concatenate(score_parts)
+
+    def _exact_scores(self, lists: _InvertedLists, rows: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """按行号精确计算相似度（按簇分组取向量）"""
+        scores = np.empty(rows.size, dtype=np.float32)
+        owners = lists.row_list[rows]
+        order = np.argsort(owners, kind="stable")
+        clusters, starts = np.unique(owners[order], return_index=True)
+        for cluster, idx in zip(clusters, np.split(order, starts[1:])):
+            scores[idx] = lists.vectors[cluster][lists.row_pos[rows[idx]]] @ q
+        return scores
+
+    def _score(
+        self,
+        q: np.ndarray,
+        top_k: int,
+        filter_metadata: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        if self._size == 0:
+            return None, np.empty(0, dtype=np.float32)
+
+        lists = self._lists
+        nlist = len(lists.sizes)
+        nprobe = max(1, min(self.nprobe, nlist))
+        mask = None
+        if filter_metadata:
+            mask = self._filter_mask(filter_metadata)
+            selected = np.flatnonzero(mask)
+            # 过滤后的行数不超过一次探测的扫描量时，直接精确计算
+            if selected.size <= nprobe * self._size // nlist:
+                return selected, self._exact_scores(lists, selected, q)
+
+        while True:
+            rows, scores = self._probe(lists, q, nprobe)
+            if mask is not None:
+                keep = mask[rows]
+                rows, scores = rows[keep], scores[keep]
+            # 过滤后候选不足 top_k 时扩大探测范围
+            if rows.size >= top_k or nprobe >= nlist:
+                return rows, scores
+            nprobe = min(nprobe * 2, nlist)
+
+    # ------------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------------
+
+    def _load_quantizer(self):
+        path = Path(self.persist_directory) / self._QUANTIZER_FILE
+        if not path.exists():
+            return
+        try:
+            with np.load(str(path)) as data:
+                self._centroids = data["centroids"].astype(np.float32)
+                self._trained_size = int(data["trained_size"])
+            logger.info(f"🧭 加载 IVF 质心: nlist={len(self._centroids)}, 训练规模 {self._trained_size}")
+        except Exception as e:
+            logger.warning(f"⚠️ IVF 质心读取失败，将重新训练: {e}")
+            self._centroids = None
+            self._trained_size = 0
+
+    def _save_quantizer(self):
+        if not self.persist_directory:
+            return
+        try:
+            directory = Path(self.persist_directory)
+            directory.mkdir(parents=True, exist_ok=True)
+            tmp = directory / (self._QUANTIZER_FILE + ".tmp")
+            with open(tmp, "wb") as f:
+                np.savez(f, centroids=self._centroids, trained_size=self._trained_size)
+            os.replace(tmp, directory / self._QUANTIZER_FILE)
+        except OSError as e:
+            logger.warning(f"⚠️ IVF 质心写入失败: {e}")
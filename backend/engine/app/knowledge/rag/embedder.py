@@ -3,11 +3,17 @@ RAG 嵌入计算器
 
 负责文本向量化。
 
+sentence-transformers（连带 torch）只在真正加载模型时才导入；
+应用启动时模型在后台线程加载，加载完成前知识库用关键词检索兜底。
+
 Author: VibePoster Team
 Date: 2025-01
 """
 
-from typing import Optional, List
+import importlib.util
+import threading
+import time
+from typing import Callable, List, Optional
 from abc import ABC, abstractmethod
 import numpy as np
 
@@ -15,15 +21,18 @@ from ...core.logger import get_logger
 
 logger = get_logger(__name__)
 
-# 尝试导入 sentence-transformers
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
+# 只检查 sentence-transformers 是否安装，不导入（导入会拉起 torch，耗时数秒）
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+if not SENTENCE_TRANSFORMERS_AVAILABLE:
     logger.warning("sentence-transformers 未安装")
 
 
+def _load_model(model_name: str):
+    """导入 sentence-transformers（连带 torch）并加载模型"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
 class BaseEmbedder(ABC):
     """嵌入器基类"""
     
@@ -33,7 +42,7 @@ class BaseEmbedder(ABC):
         pass
     
     @abstractmethod
-    def encode_batch(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> List[Optional[np.ndarray]]:
         """批量编码"""
         pass
     
@@ -42,6 +51,11 @@ class BaseEmbedder(ABC):
     def is_available(self) -> bool:
         """是否可用"""
         pass
+    
+    @property
+    def state(self) -> str:
+        """加载状态：pending / loading / ready / failed / disabled"""
+        return "ready" if self.is_available else "disabled"
 
 
 class SentenceTransformerEmbedder(BaseEmbedder):
@@ -51,29 +65,83 @@ class SentenceTransformerEmbedder(BaseEmbedder):
     使用预训练模型进行文本向量化。
     """
     
-    def __init__(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2"):
+    def __init__(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2", background: bool = False):
         """
         初始化嵌入器
         
         Args:
             model_name: 模型名称
+            background: 是否在后台线程加载模型（立即返回，加载完成前 is_available 为 False）
         """
         self.model_name = model_name
         self._model = None
+        self._state = "pending"
+        self._loaded = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.load_seconds: Optional[float] = None
         
-        if SENTENCE_TRANSFORMERS_AVAILABLE:
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            self._state = "failed"
+            self._loaded.set()
+        elif background:
+            threading.Thread(target=self._load, name="embedder-loader", daemon=True).start()
+        else:
+            self._load()
+    
+    def _load(self):
+        """加载模型（完成后依次执行 on_ready 回调）"""
+        self._state = "loading"
+        started = time.perf_counter()
+        try:
+            logger.info(f"加载嵌入模型: {self.model_name}")
+            self._model = _load_model(self.model_name)
+            self._state = "ready"
+        except Exception as e:
+            self._state = "failed"
+            logger.error(f"加载嵌入模型失败: {e}")
+        self.load_seconds = time.perf_counter() - started
+        if self._model is not None:
+            logger.info(f"✅ 嵌入模型加载成功 ({self.load_seconds:.1f}s)")
+        
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+            self._loaded.set()
+        if self._model is None:
+            return
+        for callback in callbacks:
             try:
-                logger.info(f"加载嵌入模型: {model_name}")
-                self._model = SentenceTransformer(model_name)
-                logger.info("✅ 嵌入模型加载成功")
+                callback()
             except Exception as e:
-                logger.error(f"加载嵌入模型失败: {e}")
+                logger.error(f"嵌入模型就绪回调失败: {e}", exc_info=True)
     
     @property
     def is_available(self) -> bool:
         """是否可用"""
         return self._model is not None
     
+    @property
+    def state(self) -> str:
+        return self._state
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待模型加载结束，返回是否可用"""
+        self._loaded.wait(timeout)
+        return self.is_available
+    
+    def on_ready(self, callback: Callable[[], None]):
+        """
+        注册模型加载成功后的回调（在加载线程中执行）
+        
+        已加载成功时立即在当前线程执行；加载失败时不执行。
+        """
+        with self._lock:
+            if not self._loaded.is_set():
+                self._callbacks.append(callback)
+                return
+        if self.is_available:
+            callback()
+    
     def encode(self, text: str) -> Optional[np.ndarray]:
         """将文本编码为向量"""
         if not self.is_available:
@@ -85,13 +153,13 @@ class SentenceTransformerEmbedder(BaseEmbedder):
             logger.error(f"文本编码失败: {e}")
             return None
     
-    def encode_batch(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> List[Optional[np.ndarray]]:
         """批量编码"""
         if not self.is_available:
             return [None] * len(texts)
         
         try:
-            embeddings = self._model.encode(texts, convert_to_numpy=True)
+            embeddings = self._model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
             return list(embeddings)
         except Exception as e:
             logger.error(f"批量编码失败: {e}")
@@ -112,16 +180,17 @@ class NullEmbedder(BaseEmbedder):
     def encode(self, text: str) -> Optional[np.ndarray]:
         return None
     
-    def encode_batch(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> List[Optional[np.ndarray]]:
         return [None] * len(texts)
 
 
-def create_embedder(model_name: Optional[str] = None) -> BaseEmbedder:
+def create_embedder(model_name: Optional[str] = None, background: bool = False) -> BaseEmbedder:
     """
     创建嵌入器工厂方法
     
     Args:
         model_name: 模型名称（可选）
+        background: 后台加载模型（直接返回加载中的 SentenceTransformerEmbedder）
     
     Returns:
         嵌入器实例
@@ -138,7 +207,9 @@ def create_embedder(model_name: Optional[str] = None) -> BaseEmbedder:
         except Exception:
             model_name = "paraphrase-multilingual-MiniLM-L12-v2"
     
-    embedder = SentenceTransformerEmbedder(model_name)
+    embedder = SentenceTransformerEmbedder(model_name, background=background)
+    if background:
+        return embedder
     
     if not embedder.is_available:
         logger.warning("嵌入器初始化失败，使用空嵌入器")
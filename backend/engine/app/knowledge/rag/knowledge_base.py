@@ -8,6 +8,9 @@ Author: VibePoster Team
 Date: 2025-01
 """
 
+import hashlib
+import threading
+import time
 from typing import List, Dict, Any, Optional
 
 from .types import Document, SearchResult, KnowledgeBaseStats, BackendType
@@ -19,13 +22,29 @@ from .retriever import (
     ChromaDBRetriever,
     CHROMADB_AVAILABLE
 )
+from .ann import IVFRetriever
 from .loader import BrandDataLoader
+from .store import EmbeddingStore, text_hash
 from ...core.interfaces import IKnowledgeBase
 from ...core.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def make_document_id(text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """
+    由 品牌 / 类别 / 文本 生成文档 ID
+
+    跨进程、跨重启保持一致（不使用随机化的 hash()），内容不同的文档不会冲突；
+    知识库按 ID 去重，重复上传相同内容只保留一份。
+    """
+    metadata = metadata or {}
+    brand = metadata.get("brand", "")
+    category = metadata.get("category", "")
+    digest = hashlib.sha256(f"{brand}|{category}|{text}".encode("utf-8")).hexdigest()
+    return f"{brand}_{category}_{digest}" if brand else f"doc_{digest}"
+
+
 class BrandKnowledgeBase(IKnowledgeBase):
     """
     品牌知识库
@@ -46,7 +65,10 @@ class BrandKnowledgeBase(IKnowledgeBase):
         persist_directory: Optional[str] = None,
         load_default_data: Optional[bool] = None,
         embedding_model: Optional[str] = None,
-        default_data_file: Optional[str] = None
+        default_data_file: Optional[str] = None,
+        store_directory: Optional[str] = None,
+        background_load: bool = False,
+        retriever: Optional[str] = None
     ):
         """
         初始化品牌知识库
@@ -57,8 +79,12 @@ class BrandKnowledgeBase(IKnowledgeBase):
             load_default_data: 是否加载默认数据
             embedding_model: 嵌入模型名称
             default_data_file: 默认数据文件路径
+            store_directory: 嵌入 / 上传文档持久化目录（空字符串关闭）
+            background_load: 后台线程加载嵌入模型，加载完成前用关键词检索，完成后切换为向量检索
+            retriever: 向量检索后端（vector / ivf）
         """
         logger.info("📚 初始化品牌知识库...")
+        started = time.perf_counter()
         
         # 从配置读取默认值
         config = self._load_config()
@@ -67,17 +93,36 @@ class BrandKnowledgeBase(IKnowledgeBase):
         self._persist_directory = persist_directory or config.get("persist_directory", "./chroma_db")
         self._load_default = load_default_data if load_default_data is not None else config.get("load_default", True)
         self._embedding_model = embedding_model or config.get("embedding_model")
+        self._batch_size = config.get("embed_batch_size", 32)
+        self._store_directory = store_directory if store_directory is not None else config.get("store_dir", "")
+        self._retriever_type = retriever or config.get("retriever", "vector")
+        self._ivf_nprobe = config.get("ivf_nprobe", 8)
+        self._ivf_nlist = config.get("ivf_nlist", 0)
         
         # 初始化组件
-        self._embedder = create_embedder(self._embedding_model)
+        self._lock = threading.RLock()
+        self._doc_ids: set = set()   # 当前检索器中已有的文档 ID（按 ID 去重）
+        self._embedder = create_embedder(self._embedding_model, background=background_load)
         self._retriever = self._create_retriever()
         self._loader = BrandDataLoader(default_data_file)
+        self._store = self._open_store()
         
         # 加载默认数据
         if self._load_default:
             self._load_default_data()
         
-        logger.info(f"✅ 知识库初始化完成: backend={self._retriever.backend_type.value}")
+        # 恢复上传的文档
+        if self._store is not None:
+            self._restore_documents()
+        
+        if self._awaiting_model:
+            self._embedder.on_ready(self._upgrade_to_vector)
+        
+        self.init_seconds = time.perf_counter() - started
+        logger.info(
+            f"✅ 知识库初始化完成: backend={self._retriever.backend_type.value}, "
+            f"embedder={self._embedder.state}, {self.init_seconds * 1000:.0f}ms"
+        )
     
     def _load_config(self) -> Dict[str, Any]:
         """从配置加载默认值"""
@@ -87,7 +132,12 @@ class BrandKnowledgeBase(IKnowledgeBase):
                 "use_chromadb": settings.rag.USE_CHROMADB,
                 "persist_directory": settings.rag.PERSIST_DIRECTORY,
                 "load_default": settings.rag.LOAD_DEFAULT_DATA,
-                "embedding_model": settings.rag.EMBEDDING_MODEL
+                "embedding_model": settings.rag.EMBEDDING_MODEL,
+                "embed_batch_size": settings.rag.EMBED_BATCH_SIZE,
+                "store_dir": settings.rag.STORE_DIR,
+                "retriever": settings.rag.RETRIEVER,
+                "ivf_nprobe": settings.rag.IVF_NPROBE,
+                "ivf_nlist": settings.rag.IVF_NLIST
             }
         except Exception:
             return {}
@@ -101,30 +151,124 @@ class BrandKnowledgeBase(IKnowledgeBase):
         
         # 其次使用向量检索
         if self._embedder.is_available:
-            logger.info("使用 sentence-transformers 向量检索后端")
-            return VectorRetriever(self._embedder)
+            return self._new_vector_retriever()
         
         # 降级到关键词检索
-        logger.warning("使用关键词检索后端（降级方案）")
+        if self._embedder.state in ("pending", "loading"):
+            logger.info("嵌入模型后台加载中，暂用关键词检索")
+        else:
+            logger.warning("使用关键词检索后端（降级方案）")
         return KeywordRetriever()
     
+    def _new_vector_retriever(self) -> VectorRetriever:
+        """按配置创建向量检索器（ivf 的质心与嵌入缓存存放在同一目录）"""
+        if self._retriever_type == "ivf":
+            logger.info(f"使用 IVF 近似最近邻检索后端 (nprobe={self._ivf_nprobe})")
+            persist = (
+                str(EmbeddingStore.directory_for(self._store_directory, self._embedding_model))
+                if self._store_directory else None
+            )
+            return IVFRetriever(self._embedder, self._ivf_nprobe, self._ivf_nlist, persist)
+        logger.info("使用 sentence-transformers 向量检索后端")
+        return VectorRetriever(self._embedder)
+    
+    @property
+    def _awaiting_model(self) -> bool:
+        """当前为关键词兜底、嵌入模型仍在后台加载（或已加载、尚未切换检索器）"""
+        return isinstance(self._retriever, KeywordRetriever) and self._embedder.state in ("pending", "loading", "ready")
+    
+    def _upgrade_to_vector(self):
+        """嵌入模型就绪后把已有文档编码进向量检索器，再原子替换当前检索器"""
+        started = time.perf_counter()
+        with self._lock:
+            if not isinstance(self._retriever, KeywordRetriever):
+                return
+            documents = list(self._retriever.documents)
+            vector = self._new_vector_retriever()
+            self._add_with_store(documents, retriever=vector)   # 已去重，原样迁移
+            self._retriever = vector
+        logger.info(
+            f"🔁 切换为向量检索: {len(documents)} 条文档, {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+    
+    def _open_store(self) -> Optional[EmbeddingStore]:
+        """打开持久化存储（仅向量检索后端 / 等待模型时；目录为空或打开失败时返回 None）"""
+        if not self._store_directory:
+            return None
+        if not (isinstance(self._retriever, VectorRetriever) or self._awaiting_model):
+            return None
+        try:
+            return EmbeddingStore(self._store_directory, self._embedding_model)
+        except Exception as e:
+            logger.warning(f"⚠️ RAG 持久化存储不可用，仅使用内存: {e}")
+            return None
+    
+    def _add_with_store(
+        self,
+        documents: List[Document],
+        persist: bool = False,
+        retriever: Optional[BaseRetriever] = None
+    ):
+        """
+        批量入库：先从存储取已缓存的嵌入，只编码未命中的文档，新嵌入写回存储
+        
+        写入当前检索器时按 ID 去重：ID 已存在（或在本批中重复）的文档跳过，
+        也不写入持久化存储，内存与持久化两侧保持一致。
+        
+        Args:
+            documents: 文档列表
+            persist: 是否同时保存文档本身（上传的文档需要在重启后恢复）
+            retriever: 写入的检索器（默认当前检索器；指定时视为迁移已去重的文档）
+        """
+        if retriever is None:
+            with self._lock:
+                fresh = []
+                for doc in documents:
+                    if doc.id not in self._doc_ids:
+                        self._doc_ids.add(doc.id)
+                        fresh.append(doc)
+            if len(fresh) < len(documents):
+                logger.debug(f"跳过重复文档 {len(documents) - len(fresh)} 条")
+            documents = fresh
+            if not documents:
+                return
+        
+        if self._store is not None:
+            cached = self._store.lookup([text_hash(doc.text) for doc in documents if doc.embedding is None])
+            hits = 0
+            for doc in documents:
+                if doc.embedding is None and text_hash(doc.text) in cached:
+                    doc.embedding = cached[text_hash(doc.text)]
+                    hits += 1
+            if hits:
+                logger.info(f"🗄️ 嵌入缓存命中 {hits}/{len(documents)}")
+        
+        with self._lock:
+            (retriever or self._retriever).add_batch(documents, self._batch_size)
+        
+        if self._store is not None:
+            try:
+                if persist:
+                    self._store.save_documents(documents)
+                else:
+                    self._store.put_embeddings(documents)
+            except Exception as e:
+                logger.warning(f"⚠️ RAG 持久化写入失败: {e}")
+    
     def _load_default_data(self):
         """加载默认品牌数据"""
-        documents = self._loader.load()
-        for doc in documents:
-            self._add_document_internal(doc)
+        self._add_with_store(self._loader.load())
+    
+    def _restore_documents(self):
+        """恢复持久化存储中的上传文档"""
+        documents = self._store.load_documents()
+        if documents:
+            self._add_with_store(documents)
+            logger.info(f"🗄️ 恢复上传文档 {len(documents)} 条")
     
     def _add_document_internal(self, document: Document):
-        """内部添加文档方法"""
-        # 如果使用向量检索且文档没有嵌入，计算嵌入
-        if (
-            isinstance(self._retriever, VectorRetriever) and 
-            document.embedding is None and 
-            self._embedder.is_available
-        ):
-            document.embedding = self._embedder.encode(document.text)
-        
-        self._retriever.add(document)
+        """内部添加文档方法（缺少嵌入时由检索器计算，有持久化存储时同步写入）"""
+        self._add_with_store([document], persist=True)
     
     # ========================================================================
     # IKnowledgeBase 接口实现
@@ -142,13 +286,13 @@ class BrandKnowledgeBase(IKnowledgeBase):
         Args:
             text: 文档文本
             metadata: 元数据
-            doc_id: 文档 ID
+            doc_id: 文档 ID（缺省时由内容生成，见 make_document_id）
         
         Returns:
             文档 ID
         """
         if doc_id is None:
-            doc_id = f"doc_{self._retriever.document_count}"
+            doc_id = make_document_id(text, metadata)
         
         document = Document(
             id=doc_id,
@@ -161,6 +305,29 @@ class BrandKnowledgeBase(IKnowledgeBase):
         
         return doc_id
     
+    def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
+        """
+        批量添加文档（嵌入按 RAG_EMBED_BATCH_SIZE 分批计算）
+        
+        Args:
+            documents: 文档列表，每项包含 text，可选 metadata / id（缺省时由内容生成，见 make_document_id）
+        
+        Returns:
+            文档 ID 列表（与输入顺序一致）
+        """
+        batch = [
+            Document(
+                id=item.get("id") or make_document_id(item["text"], item.get("metadata")),
+                text=item["text"],
+                metadata=item.get("metadata") or {}
+            )
+            for item in documents
+        ]
+        self._add_with_store(batch, persist=True)
+        logger.info(f"📚 批量添加文档: {len(batch)} 条 (batch_size={self._batch_size})")
+        
+        return [doc.id for doc in batch]
+    
     def search(
         self,
         query: str,
@@ -194,6 +361,7 @@ class BrandKnowledgeBase(IKnowledgeBase):
             model_available=SENTENCE_TRANSFORMERS_AVAILABLE,
             chromadb_available=CHROMADB_AVAILABLE,
             embedding_model=self._embedding_model if self._embedder.is_available else None,
+            embedder_state=self._embedder.state,
             default_data_file=str(self._loader.data_file)
         )
         return stats.to_dict()
@@ -210,14 +378,33 @@ class BrandKnowledgeBase(IKnowledgeBase):
     
     def clear(self):
         """清空知识库"""
-        if isinstance(self._retriever, (VectorRetriever, KeywordRetriever)):
-            self._retriever.documents.clear()
+        with self._lock:
+            if isinstance(self._retriever, VectorRetriever):
+                self._retriever.clear()
+            elif isinstance(self._retriever, KeywordRetriever):
+                self._retriever.documents.clear()
+            self._doc_ids.clear()
+            if self._store is not None:
+                self._store.clear_documents()
         logger.info("知识库已清空")
     
     # ========================================================================
     # 属性访问
     # ========================================================================
     
+    def readiness(self) -> Dict[str, Any]:
+        """
+        就绪状态（/health 使用）
+        
+        ready 表示嵌入模型加载已结束（成功切到向量检索，或确定只能用关键词检索）。
+        """
+        return {
+            "ready": not self._awaiting_model,
+            "embedder": self._embedder.state,
+            "backend": self._retriever.backend_type.value,
+            "documents": self._retriever.document_count,
+        }
+    
     @property
     def embedder(self) -> BaseEmbedder:
         """嵌入器"""
@@ -7,7 +7,7 @@ Author: VibePoster Team
 Date: 2025-01
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from abc import ABC, abstractmethod
 import numpy as np
 
@@ -34,6 +34,11 @@ class BaseRetriever(ABC):
         """添加文档"""
         pass
     
+    def add_batch(self, documents: List[Document], batch_size: int = 32):
+        """批量添加文档（默认逐条添加，子类可覆盖为批量写入）"""
+        for document in documents:
+            self.add(document)
+    
     @abstractmethod
     def search(
         self,
@@ -62,8 +67,14 @@ class VectorRetriever(BaseRetriever):
     向量检索器
     
     使用 sentence-transformers 进行向量相似度检索。
+    
+    嵌入在写入时归一化并存入一个连续的 float32 矩阵（容量按倍数增长），
+    检索是一次矩阵-向量乘积 + argpartition 取 top-k；
+    元数据过滤通过「键 → 值 → 行号」倒排索引编译为布尔掩码。
     """
     
+    _INITIAL_CAPACITY = 64
+    
     def __init__(self, embedder: BaseEmbedder):
         """
         初始化检索器
@@ -73,6 +84,11 @@ class VectorRetriever(BaseRetriever):
         """
         self.embedder = embedder
         self.documents: List[Document] = []
+        self._matrix: Optional[np.ndarray] = None     # (capacity, dim)，前 _size 行有效
+        self._dim: Optional[int] = None
+        self._size = 0
+        self._row_docs: List[Document] = []          # 矩阵行号 → 文档
+        self._meta_index: Dict[str, Dict[Any, List[int]]] = {}
     
     @property
     def backend_type(self) -> BackendType:
@@ -87,6 +103,111 @@ class VectorRetriever(BaseRetriever):
         if document.embedding is None and self.embedder.is_available:
             document.embedding = self.embedder.encode(document.text)
         self.documents.append(document)
+        if document.embedding is not None:
+            self._append_rows([document])
+    
+    def add_batch(self, documents: List[Document], batch_size: int = 32):
+        """
+        批量添加文档
+        
+        缺少嵌入的文档按 batch_size 分批调用 encode_batch，
+        向量一次归一化写入。
+        """
+        if self.embedder.is_available:
+            pending = [doc for doc in documents if doc.embedding is None]
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                embeddings = self.embedder.encode_batch([doc.text for doc in chunk], batch_size)
+                for doc, embedding in zip(chunk, embeddings):
+                    doc.embedding = embedding
+        
+        self.documents.extend(documents)
+        self._append_rows([doc for doc in documents if doc.embedding is not None])
+    
+    def clear(self):
+        """清空文档与向量矩阵"""
+        self.documents.clear()
+        self._matrix = None
+        self._dim = None
+        self._size = 0
+        self._row_docs.clear()
+        self._meta_index.clear()
+    
+    # ------------------------------------------------------------------------
+    # 向量矩阵
+    # ------------------------------------------------------------------------
+    
+    def _append_rows(self, documents: List[Document]):
+        """归一化嵌入并写入矩阵末尾"""
+        documents, vectors = self._normalized(documents)
+        if not documents:
+            return
+        self._reserve(self._size + len(documents))
+        self._matrix[self._size:self._size + len(documents)] = vectors
+        self._register(documents)
+    
+    def _normalized(self, documents: List[Document]) -> Tuple[List[Document], np.ndarray]:
+        """堆叠并归一化嵌入（维度与索引不一致的文档跳过）"""
+        kept = []
+        rows = []
+        for document in documents:
+            vec = np.asarray(document.embedding, dtype=np.float32).ravel()
+            if self._dim is None:
+                self._dim = vec.size
+            elif vec.size != self._dim:
+                logger.warning(
+                    f"文档 {document.id} 的嵌入维度 {vec.size} 与索引维度 {self._dim} 不一致，跳过向量索引"
+                )
+                continue
+            kept.append(document)
+            rows.append(vec)
+        if not kept:
+            return kept, np.empty((0, self._dim or 0), dtype=np.float32)
+        
+        vectors = np.stack(rows)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms > 0, norms, 1)
+        return kept, vectors
+    
+    def _register(self, documents: List[Document]):
+        """登记新写入行的文档与元数据索引（行号从 _size 起连续分配）"""
+        for document in documents:
+            row = self._size
+            self._size += 1
+            self._row_docs.append(document)
+            for key, value in document.metadata.items():
+                try:
+                    self._meta_index.setdefault(key, {}).setdefault(value, []).append(row)
+                except TypeError:
+                    # 不可哈希的值（列表 / 字典）不进索引，过滤时逐行比较
+                    pass
+    
+    def _reserve(self, capacity: int):
+        """把矩阵容量扩到至少 capacity 行（按倍数增长）"""
+        if self._matrix is None:
+            self._matrix = np.empty((max(self._INITIAL_CAPACITY, capacity), self._dim), dtype=np.float32)
+            return
+        if capacity <= self._matrix.shape[0]:
+            return
+        grown = np.empty((max(capacity, 2 * self._matrix.shape[0]), self._dim), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+    
+    def _filter_mask(self, filter_metadata: Dict[str, Any]) -> np.ndarray:
+        """把元数据过滤条件编译为矩阵行的布尔掩码"""
+        mask = np.ones(self._size, dtype=bool)
+        for key, value in filter_metadata.items():
+            try:
+                rows = self._meta_index.get(key, {}).get(value, [])
+            except TypeError:
+                rows = [
+                    i for i, doc in enumerate(self._row_docs)
+                    if key in doc.metadata and doc.metadata[key] == value
+                ]
+            key_mask = np.zeros(self._size, dtype=bool)
+            key_mask[rows] = True
+            mask &= key_mask
+        return mask
     
     def search(
         self,
@@ -101,35 +222,63 @@ class VectorRetriever(BaseRetriever):
             logger.warning("查询向量化失败，回退到关键词检索")
             return self._keyword_search(query, top_k, filter_metadata)
         
-        scores = []
-        for doc in self.documents:
-            # 元数据过滤
-            if filter_metadata and not self._match_metadata(doc.metadata, filter_metadata):
-                continue
-            
-            if doc.embedding is not None:
-                similarity = self._cosine_similarity(query_embedding, doc.embedding)
-                scores.append((doc, similarity))
+        if self._size == 0 or top_k <= 0:
+            return []
         
-        # 排序
-        scores.sort(key=lambda x: x[1], reverse=True)
+        q = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(q))
+        if norm > 0:
+            q = q / norm
+        rows, scores = self._score(q, top_k, filter_metadata)
+        return self._top_results(rows, scores, top_k)
+    
+    def _score(
+        self,
+        q: np.ndarray,
+        top_k: int,
+        filter_metadata: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        计算候选行的相似度
+        
+        Returns:
+            (候选行号，None 表示全部行, 相似度)
+        """
+        scores = self._matrix[:self._size] @ q
+        if filter_metadata:
+            rows = np.flatnonzero(self._filter_mask(filter_metadata))
+            return rows, scores[rows]
+        return None, scores
+    
+    def _top_results(
+        self,
+        rows: Optional[np.ndarray],
+        scores: np.ndarray,
+        top_k: int
+    ) -> List[SearchResult]:
+        """top-k：argpartition 选出前 k 个，再只对这 k 个排序"""
+        k = min(top_k, scores.size)
+        if k == 0:
+            return []
+        if k < scores.size:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
         
-        # 构建结果
         results = []
-        for doc, score in scores[:top_k]:
+        for i in top:
+            row = int(rows[i]) if rows is not None else int(i)
+            doc = self._row_docs[row]
             results.append(SearchResult(
                 text=doc.text,
                 metadata=doc.metadata,
-                score=float(score),
+                score=float(scores[i]),
                 document_id=doc.id
             ))
         
         return results
     
-    def _cosine_similarity(self, a: np.ndarray, b: np.ndarray) -> float:
-        """计算余弦相似度"""
-        return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
-    
     def _keyword_search(
         self,
         query: str,
@@ -268,10 +417,14 @@ class ChromaDBRetriever(BaseRetriever):
         import os
         os.makedirs(persist_directory, exist_ok=True)
         
-        self.client = chromadb.Client(ChromaSettings(
-            chroma_db_impl="duckdb+parquet",
-            persist_directory=persist_directory
-        ))
+        if hasattr(chromadb, "PersistentClient"):
+            self.client = chromadb.PersistentClient(path=persist_directory)
+        else:
+            # chromadb < 0.4
+            self.client = chromadb.Client(ChromaSettings(
+                chroma_db_impl="duckdb+parquet",
+                persist_directory=persist_directory
+            ))
         self.collection = self.client.get_or_create_collection(
             name=collection_name,
             metadata={"hnsw:space": "cosine"}
@@ -296,6 +449,19 @@ class ChromaDBRetriever(BaseRetriever):
         )
         self._count += 1
     
+    def add_batch(self, documents: List[Document], batch_size: int = 32):
+        """分批写入集合（嵌入不全时交给 ChromaDB 计算）"""
+        for start in range(0, len(documents), batch_size):
+            chunk = documents[start:start + batch_size]
+            embedded = all(doc.embedding is not None for doc in chunk)
+            self.collection.add(
+                ids=[doc.id for doc in chunk],
+                documents=[doc.text for doc in chunk],
+                metadatas=[doc.metadata for doc in chunk],
+                embeddings=[doc.embedding.tolist() for doc in chunk] if embedded else None
+            )
+            self._count += len(chunk)
+    
     def search(
         self,
         query: str,
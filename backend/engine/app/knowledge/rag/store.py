@@ -0,0 +1,219 @@
+"""
+RAG 本地持久化存储
+
+按嵌入模型分目录保存：
+    embeddings.npy   float32 向量矩阵（内存映射读写，容量按倍数增长）
+    documents.db     SQLite 旁路表
+                     - embeddings: 文本摘要 → 矩阵行号（同一模型下相同文本只编码一次）
+                     - documents:  用户上传的文档（文本 / 元数据 / 文本摘要），重启后恢复
+
+BrandKnowledgeBase 启动时按文本摘要复用已有嵌入，只对新增 / 内容变化的文档重新编码；
+上传的文档逐批写入，不依赖 ChromaDB。
+
+Author: VibePoster Team
+Date: 2025-01
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .types import Document
+from ...core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def text_hash(text: str) -> str:
+    """文档文本摘要（嵌入缓存键）"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    嵌入 + 文档持久化存储
+
+    线程安全：上传路由在线程池中写入，检索在事件循环中读取。
+    """
+
+    _INITIAL_CAPACITY = 256
+    _VECTORS_FILE = "embeddings.npy"
+    _DB_FILE = "documents.db"
+
+    def __init__(self, directory: str, model_name: str):
+        """
+        打开（或创建）存储
+
+        Args:
+            directory: 存储根目录
+            model_name: 嵌入模型名称（不同模型的向量互不复用）
+        """
+        self.path = self.directory_for(directory, model_name)
+        self.model_name = model_name
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path / self._DB_FILE), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "text_hash TEXT PRIMARY KEY, row INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL, "
+            "text_hash TEXT NOT NULL, seq INTEGER NOT NULL);"
+        )
+        self._db.commit()
+
+        self._count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._vectors: Optional[np.memmap] = None
+        vectors_file = self.path / self._VECTORS_FILE
+        if vectors_file.exists():
+            self._vectors = np.load(str(vectors_file), mmap_mode="r+")
+            if self._vectors.shape[0] < self._count:
+                # 向量文件比索引短（写入中途退出）：丢弃索引，重新编码
+                logger.warning(f"⚠️ 嵌入文件与索引不一致，重建缓存: {self.path}")
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+                self._count = 0
+
+        logger.info(f"🗄️ RAG 持久化存储: {self.path}（已缓存 {self._count} 条嵌入）")
+
+    @staticmethod
+    def directory_for(directory: str, model_name: str) -> Path:
+        """模型对应的存储子目录"""
+        return Path(directory) / re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+
+    @property
+    def embedding_count(self) -> int:
+        return self._count
+
+    # ------------------------------------------------------------------------
+    # 嵌入
+    # ------------------------------------------------------------------------
+
+    def lookup(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """按文本摘要取已缓存的嵌入（未命中的摘要不出现在结果中）"""
+        if not hashes or self._vectors is None:
+            return {}
+        with self._lock:
+            return {h: np.array(self._vectors[row]) for h, row in self._rows(hashes).items()}
+
+    def _rows(self, hashes: List[str]) -> Dict[str, int]:
+        """文本摘要 → 矩阵行号（分批查询，避免超出 SQLite 参数个数上限）"""
+        unique = list(dict.fromkeys(hashes))
+        rows: Dict[str, int] = {}
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            rows.update(self._db.execute(
+                f"SELECT text_hash, row FROM embeddings WHERE text_hash IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall())
+        return rows
+
+    def put_embeddings(self, documents: List[Document]) -> int:
+        """写入文档嵌入（已缓存的文本跳过），返回新写入的条数"""
+        pending: Dict[str, np.ndarray] = {}
+        for doc in documents:
+            if doc.embedding is not None:
+                pending.setdefault(text_hash(doc.text), np.asarray(doc.embedding, dtype=np.float32).ravel())
+        if not pending:
+            return 0
+
+        with self._lock:
+            known = self._rows(list(pending))
+            new = [(h, v) for h, v in pending.items() if h not in known]
+            if not new:
+                return 0
+
+            dim = new[0][1].size
+            if self._vectors is not None and self._vectors.shape[1] != dim:
+                logger.warning(f"⚠️ 嵌入维度 {dim} 与存储维度 {self._vectors.shape[1]} 不一致，跳过持久化")
+                return 0
+            self._reserve(self._count + len(new), dim)
+
+            start = self._count
+            for i, (_, vec) in enumerate(new):
+                self._vectors[start + i] = vec
+            self._vectors.flush()
+            self._db.executemany(
+                "INSERT INTO embeddings (text_hash, row) VALUES (?, ?)",
+                [(h, start + i) for i, (h, _) in enumerate(new)],
+            )
+            self._db.commit()
+            self._count += len(new)
+        return len(new)
+
+    def _reserve(self, capacity: int, dim: int) -> None:
+        """把向量文件容量扩到至少 capacity 行（新文件写完后原子替换）"""
+        if self._vectors is not None and self._vectors.shape[0] >= capacity:
+            return
+        size = max(self._INITIAL_CAPACITY, capacity, 2 * (self._vectors.shape[0] if self._vectors is not None else 0))
+        target = self.path / self._VECTORS_FILE
+        tmp = self.path / (self._VECTORS_FILE + ".tmp")
+        grown = np.lib.format.open_memmap(str(tmp), mode="w+", dtype=np.float32, shape=(size, dim))
+        if self._vectors is not None and self._count:
+            grown[:self._count] = self._vectors[:self._count]
+        grown.flush()
+        del grown
+        self._vectors = None
+        os.replace(tmp, target)
+        self._vectors = np.load(str(target), mmap_mode="r+")
+
+    # ------------------------------------------------------------------------
+    # 文档
+    # ------------------------------------------------------------------------
+
+    def save_documents(self, documents: List[Document]) -> None:
+        """
+        保存文档（同 ID 覆盖）；有嵌入的同时写入嵌入缓存
+
+        ID 须稳定且不同内容不冲突（知识库缺省使用 make_document_id 生成），
+        否则重启后同 ID 的文档只剩最后一条。
+        """
+        if not documents:
+            return
+        self.put_embeddings(documents)
+        with self._lock:
+            seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM documents").fetchone()[0]
+            self._db.executemany(
+                "INSERT OR REPLACE INTO documents (id, text, metadata, text_hash, seq) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (doc.id, doc.text, json.dumps(doc.metadata, ensure_ascii=False), text_hash(doc.text), seq + i + 1)
+                    for i, doc in enumerate(documents)
+                ],
+            )
+            self._db.commit()
+
+    def load_documents(self) -> List[Document]:
+        """按保存顺序读出文档，已缓存嵌入的直接附上"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, text, metadata, text_hash FROM documents ORDER BY seq"
+            ).fetchall()
+        cached = self.lookup([row[3] for row in rows])
+        return [
+            Document(id=doc_id, text=text, metadata=json.loads(metadata), embedding=cached.get(h))
+            for doc_id, text, metadata, h in rows
+        ]
+
+    @property
+    def document_count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def clear_documents(self) -> None:
+        """删除已保存的文档（嵌入缓存保留，重新上传相同文本时无需编码）"""
+        with self._lock:
+            self._db.execute("DELETE FROM documents")
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+            self._vectors = None
@@ -14,6 +14,7 @@ import numpy as np
 class BackendType(str, Enum):
     """检索后端类型"""
     VECTOR = "sentence-transformers"    # 向量检索
+    IVF = "ivf"                         # 近似最近邻（IVF-Flat）
     CHROMADB = "chromadb"               # ChromaDB
     KEYWORD = "keyword"                 # 关键词匹配（降级方案）
 
@@ -59,6 +60,7 @@ class KnowledgeBaseStats(BaseModel):
     model_available: bool = Field(..., description="嵌入模型是否可用")
     chromadb_available: bool = Field(..., description="ChromaDB 是否可用")
     embedding_model: Optional[str] = Field(default=None, description="嵌入模型名称")
+    embedder_state: Optional[str] = Field(default=None, description="嵌入模型加载状态")
     default_data_file: Optional[str] = Field(default=None, description="默认数据文件路径")
     
     def to_dict(self) -> Dict[str, Any]:
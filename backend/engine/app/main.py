@@ -2,14 +2,17 @@
 FastAPI 入口 - 应用初始化 - 应用配置和路由注册
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 # 引入路由和配置
-from .api.routes import knowledge_router, steps_router
+from .api.routes import assets_router, knowledge_router, layout_router, steps_router
 from .core.config import settings
 from .core.exceptions import VibePosterException
+from .core.http_client import aclose_http_clients, close_http_clients
 from .api.middleware import (
     vibe_poster_exception_handler,
     http_exception_handler,
@@ -17,11 +20,24 @@ from .api.middleware import (
     exception_handler,
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 知识库本身创建很快（关键词兜底），嵌入模型在后台线程加载，不阻塞启动与首个请求
+    if settings.rag.PRELOAD:
+        from .core.dependencies import get_knowledge_base
+        get_knowledge_base()
+    yield
+    # 请求路径的异步抓取共用应用事件循环上的连接池，关闭时一并释放
+    await aclose_http_clients()
+    close_http_clients()
+
+
 # 创建 FastAPI 应用实例
 app = FastAPI(
     title="VibePoster API",
     description="AI 驱动的海报生成系统",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # 配置跨域（从配置文件读取，更安全）
@@ -49,9 +65,30 @@ app.add_exception_handler(Exception, exception_handler)
 # 注册路由
 app.include_router(knowledge_router)
 app.include_router(steps_router)
+app.include_router(assets_router)
+app.include_router(layout_router)
 
 
 # 健康检查端点（供 Docker 使用，不记录日志）
 @app.get("/health", include_in_schema=False)
 async def health_check():
-    return {"status": "ok"}
+    from .core.dependencies import get_knowledge_base_status
+    return {"status": "ok", "rag": get_knowledge_base_status()}
+
+
+# 运行指标（共享连接池 / LLM 响应缓存 / 排版结果缓存），供监控采集
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    from .core.http_client import get_http_pool_stats
+    from .core.llm_cache import get_llm_cache
+    from .agents.rule_critic import get_rule_critic_stats
+    from .services.renderer.layout_memo import get_layout_memo
+
+    llm_cache = get_llm_cache()
+    layout_memo = get_layout_memo()
+    return {
+        "http_pool": get_http_pool_stats(),
+        "llm_cache": llm_cache.get_stats() if llm_cache is not None else None,
+        "rule_critic": get_rule_critic_stats(),
+        "layout_memo": layout_memo.get_stats() if layout_memo is not None else None,
+    }
@@ -5,6 +5,7 @@ Models 模块 - 领域数据模型
 - poster.py: 海报相关数据模型（PosterData, Canvas, Layer 等）
 - response.py: 统一 API 响应模型（APIResponse, ErrorResponse 等）
 - design_brief.py: 设计简报与素材列表模型
+- layout_tree.py: 布局树与图层编辑模型（增量重排）
 """
 
 from .poster import (
@@ -22,6 +23,7 @@ from .response import (
     KGInferResult,
     BrandSearchResult,
     BrandUploadResult,
+    BrandBatchUploadResult,
     StatsResult,
 )
 from .design_brief import (
@@ -29,6 +31,11 @@ from .design_brief import (
     AssetLayer,
     AssetList,
 )
+from .layout_tree import (
+    LayoutGroup,
+    LayoutTree,
+    LayerEdit,
+)
 
 __all__ = [
     # Poster models
@@ -45,10 +52,15 @@ __all__ = [
     "KGInferResult",
     "BrandSearchResult",
     "BrandUploadResult",
+    "BrandBatchUploadResult",
     "StatsResult",
     # Design brief models
     "DesignBrief",
     "AssetLayer",
     "AssetList",
+    # Layout tree models
+    "LayoutGroup",
+    "LayoutTree",
+    "LayerEdit",
 ]
 
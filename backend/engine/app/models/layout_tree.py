@@ -0,0 +1,36 @@
+"""
+布局树与图层编辑的类型定义
+
+布局树描述海报中哪些图层由同一个布局容器排列（以及文字的语义角色），
+前端保存它，单字段编辑时连同海报一起提交给 /api/layout/patch 做增量重排。
+"""
+
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class LayoutGroup(BaseModel):
+    """一个布局容器（图层 ID 按排列顺序自上而下）"""
+
+    name: Literal["content", "cta"] = "content"
+    layers: List[str] = Field(default_factory=list, min_length=1, description="图层 ID（至少一个）")
+
+
+class LayoutTree(BaseModel):
+    """海报的布局树"""
+
+    strategy: Optional[str] = Field(None, description="布局策略，缺省时取海报的 layout_strategy")
+    engine: Literal["strategy", "constraint"] = "strategy"
+    groups: List[LayoutGroup] = Field(default_factory=list)
+    roles: Dict[str, str] = Field(default_factory=dict, description="文字图层 ID → title / subtitle / body / cta")
+    overlays: List[str] = Field(default_factory=list, description="随内容范围变化的遮罩图层 ID")
+    subjects: List[str] = Field(default_factory=list, description="主体素材图层 ID（约束布局的避让区域）")
+
+
+class LayerEdit(BaseModel):
+    """单个图层的字段编辑"""
+
+    layer_id: str
+    content: Optional[str] = None
+    font_size: Optional[int] = Field(None, ge=1, le=2000)
+    color: Optional[str] = None
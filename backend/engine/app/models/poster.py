@@ -35,6 +35,7 @@ class TextLayer(BaseLayer):
     fontFamily: str = "PingFang SC"
     textAlign: str = "left"
     fontWeight: str = "normal"
+    truncated: bool = False  # 排版自适应放不下时截断了内容（末尾为 "…"）
 
 
 class ImageLayer(BaseLayer):
@@ -82,6 +82,13 @@ class BrandUploadResult(BaseModel):
     text_length: int = Field(..., description="文档长度")
 
 
+class BrandBatchUploadResult(BaseModel):
+    """品牌文档批量上传结果"""
+    documents: List[BrandUploadResult] = Field(default_factory=list, description="各文档上传结果")
+    count: int = Field(..., description="上传文档数")
+    elapsed_ms: float = Field(..., description="入库耗时（毫秒）")
+
+
 class BrandDocumentItem(BaseModel):
     """品牌知识库中的单个文档摘要"""
     doc_id: str = Field(..., description="文档 ID")
@@ -103,5 +110,6 @@ class StatsResult(BaseModel):
     backend: Optional[str] = None
     model_available: Optional[bool] = None
     chromadb_available: Optional[bool] = None
+    embedder_state: Optional[str] = None
     node_count: Optional[int] = None
     edge_count: Optional[int] = None
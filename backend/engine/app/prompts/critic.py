@@ -117,6 +117,10 @@ def _summarize_intent(design_brief: Optional[Dict[str, Any]]) -> str:
     return "\n【设计意图（参考）】\n" + "\n".join(parts) + "\n"
 
 
+# 海报 JSON 中供引擎增量重排 / 多尺寸派生使用的字段，不参与审核
+_ENGINE_ONLY_KEYS = ("layout_tree", "dsl_instructions")
+
+
 def get_prompt(
     poster_data: Dict[str, Any],
     design_brief: Optional[Dict[str, Any]] = None,
@@ -134,7 +138,10 @@ def get_prompt(
     return {
         "system": SYSTEM_PROMPT,
         "user": USER_PROMPT_TEMPLATE.format(
-            poster_data=json.dumps(poster_data, ensure_ascii=False, indent=2),
+            poster_data=json.dumps(
+                {k: v for k, v in poster_data.items() if k not in _ENGINE_ONLY_KEYS},
+                ensure_ascii=False, indent=2,
+            ),
             intent_section=_summarize_intent(design_brief),
         ),
     }
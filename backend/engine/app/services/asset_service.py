@@ -5,14 +5,19 @@
 - Text Only:       纯文本 → 搜索/生成背景
 - Style Reference:  背景参考图 → 分析风格后搜索匹配背景
 - With Material:    主体素材 + 可选背景 → 处理主体，搜索/生成背景
+
+素材抓取（Flux / Pexels）在应用事件循环上并发执行，复用进程级异步连接池；
+Vision 分析与图片解码等阻塞调用放到线程池。
 """
 
+import asyncio
 from typing import Dict, Any, List, Optional
 
 from pydantic import BaseModel, Field
 
-from ..tools import search_assets_multiple
-from ..tools.vision import image_to_base64, analyze_image
+from ..core.blob_store import store_bytes
+from ..tools.asset_db import asearch_assets_multiple
+from ..tools.vision import analyze_image, detect_image_mime
 from ..tools.image_understanding import understand_image
 from ..core.logger import get_logger
 
@@ -34,14 +39,14 @@ class AssetResult(BaseModel):
 class AssetService:
     """素材搜索与处理服务"""
 
-    def process_text_only(
+    async def process_text_only(
         self,
         design_brief: Dict[str, Any],
         count: int,
     ) -> AssetResult:
         """模式 1: 纯文本 — 直接搜索/生成背景候选"""
         keywords = design_brief.get("style_keywords", [])
-        candidates = search_assets_multiple(
+        candidates = await asearch_assets_multiple(
             keywords=keywords,
             design_brief=design_brief,
             count=count,
@@ -52,7 +57,7 @@ class AssetService:
             design_brief=design_brief,
         )
 
-    def process_style_reference(
+    async def process_style_reference(
         self,
         design_brief: Dict[str, Any],
         bg_bytes: bytes,
@@ -61,7 +66,8 @@ class AssetService:
         """模式 2: 风格参考图 — 分析风格后搜索匹配的新背景"""
         keywords = design_brief.get("style_keywords", [])
 
-        analysis = understand_image(
+        analysis = await asyncio.to_thread(
+            understand_image,
             image_data=bg_bytes,
             user_prompt=design_brief.get("user_prompt", ""),
         )
@@ -97,7 +103,7 @@ class AssetService:
             f"theme={ref_theme}, palette={ref_palette}"
         )
 
-        candidates = search_assets_multiple(
+        candidates = await asearch_assets_multiple(
             keywords=keywords,
             design_brief=design_brief,
             count=count,
@@ -131,7 +137,7 @@ class AssetService:
             color_suggestions=color_suggestions,
         )
 
-    def process_with_material(
+    async def process_with_material(
         self,
         design_brief: Dict[str, Any],
         subject_bytes: bytes,
@@ -143,13 +149,14 @@ class AssetService:
         keywords = design_brief.get("style_keywords", [])
 
         # 处理主体素材
-        subject_url = image_to_base64(subject_bytes)
-        dims = analyze_image(subject_bytes)
+        subject_url = await asyncio.to_thread(store_bytes, subject_bytes, detect_image_mime(subject_bytes))
+        dims = await asyncio.to_thread(analyze_image, subject_bytes)
         subject_width = dims["width"]
         subject_height = dims["height"]
         logger.info(f"🧩 Material 模式：主体素材 {subject_width}×{subject_height}")
 
-        subject_analysis = understand_image(
+        subject_analysis = await asyncio.to_thread(
+            understand_image,
             image_data=subject_bytes,
             user_prompt=user_prompt,
         )
@@ -159,11 +166,11 @@ class AssetService:
 
         # 确定背景候选
         if bg_bytes:
-            user_bg_url = image_to_base64(bg_bytes)
+            user_bg_url = await asyncio.to_thread(store_bytes, bg_bytes, detect_image_mime(bg_bytes))
             logger.info("🖼️ Material 模式：使用用户上传的背景图")
             candidates = [user_bg_url]
         else:
-            candidates = search_assets_multiple(
+            candidates = await asearch_assets_multiple(
                 keywords=keywords,
                 design_brief=design_brief,
                 count=count,
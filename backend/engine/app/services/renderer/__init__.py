@@ -6,12 +6,14 @@
 - DSLParser: 兼容性入口（委托 LayoutBuilder）
 - SchemaConverter: 元素字典 → Pydantic Schema 转换器
 - RendererService: 统一渲染服务入口
+- rasterize_poster: PosterData → 图片（引擎内光栅化，供视觉审核使用）
 """
 
 from .layout_builder import LayoutBuilder, STRATEGIES, VALID_STRATEGIES
 from .dsl_parser import DSLParser
 from .schema_converter import SchemaConverter
 from .service import RendererService, create_simple_poster_from_text
+from .rasterizer import rasterize_poster
 
 __all__ = [
     "LayoutBuilder",
@@ -21,4 +23,5 @@ __all__ = [
     "SchemaConverter",
     "RendererService",
     "create_simple_poster_from_text",
+    "rasterize_poster",
 ]
@@ -9,8 +9,12 @@
 - 每个条目包含 CSS family + PSD PostScript name，保证三端一致
 """
 
+import os
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
 
+from ...core.config import settings
+
 
 # =============================================================================
 # 字体注册表
@@ -108,3 +112,83 @@ def build_ps_name_map() -> Dict[str, str]:
         for entry in style_entries.values():
             ps_map[entry["family"]] = entry["ps"]
     return ps_map
+
+
+# =============================================================================
+# 字体文件查找（引擎内光栅化 / 文字测量使用）
+# =============================================================================
+
+_NOTO_SANS = {
+    "regular": ["NotoSansCJK-Regular.ttc", "NotoSansCJKsc-Regular.otf", "NotoSansSC-Regular.otf",
+                "wqy-microhei.ttc", "DroidSansFallbackFull.ttf"],
+    "bold": ["NotoSansCJK-Bold.ttc", "NotoSansCJKsc-Bold.otf", "NotoSansSC-Bold.otf"],
+}
+_NOTO_SERIF = {
+    "regular": ["NotoSerifCJK-Regular.ttc", "NotoSerifCJKsc-Regular.otf", "NotoSerifSC-Regular.otf"],
+    "bold": ["NotoSerifCJK-Bold.ttc", "NotoSerifCJKsc-Bold.otf", "NotoSerifSC-Bold.otf"],
+}
+
+# CSS family → 字体文件名候选（macOS 原生字体优先，Linux 容器用 Noto CJK 兜底）
+FONT_FILES: Dict[str, Dict[str, List[str]]] = {
+    "PingFang SC": {"regular": ["PingFang.ttc"], "bold": ["PingFang.ttc"]},
+    "Songti SC": {"regular": ["Songti.ttc"] + _NOTO_SERIF["regular"],
+                  "bold": ["Songti.ttc"] + _NOTO_SERIF["bold"]},
+    "Yuanti TC": {"regular": ["Yuanti.ttc"], "bold": ["Yuanti.ttc"]},
+    "Kaiti SC": {"regular": ["Kaiti.ttc"], "bold": ["Kaiti.ttc"]},
+    "Baoli SC": {"regular": ["Baoli.ttc"], "bold": ["Baoli.ttc"]},
+}
+
+_FALLBACK_FONT_FILES: Dict[str, List[str]] = {
+    "regular": _NOTO_SANS["regular"] + ["DejaVuSans.ttf"],
+    "bold": _NOTO_SANS["bold"] + _NOTO_SANS["regular"] + ["DejaVuSans-Bold.ttf", "DejaVuSans.ttf"],
+}
+
+_SYSTEM_FONT_DIRS = [
+    "/System/Library/Fonts",
+    "/System/Library/AssetsV2",
+    "/Library/Fonts",
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/Library/Fonts"),
+]
+
+_BOLD_WEIGHTS = frozenset({"bold", "bolder", "600", "700", "800", "900"})
+
+
+@lru_cache(maxsize=1)
+def _font_file_index() -> Dict[str, str]:
+    """扫描字体目录，建立 小写文件名 → 路径 索引（RENDER_FONT_DIRS 优先）"""
+    index: Dict[str, str] = {}
+    for root_dir in settings.render.font_dirs + _SYSTEM_FONT_DIRS:
+        if not os.path.isdir(root_dir):
+            continue
+        for dirpath, _, filenames in os.walk(root_dir):
+            for name in filenames:
+                if name.lower().endswith((".ttf", ".ttc", ".otf")):
+                    index.setdefault(name.lower(), os.path.join(dirpath, name))
+    return index
+
+
+@lru_cache(maxsize=128)
+def resolve_font_file(family: Optional[str], weight: str = "normal") -> Optional[str]:
+    """
+    将 CSS fontFamily + fontWeight 解析为本机字体文件路径。
+
+    Returns:
+        字体文件路径；本机没有任何候选字体时返回 None（调用方使用内置默认字体）
+    """
+    variant = "bold" if str(weight).lower() in _BOLD_WEIGHTS else "regular"
+    candidates = FONT_FILES.get(family or "", {}).get(variant, []) + _FALLBACK_FONT_FILES[variant]
+    index = _font_file_index()
+    for name in candidates:
+        path = index.get(name.lower())
+        if path:
+            return path
+    return None
+
+
+def clear_font_file_cache() -> None:
+    """重新扫描字体目录（修改 RENDER_FONT_DIRS 后 / 测试使用）"""
+    _font_file_index.cache_clear()
+    resolve_font_file.cache_clear()
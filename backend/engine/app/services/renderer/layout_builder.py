@@ -5,6 +5,8 @@
     1. LLM 输出语义 DSL（无坐标，只有内容和样式属性）
     2. LayoutBuilder 根据 layout_strategy 创建 OOP 容器树
     3. VerticalContainer.arrange() 动态计算所有坐标
+       （LAYOUT_ENGINE_MODE=constraint 时改用 ConstraintContainer：策略只作为对齐 / 锚点偏好，
+        由约束求解器在安全区内避让主体，适配任意宽高比）
     4. 输出与 SchemaConverter 兼容的扁平元素字典列表
 
 坐标计算权完全归 OOP 引擎，LLM 只负责"放什么"和"什么风格"。
@@ -14,6 +16,7 @@ from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 
 from ...core.layout import (
+    ConstraintContainer,
     VerticalContainer,
     TextBlock,
     ImageBlock,
@@ -21,8 +24,13 @@ from ...core.layout import (
     Style,
     Element,
 )
+from ...core.config import settings
+from ...core.layout.constraints import KIWI_AVAILABLE, UnsatisfiableLayout
 from ...core.logger import get_logger
+from ...models.layout_tree import LayoutGroup, LayoutTree
 from .font_registry import resolve_font, resolve_font_style_from_kg, DEFAULT_FONT_STYLE
+from .subject_bbox import place_box_in_cover, subject_content_bbox
+from .typography_fit import fit_container
 
 logger = get_logger(__name__)
 
@@ -156,38 +164,47 @@ class LayoutBuilder:
                 "src": bg.get("src", ""), "layer_type": "background",
             })
 
-        # ── 3. 主内容容器 ──
+        # ── 3. 主体素材（先确定位置，约束布局需要避让） ──
+        subject_layers = [
+            self._build_subject(subj, strategy, canvas_width, canvas_height) for subj in subj_instrs
+        ]
+
+        # ── 4. 文字内容布局 ──
         avail_w = canvas_width - 2 * strategy.padding
         content_elems = self._create_elements(
             content_instrs, avail_w, resolved_font_style, main_color,
             design_brief, strategy, strategy.text_align,
         )
-
-        content_ctr = self._build_and_arrange_container(
-            content_elems, strategy.content_region,
-            canvas_width, canvas_height, strategy.padding, strategy.gap,
-            text_align=strategy.text_align,
+        cta_align = strategy.cta_region.align if strategy.cta_region else strategy.text_align
+        cta_elems = self._create_elements(
+            cta_instrs, avail_w, resolved_font_style, main_color,
+            design_brief, strategy, cta_align,
         )
 
-        # ── 4. CTA 区域 ──
         cta_ctr: Optional[VerticalContainer] = None
-        if cta_instrs:
-            cta_align = strategy.cta_region.align if strategy.cta_region else strategy.text_align
-            cta_elems = self._create_elements(
-                cta_instrs, avail_w, resolved_font_style, main_color,
-                design_brief, strategy, cta_align,
-            )
-            if strategy.cta_region:
-                cta_ctr = self._build_and_arrange_container(
-                    cta_elems, strategy.cta_region,
-                    canvas_width, canvas_height, strategy.padding, strategy.gap,
-                    text_align=cta_align,
+        if use_constraint_engine():
+            try:
+                content_ctr = self._layout_constrained(
+                    content_elems + cta_elems, strategy, subject_layers, canvas_width, canvas_height,
                 )
-            else:
-                for e in cta_elems:
-                    content_ctr.add(e)
-                content_ctr.arrange()
-                self._center_in_region(content_ctr, strategy.content_region, canvas_height)
+            except UnsatisfiableLayout as e:
+                # 求解过程会改写元素宽度 / 字号，回退时按指令重新创建
+                logger.warning(f"⚠️ {e}，回退到固定策略区域")
+                content_elems = self._create_elements(
+                    content_instrs, avail_w, resolved_font_style, main_color,
+                    design_brief, strategy, strategy.text_align,
+                )
+                cta_elems = self._create_elements(
+                    cta_instrs, avail_w, resolved_font_style, main_color,
+                    design_brief, strategy, cta_align,
+                )
+                content_ctr, cta_ctr = self._layout_in_regions(
+                    content_elems, cta_elems, strategy, canvas_width, canvas_height,
+                )
+        else:
+            content_ctr, cta_ctr = self._layout_in_regions(
+                content_elems, cta_elems, strategy, canvas_width, canvas_height,
+            )
 
         # ── 5. Overlay（铺设于背景与文字之间） ──
         for ov in overlay_instrs:
@@ -201,8 +218,7 @@ class LayoutBuilder:
             result.extend(cta_ctr.get_all_elements())
 
         # ── 7. 主体素材 ──
-        for subj in subj_instrs:
-            result.append(self._build_subject(subj, strategy, canvas_width, canvas_height))
+        result.extend(subject_layers)
 
         # ── 8. 画布边界保护 ──
         result = [_ensure_canvas_bounds(e, canvas_width, canvas_height) for e in result]
@@ -210,6 +226,150 @@ class LayoutBuilder:
         logger.info(f"✅ OOP 布局完成，共 {len(result)} 个元素")
         return result
 
+    def describe_tree(
+        self,
+        dsl_instructions: List[Dict[str, Any]],
+        layout_strategy: str = DEFAULT_STRATEGY,
+    ) -> LayoutTree:
+        """
+        与 build() 输出对应的布局树（图层 ID 与 SchemaConverter 的 "{type}_{序号}" 一致）
+
+        build() 的输出顺序固定为：背景 → 遮罩 → 主内容 → CTA → 主体素材，
+        因此无需重新排版即可由指令分类得到每个容器包含的图层。
+        """
+        bg_instrs, subj_instrs, overlay_instrs, content_instrs, cta_instrs = (
+            _classify_instructions(dsl_instructions)
+        )
+        strategy_name = layout_strategy if layout_strategy in STRATEGIES else DEFAULT_STRATEGY
+        tree = LayoutTree(
+            strategy=strategy_name,
+            engine="constraint" if use_constraint_engine() else "strategy",
+        )
+        index = len(bg_instrs)
+
+        for _ in overlay_instrs:
+            tree.overlays.append(f"rect_{index}")
+            index += 1
+
+        groups = {"content": LayoutGroup(name="content"), "cta": LayoutGroup(name="cta")}
+        separate_cta = tree.engine == "strategy" and STRATEGIES[strategy_name].cta_region is not None
+        for name, instrs in (("content", content_instrs), ("cta", cta_instrs)):
+            group = groups[name if separate_cta else "content"]
+            for instr in instrs:
+                cmd = instr.get("command", "")
+                layer_id = f"{'rect' if cmd in _DIVIDER_COMMANDS or cmd in _SHAPE_COMMANDS else 'text'}_{index}"
+                group.layers.append(layer_id)
+                role = _command_role(cmd)
+                if role:
+                    tree.roles[layer_id] = role
+                index += 1
+        tree.groups = [g for g in groups.values() if g.layers]
+
+        tree.subjects = [f"image_{index + i}" for i in range(len(subj_instrs))]
+        return tree
+
+    # ------------------------------------------------------------------
+    # 文字内容布局
+    # ------------------------------------------------------------------
+
+    def _layout_in_regions(
+        self,
+        content_elems: List[Element],
+        cta_elems: List[Element],
+        strategy: StrategyConfig,
+        canvas_width: int,
+        canvas_height: int,
+    ) -> Tuple[VerticalContainer, Optional[VerticalContainer]]:
+        """按策略的固定区域排版：主内容与 CTA 各自放进区域并居中"""
+        content_ctr = self._build_and_arrange_container(
+            content_elems, strategy.content_region,
+            canvas_width, canvas_height, strategy.padding, strategy.gap,
+            text_align=strategy.text_align,
+        )
+
+        cta_ctr: Optional[VerticalContainer] = None
+        if cta_elems:
+            if strategy.cta_region:
+                cta_ctr = self._build_and_arrange_container(
+                    cta_elems, strategy.cta_region,
+                    canvas_width, canvas_height, strategy.padding, strategy.gap,
+                    text_align=strategy.cta_region.align,
+                )
+            else:
+                for e in cta_elems:
+                    content_ctr.add(e)
+                content_ctr.arrange()
+                self._center_in_region(content_ctr, strategy.content_region, canvas_height)
+
+        # 排版自适应：字号 / 间距调整到恰好放进区域
+        if settings.layout_fit.ENABLED:
+            min_fs = round(settings.layout_fit.MIN_FONT_SIZE * canvas_width / 1080)
+            self._fit_to_region(content_ctr, strategy.content_region, canvas_height, strategy.gap, min_fs)
+            if cta_ctr and strategy.cta_region:
+                self._fit_to_region(cta_ctr, strategy.cta_region, canvas_height, strategy.gap, min_fs)
+
+        return content_ctr, cta_ctr
+
+    def _layout_constrained(
+        self,
+        elements: List[Element],
+        strategy: StrategyConfig,
+        subject_layers: List[Dict[str, Any]],
+        canvas_width: int,
+        canvas_height: int,
+    ) -> ConstraintContainer:
+        """
+        约束求解排版：策略的内容区域中心作为锚点、对齐方式作为偏好，
+        安全区 / 最小间距 / 主体避让为硬约束，一次求解得到全部坐标。
+        """
+        ctr = self.new_constraint_container(strategy, subject_layers, canvas_width, canvas_height)
+        col_w = ctr.safe_rect.width
+        for e in elements:
+            # 所有元素（含通栏形状 / 分隔线）都不超过安全区宽度，否则水平约束无解
+            if isinstance(e, TextBlock) and e.max_width > col_w:
+                e.max_width = e.width = col_w
+                e.height = e.calculate_height()
+            elif e.width > col_w:
+                e.width = col_w
+            ctr.add(e)
+
+        if settings.layout_fit.ENABLED:
+            min_fs = round(settings.layout_fit.MIN_FONT_SIZE * canvas_width / 1080)
+            fit_container(ctr, ctr.available_height(), strategy.gap, min_fs)
+        else:
+            ctr.arrange()
+
+        logger.info(
+            f"🧮 约束布局: placement={ctr.placement}, {len(elements)} 个元素, "
+            f"{len(ctr.keep_outs)} 个避让区域, 求解 {ctr.solve_ms:.2f}ms"
+        )
+        return ctr
+
+    @staticmethod
+    def new_constraint_container(
+        strategy: StrategyConfig,
+        subject_layers: List[Dict[str, Any]],
+        canvas_width: int,
+        canvas_height: int,
+    ) -> ConstraintContainer:
+        """按布局引擎配置创建空的约束容器（整块画布 + 安全边距），并登记主体避让区域"""
+        cfg = settings.layout_engine
+        margin = cfg.SAFE_MARGIN_RATIO * min(canvas_width, canvas_height)
+        region = strategy.content_region
+        ctr = ConstraintContainer(
+            x=0, y=0, width=canvas_width, height=canvas_height,
+            safe_margins=(margin, margin, margin, margin),
+            gap=strategy.gap,
+            min_gap=strategy.gap * settings.layout_fit.MIN_GAP_RATIO,
+            align=strategy.text_align,
+            anchor=(region.y_start + region.y_end) / 2,
+            style=Style(text_align=strategy.text_align),
+        )
+        subject_margin = cfg.SUBJECT_MARGIN * canvas_width / 1080
+        for layer in subject_layers:
+            ctr.avoid(*_subject_keep_out(layer), margin=subject_margin)
+        return ctr
+
     # ------------------------------------------------------------------
     # OOP 元素创建
     # ------------------------------------------------------------------
@@ -231,27 +391,27 @@ class LayoutBuilder:
 
             if cmd in _TITLE_COMMANDS:
                 elem = self._make_text(
-                    instr, available_width, font_style, role="title",
+                    instr, available_width, font_style, role="title", text_role="title",
                     default_size=int(48 * strategy.title_scale),
                     default_color=main_color, default_weight="bold",
                     default_align=text_align,
                 )
             elif cmd in _SUBTITLE_COMMANDS:
                 elem = self._make_text(
-                    instr, available_width, font_style, role="body",
+                    instr, available_width, font_style, role="body", text_role="subtitle",
                     default_size=32, default_color="#E0E0E0",
                     default_weight="normal", default_align=text_align,
                 )
             elif cmd in _BODY_COMMANDS:
                 body_align = text_align if text_align != "center" else "left"
                 elem = self._make_text(
-                    instr, available_width, font_style, role="body",
+                    instr, available_width, font_style, role="body", text_role="body",
                     default_size=24, default_color="#F0F0F0",
                     default_weight="normal", default_align=body_align,
                 )
             elif cmd in _CTA_COMMANDS:
                 elem = self._make_text(
-                    instr, available_width, font_style, role="title",
+                    instr, available_width, font_style, role="title", text_role="cta",
                     default_size=28, default_color="#8B5CF6",
                     default_weight="bold", default_align="center",
                 )
@@ -278,6 +438,7 @@ class LayoutBuilder:
         default_color: str,
         default_weight: str,
         default_align: str,
+        text_role: str = "body",
     ) -> TextBlock:
         fs = int(instr.get("font_size", default_size))
         font = resolve_font(font_style, role=role)
@@ -285,6 +446,7 @@ class LayoutBuilder:
             content=instr.get("content", ""),
             font_size=fs,
             max_width=available_width,
+            role=text_role,
             style=Style(
                 font_size=fs,
                 font_family=font["family"],
@@ -366,12 +528,24 @@ class LayoutBuilder:
     def _center_in_region(
         container: VerticalContainer, region: LayoutRegion, canvas_height: int,
     ) -> None:
-        """将容器内容在指定区域内垂直居中"""
+        """将容器内容在指定区域内垂直居中（超出区域时贴齐区域顶部）"""
         region_h = (region.y_end - region.y_start) * canvas_height
-        if container.height < region_h:
-            offset = (region_h - container.height) / 2
-            container.y = int(region.y_start * canvas_height + offset)
-            container.arrange()
+        offset = max(0.0, (region_h - container.height) / 2)
+        container.y = int(region.y_start * canvas_height + offset)
+        container.arrange()
+
+    @staticmethod
+    def _fit_to_region(
+        container: VerticalContainer,
+        region: LayoutRegion,
+        canvas_height: int,
+        gap: float,
+        min_font_size: int,
+    ) -> None:
+        """求解字号 / 间距使容器恰好放进区域，再重新居中"""
+        region_h = (region.y_end - region.y_start) * canvas_height
+        fit_container(container, region_h, gap, min_font_size)
+        LayoutBuilder._center_in_region(container, region, canvas_height)
 
     # ------------------------------------------------------------------
     # 特殊图层
@@ -389,16 +563,7 @@ class LayoutBuilder:
         deco = _get_decoration_style(design_brief, "overlay")
         color = _resolve_kg_color(design_brief, deco.get("color_source", "primary"))
 
-        cov = strategy.overlay_coverage
-        if cov == "content":
-            y_top = max(0, int(content_ctr.y) - 40)
-            y_bot = min(ch, int(content_ctr.y + content_ctr.height) + 40)
-            if cta_ctr:
-                y_bot = min(ch, max(y_bot, int(cta_ctr.y + cta_ctr.height) + 40))
-        elif cov == "bottom_half":
-            y_top, y_bot = ch // 2, ch
-        else:
-            y_top, y_bot = 0, ch
+        y_top, y_bot = overlay_span(strategy.overlay_coverage, content_ctr, cta_ctr, ch)
 
         gradient = ""
         ov_type = deco.get("type", "linear-gradient")
@@ -427,6 +592,14 @@ class LayoutBuilder:
         strategy: StrategyConfig,
         cw: int, ch: int,
     ) -> Dict[str, Any]:
+        geometry = [instr.get(k) for k in ("x", "y", "width", "height")]
+        if use_constraint_engine() and all(isinstance(v, (int, float)) for v in geometry):
+            # 约束模式下尊重显式给出的主体位置，文字由求解器避让
+            x, y, w, h = geometry
+            return {
+                "type": "image", "x": x, "y": y, "width": w, "height": h,
+                "src": instr.get("src", ""), "layer_type": "subject",
+            }
         mid = (strategy.content_region.y_start + strategy.content_region.y_end) / 2
         if mid < 0.5:
             sy, sh = int(ch * 0.55), ch - int(ch * 0.55)
@@ -443,6 +616,50 @@ class LayoutBuilder:
 # 模块级辅助函数
 # ============================================================================
 
+def _command_role(cmd: str) -> Optional[str]:
+    if cmd in _TITLE_COMMANDS:
+        return "title"
+    if cmd in _SUBTITLE_COMMANDS:
+        return "subtitle"
+    if cmd in _BODY_COMMANDS:
+        return "body"
+    if cmd in _CTA_COMMANDS:
+        return "cta"
+    return None
+
+
+def overlay_span(
+    coverage: str, content: Element, cta: Optional[Element], canvas_height: int,
+) -> Tuple[int, int]:
+    """遮罩的垂直范围 (y_top, y_bottom)：content 覆盖内容（及 CTA）外扩 40px，其余按固定比例"""
+    ch = canvas_height
+    if coverage == "content":
+        y_top = max(0, int(content.y) - 40)
+        y_bot = min(ch, int(content.y + content.height) + 40)
+        if cta:
+            y_bot = min(ch, max(y_bot, int(cta.y + cta.height) + 40))
+        return y_top, y_bot
+    if coverage == "bottom_half":
+        return ch // 2, ch
+    return 0, ch
+
+
+def use_constraint_engine() -> bool:
+    if settings.layout_engine.MODE != "constraint":
+        return False
+    if not KIWI_AVAILABLE:
+        logger.warning("⚠️ 未安装 kiwisolver，约束布局不可用，使用固定策略区域")
+        return False
+    return True
+
+
+def _subject_keep_out(layer: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    """主体图层的避让矩形：能读取 alpha 通道时取不透明像素的外接框，否则取整个图层"""
+    rect = (layer["x"], layer["y"], layer["width"], layer["height"])
+    box = subject_content_bbox(layer.get("src", ""))
+    return place_box_in_cover(box, rect) if box is not None else rect
+
+
 def _resolve_font_style(
     font_style: Optional[str], design_brief: Optional[Dict[str, Any]],
 ) -> str:
@@ -0,0 +1,154 @@
+"""
+排版结果缓存 - 按规范化哈希寻址
+
+键 = sha256(规范化 JSON)，包含影响排版结果的全部输入：
+- dsl_instructions（图片 src 替换为摘要，避免 data URL 参与序列化）
+- layout_strategy / font_style / 画布尺寸
+- design_brief 中被布局引擎读取的字段（main_color / background_color / kg_rules）
+- asset_list 中的图片 src 摘要（图片图层缺 src 时由其补全）
+- 排版自适应 / 布局引擎配置（LAYOUT_FIT_* / LAYOUT_ENGINE_*）
+
+值为 DSL → 布局 → Schema → 合并素材 之后的 PosterData。
+Critic 重试、前端重复提交同一 brief、多策略模式重复排版时直接复用，不再重新测量文字。
+
+进程内 LRU（RENDER_LAYOUT_MEMO_MAX_ENTRIES），命中统计通过 /metrics 暴露。
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from ...core.logger import get_logger
+from ...models.poster import PosterData
+
+logger = get_logger(__name__)
+
+# design_brief 中会影响排版 / Schema 转换结果的字段
+_BRIEF_KEYS = ("main_color", "background_color", "kg_rules")
+
+
+def _src_digest(src: Any) -> Any:
+    if not isinstance(src, str) or len(src) <= 64:
+        return src
+    return "sha256:" + hashlib.sha256(src.encode("utf-8")).hexdigest()
+
+
+def make_layout_key(
+    dsl_instructions: List[Dict[str, Any]],
+    layout_strategy: str,
+    font_style: Optional[str],
+    canvas_width: int,
+    canvas_height: int,
+    design_brief: Optional[Dict[str, Any]] = None,
+    asset_list: Optional[Dict[str, Any]] = None,
+) -> str:
+    """计算排版输入的规范化哈希"""
+    from ...core.config import settings
+
+    instructions = [
+        {**instr, "src": _src_digest(instr["src"])} if "src" in instr else instr
+        for instr in dsl_instructions
+    ]
+    brief = design_brief or {}
+    assets = {
+        name: _src_digest((layer or {}).get("src"))
+        for name, layer in (asset_list or {}).items()
+        if isinstance(layer, dict)
+    }
+    canonical = json.dumps(
+        {
+            "dsl": instructions,
+            "strategy": layout_strategy,
+            "font_style": font_style,
+            "canvas": [canvas_width, canvas_height],
+            "brief": {k: brief.get(k) for k in _BRIEF_KEYS if k in brief},
+            "assets": assets,
+            "fit": settings.layout_fit.model_dump(),
+            "engine": settings.layout_engine.model_dump(),
+        },
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LayoutMemo:
+    """排版结果 LRU 缓存（线程安全：同步 Agent 在线程池中调用）"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, PosterData]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[PosterData]:
+        """读取缓存（返回深拷贝，调用方可放心修改）"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+        return value.model_copy(deep=True)
+
+    def set(self, key: str, value: PosterData) -> None:
+        value = value.model_copy(deep=True)
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+            }
+
+
+# ============================================================================
+# 全局单例
+# ============================================================================
+
+_memo: Optional[LayoutMemo] = None
+_memo_lock = threading.Lock()
+
+
+def get_layout_memo() -> Optional[LayoutMemo]:
+    """获取全局排版结果缓存（RENDER_LAYOUT_MEMO_ENABLED=false 时返回 None）"""
+    global _memo
+    if _memo is None:
+        with _memo_lock:
+            if _memo is None:
+                from ...core.config import settings
+                cfg = settings.render
+                if not cfg.LAYOUT_MEMO_ENABLED:
+                    return None
+                _memo = LayoutMemo(max_entries=cfg.LAYOUT_MEMO_MAX_ENTRIES)
+    return _memo
+
+
+def reset_layout_memo() -> None:
+    """重置全局缓存（用于测试）"""
+    global _memo
+    with _memo_lock:
+        _memo = None
@@ -0,0 +1,316 @@
+"""
+增量重排 — 单字段编辑（文字内容 / 字号 / 颜色）后只重新计算受影响的部分
+
+输入为已排好的海报 + 布局树（LayoutBuilder.describe_tree）+ 编辑列表，服务端不保存状态：
+    1. 颜色编辑只改写该图层，不触发排版
+    2. 内容 / 字号编辑只重新测量被编辑的文字块，同容器的其他图层沿用已有尺寸
+    3. 只重排包含被编辑图层的容器，其他容器保持原坐标；内容范围变化时同步更新遮罩
+    4. 输出 RFC 6902 JSON Patch（replace 操作，路径 /layers/{序号}/{字段}）
+
+与完整构建的差异：用户编辑的字号即最终字号，不再运行排版自适应；
+容器超出区域时先把间距压缩到 LAYOUT_FIT_MIN_GAP_RATIO，仍放不下则贴齐区域顶部。
+约束布局（engine=constraint）的文字栏宽度由求解器决定，脏容器内的文字块全部按栏宽重新测量。
+"""
+
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from pydantic import ValidationError
+
+from ...core.config import settings
+from ...core.exceptions import ValidationException
+from ...core.layout import Container, Element, Style, TextBlock, UnsatisfiableLayout, VerticalContainer
+from ...core.logger import get_logger
+from ...models.layout_tree import LayerEdit, LayoutGroup, LayoutTree
+from ...models.poster import PosterData, TextLayer
+from .layout_builder import (
+    DEFAULT_STRATEGY,
+    STRATEGIES,
+    LayoutBuilder,
+    StrategyConfig,
+    _ensure_canvas_bounds,
+    overlay_span,
+)
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class LayoutPatch:
+    """增量重排结果"""
+    patch: List[Dict[str, Any]] = field(default_factory=list)     # RFC 6902 操作列表
+    changed: List[str] = field(default_factory=list)              # 发生变化的图层 ID
+    relayout: List[str] = field(default_factory=list)             # 被重排的容器名
+    elapsed_ms: float = 0.0
+
+
+class _PlacedBlock(Element):
+    """未被编辑的图层：以已有尺寸参与排列，不重新测量"""
+
+    __slots__ = ()
+
+    def render(self) -> Dict[str, Any]:
+        return {"x": self.x, "y": self.y, "width": self.width, "height": self.height}
+
+
+# ============================================================================
+# 入口
+# ============================================================================
+
+def patch_layout(
+    poster: Dict[str, Any],
+    tree: LayoutTree,
+    edits: List[LayerEdit],
+) -> LayoutPatch:
+    """
+    对海报应用编辑并增量重排
+
+    Args:
+        poster: 海报 JSON（PosterData 结构，可带 layout_strategy 等附加字段）
+        tree: 海报的布局树
+        edits: 图层编辑列表
+
+    Returns:
+        LayoutPatch
+
+    Raises:
+        ValidationException: 海报结构无效、图层不存在或编辑字段不适用于该图层
+    """
+    started = time.perf_counter()
+    try:
+        poster_data = PosterData.model_validate(poster)
+    except ValidationError as e:
+        raise ValidationException(
+            "海报数据格式错误", detail={"errors": e.errors(include_url=False, include_context=False)},
+        )
+
+    layers = poster_data.layers
+    by_id = {layer.id: layer for layer in layers}
+    for group in tree.groups:
+        if not group.layers:
+            raise ValidationException("布局容器不能为空", detail={"group": group.name})
+        missing = [lid for lid in group.layers if lid not in by_id]
+        if missing:
+            raise ValidationException("布局树引用了不存在的图层", detail={"layers": missing})
+
+    before = [layer.model_dump() for layer in layers]
+    remeasure = _apply_edits(by_id, edits)
+
+    strategy_name = tree.strategy or poster.get("layout_strategy") or DEFAULT_STRATEGY
+    strategy = STRATEGIES.get(strategy_name, STRATEGIES[DEFAULT_STRATEGY])
+    cw, ch = poster_data.canvas.width, poster_data.canvas.height
+    result = LayoutPatch()
+
+    # 不属于任何容器的文字：原位重新测量高度
+    grouped = {lid for group in tree.groups for lid in group.layers}
+    for lid in remeasure - grouped:
+        layer = by_id[lid]
+        height = _text_block(layer, layer.width).height
+        layer.height = _ensure_bounds(layer, layer.x, layer.y, layer.width, height, cw, ch)["height"]
+
+    # 只重排脏容器
+    arranged: Dict[str, Container] = {}
+    for group in tree.groups:
+        if not remeasure.intersection(group.layers):
+            continue
+        if tree.engine == "constraint":
+            try:
+                ctr = _relayout_constrained(group, tree, by_id, strategy, cw, ch)
+            except UnsatisfiableLayout as e:
+                logger.warning(f"⚠️ {e}，按固定策略区域重排")
+                ctr = _relayout_group(group, by_id, strategy, remeasure, cw, ch)
+        else:
+            ctr = _relayout_group(group, by_id, strategy, remeasure, cw, ch)
+        arranged[group.name] = ctr
+        result.relayout.append(group.name)
+
+    if arranged and strategy.overlay_coverage == "content":
+        _update_overlays(tree, by_id, arranged, strategy, ch)
+
+    for i, (old, layer) in enumerate(zip(before, layers)):
+        new = layer.model_dump()
+        ops = [
+            {"op": "replace", "path": f"/layers/{i}/{key}", "value": value}
+            for key, value in new.items() if old.get(key) != value
+        ]
+        if ops:
+            result.patch.extend(ops)
+            result.changed.append(layer.id)
+
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"✏️ 增量重排: {len(edits)} 处编辑, 重排容器 {result.relayout or '无'}, "
+        f"{len(result.changed)} 个图层变化, {result.elapsed_ms:.2f}ms"
+    )
+    return result
+
+
+# ============================================================================
+# 编辑
+# ============================================================================
+
+def _apply_edits(by_id: Dict[str, Any], edits: List[LayerEdit]) -> Set[str]:
+    """写入编辑字段，返回需要重新测量的文字图层 ID"""
+    remeasure: Set[str] = set()
+    for edit in edits:
+        layer = by_id.get(edit.layer_id)
+        if layer is None:
+            raise ValidationException("图层不存在", detail={"layer_id": edit.layer_id})
+
+        if edit.content is not None or edit.font_size is not None:
+            if not isinstance(layer, TextLayer):
+                raise ValidationException(
+                    "只有文字图层可以修改内容 / 字号", detail={"layer_id": edit.layer_id, "type": layer.type},
+                )
+            if edit.content is not None and edit.content != layer.content:
+                layer.content = edit.content
+                layer.truncated = False  # 用户给出的全文，不再是截断结果
+                remeasure.add(layer.id)
+            if edit.font_size is not None and edit.font_size != layer.fontSize:
+                layer.fontSize = edit.font_size
+                remeasure.add(layer.id)
+
+        if edit.color is not None:
+            if layer.type == "text":
+                layer.color = edit.color
+            elif layer.type == "rect":
+                layer.backgroundColor = edit.color
+            else:
+                raise ValidationException("图片图层没有颜色", detail={"layer_id": edit.layer_id})
+    return remeasure
+
+
+# ============================================================================
+# 重排
+# ============================================================================
+
+def _text_block(layer: TextLayer, max_width: float) -> TextBlock:
+    return TextBlock(
+        content=layer.content,
+        font_size=layer.fontSize,
+        max_width=max_width,
+        style=Style(
+            font_size=layer.fontSize,
+            font_family=layer.fontFamily,
+            font_weight=layer.fontWeight,
+            color=layer.color,
+            text_align=layer.textAlign,
+            opacity=layer.opacity,
+        ),
+    )
+
+
+def _observed_gap(group: LayoutGroup, by_id: Dict[str, Any], default: float) -> float:
+    """由现有坐标反推容器间距（排版自适应可能改过间距）"""
+    members = [by_id[lid] for lid in group.layers]
+    gaps = [b.y - (a.y + a.height) for a, b in zip(members, members[1:])]
+    return max(0.0, float(statistics.median(gaps))) if gaps else default
+
+
+def _relayout_group(
+    group: LayoutGroup,
+    by_id: Dict[str, Any],
+    strategy: StrategyConfig,
+    remeasure: Set[str],
+    cw: int, ch: int,
+) -> VerticalContainer:
+    """固定区域布局：按原间距重新排列容器并在区域内居中"""
+    use_cta_region = group.name == "cta" and strategy.cta_region is not None
+    region = strategy.cta_region if use_cta_region else strategy.content_region
+    gap = _observed_gap(group, by_id, strategy.gap)
+
+    ctr = VerticalContainer(
+        x=0, y=0, width=cw, padding=strategy.padding, gap=gap,
+        style=Style(text_align=region.align if use_cta_region else strategy.text_align),
+    )
+    for lid in group.layers:
+        layer = by_id[lid]
+        if lid in remeasure:
+            ctr.add(_text_block(layer, layer.width))
+        else:
+            ctr.add(_PlacedBlock(layer.x, layer.y, layer.width, layer.height))
+    ctr.arrange()
+
+    region_h = (region.y_end - region.y_start) * ch
+    n = len(ctr.elements)
+    if ctr.height > region_h and n > 1:
+        min_gap = min(gap, strategy.gap * settings.layout_fit.MIN_GAP_RATIO)
+        ctr.gap = max(min_gap, gap - (ctr.height - region_h) / (n - 1))
+    LayoutBuilder._center_in_region(ctr, region, ch)
+
+    _write_back(group, by_id, ctr, cw, ch)
+    return ctr
+
+
+def _relayout_constrained(
+    group: LayoutGroup,
+    tree: LayoutTree,
+    by_id: Dict[str, Any],
+    strategy: StrategyConfig,
+    cw: int, ch: int,
+) -> Container:
+    """约束布局：按当前主体位置重新求解该容器"""
+    subjects = [
+        {"x": s.x, "y": s.y, "width": s.width, "height": s.height, "src": getattr(s, "src", "")}
+        for s in (by_id[sid] for sid in tree.subjects if sid in by_id)
+    ]
+    ctr = LayoutBuilder.new_constraint_container(strategy, subjects, cw, ch)
+    col_w = ctr.safe_rect.width
+    for lid in group.layers:
+        layer = by_id[lid]
+        if layer.type == "text":
+            ctr.add(_text_block(layer, col_w))
+        else:
+            # 形状 / 分隔线不超过安全区宽度，否则水平约束无解
+            ctr.add(_PlacedBlock(layer.x, layer.y, min(layer.width, col_w), layer.height))
+    ctr.arrange()
+
+    _write_back(group, by_id, ctr, cw, ch)
+    return ctr
+
+
+def _write_back(group: LayoutGroup, by_id: Dict[str, Any], ctr: Container, cw: int, ch: int) -> None:
+    for lid, elem in zip(group.layers, ctr.elements):
+        layer = by_id[lid]
+        bounds = _ensure_bounds(layer, elem.x, elem.y, elem.width, elem.height, cw, ch)
+        for key in ("x", "y", "width", "height"):
+            setattr(layer, key, bounds[key])
+
+
+def _ensure_bounds(
+    layer: Any, x: float, y: float, width: float, height: float, cw: int, ch: int,
+) -> Dict[str, Any]:
+    """与 LayoutBuilder 输出相同的画布边界保护（取整 + 边距）"""
+    elem = {"x": x, "y": y, "width": width, "height": height, "subtype": getattr(layer, "subtype", None)}
+    return _ensure_canvas_bounds(elem, cw, ch)
+
+
+def _update_overlays(
+    tree: LayoutTree,
+    by_id: Dict[str, Any],
+    arranged: Dict[str, Container],
+    strategy: StrategyConfig,
+    ch: int,
+) -> None:
+    """遮罩覆盖内容范围时，按重排后的容器（或未变容器的现有外接框）更新"""
+    padding = strategy.padding if tree.engine == "strategy" else 0
+    bounds: Dict[str, Optional[Element]] = {}
+    for group in tree.groups:
+        if group.name in arranged:
+            bounds[group.name] = arranged[group.name]
+            continue
+        members = [by_id[lid] for lid in group.layers]
+        top = min(m.y for m in members) - padding
+        bottom = max(m.y + m.height for m in members) + padding
+        bounds[group.name] = _PlacedBlock(0, top, 0, bottom - top)
+
+    content = bounds.get("content") or bounds.get("cta")
+    if content is None:
+        return
+    y_top, y_bot = overlay_span("content", content, bounds.get("cta") if "content" in bounds else None, ch)
+    for oid in tree.overlays:
+        overlay = by_id.get(oid)
+        if overlay is not None:
+            overlay.y, overlay.height = y_top, y_bot - y_top
@@ -0,0 +1,382 @@
+"""
+海报光栅化器 — PosterData → PIL Image（引擎内，Pillow + NumPy）
+
+供 Critic 视觉审核使用：直接在审核分辨率下绘制，省去
+「序列化 JSON → HTTP → Node 解码 base64 → sharp/SVG 合成 → PNG 压缩 → 再 base64」整条链路。
+
+绘制语义与 Node 渲染服务（backend/render/src/services/imageGenerator.js）保持一致：
+- 画布：backgroundColor 仅支持 #RRGGBB，其他值按黑色处理
+- image：cover 缩放、居中裁剪，图层 opacity 不生效
+- rect：圆角 / 描边 / 纯色 / linear-gradient(Ndeg, c1, c2) / radial-gradient(circle, c1, c2)，整体 opacity
+- text：不自动换行（仅按 \\n 分行），首行基线 y + fontSize，行高 lineHeight(1.2)，
+  textAlign 对应 text-anchor，带 stdDeviation=3 的柔和阴影；fontWeight 不生效
+"""
+
+import base64
+import hashlib
+import io
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFilter, ImageFont, ImageOps
+
+from ...core.config import settings
+from ...core.logger import get_logger
+from .font_registry import resolve_font_file
+
+logger = get_logger(__name__)
+
+RGBA = Tuple[int, int, int, int]
+
+_LINEAR_RE = re.compile(r"linear-gradient\((\d+)deg,\s*([^,]+),\s*([^)]+)\)")
+_RADIAL_RE = re.compile(r"radial-gradient\(circle,\s*([^,]+),\s*([^)]+)\)")
+_HEX6_RE = re.compile(r"^#?([a-f\d]{2})([a-f\d]{2})([a-f\d]{2})$", re.I)
+
+_TEXT_ANCHORS = {"left": "ls", "center": "ms", "right": "rs"}
+_SHADOW_SIGMA = 3.0
+_SHADOW_OFFSET_Y = 1.0
+_SHADOW_ALPHA = 0.5
+
+
+# =============================================================================
+# 颜色
+# =============================================================================
+
+def _canvas_color(value: Any) -> Tuple[int, int, int]:
+    """与 Node hexToRgb 一致：只认 #RRGGBB，否则黑色"""
+    match = _HEX6_RE.match(str(value or ""))
+    if not match:
+        return 0, 0, 0
+    return tuple(int(g, 16) for g in match.groups())
+
+
+def _parse_color(value: Any) -> Optional[RGBA]:
+    """解析 CSS 颜色（hex / rgb() / rgba() / 颜色名）；transparent / none / 无法解析返回 None"""
+    text = str(value or "").strip()
+    if not text or text.lower() in ("transparent", "none"):
+        return None
+    try:
+        rgb = ImageColor.getrgb(text)
+    except ValueError:
+        return None
+    return rgb if len(rgb) == 4 else (*rgb, 255)
+
+
+# =============================================================================
+# 合成工具
+# =============================================================================
+
+def _apply_opacity(img: Image.Image, opacity: float) -> Image.Image:
+    if opacity >= 1:
+        return img
+    alpha = img.getchannel("A").point(lambda v: int(v * max(opacity, 0.0) + 0.5))
+    img.putalpha(alpha)
+    return img
+
+
+def _composite(base: Image.Image, layer: Image.Image, x: int, y: int) -> None:
+    """把 RGBA 图层 over 合成到 base 的 (x, y)，超出画布的部分裁掉"""
+    left, top = max(x, 0), max(y, 0)
+    right, bottom = min(x + layer.width, base.width), min(y + layer.height, base.height)
+    if right <= left or bottom <= top:
+        return
+    if (left, top, right, bottom) != (x, y, x + layer.width, y + layer.height):
+        layer = layer.crop((left - x, top - y, right - x, bottom - y))
+    base.alpha_composite(layer, dest=(left, top))
+
+
+# =============================================================================
+# 图片图层（解码 + cover 缩放结果按 src 与尺寸缓存）
+# =============================================================================
+
+class _ImageCache:
+    """已缩放图片的 LRU；同一背景 / 主体在多个候选版式间只解码一次"""
+
+    def __init__(self):
+        self._items: "OrderedDict[Tuple[str, int, int], Image.Image]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, int, int]) -> Optional[Image.Image]:
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def put(self, key: Tuple[str, int, int], img: Image.Image) -> None:
+        size = settings.render.IMAGE_CACHE_SIZE
+        if size <= 0:
+            return
+        with self._lock:
+            self._items[key] = img
+            while len(self._items) > size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_image_cache = _ImageCache()
+
+
+def clear_image_cache() -> None:
+    _image_cache.clear()
+
+
+def _load_source(src: str) -> Optional[bytes]:
+    """读取图层图片字节：asset:// 直接读本地存储，data URL 解码，http(s) 走共享连接池"""
+    from ...core.blob_store import is_asset_ref, resolve_asset_ref
+
+    if is_asset_ref(src):
+        blob = resolve_asset_ref(src)
+        return blob[0] if blob else None
+    if src.startswith("data:image"):
+        return base64.b64decode(src.split(",", 1)[1])
+    if src.startswith(("http://", "https://")):
+        from ...core.http_client import get_http_client
+
+        response = get_http_client().get(src)
+        response.raise_for_status()
+        return response.content
+    return None
+
+
+def _load_image_layer(src: str, width: int, height: int) -> Optional[Image.Image]:
+    src_key = src if len(src) <= 256 else hashlib.sha256(src.encode("utf-8")).hexdigest()
+    key = (src_key, width, height)
+    cached = _image_cache.get(key)
+    if cached is not None:
+        return cached
+
+    data = _load_source(src)
+    if data is None:
+        return None
+    img = Image.open(io.BytesIO(data))
+    img.draft("RGB", (width, height))  # JPEG 直接按接近目标的尺寸解码
+    img = ImageOps.fit(img.convert("RGBA"), (width, height), Image.LANCZOS, centering=(0.5, 0.5))
+    _image_cache.put(key, img)
+    return img
+
+
+# =============================================================================
+# 形状图层
+# =============================================================================
+
+def _gradient_fill(gradient: str, w: int, h: int) -> Optional[np.ndarray]:
+    """按 Node 端的 SVG 渐变参数（objectBoundingBox 单位）生成 h×w×4 的 RGBA 数组"""
+    linear = _LINEAR_RE.search(gradient)
+    radial = _RADIAL_RE.search(gradient) if not linear else None
+    if not linear and not radial:
+        return None
+
+    stops = (linear.group(2), linear.group(3)) if linear else (radial.group(1), radial.group(2))
+    c1, c2 = (_parse_color(c.strip()) or (0, 0, 0, 0) for c in stops)
+
+    u = (np.arange(w, dtype=np.float32) + 0.5) / max(w, 1)
+    v = (np.arange(h, dtype=np.float32) + 0.5) / max(h, 1)
+    uu, vv = np.meshgrid(u, v)
+
+    if linear:
+        rad = math.radians(int(linear.group(1)) - 90)
+        x1, y1 = 0.5 - math.cos(rad) * 0.5, 0.5 - math.sin(rad) * 0.5
+        dx, dy = math.cos(rad), math.sin(rad)
+        t = ((uu - x1) * dx + (vv - y1) * dy) / max(dx * dx + dy * dy, 1e-6)
+    else:
+        t = np.sqrt((uu - 0.5) ** 2 + (vv - 0.5) ** 2) / 0.5
+
+    t = np.clip(t, 0.0, 1.0)[..., None]
+    start = np.asarray(c1, dtype=np.float32)
+    end = np.asarray(c2, dtype=np.float32)
+    return (start + (end - start) * t + 0.5).astype(np.uint8)
+
+
+def _draw_rect(base: Image.Image, layer: Dict[str, Any], scale: float) -> None:
+    x, y = float(layer.get("x") or 0) * scale, float(layer.get("y") or 0) * scale
+    w, h = float(layer.get("width") or 0) * scale, float(layer.get("height") or 0) * scale
+    radius = min(float(layer.get("borderRadius") or 0) * scale, w / 2, h / 2)
+    border_w = float(layer.get("borderWidth") or 0) * scale
+    border_color = _parse_color(layer.get("borderColor")) if border_w > 0 else None
+    opacity = float(layer.get("opacity", 1.0) if layer.get("opacity") is not None else 1.0)
+
+    fill_arr = _gradient_fill(layer["gradient"], max(1, round(w)), max(1, round(h))) if layer.get("gradient") else None
+    fill_color = None if fill_arr is not None else _parse_color(layer.get("backgroundColor"))
+    if fill_arr is None and fill_color is None and border_color is None:
+        return
+    if w <= 0 or h <= 0:
+        return
+
+    # 描边一半在矩形外（SVG stroke 居中于边框）
+    pad = math.ceil(border_w / 2) + 1
+    ox, oy = math.floor(x) - pad, math.floor(y) - pad
+    tile = Image.new("RGBA", (math.ceil(w) + 2 * pad + 1, math.ceil(h) + 2 * pad + 1), (0, 0, 0, 0))
+    box = (x - ox, y - oy, x - ox + w - 1, y - oy + h - 1)
+
+    if fill_arr is not None or fill_color is not None:
+        mask = Image.new("L", tile.size, 0)
+        ImageDraw.Draw(mask).rounded_rectangle(box, radius=radius, fill=255)
+        if fill_arr is not None:
+            fill_img = Image.new("RGBA", tile.size, (0, 0, 0, 0))
+            fill_img.paste(Image.fromarray(fill_arr, "RGBA"), (round(box[0]), round(box[1])))
+        else:
+            fill_img = Image.new("RGBA", tile.size, fill_color)
+        alpha = np.asarray(fill_img.getchannel("A"), dtype=np.uint16) * np.asarray(mask, dtype=np.uint16) // 255
+        fill_img.putalpha(Image.fromarray(alpha.astype(np.uint8), "L"))
+        tile = fill_img
+
+    if border_color is not None:
+        half = border_w / 2
+        outer = (box[0] - half, box[1] - half, box[2] + half, box[3] + half)
+        stroke = Image.new("RGBA", tile.size, (0, 0, 0, 0))
+        ImageDraw.Draw(stroke).rounded_rectangle(
+            outer, radius=radius + half, outline=border_color, width=max(1, round(border_w)),
+        )
+        tile.alpha_composite(stroke)
+
+    _composite(base, _apply_opacity(tile, opacity), ox, oy)
+
+
+# =============================================================================
+# 文本图层
+# =============================================================================
+
+_font_cache: Dict[Tuple[Optional[str], int], ImageFont.ImageFont] = {}
+_font_lock = threading.Lock()
+_warned_default_font = False
+
+
+def _get_font(family: str, size: int) -> ImageFont.ImageFont:
+    global _warned_default_font
+    path = resolve_font_file(family)
+    key = (path, size)
+    with _font_lock:
+        font = _font_cache.get(key)
+        if font is not None:
+            return font
+        if path:
+            font = ImageFont.truetype(path, size)
+        else:
+            if not _warned_default_font:
+                logger.warning("⚠️ 未找到可用字体文件，使用 Pillow 内置字体（可通过 RENDER_FONT_DIRS 指定字体目录）")
+                _warned_default_font = True
+            font = ImageFont.load_default(size=size)
+        _font_cache[key] = font
+        return font
+
+
+def _draw_text(base: Image.Image, layer: Dict[str, Any], scale: float) -> None:
+    content = str(layer.get("content") or "").strip()
+    if not content:
+        return
+
+    font_size = float(layer.get("fontSize") or 16)
+    line_height = float(layer.get("lineHeight") or 1.2)
+    color = _parse_color(layer.get("color") or "#000000") or (0, 0, 0, 255)
+    align = layer.get("textAlign") or "left"
+    opacity = float(layer.get("opacity", 1.0) if layer.get("opacity") is not None else 1.0)
+    font = _get_font(layer.get("fontFamily") or "PingFang SC", max(1, round(font_size * scale)))
+
+    x, y = float(layer.get("x") or 0), float(layer.get("y") or 0)
+    w = float(layer.get("width") or 0)
+    anchor_x = {"center": x + w / 2, "right": x + w}.get(align, x) * scale
+    anchor = _TEXT_ANCHORS.get(align, "ls")
+
+    lines = [(line, (y + font_size + i * font_size * line_height) * scale)
+             for i, line in enumerate(content.split("\n"))]
+
+    # 只在文字包围盒（含阴影外扩）内绘制，避免整画布大小的模糊
+    measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+    boxes = [measure.textbbox((anchor_x, by), line, font=font, anchor=anchor) for line, by in lines if line]
+    if not boxes:
+        return
+    spread = math.ceil(3 * _SHADOW_SIGMA * scale) + 2
+    left = math.floor(min(b[0] for b in boxes)) - spread
+    top = math.floor(min(b[1] for b in boxes)) - spread
+    right = math.ceil(max(b[2] for b in boxes)) + spread
+    bottom = math.ceil(max(b[3] for b in boxes)) + spread + math.ceil(_SHADOW_OFFSET_Y * scale)
+
+    mask = Image.new("L", (right - left, bottom - top), 0)
+    draw = ImageDraw.Draw(mask)
+    for line, by in lines:
+        draw.text((anchor_x - left, by - top), line, font=font, fill=255, anchor=anchor)
+
+    shadow_alpha = mask.filter(ImageFilter.GaussianBlur(_SHADOW_SIGMA * scale)).point(
+        lambda v: int(v * _SHADOW_ALPHA + 0.5)
+    )
+    shift = round(_SHADOW_OFFSET_Y * scale)
+    tile = Image.new("RGBA", mask.size, (0, 0, 0, 0))
+    if shift:
+        shadow_alpha = shadow_alpha.transform(shadow_alpha.size, Image.AFFINE, (1, 0, 0, 0, 1, -shift))
+    tile.putalpha(shadow_alpha)
+
+    glyphs = Image.new("RGBA", mask.size, color[:3] + (0,))
+    glyphs.putalpha(mask.point(lambda v: v * color[3] // 255))
+    tile.alpha_composite(glyphs)
+
+    _composite(base, _apply_opacity(tile, opacity), left, top)
+
+
+# =============================================================================
+# 对外入口
+# =============================================================================
+
+def rasterize_poster(poster_data: Dict[str, Any], max_edge: Optional[int] = None) -> Image.Image:
+    """
+    将海报数据绘制为 RGB 图像。
+
+    Args:
+        poster_data: PosterData 字典（canvas + layers）
+        max_edge: 输出最长边像素（None 表示按画布原尺寸），坐标 / 字号等比缩放
+
+    Returns:
+        PIL RGB 图像
+    """
+    canvas = poster_data.get("canvas", {}) or {}
+    cw, ch = int(canvas.get("width") or 1080), int(canvas.get("height") or 1920)
+    scale = min(1.0, max_edge / max(cw, ch)) if max_edge else 1.0
+    out_w, out_h = max(1, round(cw * scale)), max(1, round(ch * scale))
+
+    base = Image.new("RGBA", (out_w, out_h), _canvas_color(canvas.get("backgroundColor", "#FFFFFF")) + (255,))
+
+    for layer in poster_data.get("layers", []) or []:
+        layer_type = layer.get("type")
+        try:
+            if layer_type == "image":
+                if not layer.get("src"):
+                    continue
+                w = round(float(layer.get("width") or 0) * scale)
+                h = round(float(layer.get("height") or 0) * scale)
+                if w <= 0 or h <= 0:
+                    continue
+                img = _load_image_layer(layer["src"], w, h)
+                if img is not None:
+                    _composite(base, img, round(float(layer.get("x") or 0) * scale),
+                               round(float(layer.get("y") or 0) * scale))
+            elif layer_type == "rect":
+                _draw_rect(base, layer, scale)
+            elif layer_type == "text":
+                _draw_text(base, layer, scale)
+        except Exception as e:
+            logger.warning(f"⚠️ 光栅化图层 {layer.get('id', '?')} 失败，跳过: {e}")
+
+    return base.convert("RGB")
+
+
+def rasterize_poster_to_bytes(
+    poster_data: Dict[str, Any],
+    max_edge: Optional[int] = None,
+    fmt: str = "png",
+    quality: int = 85,
+) -> bytes:
+    """绘制海报并编码为 png / jpeg / webp 字节"""
+    img = rasterize_poster(poster_data, max_edge=max_edge)
+    buf = io.BytesIO()
+    if fmt.lower() in ("jpeg", "jpg", "webp"):
+        img.save(buf, format="JPEG" if fmt.lower() != "webp" else "WEBP", quality=quality)
+    else:
+        img.save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
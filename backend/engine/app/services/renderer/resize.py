@@ -0,0 +1,179 @@
+"""
+多尺寸派生 — 同一份语义 DSL 按目标宽高比重新排版，无需重新走 Planner → Visual → Layout
+
+    1. 按目标画布的宽高比类别映射布局策略（竖版保留原策略，横版 / 横幅换成内容区域更高的策略）
+    2. DSL 中的字号 / 形状高度按画布短边等比换算，最终字号仍由排版自适应决定
+    3. 背景图按目标宽高比做主体感知裁剪（以视觉重心为中心，而不是居中裁剪），
+       裁剪结果存入 blob 存储，图层引用新的 asset://
+"""
+
+import copy
+import hashlib
+import io
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from ...core.blob_store import store_bytes
+from ...core.logger import get_logger
+from .layout_builder import DEFAULT_STRATEGY, STRATEGIES
+from .subject_bbox import focal_point
+
+logger = get_logger(__name__)
+
+
+# ============================================================================
+# 宽高比 → 布局策略
+# ============================================================================
+
+def aspect_class(width: int, height: int) -> str:
+    """portrait（竖版）/ square（方形）/ landscape（横版）/ banner（横幅）"""
+    ratio = width / height
+    if ratio < 0.8:
+        return "portrait"
+    if ratio <= 1.25:
+        return "square"
+    if ratio <= 2.5:
+        return "landscape"
+    return "banner"
+
+
+# 未列出的策略保持不变；横版 / 横幅的纵向空间少，换成内容区域更高的策略
+STRATEGY_BY_ASPECT: Dict[str, Dict[str, str]] = {
+    "portrait": {},
+    "square": {
+        "split_vertical": "centered",
+    },
+    "landscape": {
+        "top_text": "left_aligned",
+        "bottom_heavy": "left_aligned",
+        "split_vertical": "left_aligned",
+        "diagonal": "left_aligned",
+    },
+    "banner": {
+        "top_text": "left_aligned",
+        "bottom_heavy": "left_aligned",
+        "split_vertical": "left_aligned",
+        "diagonal": "left_aligned",
+        "centered": "left_aligned",
+        "big_title": "left_aligned",
+    },
+}
+
+
+def resize_strategy(layout_strategy: Optional[str], width: int, height: int) -> str:
+    """目标画布使用的布局策略"""
+    strategy = layout_strategy if layout_strategy in STRATEGIES else DEFAULT_STRATEGY
+    return STRATEGY_BY_ASPECT[aspect_class(width, height)].get(strategy, strategy)
+
+
+# ============================================================================
+# DSL 换算
+# ============================================================================
+
+_SCALED_KEYS = ("font_size", "height")
+
+
+def scale_instructions(
+    dsl_instructions: List[Dict[str, Any]],
+    source_size: Tuple[int, int],
+    target_size: Tuple[int, int],
+) -> List[Dict[str, Any]]:
+    """
+    按画布短边比例换算 DSL 中的像素尺寸（字号、形状高度），返回新的指令列表
+
+    图片指令中显式给出的坐标（约束模式的主体位置）按宽 / 高分别换算。
+    """
+    scale = min(target_size) / min(source_size)
+    sx = target_size[0] / source_size[0]
+    sy = target_size[1] / source_size[1]
+    result = copy.deepcopy(dsl_instructions)
+    for instr in result:
+        if instr.get("command") == "add_image":
+            for key, factor in (("x", sx), ("width", sx), ("y", sy), ("height", sy)):
+                if isinstance(instr.get(key), (int, float)):
+                    instr[key] = round(instr[key] * factor)
+            continue
+        for key in _SCALED_KEYS:
+            if isinstance(instr.get(key), (int, float)):
+                instr[key] = max(1, round(instr[key] * scale))
+    return result
+
+
+# ============================================================================
+# 主体感知裁剪
+# ============================================================================
+
+_CROP_CACHE_SIZE = 64
+
+# (src 摘要, 宽, 高) → 裁剪后的 asset:// 引用
+_crop_cache: Dict[Tuple[str, int, int], str] = {}
+
+
+def crop_box(
+    image_size: Tuple[int, int], target_size: Tuple[int, int], focus: Tuple[float, float],
+) -> Tuple[int, int, int, int]:
+    """目标宽高比下面积最大、中心尽量靠近 focus 的裁剪框 (left, top, right, bottom)"""
+    iw, ih = image_size
+    target = target_size[0] / target_size[1]
+    if iw / ih > target:
+        cw, ch = max(1, round(ih * target)), ih
+    else:
+        cw, ch = iw, max(1, round(iw / target))
+    left = min(max(round(focus[0] * iw - cw / 2), 0), iw - cw)
+    top = min(max(round(focus[1] * ih - ch / 2), 0), ih - ch)
+    return left, top, left + cw, top + ch
+
+
+def crop_background(src: str, width: int, height: int) -> str:
+    """
+    把背景图裁剪到目标宽高比（以视觉重心为中心）并缩放到不超过画布尺寸
+
+    Returns:
+        裁剪图的 asset:// 引用；图片无法读取或宽高比已一致时返回原 src
+    """
+    if not src:
+        return src
+    key = (
+        src if len(src) <= 256 else hashlib.sha256(src.encode("utf-8")).hexdigest(),
+        width, height,
+    )
+    cached = _crop_cache.get(key)
+    if cached is not None:
+        return cached
+
+    from .rasterizer import _load_source
+
+    try:
+        data = _load_source(src)
+        if data is None:
+            return src
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except Exception as e:
+        logger.warning(f"⚠️ 背景图读取失败，沿用居中裁剪: {e}")
+        return src
+
+    iw, ih = img.size
+    if abs(iw / ih - width / height) < 0.01:
+        return src
+
+    focus = focal_point(img)
+    cropped = img.crop(crop_box((iw, ih), (width, height), focus))
+    if cropped.width > width:
+        cropped = cropped.resize((width, height), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    if "A" in cropped.getbands():
+        cropped.save(buf, format="PNG", optimize=True)
+        mime = "image/png"
+    else:
+        cropped.convert("RGB").save(buf, format="JPEG", quality=90)
+        mime = "image/jpeg"
+    ref = store_bytes(buf.getvalue(), mime)
+
+    if len(_crop_cache) >= _CROP_CACHE_SIZE:
+        _crop_cache.pop(next(iter(_crop_cache)), None)
+    _crop_cache[key] = ref
+    logger.info(f"✂️ 背景主体感知裁剪: {iw}x{ih} → {width}x{height}, 重心=({focus[0]:.2f}, {focus[1]:.2f})")
+    return ref
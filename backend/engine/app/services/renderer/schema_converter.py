@@ -85,6 +85,7 @@ class SchemaConverter:
                 fontFamily=font_family,
                 textAlign=elem.get("textAlign", "left"),
                 fontWeight=elem.get("fontWeight", "normal"),
+                truncated=bool(elem.get("truncated", False)),
             )
 
         if elem_type == "image":
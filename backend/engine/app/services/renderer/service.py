@@ -3,7 +3,7 @@
 
 职责：
 1. 协调 DSL 解析（OOP 布局引擎）和 Schema 转换
-2. 提供完整的渲染流程
+2. 提供完整的渲染流程（build_poster，结果按输入哈希缓存）
 """
 
 from typing import Dict, Any, List, Optional
@@ -11,6 +11,7 @@ from typing import Dict, Any, List, Optional
 from ...models.poster import PosterData, Canvas
 from ...core.logger import get_logger
 from .dsl_parser import DSLParser
+from .layout_memo import get_layout_memo, make_layout_key
 from .schema_converter import SchemaConverter
 
 logger = get_logger(__name__)
@@ -23,6 +24,57 @@ class RendererService:
         self.dsl_parser = DSLParser()
         self.schema_converter = SchemaConverter()
 
+    def build_poster(
+        self,
+        dsl_instructions: List[Dict[str, Any]],
+        layout_strategy: str = "centered",
+        canvas_width: int = 1080,
+        canvas_height: int = 1920,
+        design_brief: Optional[Dict[str, Any]] = None,
+        font_style: Optional[str] = None,
+        asset_list: Optional[Dict[str, Any]] = None,
+    ) -> PosterData:
+        """
+        DSL → OOP 布局 → PosterData → 合并设计数据（完整流程）
+
+        相同输入（见 layout_memo.make_layout_key）直接返回缓存的 PosterData 副本。
+        """
+        memo = get_layout_memo()
+        key = None
+        if memo is not None:
+            key = make_layout_key(
+                dsl_instructions, layout_strategy, font_style,
+                canvas_width, canvas_height, design_brief, asset_list,
+            )
+            cached = memo.get(key)
+            if cached is not None:
+                logger.debug(f"♻️ 排版结果缓存命中: strategy={layout_strategy}, font_style={font_style}")
+                return cached
+
+        elements = self.parse_dsl_and_build_layout(
+            dsl_instructions=dsl_instructions,
+            layout_strategy=layout_strategy,
+            canvas_width=canvas_width,
+            canvas_height=canvas_height,
+            design_brief=design_brief,
+            font_style=font_style,
+        )
+        poster_data = self.convert_to_pydantic_schema(
+            elements=elements,
+            design_brief=design_brief,
+            canvas_width=canvas_width,
+            canvas_height=canvas_height,
+        )
+        poster_data = self.merge_with_design_brief(
+            poster_data=poster_data,
+            design_brief=design_brief or {},
+            asset_list=asset_list,
+        )
+
+        if memo is not None:
+            memo.set(key, poster_data)
+        return poster_data
+
     def parse_dsl_and_build_layout(
         self,
         dsl_instructions: List[Dict[str, Any]],
@@ -0,0 +1,135 @@
+"""
+主体素材外接框 — 由透明 PNG 的 alpha 通道得到主体实际占据的区域
+
+约束布局用它作为文字的禁入区域（而不是整个主体图层矩形），
+多尺寸派生用 focal_point 做主体感知的背景裁剪（不透明背景按边缘能量估计视觉重心）。
+subject_content_bbox 仅读取本地可得的图片（asset:// 引用 / data URL），不为排版发起网络请求。
+"""
+
+import hashlib
+import io
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from ...core.logger import get_logger
+
+logger = get_logger(__name__)
+
+_ALPHA_THRESHOLD = 16
+_CACHE_SIZE = 64
+_FOCUS_SAMPLE = 96  # 估计视觉重心时的缩略图边长
+
+
+class SubjectBox(NamedTuple):
+    """主体外接框（x0 / y0 / x1 / y1 为相对图片宽高的比例 0.0~1.0）"""
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    image_width: int
+    image_height: int
+
+
+# 摘要 → 外接框（data URL 很长，不直接作为缓存键）
+_bbox_cache: Dict[str, Optional[SubjectBox]] = {}
+
+
+def _compute_bbox(src: str) -> Optional[SubjectBox]:
+    from ...core.blob_store import is_asset_ref
+
+    if not (is_asset_ref(src) or src.startswith("data:image")):
+        return None
+    from .rasterizer import _load_source
+
+    try:
+        data = _load_source(src)
+        if data is None:
+            return None
+        return alpha_bbox(Image.open(io.BytesIO(data)))
+    except Exception as e:
+        logger.warning(f"⚠️ 主体外接框计算失败: {e}")
+        return None
+
+
+def alpha_bbox(img: Image.Image) -> Optional[SubjectBox]:
+    """图片 alpha 通道中不透明像素的外接框（无 alpha 通道 / 全透明时返回 None）"""
+    if "A" not in img.getbands():
+        return None
+    alpha = np.asarray(img.getchannel("A"))
+    rows = np.flatnonzero((alpha > _ALPHA_THRESHOLD).any(axis=1))
+    cols = np.flatnonzero((alpha > _ALPHA_THRESHOLD).any(axis=0))
+    if rows.size == 0:
+        return None
+    h, w = alpha.shape
+    return SubjectBox(cols[0] / w, rows[0] / h, (cols[-1] + 1) / w, (rows[-1] + 1) / h, w, h)
+
+
+def focal_point(img: Image.Image) -> Tuple[float, float]:
+    """
+    图片的视觉重心（相对宽高的比例坐标）
+
+    有透明通道时取不透明像素外接框的中心；否则在缩略图上计算亮度梯度能量，
+    取能量平方加权的重心（主体通常细节最多，大面积天空 / 纯色背景能量低）。
+    """
+    box = alpha_bbox(img)
+    if box is not None:
+        return (box.x0 + box.x1) / 2, (box.y0 + box.y1) / 2
+
+    gray = img.convert("L")
+    gray.thumbnail((_FOCUS_SAMPLE, _FOCUS_SAMPLE))
+    lum = np.asarray(gray, dtype=np.float32)
+    energy = np.zeros_like(lum)
+    energy[:, 1:] += np.abs(np.diff(lum, axis=1))
+    energy[1:, :] += np.abs(np.diff(lum, axis=0))
+    energy *= energy
+    total = float(energy.sum())
+    if total <= 0:
+        return 0.5, 0.5
+    h, w = lum.shape
+    fx = float((energy.sum(axis=0) * (np.arange(w) + 0.5)).sum()) / total / w
+    fy = float((energy.sum(axis=1) * (np.arange(h) + 0.5)).sum()) / total / h
+    return fx, fy
+
+
+def subject_content_bbox(src: str) -> Optional[SubjectBox]:
+    """
+    主体图片中不透明像素的外接框
+
+    Returns:
+        SubjectBox；图片不可本地读取 / 无 alpha 通道 / 全透明时返回 None
+    """
+    if not src:
+        return None
+    key = src if len(src) <= 256 else hashlib.sha256(src.encode("utf-8")).hexdigest()
+    if key not in _bbox_cache:
+        if len(_bbox_cache) >= _CACHE_SIZE:
+            _bbox_cache.pop(next(iter(_bbox_cache)), None)
+        _bbox_cache[key] = _compute_bbox(src)
+    return _bbox_cache[key]
+
+
+def place_box_in_cover(
+    box: SubjectBox, rect: Tuple[float, float, float, float],
+) -> Tuple[float, float, float, float]:
+    """
+    将主体外接框映射到 cover 缩放、居中裁剪后的图层矩形中
+
+    Args:
+        box: 主体外接框
+        rect: 图层矩形 (x, y, width, height)
+
+    Returns:
+        画布坐标 (x, y, width, height)，已裁剪到图层矩形内
+    """
+    iw, ih = box.image_width, box.image_height
+    rx, ry, rw, rh = rect
+    scale = max(rw / iw, rh / ih)
+    ox = rx + (rw - iw * scale) / 2
+    oy = ry + (rh - ih * scale) / 2
+    x0 = max(rx, ox + box.x0 * iw * scale)
+    y0 = max(ry, oy + box.y0 * ih * scale)
+    x1 = min(rx + rw, ox + box.x1 * iw * scale)
+    y1 = min(ry + rh, oy + box.y1 * ih * scale)
+    return x0, y0, max(0.0, x1 - x0), max(0.0, y1 - y0)
@@ -0,0 +1,254 @@
+"""
+排版自适应 — 将内容容器调整到恰好放进布局策略的区域
+
+LLM 给出的 font_size 只作为期望值，由确定性的求解过程决定最终字号与间距：
+    1. 区域放不下：先压缩间距；再二分查找整体压缩比例（各层级有最小字号，保持 标题 > 副标题 > 正文），
+       然后按 标题 → 副标题 → CTA → 正文 的顺序逐个元素二分查找可回调的最大字号；
+       字号全部到下限仍放不下时，开启 LAYOUT_FIT_TRUNCATE 才截断正文 / 副标题（末尾加 "…"），
+       标题与 CTA 从不截断；截断的文字块标记 truncated，随图层输出供 Critic 审核
+    2. 区域有余量：文字整体等比放大（不超过 MAX_UPSCALE），再拉大间距填充区域
+
+求解结束后容器高度不超过区域高度（除非区域连一行最小字号都放不下，或未开启截断）。
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from ...core.config import settings
+from ...core.layout import TextBlock, VerticalContainer
+from ...core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# 优先级（低 → 高）：逐个回调字号从重要文字开始
+SHRINK_ORDER = ("body", "cta", "subtitle", "title")
+# 允许截断的角色（先正文后副标题）；标题与 CTA 截断后信息不完整，宁可超出区域交给 Critic
+TRUNCATE_ORDER = ("body", "subtitle")
+
+# 层级链：高一级的字号至少为低一级的 HIERARCHY_RATIO 倍
+_HIERARCHY_BELOW = {
+    "title": ("subtitle", "body"),
+    "subtitle": ("body",),
+}
+_ROLE_LEVEL = {"body": 0, "cta": 0, "subtitle": 1, "title": 2}
+
+_ELLIPSIS = "…"
+_SCALE_SEARCH_STEPS = 12
+
+
+@dataclass
+class FitResult:
+    """排版自适应结果"""
+    fits: bool
+    gap: float
+    scale: float = 1.0          # 整体放大倍数（仅有余量时 > 1）
+    shrunk: int = 0             # 被压缩字号的元素数
+    truncated: int = 0          # 被截断的元素数
+
+
+# ============================================================================
+# 辅助函数
+# ============================================================================
+
+def _texts(ctr: VerticalContainer, role: Optional[str] = None) -> List[TextBlock]:
+    return [
+        e for e in ctr.elements
+        if isinstance(e, TextBlock) and (role is None or (e.role or "body") == role)
+    ]
+
+
+def _stack_height(ctr: VerticalContainer, gap: float) -> float:
+    """按给定间距计算容器高度（与 VerticalContainer.arrange 一致，不移动元素）"""
+    n = len(ctr.elements)
+    return 2 * ctr.padding + sum(e.height for e in ctr.elements) + max(n - 1, 0) * gap
+
+
+def _hierarchy_cap(block: TextBlock, ctr: VerticalContainer, ratio: float) -> int:
+    """该元素在保持层级前提下可取的最大字号（不超过任一上级字号 / ratio）"""
+    role = block.role or "body"
+    caps = [
+        other.font_size / ratio
+        for upper_role, lower_roles in _HIERARCHY_BELOW.items() if role in lower_roles
+        for other in _texts(ctr, upper_role)
+    ]
+    return math.floor(min(caps)) if caps else block.font_size * 10
+
+
+def _largest_fitting(lo: int, hi: int, fits: Callable[[int], bool]) -> Optional[int]:
+    """在 [lo, hi] 中二分查找 fits 为真的最大整数（fits 单调递减），都不满足时返回 None"""
+    if not fits(lo):
+        return None
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if fits(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+# ============================================================================
+# 求解
+# ============================================================================
+
+def fit_container(
+    ctr: VerticalContainer,
+    region_height: float,
+    base_gap: float,
+    min_font_size: Optional[int] = None,
+) -> FitResult:
+    """
+    调整容器内文字字号 / 间距，使容器高度恰好不超过 region_height
+
+    Args:
+        ctr: 已添加元素的垂直容器（TextBlock.role 标注语义角色）
+        region_height: 区域高度（px）
+        base_gap: 布局策略的默认间距
+        min_font_size: 字号下限（px，已按画布宽度换算；默认取配置）
+
+    Returns:
+        FitResult
+    """
+    cfg = settings.layout_fit
+    min_size = min_font_size or cfg.MIN_FONT_SIZE
+    min_gap = base_gap * cfg.MIN_GAP_RATIO
+    max_gap = base_gap * cfg.MAX_GAP_RATIO
+    n = len(ctr.elements)
+
+    def solve_gap() -> float:
+        """当前字号下可用的间距（放不下时返回 min_gap）"""
+        if n <= 1:
+            return base_gap
+        free = (region_height - _stack_height(ctr, 0)) / (n - 1)
+        return max(min_gap, min(max_gap, free))
+
+    def fits() -> bool:
+        return _stack_height(ctr, solve_gap()) <= region_height
+
+    if not _texts(ctr):
+        ctr.gap = solve_gap()
+        ctr.arrange()
+        return FitResult(fits=ctr.height <= region_height, gap=ctr.gap)
+
+    result = FitResult(fits=True, gap=base_gap)
+
+    if _stack_height(ctr, base_gap) <= region_height:
+        result.scale = _upscale(ctr, region_height, base_gap, cfg.MAX_UPSCALE)
+    elif not fits():
+        _shrink(ctr, min_size, cfg.HIERARCHY_RATIO, fits, result)
+        if not fits() and cfg.TRUNCATE:
+            _truncate(ctr, fits, result)
+
+    result.gap = solve_gap()
+    ctr.gap = result.gap
+    ctr.arrange()
+    result.fits = ctr.height <= region_height + 0.5
+
+    if not result.fits:
+        logger.warning(f"⚠️ 排版自适应后仍超出区域: {ctr.height:.0f} > {region_height:.0f}")
+    elif result.shrunk or result.truncated or result.scale > 1:
+        logger.info(
+            f"📏 排版自适应: scale={result.scale:.2f}, gap={result.gap:.0f}, "
+            f"压缩 {result.shrunk} 个, 截断 {result.truncated} 个"
+        )
+    return result
+
+
+def _upscale(ctr: VerticalContainer, region_height: float, base_gap: float, max_scale: float) -> float:
+    """有余量时整体等比放大文字（保持层级比例），返回最终倍数"""
+    blocks = _texts(ctr)
+    base_sizes = [b.font_size for b in blocks]
+
+    def apply(scale: float) -> bool:
+        for b, size in zip(blocks, base_sizes):
+            b.update_font_size(max(size, int(size * scale)))
+        return _stack_height(ctr, base_gap) <= region_height
+
+    if max_scale <= 1.0:
+        return 1.0
+    if apply(max_scale):
+        return max_scale
+
+    lo, hi = 1.0, max_scale
+    for _ in range(_SCALE_SEARCH_STEPS):
+        mid = (lo + hi) / 2
+        if apply(mid):
+            lo = mid
+        else:
+            hi = mid
+    apply(lo)
+    return lo
+
+
+def _shrink(
+    ctr: VerticalContainer,
+    min_size: int,
+    ratio: float,
+    fits: Callable[[], bool],
+    result: FitResult,
+) -> None:
+    """
+    整体等比压缩字号（各层级有各自的下限），再逐个元素二分回调字号
+
+    下限：正文 / CTA = min_size，副标题 = min_size × ratio，标题 = min_size × ratio²，
+    原本满足层级比例的字号在压缩后仍满足。
+    """
+    blocks = _texts(ctr)
+    original = {id(b): b.font_size for b in blocks}
+    floors = {
+        id(b): min(math.ceil(min_size * ratio ** _ROLE_LEVEL.get(b.role or "body", 0)), b.font_size)
+        for b in blocks
+    }
+
+    def apply(scale: float) -> bool:
+        for b in blocks:
+            b.update_font_size(max(floors[id(b)], int(original[id(b)] * scale)))
+        return fits()
+
+    lo, hi = 0.0, 1.0
+    for _ in range(_SCALE_SEARCH_STEPS):
+        mid = (lo + hi) / 2
+        if apply(mid):
+            lo = mid
+        else:
+            hi = mid
+    apply(lo)
+    result.shrunk = sum(1 for b in blocks if b.font_size < original[id(b)])
+    if not fits():
+        return
+
+    # 逐个元素回调：重要的先回调，上限为原字号且不打破与上一层级的比例
+    for role in reversed(SHRINK_ORDER):
+        for block in _texts(ctr, role):
+            current = block.font_size
+            cap = min(original[id(block)], _hierarchy_cap(block, ctr, ratio))
+            if cap <= current:
+                continue
+
+            def fits_at(size: int) -> bool:
+                block.update_font_size(size)
+                return fits()
+
+            block.update_font_size(_largest_fitting(current, cap, fits_at) or current)
+
+
+def _truncate(ctr: VerticalContainer, fits: Callable[[], bool], result: FitResult) -> None:
+    """字号已到下限仍放不下：按优先级截断正文 / 副标题"""
+    for role in TRUNCATE_ORDER:
+        for block in reversed(_texts(ctr, role)):
+            text = block.content
+            if len(text) <= 1:
+                continue
+
+            def fits_with(keep: int) -> bool:
+                block.update_content(text[:keep].rstrip() + _ELLIPSIS)
+                return fits()
+
+            best = _largest_fitting(0, len(text) - 1, fits_with)
+            block.update_content(text[:best or 0].rstrip() + _ELLIPSIS)
+            block.truncated = True
+            result.truncated += 1
+            if best is not None:
+                return
@@ -6,13 +6,16 @@
 2. Pexels API（备选，如果 Flux 失败或未配置）
 3. 本地占位符库（如果所有 API 都失败）
 """
+import asyncio
 import json
 import random
-import requests
 import base64
+import httpx
 from pathlib import Path
 from typing import Optional, Dict, List
+from ..core.blob_store import store_bytes
 from ..core.config import settings
+from ..core.http_client import aclose_http_clients, get_async_http_client, get_http_client
 from ..core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -25,6 +28,12 @@ FLUX_API_KEY = settings.visual.FLUX_API_KEY
 FLUX_API_URL = settings.visual.FLUX_API_URL
 FLUX_MODEL = settings.visual.FLUX_MODEL
 
+FLUX_TIMEOUT = 60.0  # 生成图片可能需要较长时间
+DOWNLOAD_TIMEOUT = 15.0
+PEXELS_TIMEOUT = 10.0
+USER_AGENT = "VibePoster/1.0"
+DEFAULT_HEADERS = {"User-Agent": USER_AGENT}
+
 # 数据文件路径
 DATA_FILE = Path(__file__).parent / "data" / "asset_library.json"
 
@@ -100,11 +109,12 @@ def generate_flux_image(
     }
     
     try:
-        response = requests.post(
+        client = get_http_client()
+        response = client.post(
             FLUX_API_URL,
             json=payload,
             headers=headers,
-            timeout=60  # 生成图片可能需要较长时间
+            timeout=FLUX_TIMEOUT
         )
         response.raise_for_status()
         
@@ -122,7 +132,7 @@ def generate_flux_image(
             # 下载图片并转换为 base64
             image_url = result["url"]
             logger.info(f"📥 正在下载 Flux 生成的图片...")
-            img_response = requests.get(image_url, timeout=30)
+            img_response = client.get(image_url, headers=DEFAULT_HEADERS, timeout=DOWNLOAD_TIMEOUT)
             img_response.raise_for_status()
             
             image_data = img_response.content
@@ -135,7 +145,7 @@ def generate_flux_image(
             # 另一种可能的返回格式
             image_url = result["result"]["sample"]
             logger.info(f"📥 正在下载 Flux 生成的图片...")
-            img_response = requests.get(image_url, timeout=30)
+            img_response = client.get(image_url, headers=DEFAULT_HEADERS, timeout=DOWNLOAD_TIMEOUT)
             img_response.raise_for_status()
             
             image_data = img_response.content
@@ -148,10 +158,10 @@ def generate_flux_image(
             logger.warning(f"⚠️ Flux API 返回格式未知: {list(result.keys())}")
             return None
             
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.warning("⚠️ Flux API 请求超时")
         return None
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.warning(f"⚠️ Flux API 调用失败: {e}")
         return None
     except Exception as e:
@@ -191,17 +201,18 @@ def search_pexels(query: str, orientation: str = "portrait", max_retries: int =
     
     headers = {
         "Authorization": PEXELS_API_KEY,
-        "User-Agent": "VibePoster/1.0"
+        "User-Agent": USER_AGENT
     }
+    client = get_http_client()
     
     # 重试机制
     for attempt in range(max_retries + 1):
         try:
-            response = requests.get(
+            response = client.get(
                 PEXELS_API_URL,
                 params=params,
                 headers=headers,
-                timeout=10
+                timeout=PEXELS_TIMEOUT
             )
             response.raise_for_status()
             
@@ -224,7 +235,7 @@ def search_pexels(query: str, orientation: str = "portrait", max_retries: int =
             # 下载图片并转换为 base64
             try:
                 logger.info(f"📥 正在下载 Pexels 图片...")
-                img_response = requests.get(image_url, timeout=15, headers={"User-Agent": "VibePoster/1.0"})
+                img_response = client.get(image_url, headers=DEFAULT_HEADERS, timeout=DOWNLOAD_TIMEOUT)
                 img_response.raise_for_status()
                 image_data = img_response.content
                 
@@ -248,7 +259,7 @@ def search_pexels(query: str, orientation: str = "portrait", max_retries: int =
                 logger.warning(f"⚠️ 下载 Pexels 图片失败: {e}")
                 return None
             
-        except requests.exceptions.ConnectionError as e:
+        except httpx.ConnectError as e:
             if attempt < max_retries:
                 logger.warning(f"⚠️ Pexels API 连接失败 (尝试 {attempt + 1}/{max_retries + 1}): {e}")
                 import time
@@ -257,7 +268,7 @@ def search_pexels(query: str, orientation: str = "portrait", max_retries: int =
             else:
                 logger.error(f"⚠️ Pexels API 连接失败 (网络错误，已重试 {max_retries + 1} 次): {e}")
                 return None
-        except requests.exceptions.Timeout as e:
+        except httpx.TimeoutException as e:
             if attempt < max_retries:
                 logger.warning(f"⚠️ Pexels API 请求超时 (尝试 {attempt + 1}/{max_retries + 1}): {e}")
                 import time
@@ -266,7 +277,7 @@ def search_pexels(query: str, orientation: str = "portrait", max_retries: int =
             else:
                 logger.error(f"⚠️ Pexels API 请求超时 (已重试 {max_retries + 1} 次): {e}")
                 return None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"⚠️ Pexels API 调用失败 (HTTP 错误): {e}")
             return None
         except Exception as e:
@@ -276,78 +287,158 @@ def search_pexels(query: str, orientation: str = "portrait", max_retries: int =
     return None
 
 
-def search_pexels_multiple(query: str, count: int = 3, orientation: str = "portrait") -> List[str]:
-    """从 Pexels 搜索多张图片，返回 base64 URL 列表"""
-    if not PEXELS_API_KEY:
-        return []
+# ============================================================================
+# 并发获取多张候选图（Flux 生成 + Pexels 搜索 + 图片下载同时进行）
+# ============================================================================
+
+def _guess_mime(image_url: str) -> str:
+    lower = image_url.lower()
+    if ".png" in lower:
+        return "image/png"
+    if ".webp" in lower:
+        return "image/webp"
+    return "image/jpeg"
+
 
+async def _adownload_to_store(client: httpx.AsyncClient, image_url: str, mime_type: str) -> str:
+    """下载图片存入 blob store（写盘在线程池中进行，不阻塞事件循环），返回 asset:// 引用"""
+    response = await client.get(image_url, headers=DEFAULT_HEADERS, timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    return await asyncio.to_thread(store_bytes, response.content, mime_type)
+
+
+async def _agenerate_flux_image(
+    client: httpx.AsyncClient,
+    prompt: str,
+    sink: List[str],
+    aspect_ratio: str = "9:16",
+    output_format: str = "jpeg",
+) -> None:
+    """Flux 生成（异步），成功后把 asset:// 引用写入 sink"""
+    logger.info(f"🎨 使用 Flux 生成背景图: {prompt[:50]}...")
+    payload = {
+        "prompt": prompt,
+        "enableTranslation": True,
+        "aspectRatio": aspect_ratio,
+        "outputFormat": output_format,
+        "promptUpsampling": False,
+        "model": FLUX_MODEL,
+        "safetyTolerance": 2,
+    }
+    headers = {"Authorization": f"Bearer {FLUX_API_KEY}", "Content-Type": "application/json", **DEFAULT_HEADERS}
+    mime_type = f"image/{output_format}"
+
+    try:
+        response = await client.post(FLUX_API_URL, json=payload, headers=headers, timeout=FLUX_TIMEOUT)
+        response.raise_for_status()
+        result = response.json()
+
+        if "image" in result:
+            sink.append(await asyncio.to_thread(store_bytes, base64.b64decode(result["image"]), mime_type))
+        elif "url" in result:
+            sink.append(await _adownload_to_store(client, result["url"], mime_type))
+        elif "result" in result and "sample" in result["result"]:
+            sink.append(await _adownload_to_store(client, result["result"]["sample"], mime_type))
+        else:
+            logger.warning(f"⚠️ Flux API 返回格式未知: {list(result.keys())}")
+            return
+        logger.info("✅ Flux 图片生成成功")
+    except httpx.TimeoutException:
+        logger.warning("⚠️ Flux API 请求超时")
+    except httpx.HTTPError as e:
+        logger.warning(f"⚠️ Flux API 调用失败: {e}")
+    except ValueError as e:
+        logger.warning(f"⚠️ Flux API 返回内容无法解析: {e}")
+    except OSError as e:
+        logger.warning(f"⚠️ Flux 图片写入存储失败: {e}")
+
+
+async def _asearch_pexels_multiple(
+    client: httpx.AsyncClient,
+    query: str,
+    count: int,
+    sink: List[str],
+    orientation: str = "portrait",
+) -> None:
+    """Pexels 搜索 + 并发下载（异步），每张图下载完成即把 asset:// 引用写入 sink"""
     params = {
         "query": query,
         "orientation": orientation,
         "per_page": min(count * 2, 10),
         "size": "large",
     }
-    headers = {"Authorization": PEXELS_API_KEY, "User-Agent": "VibePoster/1.0"}
-
     try:
-        response = requests.get(PEXELS_API_URL, params=params, headers=headers, timeout=10)
+        response = await client.get(
+            PEXELS_API_URL, params=params, headers={"Authorization": PEXELS_API_KEY, **DEFAULT_HEADERS},
+            timeout=PEXELS_TIMEOUT,
+        )
         response.raise_for_status()
-        data = response.json()
-        photos = data.get("photos", [])
-        if not photos:
-            return []
+        photos = response.json().get("photos", [])
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning(f"⚠️ Pexels 批量搜索失败: {e}")
+        return
 
-        from ..tools.vision import image_to_base64
+    async def download(image_url: str) -> None:
+        try:
+            sink.append(await _adownload_to_store(client, image_url, _guess_mime(image_url)))
+        except httpx.HTTPError as e:
+            logger.debug(f"Pexels 图片下载失败: {e}")
+        except Exception as e:
+            # 写入存储失败等，单张失败不影响其他下载
+            logger.warning(f"⚠️ Pexels 图片保存失败: {type(e).__name__}: {e}")
 
-        results = []
-        for photo in photos[:count]:
-            image_url = (
-                photo.get("src", {}).get("large")
-                or photo.get("src", {}).get("original")
-            )
-            if not image_url:
-                continue
-            try:
-                img_resp = requests.get(image_url, timeout=15, headers={"User-Agent": "VibePoster/1.0"})
-                img_resp.raise_for_status()
-                mime = "image/jpeg"
-                if ".png" in image_url.lower():
-                    mime = "image/png"
-                results.append(image_to_base64(img_resp.content, mime))
-            except Exception:
-                continue
-        return results
-    except Exception as e:
-        logger.warning(f"⚠️ Pexels 批量搜索失败: {e}")
-        return []
+    urls = [
+        photo.get("src", {}).get("large") or photo.get("src", {}).get("original")
+        for photo in photos[:count]
+    ]
+    await asyncio.gather(*(download(url) for url in urls if url))
 
 
-def search_assets_multiple(
+async def asearch_assets_multiple(
     keywords: list,
     design_brief: Optional[Dict] = None,
     count: int = 3,
+    deadline: Optional[float] = None,
 ) -> List[str]:
     """
-    获取多张候选背景图（用于分步模式中的素材选择）
+    获取多张候选背景图（异步并发版本）
 
-    优先级: Flux(1张) + Pexels(补齐) → 纯 Pexels → 本地占位符
+    Flux 生成、Pexels 搜索与每张 Pexels 图片下载同时进行；
+    到达 deadline（秒）时取消未完成的任务，返回已到达的结果。
+    图片存入 blob store，返回 asset://<sha256> 引用而非 base64 data URL。
+
+    优先级: Flux(1张) + Pexels(补齐) → 本地占位符
     """
-    logger.info(f"📚 获取 {count} 张候选背景图，关键词: {keywords}")
-    results: List[str] = []
+    if deadline is None:
+        deadline = settings.visual.ASSET_SEARCH_DEADLINE
+    logger.info(f"📚 获取 {count} 张候选背景图，关键词: {keywords}（deadline={deadline:.0f}s）")
+
+    flux_results: List[str] = []
+    pexels_results: List[str] = []
 
-    # Flux 生成 1 张（耗时较长，只生成 1 张）
+    client = get_async_http_client()
+    tasks = []
     if FLUX_API_KEY:
         flux_prompt = build_flux_prompt(design_brief or {}, keywords)
-        img = generate_flux_image(prompt=flux_prompt, aspect_ratio="9:16")
-        if img:
-            results.append(img)
-
-    # Pexels 补齐
-    remaining = count - len(results)
-    if remaining > 0 and PEXELS_API_KEY:
+        tasks.append(asyncio.create_task(_agenerate_flux_image(client, flux_prompt, flux_results)))
+    if PEXELS_API_KEY:
+        # 与 Flux 并发，不知道 Flux 是否成功，按 count 张请求，最后再截断
         query = combine_keywords(keywords)
-        pexels_results = search_pexels_multiple(query, count=remaining)
-        results.extend(pexels_results)
+        tasks.append(asyncio.create_task(_asearch_pexels_multiple(client, query, count, pexels_results)))
+
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in done:
+            # 取回异常，避免 "Task exception was never retrieved"
+            if task.exception() is not None:
+                logger.warning(f"⚠️ 素材获取任务失败: {type(task.exception()).__name__}: {task.exception()}")
+        if pending:
+            logger.warning(f"⏱️ 素材获取超过 deadline，取消 {len(pending)} 个未完成任务，使用已到达的结果")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    results = (flux_results + pexels_results)[:count]
 
     # 本地占位符兜底
     if not results:
@@ -359,6 +450,28 @@ def search_assets_multiple(
     return results
 
 
+def search_assets_multiple(
+    keywords: list,
+    design_brief: Optional[Dict] = None,
+    count: int = 3,
+    deadline: Optional[float] = None,
+) -> List[str]:
+    """
+    获取多张候选背景图（用于分步模式中的素材选择）
+
+    同步入口（脚本 / 离线调用），在临时事件循环中运行 asearch_assets_multiple，
+    每次调用都会新建并关闭连接池。请求路径请直接 await asearch_assets_multiple。
+    """
+    async def run() -> List[str]:
+        try:
+            return await asearch_assets_multiple(keywords, design_brief, count, deadline)
+        finally:
+            # 临时事件循环结束前关闭其连接池，避免连接泄漏
+            await aclose_http_clients()
+
+    return asyncio.run(run())
+
+
 def combine_keywords(keywords: list) -> str:
     """
     将关键词列表组合成搜索词
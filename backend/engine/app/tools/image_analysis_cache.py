@@ -0,0 +1,188 @@
+"""
+图像理解结果缓存 - 按图片摘要寻址
+
+键 = sha256(图片字节) + sha256(user_prompt)，值 = analyze_image_with_llm 的结果字典。
+步骤向导中用户每次微调 brief 都会重新提交同一张主体/背景图，
+命中缓存时无需再 base64 编码整图、也不再调用 Vision LLM。
+
+两级存储：
+1. 进程内 LRU（VISUAL_IMAGE_CACHE_MAX_ENTRIES）
+2. 磁盘 JSON 文件（VISUAL_IMAGE_CACHE_DIR，留空则不落盘；超过上限时按修改时间淘汰）
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def image_digest(image_data: bytes, user_prompt: Optional[str] = None) -> str:
+    """计算缓存键：图片内容摘要 + 用户描述摘要"""
+    image_hash = hashlib.sha256(image_data).hexdigest()
+    prompt_hash = hashlib.sha256((user_prompt or "").encode("utf-8")).hexdigest()[:16]
+    return f"{image_hash}_{prompt_hash}"
+
+
+class ImageAnalysisCache:
+    """图像理解结果的两级缓存（内存 LRU + 磁盘 JSON）"""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        cache_dir: Optional[str] = None,
+        max_disk_entries: int = 2048,
+    ):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.cache_dir: Optional[Path] = Path(cache_dir) if cache_dir else None
+
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.cache_dir is not None:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"⚠️ 图像理解缓存目录不可用，仅使用内存: {e}")
+                self.cache_dir = None
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存（返回深拷贝，调用方可放心修改）"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(value)
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self._put_memory(key, value)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """写入缓存（内存 + 磁盘）"""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._put_memory(key, value)
+        self._write_disk(key, value)
+
+    def _put_memory(self, key: str, value: Dict[str, Any]) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # 刷新修改时间，淘汰时视为最近使用
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ 图像理解缓存文件损坏，已忽略: {path.name} ({e})")
+            return None
+
+    def _write_disk(self, key: str, value: Dict[str, Any]) -> None:
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        try:
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self._prune_disk()
+        except OSError as e:
+            logger.warning(f"⚠️ 图像理解缓存写入磁盘失败: {e}")
+
+    def _prune_disk(self) -> None:
+        files = list(self.cache_dir.glob("*.json"))
+        overflow = len(files) - self.max_disk_entries
+        if overflow <= 0:
+            return
+        files.sort(key=lambda p: p.stat().st_mtime)
+        for path in files[:overflow]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """清空缓存（含磁盘）"""
+        with self._lock:
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.cache_dir is not None:
+            for path in self.cache_dir.glob("*.json"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_enabled": self.cache_dir is not None,
+        }
+
+
+# ============================================================================
+# 全局单例
+# ============================================================================
+
+_cache: Optional[ImageAnalysisCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_image_analysis_cache() -> Optional[ImageAnalysisCache]:
+    """获取全局图像理解缓存（VISUAL_IMAGE_CACHE_ENABLED=false 时返回 None）"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from ..core.config import settings
+                cfg = settings.visual
+                if not cfg.IMAGE_CACHE_ENABLED:
+                    return None
+                _cache = ImageAnalysisCache(
+                    max_entries=cfg.IMAGE_CACHE_MAX_ENTRIES,
+                    cache_dir=cfg.IMAGE_CACHE_DIR or None,
+                    max_disk_entries=cfg.IMAGE_CACHE_MAX_DISK_ENTRIES,
+                )
+    return _cache
+
+
+def reset_image_analysis_cache() -> None:
+    """重置全局缓存（用于测试）"""
+    global _cache
+    with _cache_lock:
+        _cache = None
@@ -2,7 +2,6 @@
 图像理解工具 - 使用 LLM Vision API 理解图片的风格、元素、主题等
 同时完成 OCR 文字识别（一次 API 调用完成两个任务）
 """
-import base64
 from typing import Dict, Any, Optional
 from ..core.logger import get_logger
 from ..core.llm import LLMClientFactory
@@ -10,6 +9,8 @@ from ..core.config import settings
 from ..core.exceptions import VibePosterException
 from ..prompts import visual as visual_prompt
 from ..core.utils import parse_llm_json_response
+from .image_analysis_cache import get_image_analysis_cache, image_digest
+from .vision import image_to_vision_data_url
 
 logger = get_logger(__name__)
 
@@ -28,6 +29,14 @@ def analyze_image_with_llm(
     Returns:
         完整的分析结果字典，包含所有图像理解信息（OCR + 风格 + 配色等）
     """
+    cache = get_image_analysis_cache()
+    cache_key = image_digest(image_data, user_prompt) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"💾 图像分析命中缓存: {cache_key[:12]}")
+            return cached
+
     try:
         vision_provider = (settings.visual.VISION_PROVIDER or settings.visual.PROVIDER).value
         vision_api_key = settings.visual.VISION_API_KEY or settings.visual.API_KEY
@@ -38,9 +47,10 @@ def analyze_image_with_llm(
             provider=vision_provider,
             api_key=vision_api_key,
             base_url=vision_base_url,
+            cache_namespace="image_understanding",
         )
         
-        image_base64 = base64.b64encode(image_data).decode('utf-8')
+        image_url = image_to_vision_data_url(image_data)
         
         prompts = visual_prompt.get_prompt(user_prompt if user_prompt else "无")
         prompt = f"{prompts['system']}\n\n{prompts['user']}"
@@ -60,7 +70,7 @@ def analyze_image_with_llm(
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_base64}"
+                                "url": image_url
                             }
                         }
                     ]
@@ -101,6 +111,10 @@ def analyze_image_with_llm(
         style = result.get("style", "unknown")
         
         logger.info(f"✅ 图像分析完成: 风格={style}, 识别文字数={ocr_count}")
+
+        # 解析失败（回退到 fallback）的结果不缓存，下次仍会重试
+        if cache is not None and result is not fallback:
+            cache.set(cache_key, result)
         return result
         
     except Exception as e:
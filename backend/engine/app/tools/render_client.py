@@ -3,11 +3,13 @@
 
 用于 Critic Agent 双路审核中的视觉审核路径：
 将 poster JSON 发送到渲染服务，获取渲染后的 PNG 图片。
+请求走共享连接池（core/http_client.py），多次审核复用 keep-alive 连接。
 """
 import httpx
 from typing import Dict, Any
 
 from ..core.config import settings
+from ..core.http_client import get_async_http_client, get_http_client
 from ..core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -33,24 +35,35 @@ def render_poster_to_image(poster_data: Dict[str, Any]) -> bytes:
     logger.info(f"🖼️ 调用渲染服务: {settings.critic.RENDER_SERVICE_URL}")
 
     try:
-        with httpx.Client(timeout=RENDER_TIMEOUT) as client:
-            response = client.post(url, json=poster_data)
+        response = get_http_client().post(url, json=poster_data, timeout=RENDER_TIMEOUT)
 
-        if response.status_code != 200:
-            error_detail = response.text[:200]
-            raise RuntimeError(
-                f"渲染服务返回 {response.status_code}: {error_detail}"
-            )
+        return _read_image_response(response)
+
+    except httpx.ConnectError:
+        raise RuntimeError(
+            f"无法连接渲染服务 ({settings.critic.RENDER_SERVICE_URL})，请确认服务已启动"
+        )
+    except httpx.TimeoutException:
+        raise RuntimeError(
+            f"渲染服务超时 ({RENDER_TIMEOUT}s)"
+        )
 
-        content_type = response.headers.get("content-type", "")
-        if "image" not in content_type:
-            raise RuntimeError(
-                f"渲染服务返回非图片类型: {content_type}"
-            )
 
-        image_bytes = response.content
-        logger.info(f"✅ 渲染成功，图片大小: {len(image_bytes)} bytes")
-        return image_bytes
+async def arender_poster_to_image(poster_data: Dict[str, Any]) -> bytes:
+    """
+    render_poster_to_image 的异步版本（供异步 Critic 审核路径使用）。
+
+    Raises:
+        RuntimeError: 渲染服务不可用或返回错误
+    """
+    url = f"{settings.critic.RENDER_SERVICE_URL}/api/render/image?format=png"
+
+    logger.info(f"🖼️ 调用渲染服务 (async): {settings.critic.RENDER_SERVICE_URL}")
+
+    try:
+        response = await get_async_http_client().post(url, json=poster_data, timeout=RENDER_TIMEOUT)
+
+        return _read_image_response(response)
 
     except httpx.ConnectError:
         raise RuntimeError(
@@ -60,3 +73,22 @@ def render_poster_to_image(poster_data: Dict[str, Any]) -> bytes:
         raise RuntimeError(
             f"渲染服务超时 ({RENDER_TIMEOUT}s)"
         )
+
+
+def _read_image_response(response: httpx.Response) -> bytes:
+    """校验渲染服务响应并返回图片字节"""
+    if response.status_code != 200:
+        error_detail = response.text[:200]
+        raise RuntimeError(
+            f"渲染服务返回 {response.status_code}: {error_detail}"
+        )
+
+    content_type = response.headers.get("content-type", "")
+    if "image" not in content_type:
+        raise RuntimeError(
+            f"渲染服务返回非图片类型: {content_type}"
+        )
+
+    image_bytes = response.content
+    logger.info(f"✅ 渲染成功，图片大小: {len(image_bytes)} bytes")
+    return image_bytes
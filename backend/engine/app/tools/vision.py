@@ -2,9 +2,12 @@
 视觉处理工具 — 图像分析、合成、编码
 负责底层的图像处理，不涉及决策，只干活
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
 import base64
+import hashlib
 import io
+import threading
 from PIL import Image
 import numpy as np
 from ..core.logger import get_logger
@@ -82,3 +85,115 @@ def image_to_base64(image_data: bytes, mime_type: str = "image/png") -> str:
     """
     b64_img = base64.b64encode(image_data).decode("utf-8")
     return f"data:{mime_type};base64,{b64_img}"
+
+
+def detect_image_mime(image_data: bytes) -> str:
+    """按文件头识别图片 MIME 类型（无法识别时为 image/png）"""
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            return Image.MIME.get(img.format or "", "image/png")
+    except Exception:
+        return "image/png"
+
+
+# =============================================================================
+# Vision LLM 请求预处理
+# =============================================================================
+
+_VISION_MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+# 最近处理过的图片（键 = 原图摘要 + 参数），同一请求内的重试 / 多次审核直接复用
+_VISION_PAYLOAD_CACHE_SIZE = 16
+_vision_payload_cache: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+_vision_payload_lock = threading.Lock()
+
+
+def _encode_for_vision(image_data: bytes, max_edge: int, fmt: str, quality: int) -> Tuple[bytes, str]:
+    img = Image.open(io.BytesIO(image_data))
+    img.load()
+    original_mime = Image.MIME.get(img.format or "", "image/png")
+
+    if max_edge > 0 and max(img.size) > max_edge:
+        scale = max_edge / max(img.size)
+        new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img = img.resize(new_size, Image.LANCZOS)
+        resized = True
+    else:
+        resized = False
+
+    if fmt == "jpeg":
+        # JPEG 不支持透明通道：铺白底
+        if img.mode in ("RGBA", "LA", "P"):
+            rgba = img.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.split()[-1])
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+    elif img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+
+    buf = io.BytesIO()
+    save_kwargs: Dict[str, Any] = {"optimize": True}
+    if fmt in ("jpeg", "webp"):
+        save_kwargs["quality"] = quality
+    img.save(buf, format=fmt.upper(), **save_kwargs)
+    encoded = buf.getvalue()
+
+    # 未缩放且重新编码反而更大时，保留原图
+    if not resized and len(encoded) >= len(image_data):
+        return image_data, original_mime
+    return encoded, _VISION_MIME_TYPES[fmt]
+
+
+def prepare_image_for_vision(
+    image_data: bytes,
+    max_edge: Optional[int] = None,
+    fmt: Optional[str] = None,
+    quality: Optional[int] = None,
+) -> Tuple[bytes, str]:
+    """
+    发送给 Vision LLM 前压缩图片：按最长边缩放并重新编码
+
+    Args:
+        image_data: 原始图片二进制数据
+        max_edge: 最长边像素（默认 LLM_VISION_IMAGE_MAX_EDGE，0 表示不缩放）
+        fmt: 编码格式 jpeg / webp / png（默认 LLM_VISION_IMAGE_FORMAT）
+        quality: JPEG/WebP 质量（默认 LLM_VISION_IMAGE_QUALITY）
+
+    Returns:
+        (处理后的图片字节, MIME 类型)；处理失败时返回原图及按文件头识别的 MIME 类型
+    """
+    from ..core.config import settings
+
+    max_edge = settings.llm.VISION_IMAGE_MAX_EDGE if max_edge is None else max_edge
+    fmt = (fmt or settings.llm.VISION_IMAGE_FORMAT).lower()
+    quality = quality or settings.llm.VISION_IMAGE_QUALITY
+
+    key = f"{hashlib.sha256(image_data).hexdigest()}:{max_edge}:{fmt}:{quality}"
+    with _vision_payload_lock:
+        cached = _vision_payload_cache.get(key)
+        if cached is not None:
+            _vision_payload_cache.move_to_end(key)
+            return cached
+
+    try:
+        result = _encode_for_vision(image_data, max_edge, fmt, quality)
+    except Exception as e:
+        logger.warning(f"⚠️ Vision 图片预处理失败，使用原图: {e}")
+        return image_data, detect_image_mime(image_data)
+
+    if result[0] is not image_data:
+        logger.info(f"🗜️ Vision 图片压缩: {len(image_data) / 1024:.0f}KB → {len(result[0]) / 1024:.0f}KB ({fmt})")
+
+    with _vision_payload_lock:
+        _vision_payload_cache[key] = result
+        while len(_vision_payload_cache) > _VISION_PAYLOAD_CACHE_SIZE:
+            _vision_payload_cache.popitem(last=False)
+    return result
+
+
+def image_to_vision_data_url(image_data: bytes) -> str:
+    """预处理图片并编码为 data URL（供 Vision LLM 的 image_url 使用）"""
+    payload, mime_type = prepare_image_for_vision(image_data)
+    return image_to_base64(payload, mime_type=mime_type)
@@ -101,3 +101,57 @@ def sample_poster_data() -> dict:
         ]
     }
 
+
+
+@pytest.fixture(autouse=True)
+def _reset_llm_cache():
+    """每个用例使用全新的 LLM 响应缓存，避免 mock 响应在用例间串用"""
+    from app.core.llm import LLMClientFactory
+    from app.core.llm_cache import reset_llm_cache
+
+    reset_llm_cache()
+    LLMClientFactory._cached_clients.clear()
+    yield
+    reset_llm_cache()
+    LLMClientFactory._cached_clients.clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_image_analysis_cache(tmp_path, monkeypatch):
+    """图像理解缓存落盘到临时目录，且每个用例重新创建"""
+    from app.core.config import settings
+    from app.tools.image_analysis_cache import reset_image_analysis_cache
+
+    monkeypatch.setattr(settings.visual, "IMAGE_CACHE_DIR", str(tmp_path / "image_analysis_cache"))
+    reset_image_analysis_cache()
+    yield
+    reset_image_analysis_cache()
+
+
+@pytest.fixture(autouse=True)
+def _memory_only_rag_store(monkeypatch):
+    """知识库不读写默认的 data/rag_store（需要持久化的用例显式传入 tmp_path）"""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings.rag, "STORE_DIR", "")
+
+
+@pytest.fixture(autouse=True)
+def _reset_blob_store(monkeypatch):
+    """每个用例使用全新的内存图片存储（不写入默认的 data/blobs 目录）"""
+    from app.core.blob_store import reset_blob_store
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings.blob, "BACKEND", "memory")
+    reset_blob_store()
+    yield
+    reset_blob_store()
+
+
+@pytest.fixture(autouse=True)
+def _reset_rule_critic_stats():
+    """规则预审统计按用例隔离"""
+    from app.agents.rule_critic import reset_rule_critic_stats
+
+    reset_rule_critic_stats()
+    yield
@@ -5,7 +5,7 @@ import json
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, AsyncMock, patch
 
 from app.main import app
 
@@ -52,7 +52,7 @@ class TestStepPlanRoute:
 class TestStepAssetsRoute:
     """Step 2: /api/step/assets 路由测试"""
 
-    @patch("app.api.routes.steps.search_assets_multiple")
+    @patch("app.services.asset_service.asearch_assets_multiple", new_callable=AsyncMock)
     def test_assets_text_only(self, mock_search):
         mock_search.return_value = [
             "https://example.com/bg1.jpg",
@@ -74,18 +74,25 @@ class TestStepAssetsRoute:
         data = response.json()
         assert data["step"] == "assets"
         assert len(data["candidates"]) == 2
-        mock_search.assert_called_once()
+        mock_search.assert_awaited_once()
 
 
 class TestStepLayoutsRoute:
     """Step 3: /api/step/layouts 路由测试"""
 
-    @patch("app.api.routes.steps.run_layout_agent")
-    def test_layouts_success(self, mock_layout):
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    def test_layouts_success(self, mock_layout, mock_critic):
         mock_layout.return_value = {
             "canvas": {"width": 1080, "height": 1920, "backgroundColor": "#FFFFFF"},
-            "layers": [],
+            "layers": [
+                {
+                    "id": "title", "type": "text", "content": "Test",
+                    "x": 100, "y": 100, "width": 600, "height": 80,
+                },
+            ],
         }
+        mock_critic.return_value = {"status": "PASS", "feedback": "OK", "issues": []}
 
         response = client.post(
             "/api/step/layouts",
@@ -95,6 +102,7 @@ class TestStepLayoutsRoute:
                 "canvas_width": 1080,
                 "canvas_height": 1920,
                 "count": 2,
+                "mode": "per_strategy",
             },
         )
 
@@ -102,13 +110,277 @@ class TestStepLayoutsRoute:
         data = response.json()
         assert data["step"] == "layouts"
         assert len(data["layouts"]) == 2
-        assert mock_layout.call_count == 2
+        assert mock_layout.await_count == 2
+        assert mock_critic.await_count == 2
+
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    def test_layouts_keep_candidate_order(self, mock_layout, mock_critic):
+        """先完成的候选不会排到前面：/layouts 按候选序号返回"""
+        import asyncio
+        from app.api.routes.steps import _STYLE_HINTS
+
+        async def _layout(style_hint, **kwargs):
+            idx = _STYLE_HINTS.index(style_hint)
+            await asyncio.sleep(0.03 * (3 - idx))   # 候选 0 最慢
+            return {
+                "canvas": {"width": 1080, "height": 1920, "backgroundColor": "#FFFFFF"},
+                "layers": [
+                    {
+                        "id": "title", "type": "text", "content": f"候选 {idx}",
+                        "x": 100, "y": 100, "width": 600, "height": 80,
+                    },
+                ],
+            }
+
+        mock_layout.side_effect = _layout
+        mock_critic.return_value = {"status": "PASS", "feedback": "OK", "issues": []}
+
+        response = client.post(
+            "/api/step/layouts",
+            json={
+                "design_brief": {"title": "Test"},
+                "selected_asset_url": "https://example.com/bg.jpg",
+                "count": 3,
+                "mode": "per_strategy",
+            },
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        titles = [layout["layers"][0]["content"] for layout in response.json()["layouts"]]
+        assert titles == ["候选 0", "候选 1", "候选 2"]
+
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    def test_layouts_respects_concurrency_limit(self, mock_layout, mock_critic):
+        import asyncio
+
+        in_flight = {"now": 0, "peak": 0}
+
+        async def _slow_layout(**kwargs):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            return {"canvas": {}, "layers": []}
+
+        mock_layout.side_effect = _slow_layout
+
+        with patch("app.api.routes.steps.settings.llm.MAX_CONCURRENCY", 2):
+            response = client.post(
+                "/api/step/layouts",
+                json={
+                    "design_brief": {"title": "Test"},
+                    "selected_asset_url": "https://example.com/bg.jpg",
+                    "count": 6,
+                    "mode": "per_strategy",
+                },
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert mock_layout.await_count == 6
+        assert in_flight["peak"] <= 2
+
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    def test_concurrency_limit_shared_across_requests(self, mock_layout, mock_critic):
+        """并发上限是进程级的：两个同时进行的请求共享同一组名额"""
+        import asyncio
+        from app.api.routes.steps import LayoutsRequest, step_layouts
+
+        in_flight = {"now": 0, "peak": 0}
+
+        async def _slow_layout(**kwargs):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            return {"canvas": {}, "layers": []}
+
+        mock_layout.side_effect = _slow_layout
+        req = LayoutsRequest(
+            design_brief={"title": "Test"},
+            selected_asset_url="https://example.com/bg.jpg",
+            count=4,
+            mode="per_strategy",
+        )
+
+        async def _two_requests():
+            return await asyncio.gather(step_layouts(req), step_layouts(req))
+
+        with patch("app.api.routes.steps.settings.llm.MAX_CONCURRENCY", 2):
+            asyncio.run(_two_requests())
+
+        assert mock_layout.await_count == 8
+        assert in_flight["peak"] == 2
+
+
+class TestStepLayoutsStreamRoute:
+    """Step 3（流式）: /api/step/layouts/stream 路由测试"""
+
+    _REQUEST = {
+        "design_brief": {"title": "Test"},
+        "selected_asset_url": "https://example.com/bg.jpg",
+        "count": 2,
+        "mode": "per_strategy",
+    }
+
+    @staticmethod
+    def _valid_poster():
+        return {
+            "canvas": {"width": 1080, "height": 1920, "backgroundColor": "#FFFFFF"},
+            "layers": [
+                {
+                    "id": "title", "type": "text", "content": "Test",
+                    "x": 100, "y": 100, "width": 600, "height": 80,
+                },
+            ],
+        }
+
+    @staticmethod
+    def _read_events(response):
+        return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    def test_stream_emits_layouts_and_done(self, mock_layout, mock_critic):
+        mock_layout.side_effect = lambda **kw: self._valid_poster()
+        mock_critic.return_value = {"status": "PASS", "feedback": "OK", "issues": []}
+
+        response = client.post("/api/step/layouts/stream", json=self._REQUEST)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = self._read_events(response)
+        kinds = [e["event"] for e in events]
+        assert kinds.count("generated") == 2
+        assert kinds.count("validated") == 2
+        assert kinds.count("layout") == 2
+        assert events[-1] == {"event": "done", "total": 2, "passed": 2}
+        for e in events:
+            if e["event"] == "layout":
+                assert e["poster"]["_review"]["status"] == "PASS"
+
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    def test_stream_reports_rule_rejection(self, mock_layout, mock_critic):
+        mock_layout.return_value = {"canvas": {}, "layers": []}
+
+        response = client.post("/api/step/layouts/stream", json=self._REQUEST)
+
+        events = self._read_events(response)
+        rejected = [e for e in events if e["event"] == "rejected"]
+        assert len(rejected) == 2
+        assert all(e["stage"] == "rule" for e in rejected)
+        assert events[-1]["passed"] == 0
+        mock_critic.assert_not_awaited()
+
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    def test_stream_retries_critic_rejection_once(self, mock_layout, mock_critic):
+        mock_layout.side_effect = lambda **kw: self._valid_poster()
+        mock_critic.side_effect = [
+            {"status": "REJECT", "feedback": "对比度不足", "issues": ["contrast"]},
+            {"status": "PASS", "feedback": "OK", "issues": []},
+        ]
+
+        response = client.post(
+            "/api/step/layouts/stream", json={**self._REQUEST, "count": 1},
+        )
+
+        kinds = [e["event"] for e in self._read_events(response)]
+        assert kinds == [
+            "generated", "validated", "rejected", "retrying",
+            "generated", "validated", "layout", "done",
+        ]
+        retry_call = mock_layout.await_args_list[1]
+        assert retry_call.kwargs["review_feedback"]["status"] == "REJECT"
+
+
+class TestStepLayoutsMultiStrategyRoute:
+    """Step 3（多策略模式）: 一次 LLM 调用，本地排出全部候选"""
+
+    _REQUEST = {
+        "design_brief": {"title": "Test"},
+        "selected_asset_url": "https://example.com/bg.jpg",
+        "count": 3,
+        "mode": "multi_strategy",
+    }
+
+    @staticmethod
+    def _variants(n):
+        strategies = ["bottom_heavy", "centered", "top_text", "diagonal"]
+        return [
+            {**TestStepLayoutsStreamRoute._valid_poster(), "layout_strategy": strategies[i]}
+            for i in range(n)
+        ]
+
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent_multi", new_callable=AsyncMock)
+    def test_single_llm_call(self, mock_multi, mock_layout, mock_critic):
+        mock_multi.return_value = self._variants(3)
+        mock_critic.return_value = {"status": "PASS", "feedback": "OK", "issues": []}
+
+        response = client.post("/api/step/layouts", json=self._REQUEST)
+
+        layouts = response.json()["layouts"]
+        assert {p["layout_strategy"] for p in layouts} == {"bottom_heavy", "centered", "top_text"}
+        assert mock_multi.await_count == 1
+        assert mock_multi.await_args.kwargs["count"] == 3
+        mock_layout.assert_not_awaited()
+
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent_multi", new_callable=AsyncMock)
+    def test_default_mode_from_settings(self, mock_multi, mock_layout, mock_critic):
+        mock_multi.return_value = self._variants(3)
+        mock_layout.return_value = TestStepLayoutsStreamRoute._valid_poster()
+        mock_critic.return_value = {"status": "PASS", "feedback": "OK", "issues": []}
+        request = {k: v for k, v in self._REQUEST.items() if k != "mode"}
+
+        with patch("app.api.routes.steps.settings.layout.MULTI_STRATEGY", False):
+            client.post("/api/step/layouts", json=request)
+
+        mock_multi.assert_not_awaited()
+        assert mock_layout.await_count == 3
+
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent_multi", new_callable=AsyncMock)
+    def test_reject_retries_with_same_strategy(self, mock_multi, mock_layout, mock_critic):
+        mock_multi.return_value = self._variants(1)
+        mock_layout.return_value = TestStepLayoutsStreamRoute._valid_poster()
+        mock_critic.side_effect = [
+            {"status": "REJECT", "feedback": "对比度不足", "issues": ["contrast"]},
+            {"status": "PASS", "feedback": "OK", "issues": []},
+        ]
+
+        response = client.post("/api/step/layouts", json={**self._REQUEST, "count": 1})
+
+        assert len(response.json()["layouts"]) == 1
+        retry = mock_layout.await_args
+        assert "bottom_heavy" in retry.kwargs["style_hint"]
+        assert retry.kwargs["review_feedback"]["status"] == "REJECT"
+
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock)
+    @patch("app.api.routes.steps.arun_layout_agent_multi", new_callable=AsyncMock)
+    def test_falls_back_to_per_strategy_on_failure(self, mock_multi, mock_layout, mock_critic):
+        mock_multi.return_value = []
+        mock_layout.return_value = TestStepLayoutsStreamRoute._valid_poster()
+        mock_critic.return_value = {"status": "PASS", "feedback": "OK", "issues": []}
+
+        response = client.post("/api/step/layouts", json=self._REQUEST)
+
+        assert len(response.json()["layouts"]) == 3
+        assert mock_layout.await_count == 3
 
 
 class TestStepFinalizeRoute:
     """Step 4: /api/step/finalize 路由测试"""
 
-    @patch("app.api.routes.steps.run_critic_agent")
+    @patch("app.api.routes.steps.arun_critic_agent", new_callable=AsyncMock)
     def test_finalize_pass(self, mock_critic):
         mock_critic.return_value = {"status": "PASS", "feedback": ""}
 
@@ -128,6 +400,42 @@ class TestStepFinalizeRoute:
         assert data["review"]["status"] == "PASS"
 
 
+class TestBrandUploadBatchRoute:
+    """/api/brand/upload-batch 路由测试"""
+
+    @patch("app.api.routes.knowledge.get_knowledge_base")
+    def test_upload_batch(self, mock_kb):
+        mock_kb.return_value.add_documents.side_effect = lambda items: [f"doc_{i}" for i, _ in enumerate(items)]
+
+        response = client.post(
+            "/api/brand/upload-batch",
+            json={"documents": [
+                {"text": "主色为红色 #C7000B", "brand_name": "华为", "category": "配色方案"},
+                {"text": "标题使用无衬线字体", "brand_name": "华为", "category": "字体规范"},
+            ]},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()["data"]
+        assert data["count"] == 2
+        assert [d["category"] for d in data["documents"]] == ["配色方案", "字体规范"]
+        assert [d["doc_id"] for d in data["documents"]] == ["doc_0", "doc_1"]
+        items = mock_kb.return_value.add_documents.call_args.args[0]
+        assert items[0]["metadata"] == {"brand": "华为", "category": "配色方案", "type": "user_upload"}
+        assert "id" not in items[0]  # ID 由知识库按内容生成
+
+    def test_upload_batch_empty(self):
+        response = client.post("/api/brand/upload-batch", json={"documents": []})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_upload_batch_blank_text(self):
+        response = client.post(
+            "/api/brand/upload-batch",
+            json={"documents": [{"text": "   ", "brand_name": "华为"}]},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 class TestHealthCheck:
     """健康检查测试"""
 
@@ -0,0 +1,145 @@
+"""
+素材库工具测试
+测试 Flux + Pexels 并发获取候选背景图与 deadline 行为（httpx.MockTransport，不访问外网）
+"""
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from unittest.mock import patch
+
+from app.core.blob_store import is_asset_ref, resolve_asset_ref
+from app.tools import asset_db
+
+
+FLUX_URL = "https://flux.test/generate"
+
+
+def _client_factory(handler):
+    def factory():
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return factory
+
+
+def _pexels_payload(n: int) -> dict:
+    return {"photos": [{"src": {"large": f"https://images.test/p{i}.jpg"}} for i in range(n)]}
+
+
+def _run(handler, count=3, deadline=5.0, flux_key="fk", pexels_key="pk"):
+    with patch.object(asset_db, "get_async_http_client", _client_factory(handler)), \
+         patch.object(asset_db, "FLUX_API_KEY", flux_key), \
+         patch.object(asset_db, "PEXELS_API_KEY", pexels_key), \
+         patch.object(asset_db, "FLUX_API_URL", FLUX_URL):
+        return asyncio.run(asset_db.asearch_assets_multiple(["tech"], {}, count=count, deadline=deadline))
+
+
+class TestAsearchAssetsMultiple:
+    """并发获取候选背景图"""
+
+    def test_flux_first_then_pexels(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "flux.test":
+                return httpx.Response(200, json={"image": "RkxVWA=="})
+            if request.url.host == "api.pexels.com":
+                return httpx.Response(200, json=_pexels_payload(3))
+            return httpx.Response(200, content=request.url.path.encode())
+
+        results = _run(handler, count=3)
+
+        assert len(results) == 3
+        assert all(is_asset_ref(r) for r in results)
+        assert resolve_asset_ref(results[0]) == (b"FLUX", "image/jpeg")
+        assert resolve_asset_ref(results[1])[0].startswith(b"/p")
+
+    def test_requests_run_concurrently(self):
+        delay = 0.3
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(delay)
+            if request.url.host == "flux.test":
+                return httpx.Response(200, json={"image": "QQ=="})
+            if request.url.host == "api.pexels.com":
+                return httpx.Response(200, json=_pexels_payload(4))
+            return httpx.Response(200, content=b"img")
+
+        start = time.perf_counter()
+        results = _run(handler, count=5)
+        elapsed = time.perf_counter() - start
+
+        # 串行需要 flux + search + 4 次下载 = 6 × delay；并发约为 search + download = 2 × delay
+        assert len(results) == 5
+        assert elapsed < 4 * delay
+
+    def test_deadline_returns_partial_results(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "flux.test":
+                await asyncio.sleep(5)
+                return httpx.Response(200, json={"image": "QQ=="})
+            if request.url.host == "api.pexels.com":
+                return httpx.Response(200, json=_pexels_payload(2))
+            if request.url.path == "/p1.jpg":
+                await asyncio.sleep(5)
+            return httpx.Response(200, content=b"img")
+
+        start = time.perf_counter()
+        results = _run(handler, count=3, deadline=0.5)
+
+        assert time.perf_counter() - start < 2
+        assert len(results) == 1
+        assert resolve_asset_ref(results[0]) == (b"img", "image/jpeg")
+
+    def test_failures_fall_back_to_placeholders(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(500)
+
+        results = _run(handler, count=2)
+
+        assert 1 <= len(results) <= 2
+        assert all(not is_asset_ref(r) for r in results)
+
+    def test_store_failure_is_contained(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "flux.test":
+                return httpx.Response(200, json={"image": "QQ=="})
+            if request.url.host == "api.pexels.com":
+                return httpx.Response(200, json=_pexels_payload(2))
+            return httpx.Response(200, content=b"img")
+
+        def failing_store(data, mime_type="image/png"):
+            raise OSError("disk full")
+
+        with patch.object(asset_db, "store_bytes", failing_store):
+            results = _run(handler, count=2)
+
+        assert results and all(not is_asset_ref(r) for r in results)
+
+    def test_store_runs_off_event_loop(self):
+        threads = []
+
+        def recording_store(data, mime_type="image/png"):
+            threads.append(threading.current_thread() is threading.main_thread())
+            return "asset://" + "0" * 64
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "api.pexels.com":
+                return httpx.Response(200, json=_pexels_payload(2))
+            return httpx.Response(200, content=b"img")
+
+        with patch.object(asset_db, "store_bytes", recording_store):
+            _run(handler, count=2, flux_key="")
+
+        assert threads == [False, False]
+
+    def test_no_api_keys_uses_placeholders(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            raise AssertionError("should not hit network")
+
+        results = _run(handler, count=2, flux_key="", pexels_key="")
+        assert len(results) >= 1
+
+    def test_sync_wrapper(self):
+        with patch.object(asset_db, "FLUX_API_KEY", ""), patch.object(asset_db, "PEXELS_API_KEY", ""):
+            results = asset_db.search_assets_multiple(["tech"], {}, count=1)
+        assert len(results) == 1
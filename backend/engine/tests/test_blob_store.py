@@ -0,0 +1,222 @@
+"""
+图片内容寻址存储测试
+测试 memory / filesystem 后端、asset:// 引用转换、/api/assets 路由与载荷体积
+"""
+import base64
+import hashlib
+import json
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.blob_store import (
+    FileSystemBlobStore,
+    MemoryBlobStore,
+    asset_ref_to_data_url,
+    digest_from_ref,
+    intern_data_url,
+    get_blob_store,
+    is_asset_ref,
+    pin_asset_refs,
+    resolve_asset_ref,
+    store_bytes,
+)
+from app.main import app
+
+client = TestClient(app)
+
+
+class TestBackends:
+    """存储后端"""
+
+    @pytest.fixture(params=["memory", "filesystem"])
+    def store(self, request, tmp_path):
+        if request.param == "memory":
+            return MemoryBlobStore()
+        return FileSystemBlobStore(str(tmp_path / "blobs"))
+
+    def test_put_returns_content_address(self, store):
+        ref = store.put(b"hello", "image/png")
+
+        assert ref == "asset://" + hashlib.sha256(b"hello").hexdigest()
+        assert store.get(digest_from_ref(ref)) == (b"hello", "image/png")
+
+    def test_put_is_idempotent(self, store):
+        assert store.put(b"same", "image/png") == store.put(b"same", "image/jpeg")
+
+    def test_missing_digest(self, store):
+        assert store.get("0" * 64) is None
+        assert not store.contains("0" * 64)
+
+    def test_memory_evicts_by_size(self):
+        store = MemoryBlobStore(max_bytes=10)
+        first = store.put(b"123456", "a/b")
+        second = store.put(b"abcdef", "a/b")
+
+        assert store.get(digest_from_ref(first)) is None
+        assert store.get(digest_from_ref(second)) is not None
+
+    def test_memory_keeps_pinned(self):
+        store = MemoryBlobStore(max_bytes=10)
+        pinned = digest_from_ref(store.put(b"123456", "a/b"))
+        store.pin(pinned)
+        loose = digest_from_ref(store.put(b"abcdef", "a/b"))
+        store.put(b"ghijkl", "a/b")
+
+        assert store.get(pinned) is not None
+        assert store.get(loose) is None
+
+    def test_memory_pin_expires(self):
+        store = MemoryBlobStore(max_bytes=10, pin_ttl=60)
+        pinned = digest_from_ref(store.put(b"123456", "a/b"))
+        store.pin(pinned)
+        store._pinned[pinned] = time.time() - 1   # 钉住已到期
+        store.put(b"abcdef", "a/b")
+
+        assert store.get(pinned) is None
+        assert pinned not in store._pinned
+
+    def test_filesystem_sweeps_expired(self, tmp_path):
+        store = FileSystemBlobStore(str(tmp_path), ttl=3600)
+        old = digest_from_ref(store.put(b"old", "image/png"))
+        fresh = digest_from_ref(store.put(b"fresh", "image/png"))
+        past = time.time() - 7200
+        os.utime(store._path(old), (past, past))
+
+        assert store.sweep() == 1
+        assert store.get(old) is None
+        assert not store._path(old).with_suffix(".mime").exists()
+        assert store.get(fresh) == (b"fresh", "image/png")
+
+    def test_filesystem_sweeps_over_budget_oldest_first(self, tmp_path):
+        store = FileSystemBlobStore(str(tmp_path), max_bytes=12)
+        digests = []
+        for i, data in enumerate((b"aaaaaa", b"bbbbbb", b"cccccc")):
+            digests.append(digest_from_ref(store.put(data, "image/png")))
+            past = time.time() - 100 + i
+            os.utime(store._path(digests[-1]), (past, past))
+        store.pin(digests[0])   # 钉住同时刷新访问时间
+        store.sweep()
+
+        assert store.get(digests[0]) is not None
+        assert store.get(digests[1]) is None
+        assert store.get(digests[2]) is not None
+
+    def test_filesystem_keeps_pinned_until_pin_expires(self, tmp_path):
+        store = FileSystemBlobStore(str(tmp_path), ttl=3600)
+        digest = digest_from_ref(store.put(b"poster", "image/png"))
+        store.pin(digest)
+        past = time.time() - 7200
+        os.utime(store._path(digest), (past, past))
+
+        assert store.sweep() == 0
+        store._pinned[digest] = time.time() - 1
+        assert store.sweep() == 1
+
+    def test_filesystem_write_triggers_sweep(self, tmp_path):
+        store = FileSystemBlobStore(str(tmp_path), max_bytes=8, sweep_interval=0)
+        first = digest_from_ref(store.put(b"123456", "image/png"))
+        past = time.time() - 100
+        os.utime(store._path(first), (past, past))
+        store.put(b"abcdef", "image/png")
+
+        assert store.get(first) is None
+
+    def test_default_backend_is_filesystem(self):
+        from app.core.config import BlobConfig
+
+        assert BlobConfig.model_fields["BACKEND"].default == "filesystem"
+
+    def test_filesystem_persists(self, tmp_path):
+        ref = FileSystemBlobStore(str(tmp_path)).put(b"persist", "image/webp")
+        assert FileSystemBlobStore(str(tmp_path)).get(digest_from_ref(ref)) == (b"persist", "image/webp")
+
+
+class TestRefConversion:
+    """data URL <-> asset:// 引用"""
+
+    def test_intern_data_url(self):
+        data_url = "data:image/jpeg;base64," + base64.b64encode(b"jpeg-bytes").decode()
+        ref = intern_data_url(data_url)
+
+        assert is_asset_ref(ref)
+        assert resolve_asset_ref(ref) == (b"jpeg-bytes", "image/jpeg")
+        assert asset_ref_to_data_url(ref) == data_url
+
+    def test_intern_passthrough(self):
+        assert intern_data_url("https://example.com/a.jpg") == "https://example.com/a.jpg"
+        assert intern_data_url(None) is None
+        ref = store_bytes(b"x")
+        assert intern_data_url(ref) == ref
+
+    @pytest.mark.parametrize("mime", ["text/html", "image/svg+xml", "application/javascript", None])
+    def test_intern_skips_non_raster(self, mime):
+        data_url = f"data:{mime or ''};base64," + base64.b64encode(b"<script>alert(1)</script>").decode()
+        assert intern_data_url(data_url) == data_url
+
+    def test_pin_asset_refs_walks_poster(self):
+        ref = store_bytes(b"subject", "image/png")
+        pin_asset_refs({"layers": [{"type": "image", "src": ref}], "canvas": {"width": 10}})
+        assert digest_from_ref(ref) in get_blob_store()._pinned
+
+    def test_invalid_ref(self):
+        assert digest_from_ref("asset://not-a-digest") is None
+        assert resolve_asset_ref("asset://" + "f" * 64) is None
+
+
+class TestAssetsRoute:
+    """GET /api/assets/{sha256}"""
+
+    def test_serves_bytes(self):
+        ref = store_bytes(b"\x89PNG-data", "image/png")
+        response = client.get(f"/api/assets/{digest_from_ref(ref)}")
+
+        assert response.status_code == 200
+        assert response.content == b"\x89PNG-data"
+        assert response.headers["content-type"] == "image/png"
+        assert "immutable" in response.headers["cache-control"]
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert response.headers["content-security-policy"] == "default-src 'none'"
+
+    def test_non_raster_served_as_octet_stream(self):
+        ref = get_blob_store().put(b"<svg onload=alert(1)>", "image/svg+xml")
+        response = client.get(f"/api/assets/{digest_from_ref(ref)}")
+
+        assert response.headers["content-type"] == "application/octet-stream"
+
+    def test_unknown_digest_404(self):
+        assert client.get(f"/api/assets/{'a' * 64}").status_code == 404
+
+    def test_malformed_digest_400(self):
+        assert client.get("/api/assets/xyz").status_code == 400
+
+
+class TestPayloadSize:
+    """引用 vs 内联 base64 的 JSON 载荷体积与序列化耗时"""
+
+    def test_reference_payload_is_orders_of_magnitude_smaller(self):
+        image = os.urandom(3 * 1024 * 1024)
+        inline_src = "data:image/jpeg;base64," + base64.b64encode(image).decode()
+        ref_src = store_bytes(image, "image/jpeg")
+
+        def poster(src):
+            return {
+                "canvas": {"width": 1080, "height": 1920},
+                "layers": [{"id": f"bg{i}", "type": "image", "src": src} for i in range(6)],
+            }
+
+        start = time.perf_counter()
+        inline_json = json.dumps(poster(inline_src))
+        inline_sec = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ref_json = json.dumps(poster(ref_src))
+        ref_sec = time.perf_counter() - start
+
+        print(
+            f"\n[payload] inline={len(inline_json) / 1024:.0f}KB ({inline_sec * 1000:.1f}ms) "
+            f"→ ref={len(ref_json)}B ({ref_sec * 1000:.3f}ms)"
+        )
+        assert len(ref_json) * 1000 < len(inline_json)
@@ -0,0 +1,256 @@
+"""
+约束布局测试
+测试 ConstraintContainer 的安全区 / 间距 / 对齐 / 主体避让约束，LayoutBuilder 约束模式，以及单张海报求解耗时
+"""
+import base64
+import io
+import time
+
+import pytest
+from unittest.mock import patch
+from PIL import Image
+
+pytest.importorskip("kiwisolver")
+
+from app.core.layout import ConstraintContainer, ShapeBlock, Style, TextBlock, UnsatisfiableLayout
+from app.services.renderer.layout_builder import LayoutBuilder, STRATEGIES
+from app.services.renderer.subject_bbox import place_box_in_cover, subject_content_bbox
+
+
+def _text(content, size, width=900, role="body"):
+    return TextBlock(content=content, font_size=size, max_width=width, style=Style(font_size=size), role=role)
+
+
+def _ctr(*blocks, **kwargs):
+    params = dict(width=1080, height=1920, safe_margins=(60, 60, 60, 60), gap=20, min_gap=10)
+    params.update(kwargs)
+    ctr = ConstraintContainer(**params)
+    for b in blocks:
+        ctr.add(b)
+    return ctr
+
+
+def _overlaps(e, rect):
+    x, y, w, h = rect
+    return e.x < x + w and e.x + e.width > x and e.y < y + h and e.y + e.height > y
+
+
+# ============================================================================
+# 1. ConstraintContainer
+# ============================================================================
+
+class TestConstraintContainer:
+
+    def test_stack_respects_gap_and_anchor(self):
+        a, b = _text("夏日音乐节", 96, role="title"), _text("外滩滨江草坪", 48)
+        ctr = _ctr(a, b, anchor=0.5)
+        ctr.arrange()
+
+        assert ctr.placement == "stack"
+        assert b.y - (a.y + a.height) == pytest.approx(20)
+        assert (ctr.y + ctr.height / 2) == pytest.approx(960, abs=1)
+
+    def test_alignment(self):
+        div = ShapeBlock(width=200, height=4, subtype="divider")
+        for align, expected_x in (("left", 60), ("center", 440), ("right", 820)):
+            ctr = _ctr(div, align=align)
+            ctr.arrange()
+            assert div.x == pytest.approx(expected_x)
+
+    def test_stays_in_safe_area(self):
+        ctr = _ctr(_text("标题", 96), _text("副标题", 48), anchor=0.0)
+        ctr.arrange()
+        assert ctr.y == pytest.approx(60)
+
+    def test_avoids_subject(self):
+        a, b = _text("夏日音乐节", 96, role="title"), _text("外滩滨江草坪", 48)
+        subject = (240, 700, 600, 700)
+        ctr = _ctr(a, b, anchor=0.5).avoid(*subject, margin=20)
+        ctr.arrange()
+
+        assert not any(_overlaps(e, ctr.keep_outs[0]) for e in (a, b))
+        assert ctr.placement == "stack"
+
+    def test_splits_around_subject_when_one_side_too_small(self):
+        title, body = _text("夏日音乐节", 96, role="title"), _text("外滩滨江草坪 七月十二日", 48)
+        ctr = _ctr(title, body).avoid(0, 400, 1080, 1200)
+        ctr.arrange()
+
+        assert ctr.placement == "split"
+        assert title.y + title.height <= 400
+        assert body.y >= 1600
+
+    def test_narrows_column_beside_tall_subject(self):
+        title = _text("夏日音乐节 外滩滨江草坪", 64, role="title")
+        ctr = _ctr(title).avoid(560, 0, 520, 1920)
+        ctr.arrange()
+
+        assert ctr.placement == "column"
+        assert title.x + title.width <= 560
+        assert not _overlaps(title, ctr.keep_outs[0])
+
+    def test_overflow_is_best_effort(self):
+        blocks = [_text("很长的正文内容" * 10, 60) for _ in range(6)]
+        ctr = _ctr(*blocks, height=600)
+        ctr.arrange()
+        assert ctr.placement == "overflow"
+
+    def test_full_width_shape_clamped_to_safe_area(self):
+        band = ShapeBlock(width=1080, height=8, subtype="divider")
+        title = _text("夏日音乐节", 96, role="title")
+        ctr = _ctr(title, band)
+        ctr.arrange()
+
+        assert band.width == pytest.approx(960)
+        assert band.x == pytest.approx(60)
+
+    def test_conflicting_constraints_raise_layout_error(self):
+        import kiwisolver
+
+        ctr = _ctr(_text("标题", 96))
+        with patch.object(ConstraintContainer, "_add_constraints",
+                          side_effect=kiwisolver.UnsatisfiableConstraint("x")):
+            with pytest.raises(UnsatisfiableLayout):
+                ctr.arrange()
+
+    def test_content_edit_rearranges(self):
+        a, b = _text("短", 48), _text("第二行", 48)
+        ctr = _ctr(a, b, anchor=0.0)
+        ctr.arrange()
+        before = b.y
+
+        a.update_content("很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长很长")
+        assert b.y > before
+
+
+# ============================================================================
+# 2. 主体外接框
+# ============================================================================
+
+def _subject_png():
+    img = Image.new("RGBA", (100, 200), (0, 0, 0, 0))
+    img.paste((255, 0, 0, 255), (25, 50, 75, 150))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode()
+
+
+class TestSubjectBBox:
+
+    def test_alpha_bbox(self):
+        box = subject_content_bbox(_subject_png())
+        assert (box.x0, box.y0, box.x1, box.y1) == (0.25, 0.25, 0.75, 0.75)
+
+    def test_remote_src_not_fetched(self):
+        assert subject_content_bbox("https://example.com/subject.png") is None
+
+    def test_cover_mapping(self):
+        box = subject_content_bbox(_subject_png())
+        # 100×200 cover 到 400×400：缩放 4，纵向裁掉上下各 200
+        x, y, w, h = place_box_in_cover(box, (0, 0, 400, 400))
+        assert (x, y, w, h) == (100, 0, 200, 400)
+
+
+# ============================================================================
+# 3. LayoutBuilder 约束模式
+# ============================================================================
+
+def _dsl(subject_src=None, subject_rect=None):
+    dsl = [
+        {"command": "add_title", "content": "2025 城市夏日音乐节", "font_size": 96},
+        {"command": "add_subtitle", "content": "外滩滨江草坪 · 七月十二日至十四日", "font_size": 44},
+        {"command": "add_text", "content": "连续三晚，十二组乐队轮番登场，现场设有市集与露营区。", "font_size": 32},
+        {"command": "add_cta", "content": "立即购票", "font_size": 40},
+    ]
+    if subject_src:
+        subj = {"command": "add_image", "src": subject_src, "layer_type": "subject"}
+        if subject_rect:
+            subj.update(zip(("x", "y", "width", "height"), subject_rect))
+        dsl.append(subj)
+    return dsl
+
+
+@pytest.fixture
+def constraint_mode():
+    with patch("app.services.renderer.layout_builder.settings.layout_engine.MODE", "constraint"):
+        yield
+
+
+class TestLayoutBuilderConstraint:
+
+    @pytest.mark.parametrize("size", [(1080, 1920), (1080, 1080), (1920, 1080), (1200, 300), (300, 1200)])
+    @pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+    def test_any_aspect_ratio_inside_safe_area(self, constraint_mode, strategy, size):
+        cw, ch = size
+        elements = LayoutBuilder().build(_dsl(), strategy, cw, ch)
+        margin = 0.045 * min(cw, ch)
+        texts = [e for e in elements if e["type"] == "text"]
+        assert len(texts) == 4
+        for t in texts:
+            assert t["x"] >= margin - 1 and t["x"] + t["width"] <= cw - margin + 1
+            assert t["y"] >= margin - 1
+            if size != (1200, 300):  # 极扁横幅放不下四段文字时尽量放置
+                assert t["y"] + t["height"] <= ch - margin + 1
+
+    @pytest.mark.parametrize("rect", [(0, 1000, 1080, 920), (0, 0, 1080, 900), (200, 600, 680, 700)])
+    def test_text_avoids_explicit_subject(self, constraint_mode, rect):
+        elements = LayoutBuilder().build(_dsl(_subject_png(), rect), "centered", 1080, 1920)
+        subject = next(e for e in elements if e.get("layer_type") == "subject")
+        bbox = place_box_in_cover(subject_content_bbox(subject["src"]), rect)
+
+        class _E:
+            pass
+
+        for t in (e for e in elements if e["type"] == "text"):
+            e = _E()
+            e.x, e.y, e.width, e.height = t["x"], t["y"], t["width"], t["height"]
+            assert not _overlaps(e, bbox), t["content"]
+
+    @pytest.mark.parametrize("size", [(1080, 1920), (1920, 1080)])
+    @pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+    def test_full_width_shape(self, constraint_mode, strategy, size):
+        cw, ch = size
+        dsl = _dsl()
+        dsl.insert(1, {"command": "add_shape", "width_ratio": 1.0, "height": 12})
+        elements = LayoutBuilder().build(dsl, strategy, cw, ch)
+
+        margin = 0.045 * min(cw, ch)
+        shapes = [e for e in elements if e["type"] == "rect"]
+        assert len(shapes) == 1
+        assert shapes[0]["x"] >= margin - 1 and shapes[0]["x"] + shapes[0]["width"] <= cw - margin + 1
+
+    def test_unsatisfiable_falls_back_to_strategy_regions(self, constraint_mode):
+        import kiwisolver
+
+        with patch.object(ConstraintContainer, "_add_constraints",
+                          side_effect=kiwisolver.UnsatisfiableConstraint("x")):
+            elements = LayoutBuilder().build(_dsl(), "bottom_heavy", 1080, 1920)
+        ys = [e["y"] for e in elements if e["type"] == "text"]
+        assert len(ys) == 4
+        assert min(ys) >= 0.58 * 1920 - 1
+
+    def test_strategy_mode_unchanged(self):
+        elements = LayoutBuilder().build(_dsl(), "bottom_heavy", 1080, 1920)
+        ys = [e["y"] for e in elements if e["type"] == "text"]
+        assert min(ys) >= 0.58 * 1920 - 1
+
+    @pytest.mark.slow
+    def test_solve_time_per_poster(self, constraint_mode):
+        dsl = _dsl(_subject_png(), (200, 600, 680, 700))
+        builder = LayoutBuilder()
+        builder.build(dsl, "centered", 1080, 1920)
+
+        runs = 50
+        start = time.perf_counter()
+        for i in range(runs):
+            builder.build(dsl, sorted(STRATEGIES)[i % len(STRATEGIES)], 1080, 1920)
+        per_poster = (time.perf_counter() - start) / runs
+
+        with patch("app.services.renderer.layout_builder.settings.layout_engine.MODE", "strategy"):
+            start = time.perf_counter()
+            for i in range(runs):
+                builder.build(dsl, sorted(STRATEGIES)[i % len(STRATEGIES)], 1080, 1920)
+            baseline = (time.perf_counter() - start) / runs
+
+        print(f"\n[constraint] {per_poster * 1000:.2f}ms / poster（固定区域 {baseline * 1000:.2f}ms）")
+        assert per_poster < 0.1
@@ -7,10 +7,15 @@
 - 合并逻辑 (_merge_reviews)
 - 级联流程 (run_critic_agent)
 - 工作流节点 (critic_node / should_retry_layout)
+- 异步审核 (arun_critic_agent / LLMClientFactory.get_async_client)
+- 推测式视觉审核 (CRITIC_SPECULATIVE_VISUAL_REVIEW)
 """
 import json
+import asyncio
+import threading
+import time
 import pytest
-from unittest.mock import patch, MagicMock, Mock
+from unittest.mock import patch, MagicMock, Mock, AsyncMock
 
 
 # ============================================================================
@@ -104,8 +109,8 @@ class TestCriticPrompts:
 class TestRenderClient:
     """render_client 模块测试"""
 
-    @patch("app.tools.render_client.httpx.Client")
-    def test_render_success(self, mock_client_cls, sample_poster):
+    @patch("app.tools.render_client.get_http_client")
+    def test_render_success(self, mock_get_client, sample_poster):
         from app.tools.render_client import render_poster_to_image
 
         mock_response = MagicMock()
@@ -113,33 +118,27 @@ class TestRenderClient:
         mock_response.headers = {"content-type": "image/png"}
         mock_response.content = FAKE_PNG
 
-        mock_ctx = MagicMock()
-        mock_ctx.__enter__ = Mock(return_value=MagicMock(post=Mock(return_value=mock_response)))
-        mock_ctx.__exit__ = Mock(return_value=False)
-        mock_client_cls.return_value = mock_ctx
+        mock_get_client.return_value = MagicMock(post=Mock(return_value=mock_response))
 
         result = render_poster_to_image(sample_poster)
 
         assert result == FAKE_PNG
 
-    @patch("app.tools.render_client.httpx.Client")
-    def test_render_non_200_raises(self, mock_client_cls, sample_poster):
+    @patch("app.tools.render_client.get_http_client")
+    def test_render_non_200_raises(self, mock_get_client, sample_poster):
         from app.tools.render_client import render_poster_to_image
 
         mock_response = MagicMock()
         mock_response.status_code = 500
         mock_response.text = "Internal Server Error"
 
-        mock_ctx = MagicMock()
-        mock_ctx.__enter__ = Mock(return_value=MagicMock(post=Mock(return_value=mock_response)))
-        mock_ctx.__exit__ = Mock(return_value=False)
-        mock_client_cls.return_value = mock_ctx
+        mock_get_client.return_value = MagicMock(post=Mock(return_value=mock_response))
 
         with pytest.raises(RuntimeError, match="渲染服务返回 500"):
             render_poster_to_image(sample_poster)
 
-    @patch("app.tools.render_client.httpx.Client")
-    def test_render_non_image_content_type_raises(self, mock_client_cls, sample_poster):
+    @patch("app.tools.render_client.get_http_client")
+    def test_render_non_image_content_type_raises(self, mock_get_client, sample_poster):
         from app.tools.render_client import render_poster_to_image
 
         mock_response = MagicMock()
@@ -147,40 +146,27 @@ class TestRenderClient:
         mock_response.headers = {"content-type": "application/json"}
         mock_response.content = b"{}"
 
-        mock_ctx = MagicMock()
-        mock_ctx.__enter__ = Mock(return_value=MagicMock(post=Mock(return_value=mock_response)))
-        mock_ctx.__exit__ = Mock(return_value=False)
-        mock_client_cls.return_value = mock_ctx
+        mock_get_client.return_value = MagicMock(post=Mock(return_value=mock_response))
 
         with pytest.raises(RuntimeError, match="非图片类型"):
             render_poster_to_image(sample_poster)
 
-    @patch("app.tools.render_client.httpx.Client")
-    def test_render_connect_error(self, mock_client_cls, sample_poster):
+    @patch("app.tools.render_client.get_http_client")
+    def test_render_connect_error(self, mock_get_client, sample_poster):
         import httpx
         from app.tools.render_client import render_poster_to_image
 
-        mock_ctx = MagicMock()
-        mock_ctx.__enter__ = Mock(
-            return_value=MagicMock(post=Mock(side_effect=httpx.ConnectError("refused")))
-        )
-        mock_ctx.__exit__ = Mock(return_value=False)
-        mock_client_cls.return_value = mock_ctx
+        mock_get_client.return_value = MagicMock(post=Mock(side_effect=httpx.ConnectError("refused")))
 
         with pytest.raises(RuntimeError, match="无法连接渲染服务"):
             render_poster_to_image(sample_poster)
 
-    @patch("app.tools.render_client.httpx.Client")
-    def test_render_timeout(self, mock_client_cls, sample_poster):
+    @patch("app.tools.render_client.get_http_client")
+    def test_render_timeout(self, mock_get_client, sample_poster):
         import httpx
         from app.tools.render_client import render_poster_to_image
 
-        mock_ctx = MagicMock()
-        mock_ctx.__enter__ = Mock(
-            return_value=MagicMock(post=Mock(side_effect=httpx.TimeoutException("timeout")))
-        )
-        mock_ctx.__exit__ = Mock(return_value=False)
-        mock_client_cls.return_value = mock_ctx
+        mock_get_client.return_value = MagicMock(post=Mock(side_effect=httpx.TimeoutException("timeout")))
 
         with pytest.raises(RuntimeError, match="渲染服务超时"):
             render_poster_to_image(sample_poster)
@@ -423,3 +409,271 @@ class TestCriticNode:
 
         state = {"review_feedback": {}, "_retry_count": 0}
         assert should_retry_layout(state) == "end"
+
+
+# ============================================================================
+# 6. 异步审核
+# ============================================================================
+
+class TestAsyncCriticAgent:
+    """arun_critic_agent 级联流程（与同步版本行为一致）"""
+
+    def _mock_json_review(self, return_value):
+        return patch(
+            "app.agents.critic._arun_json_review",
+            new_callable=AsyncMock, return_value=return_value,
+        )
+
+    def _mock_visual_review(self, return_value=None, side_effect=None):
+        return patch(
+            "app.agents.critic._arun_visual_review",
+            new_callable=AsyncMock, return_value=return_value, side_effect=side_effect,
+        )
+
+    def test_json_pass_visual_pass(self, sample_poster, pass_review):
+        from app.agents.critic import arun_critic_agent
+
+        visual_r = {"status": "PASS", "feedback": "视觉OK", "issues": []}
+
+        with self._mock_json_review(pass_review), \
+             self._mock_visual_review(visual_r), \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", True):
+            result = asyncio.run(arun_critic_agent(sample_poster))
+
+        assert result["status"] == "PASS"
+        assert result["review_path"] == "dual"
+
+    def test_json_reject_skips_visual(self, sample_poster, reject_review):
+        from app.agents.critic import arun_critic_agent
+
+        with self._mock_json_review(reject_review), \
+             self._mock_visual_review() as mock_vis, \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", True):
+            result = asyncio.run(arun_critic_agent(sample_poster))
+
+        assert result["status"] == "REJECT"
+        assert result["review_path"] == "json_only"
+        mock_vis.assert_not_awaited()
+
+    def test_visual_error_degrades_to_pass(self, sample_poster, pass_review):
+        from app.agents.critic import arun_critic_agent
+
+        with self._mock_json_review(pass_review), \
+             self._mock_visual_review(side_effect=RuntimeError("render down")), \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", True):
+            result = asyncio.run(arun_critic_agent(sample_poster))
+
+        assert result["status"] == "PASS"
+        assert result["review_path"] == "json_only"
+
+    def test_json_review_uses_async_client(self, sample_poster):
+        from app.agents.critic import _arun_json_review
+
+        content = json.dumps({"status": "REJECT", "feedback": "溢出", "issues": ["x"]})
+        response = MagicMock()
+        response.choices = [MagicMock(message=MagicMock(content=content))]
+        agent = MagicMock()
+        agent.ainvoke = AsyncMock(return_value=response)
+
+        with patch("app.agents.base.AgentFactory.get_critic_agent", return_value=agent):
+            result = asyncio.run(_arun_json_review(sample_poster))
+
+        assert result["status"] == "REJECT"
+        agent.ainvoke.assert_awaited_once()
+        agent.invoke.assert_not_called()
+
+
+class TestAsyncLLMClientFactory:
+    """LLMClientFactory 异步客户端"""
+
+    def test_openai_compatible_returns_async_openai(self):
+        from openai import AsyncOpenAI
+        from app.core.llm import LLMClientFactory
+
+        client = LLMClientFactory.get_async_client("deepseek", "sk-test-async", "https://api.deepseek.com")
+        assert isinstance(client, AsyncOpenAI)
+        assert LLMClientFactory.get_async_client("deepseek", "sk-test-async", "https://api.deepseek.com") is client
+
+    def test_unsupported_provider_raises(self):
+        from app.core.llm import LLMClientFactory
+
+        with pytest.raises(ValueError, match="Unsupported provider"):
+            LLMClientFactory.get_async_client("unknown", "k", "")
+
+
+# ============================================================================
+# 7. 推测式视觉审核
+# ============================================================================
+
+PATH_DELAY = 0.3
+
+
+def _speculative(enabled=True):
+    return patch("app.agents.critic.settings.critic.SPECULATIVE_VISUAL_REVIEW", enabled)
+
+
+class TestSpeculativeVisualReview:
+    """两路同时启动：延迟约为 max(path1, path2)，Path 1 REJECT 时丢弃 / 取消 Path 2"""
+
+    def test_sync_runs_paths_concurrently(self, sample_poster, pass_review):
+        from app.agents.critic import run_critic_agent
+
+        def slow_json(*args, **kwargs):
+            time.sleep(PATH_DELAY)
+            return dict(pass_review)
+
+        def slow_visual(*args, **kwargs):
+            time.sleep(PATH_DELAY)
+            return {"status": "PASS", "feedback": "视觉OK", "issues": []}
+
+        with patch("app.agents.critic._run_json_review", side_effect=slow_json), \
+             patch("app.agents.critic._run_visual_review", side_effect=slow_visual), \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", True), \
+             _speculative():
+            start = time.perf_counter()
+            result = run_critic_agent(sample_poster)
+            elapsed = time.perf_counter() - start
+
+        assert result["review_path"] == "dual"
+        assert result["status"] == "PASS"
+        assert elapsed < 1.7 * PATH_DELAY
+
+    def test_sync_reject_discards_visual(self, sample_poster, reject_review):
+        from app.agents.critic import run_critic_agent
+
+        visual_r = {"status": "PASS", "feedback": "视觉OK", "issues": []}
+        with patch("app.agents.critic._run_json_review", return_value=reject_review), \
+             patch("app.agents.critic._run_visual_review", return_value=visual_r), \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", True), \
+             _speculative():
+            result = run_critic_agent(sample_poster)
+
+        assert result["status"] == "REJECT"
+        assert result["review_path"] == "json_only"
+
+    def test_sync_reuses_shared_executor(self, sample_poster, pass_review):
+        from app.agents import critic
+
+        visual_r = {"status": "PASS", "feedback": "视觉OK", "issues": []}
+        with patch("app.agents.critic._run_json_review", return_value=pass_review), \
+             patch("app.agents.critic._run_visual_review", return_value=visual_r), \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", True), \
+             _speculative():
+            critic.run_critic_agent(sample_poster)
+            executor = critic._visual_executor
+            critic.run_critic_agent(sample_poster)
+
+        assert executor is not None
+        assert critic._visual_executor is executor
+
+    def test_sync_reject_skips_vision_after_render(self, sample_poster, reject_review):
+        from app.agents.critic import run_critic_agent
+
+        rendering = threading.Event()
+        release = threading.Event()
+
+        def slow_render(*args, **kwargs):
+            rendering.set()
+            release.wait(5)
+            return b"png"
+
+        def json_after_render_started(*args, **kwargs):
+            rendering.wait(5)
+            return dict(reject_review)
+
+        with patch("app.agents.critic._run_json_review", side_effect=json_after_render_started), \
+             patch("app.agents.critic._render_for_review", side_effect=slow_render), \
+             patch("app.agents.critic.LLMClientFactory.get_client") as mock_client, \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", True), \
+             _speculative():
+            result = run_critic_agent(sample_poster)
+            release.set()
+            time.sleep(0.1)
+
+        assert result["status"] == "REJECT"
+        mock_client.assert_not_called()
+
+    def test_not_started_when_visual_disabled(self, sample_poster, pass_review):
+        from app.agents.critic import run_critic_agent
+
+        with patch("app.agents.critic._run_json_review", return_value=pass_review), \
+             patch("app.agents.critic._run_visual_review") as mock_vis, \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", False), \
+             _speculative():
+            result = run_critic_agent(sample_poster)
+
+        assert result["review_path"] == "json_only"
+        mock_vis.assert_not_called()
+
+    def test_async_runs_paths_concurrently(self, sample_poster, pass_review):
+        from app.agents.critic import arun_critic_agent
+
+        async def slow_json(*args, **kwargs):
+            await asyncio.sleep(PATH_DELAY)
+            return dict(pass_review)
+
+        async def slow_visual(*args, **kwargs):
+            await asyncio.sleep(PATH_DELAY)
+            return {"status": "REJECT", "feedback": "不可读", "issues": ["contrast"]}
+
+        with patch("app.agents.critic._arun_json_review", side_effect=slow_json), \
+             patch("app.agents.critic._arun_visual_review", side_effect=slow_visual), \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", True), \
+             _speculative():
+            start = time.perf_counter()
+            result = asyncio.run(arun_critic_agent(sample_poster))
+            elapsed = time.perf_counter() - start
+
+        assert result["status"] == "REJECT"
+        assert result["review_path"] == "dual"
+        assert elapsed < 1.7 * PATH_DELAY
+
+    def test_async_reject_cancels_visual(self, sample_poster, reject_review):
+        from app.agents.critic import arun_critic_agent
+
+        state = {"cancelled": False}
+
+        async def slow_visual(*args, **kwargs):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+            return {"status": "PASS", "feedback": "视觉OK", "issues": []}
+
+        async def slow_json(*args, **kwargs):
+            await asyncio.sleep(0.05)  # 确保视觉审核任务已经开始执行
+            return dict(reject_review)
+
+        async def run():
+            result = await arun_critic_agent(sample_poster)
+            await asyncio.sleep(0)  # 让被取消的任务处理 CancelledError
+            return result
+
+        with patch("app.agents.critic._arun_json_review", side_effect=slow_json), \
+             patch("app.agents.critic._arun_visual_review", side_effect=slow_visual), \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", True), \
+             _speculative():
+            start = time.perf_counter()
+            result = asyncio.run(run())
+
+        assert time.perf_counter() - start < 1
+        assert result["status"] == "REJECT"
+        assert result["review_path"] == "json_only"
+        assert state["cancelled"]
+
+    def test_async_json_error_cancels_visual(self, sample_poster):
+        from app.agents.critic import arun_critic_agent
+
+        async def slow_visual(*args, **kwargs):
+            await asyncio.sleep(5)
+
+        with patch("app.agents.critic._arun_json_review", new_callable=AsyncMock, side_effect=Exception("boom")), \
+             patch("app.agents.critic._arun_visual_review", side_effect=slow_visual), \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", True), \
+             _speculative():
+            start = time.perf_counter()
+            result = asyncio.run(arun_critic_agent(sample_poster))
+
+        assert time.perf_counter() - start < 1
+        assert "issues" in result
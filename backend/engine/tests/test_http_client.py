@@ -0,0 +1,127 @@
+"""
+共享 HTTP 连接池测试
+测试客户端复用、按事件循环隔离的异步客户端、按主机并发限制与监控指标
+"""
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from unittest.mock import patch
+
+from app.core import http_client
+from app.core.http_client import (
+    _HostLimitedTransport,
+    get_async_http_client,
+    get_http_client,
+    get_http_pool_stats,
+)
+
+
+class TestSharedClients:
+    """客户端复用"""
+
+    def test_sync_client_is_shared(self):
+        assert get_http_client() is get_http_client()
+
+    def test_sync_client_recreated_after_close(self):
+        client = get_http_client()
+        http_client.close_http_clients()
+        assert get_http_client() is not client
+
+    def test_async_client_shared_within_loop(self):
+        async def run():
+            return get_async_http_client(), get_async_http_client()
+
+        first, second = asyncio.run(run())
+        assert first is second
+
+    def test_async_client_per_event_loop(self):
+        async def run():
+            return get_async_http_client()
+
+        assert asyncio.run(run()) is not asyncio.run(run())
+
+    def test_http2_requires_h2(self):
+        with patch.object(http_client, "HTTP2_AVAILABLE", False), \
+                patch.object(http_client, "_http2_warned", False), \
+                patch.object(http_client.logger, "warning") as warning:
+            assert http_client._transport_kwargs()["http2"] is False
+            http_client._transport_kwargs()
+        warning.assert_called_once()
+
+    def test_http2_enabled_by_default(self):
+        if not http_client.HTTP2_AVAILABLE:
+            pytest.skip("h2 未安装")
+        assert http_client._transport_kwargs()["http2"] is True
+
+
+class TestHostLimitedTransport:
+    """按主机并发限制"""
+
+    def test_per_host_concurrency_limit(self):
+        active = {"now": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def fake_handle(self, request):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+            return httpx.Response(200, request=request)
+
+        transport = _HostLimitedTransport(per_host_limit=2)
+        with patch.object(httpx.HTTPTransport, "handle_request", fake_handle):
+            threads = [
+                threading.Thread(
+                    target=transport.handle_request,
+                    args=(httpx.Request("GET", "https://limited.test/x"),),
+                )
+                for _ in range(6)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        assert active["peak"] == 2
+        host_stats = get_http_pool_stats()["hosts"]["limited.test"]
+        assert host_stats["requests"] >= 6
+        assert host_stats["in_flight"] == 0
+
+    def test_errors_counted(self):
+        def failing(self, request):
+            raise httpx.ConnectError("refused")
+
+        transport = _HostLimitedTransport(per_host_limit=1)
+        with patch.object(httpx.HTTPTransport, "handle_request", failing):
+            with pytest.raises(httpx.ConnectError):
+                transport.handle_request(httpx.Request("GET", "https://down.test/"))
+
+        assert get_http_pool_stats()["hosts"]["down.test"]["errors"] >= 1
+
+
+class TestPoolStats:
+    """监控指标"""
+
+    def test_stats_shape(self):
+        get_http_client()
+        stats = get_http_pool_stats()
+
+        assert set(stats) >= {"http2", "limits", "sync", "async", "hosts"}
+        assert stats["limits"]["max_connections_per_host"] >= 1
+        assert stats["sync"]["connections"] >= 0
+
+    def test_metrics_endpoint(self):
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        response = TestClient(app).get("/metrics")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert "http_pool" in body
+        assert "llm_cache" in body
@@ -0,0 +1,117 @@
+"""
+图像理解缓存测试
+测试摘要键、内存 LRU、磁盘持久化以及 analyze_image_with_llm 的缓存接入
+"""
+import pytest
+from unittest.mock import Mock, patch
+
+from app.tools.image_analysis_cache import ImageAnalysisCache, image_digest
+
+
+def _vision_client(content: str) -> Mock:
+    client = Mock()
+    client.chat.completions.create.return_value = Mock(
+        choices=[Mock(message=Mock(content=content))]
+    )
+    return client
+
+
+class TestImageDigest:
+    """缓存键测试"""
+
+    def test_same_bytes_same_prompt(self):
+        assert image_digest(b"img", "科技") == image_digest(b"img", "科技")
+
+    def test_prompt_and_bytes_change_key(self):
+        key = image_digest(b"img", "科技")
+        assert key != image_digest(b"img", "极简")
+        assert key != image_digest(b"img2", "科技")
+
+    def test_none_prompt_equals_empty(self):
+        assert image_digest(b"img", None) == image_digest(b"img", "")
+
+
+class TestImageAnalysisCache:
+    """两级缓存测试"""
+
+    def test_memory_lru_bounded(self):
+        cache = ImageAnalysisCache(max_entries=2)
+        cache.set("a", {"v": 1})
+        cache.set("b", {"v": 2})
+        cache.set("c", {"v": 3})
+
+        assert cache.get("a") is None
+        assert cache.get("c") == {"v": 3}
+        assert cache.get_stats()["memory_entries"] == 2
+
+    def test_returns_copies(self):
+        cache = ImageAnalysisCache()
+        cache.set("k", {"texts": []})
+        cache.get("k")["texts"].append("mutated")
+
+        assert cache.get("k") == {"texts": []}
+
+    def test_disk_persistence(self, tmp_path):
+        ImageAnalysisCache(cache_dir=str(tmp_path)).set("k", {"style": "business"})
+
+        fresh = ImageAnalysisCache(cache_dir=str(tmp_path))
+        assert fresh.get("k") == {"style": "business"}
+        assert fresh.get_stats()["hits"] == 1
+
+    def test_disk_pruned_to_limit(self, tmp_path):
+        cache = ImageAnalysisCache(cache_dir=str(tmp_path), max_disk_entries=2)
+        for i in range(4):
+            cache.set(f"k{i}", {"i": i})
+
+        assert len(list(tmp_path.glob("*.json"))) == 2
+
+    def test_corrupted_file_ignored(self, tmp_path):
+        (tmp_path / "bad.json").write_text("{not json", encoding="utf-8")
+        assert ImageAnalysisCache(cache_dir=str(tmp_path)).get("bad") is None
+
+
+class TestAnalyzeImageCaching:
+    """analyze_image_with_llm 缓存接入测试"""
+
+    def test_repeat_call_skips_vision_llm(self):
+        from app.tools.image_understanding import analyze_image_with_llm
+
+        client = _vision_client('{"style": "business", "texts": [], "has_text": false}')
+        with patch("app.tools.image_understanding.LLMClientFactory.get_client", return_value=client):
+            first = analyze_image_with_llm(b"same-image", "科技海报")
+            second = analyze_image_with_llm(b"same-image", "科技海报")
+
+        assert client.chat.completions.create.call_count == 1
+        assert first == second
+        assert second["style"] == "business"
+
+    def test_different_prompt_misses(self):
+        from app.tools.image_understanding import analyze_image_with_llm
+
+        client = _vision_client('{"style": "business"}')
+        with patch("app.tools.image_understanding.LLMClientFactory.get_client", return_value=client):
+            analyze_image_with_llm(b"same-image", "科技海报")
+            analyze_image_with_llm(b"same-image", "校园海报")
+
+        assert client.chat.completions.create.call_count == 2
+
+    def test_failures_not_cached(self):
+        from app.tools.image_understanding import analyze_image_with_llm
+
+        client = _vision_client("not json at all")
+        with patch("app.tools.image_understanding.LLMClientFactory.get_client", return_value=client):
+            analyze_image_with_llm(b"img", None)
+            analyze_image_with_llm(b"img", None)
+
+        assert client.chat.completions.create.call_count == 2
+
+    def test_cache_disabled(self):
+        from app.tools.image_understanding import analyze_image_with_llm
+
+        client = _vision_client('{"style": "business"}')
+        with patch("app.tools.image_understanding.LLMClientFactory.get_client", return_value=client), \
+             patch("app.tools.image_understanding.get_image_analysis_cache", return_value=None):
+            analyze_image_with_llm(b"img", None)
+            analyze_image_with_llm(b"img", None)
+
+        assert client.chat.completions.create.call_count == 2
@@ -0,0 +1,258 @@
+"""
+IVFRetriever 测试
+IVF-Flat 近似最近邻：小规模精确检索、召回率、元数据过滤、增量写入、质心持久化
+"""
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.knowledge.rag import BaseEmbedder, BrandKnowledgeBase, Document, IVFRetriever, VectorRetriever
+
+DIM = 64
+BRANDS = ["华为", "小米", "苹果", "OPPO", "vivo"]
+
+
+class QueryEmbedder(BaseEmbedder):
+    """查询文本 → 预先登记的向量（文档嵌入直接写在 Document 上）"""
+
+    def __init__(self, dim: int = DIM):
+        self.dim = dim
+        self.queries = {}
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    def encode(self, text):
+        if text not in self.queries:
+            self.queries[text] = np.random.default_rng(len(self.queries)).standard_normal(self.dim)
+        return self.queries[text]
+
+    def encode_batch(self, texts, batch_size=32):
+        return [self.encode(t) for t in texts]
+
+
+def _noise(rng, shape, spread: float = 0.8):
+    """范数约为 spread 的随机扰动（与维度无关）"""
+    return rng.standard_normal(shape).astype(np.float32) * (spread / np.sqrt(shape[-1]))
+
+
+def _clustered(n: int, dim: int = DIM, clusters: int = 200, seed: int = 0):
+    """围绕单位簇中心分布的向量（模拟主题相近的文档块），返回 (向量, 簇中心)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    vectors = centers[rng.integers(0, clusters, n)] + _noise(rng, (n, dim))
+    return vectors, centers
+
+
+def _documents(vectors):
+    return [
+        Document(id=f"doc_{i}", text=f"品牌知识 {i}", metadata={"brand": BRANDS[i % len(BRANDS)]}, embedding=v)
+        for i, v in enumerate(vectors)
+    ]
+
+
+def _pair(vectors, chunk: int = 1000, **kwargs):
+    """同一批文档分别写入精确检索器与 IVF 检索器（IVF 分批写入，覆盖增量训练）"""
+    embedder = QueryEmbedder(vectors.shape[1])
+    exact = VectorRetriever(embedder)
+    ivf = IVFRetriever(embedder, **kwargs)
+    docs = _documents(vectors)
+    exact.add_batch(docs)
+    for start in range(0, len(docs), chunk):
+        ivf.add_batch(docs[start:start + chunk])
+    return exact, ivf, embedder
+
+
+def _recall(exact, ivf, embedder, queries, top_k=10, filter_metadata=None):
+    hits = 0
+    for i, q in enumerate(queries):
+        embedder.queries[f"q{i}"] = q
+        a = {r.document_id for r in exact.search(f"q{i}", top_k, filter_metadata)}
+        b = {r.document_id for r in ivf.search(f"q{i}", top_k, filter_metadata)}
+        hits += len(a & b)
+    return hits / (top_k * len(queries))
+
+
+class TestIVFRetriever:
+    """检索结果"""
+
+    def test_small_corpus_is_exact(self):
+        vectors, _ = _clustered(500)
+        exact, ivf, _ = _pair(vectors)
+        assert ivf._lists.active is False
+        for flt in (None, {"brand": "小米"}):
+            a = exact.search("查询", top_k=5, filter_metadata=flt)
+            b = ivf.search("查询", top_k=5, filter_metadata=flt)
+            assert [r.document_id for r in a] == [r.document_id for r in b]
+            assert [r.score for r in a] == pytest.approx([r.score for r in b], abs=1e-5)
+
+    def test_recall_against_brute_force(self):
+        vectors, centers = _clustered(12_000)
+        exact, ivf, embedder = _pair(vectors)
+        assert ivf._lists.active is True
+        assert ivf._lists.sizes.sum() == ivf._size == 12_000
+        assert ivf.backend_type.value == "ivf"
+
+        queries = centers[:50] + _noise(np.random.default_rng(1), (50, DIM))
+        assert _recall(exact, ivf, embedder, queries) >= 0.9
+
+    def test_scores_match_exact_scores(self):
+        vectors, _ = _clustered(5000)
+        exact, ivf, _ = _pair(vectors)
+        truth = {r.document_id: r.score for r in exact.search("查询", top_k=5000)}
+        for r in ivf.search("查询", top_k=20):
+            assert r.score == pytest.approx(truth[r.document_id], abs=1e-5)
+
+    def test_filter(self):
+        vectors, centers = _clustered(12_000)
+        exact, ivf, embedder = _pair(vectors)
+        embedder.queries["q"] = centers[3]
+
+        # 选择性强的过滤条件走精确计算
+        rare = [
+            Document(id=f"rare_{i}", text=f"小众品牌 {i}", metadata={"brand": "小众"}, embedding=v)
+            for i, v in enumerate(np.random.default_rng(5).standard_normal((30, DIM)))
+        ]
+        exact.add_batch(rare)
+        ivf.add_batch(rare)
+        a = exact.search("q", top_k=5, filter_metadata={"brand": "小众"})
+        b = ivf.search("q", top_k=5, filter_metadata={"brand": "小众"})
+        assert [r.document_id for r in a] == [r.document_id for r in b]
+
+        # 宽泛的过滤条件在探测结果上做掩码
+        queries = centers[:30]
+        assert _recall(exact, ivf, embedder, queries, top_k=5, filter_metadata={"brand": "华为"}) >= 0.9
+        assert all(r.metadata["brand"] == "华为" for r in ivf.search("q0", top_k=5, filter_metadata={"brand": "华为"}))
+        assert ivf.search("q0", top_k=5, filter_metadata={"brand": "不存在"}) == []
+
+    def test_incremental_add_after_training(self):
+        vectors, _ = _clustered(5000)
+        _, ivf, embedder = _pair(vectors)
+        trained = ivf._centroids.copy()
+
+        new = np.random.default_rng(9).standard_normal(DIM)
+        embedder.queries["新文档"] = new
+        ivf.add(Document(id="new", text="新文档", metadata={"brand": "华为"}, embedding=new))
+        assert np.array_equal(ivf._centroids, trained)
+        assert ivf._lists.sizes.sum() == 5001
+        assert ivf.search("新文档", top_k=1)[0].document_id == "new"
+        assert ivf.search("新文档", top_k=1, filter_metadata={"brand": "华为"})[0].document_id == "new"
+
+    def test_retrain_on_growth(self):
+        vectors, _ = _clustered(10_000)
+        ivf = IVFRetriever(QueryEmbedder())
+        docs = _documents(vectors)
+        ivf.add_batch(docs[:2500])
+        assert ivf._trained_size == 2500
+        ivf.add_batch(docs[2500:])
+        assert ivf._trained_size == 10_000
+        assert len(ivf._centroids) == int(2 * np.sqrt(10_000))
+
+    def test_search_during_retrain_sees_old_index(self):
+        vectors, _ = _clustered(10_000)
+        ivf = IVFRetriever(QueryEmbedder())
+        docs = _documents(vectors)
+        ivf.add_batch(docs[:2500])
+        old = ivf._lists
+        results = []
+
+        # k-means 与重新分簇的每一步都穿插一次检索，模拟并发查询
+        assign = IVFRetriever._assign
+
+        def assign_and_search(self, *args):
+            results.append([r.document_id for r in self.search("查询", top_k=5)])
+            assert self._lists is old
+            return assign(self, *args)
+
+        with patch.object(IVFRetriever, "_assign", assign_and_search):
+            ivf.add_batch(docs[2500:])
+        assert ivf._trained_size == 10_000
+        assert ivf._lists is not old
+        assert len(ivf._lists.centroids) == int(2 * np.sqrt(10_000))
+        assert results and all(len(r) == 5 for r in results)
+
+    def test_clear_keeps_centroids(self):
+        vectors, _ = _clustered(5000)
+        _, ivf, _ = _pair(vectors)
+        ivf.clear()
+        assert ivf._centroids is not None
+        assert ivf.search("查询", top_k=2) == []
+        ivf.add(Document(id="x", text="查询", metadata={"brand": "华为"}, embedding=np.ones(DIM)))
+        assert [r.document_id for r in ivf.search("查询", top_k=2)] == ["x"]
+
+
+class TestPersistence:
+    """质心持久化"""
+
+    def test_reload_skips_training(self, tmp_path):
+        vectors, _ = _clustered(5000)
+        _, first, _ = _pair(vectors, persist_directory=str(tmp_path))
+        assert (tmp_path / IVFRetriever._QUANTIZER_FILE).exists()
+
+        with patch.object(IVFRetriever, "_train", side_effect=AssertionError("不应重新训练")):
+            second = IVFRetriever(QueryEmbedder(), persist_directory=str(tmp_path))
+            second.add_batch(_documents(vectors))
+        assert np.array_equal(second._centroids, first._centroids)
+        first.embedder.queries["q"] = second.embedder.queries["q"] = vectors[42]
+        assert [r.document_id for r in first.search("q", 10)] == [r.document_id for r in second.search("q", 10)]
+
+    def test_dimension_change_retrains(self, tmp_path):
+        vectors, _ = _clustered(3000)
+        _pair(vectors, persist_directory=str(tmp_path))
+
+        wider, _ = _clustered(3000, dim=DIM * 2)
+        ivf = IVFRetriever(QueryEmbedder(DIM * 2), persist_directory=str(tmp_path))
+        ivf.add_batch(_documents(wider))
+        assert ivf._centroids.shape[1] == DIM * 2
+        assert ivf._lists.sizes.sum() == 3000
+
+    def test_corrupt_quantizer_ignored(self, tmp_path):
+        (tmp_path / IVFRetriever._QUANTIZER_FILE).write_bytes(b"not a npz")
+        ivf = IVFRetriever(QueryEmbedder(), persist_directory=str(tmp_path))
+        assert ivf._centroids is None
+
+
+def test_knowledge_base_selects_ivf(tmp_path):
+    embedder = QueryEmbedder()
+    with patch("app.knowledge.rag.knowledge_base.create_embedder", return_value=embedder):
+        kb = BrandKnowledgeBase(use_chromadb=False, store_directory=str(tmp_path), retriever="ivf")
+    assert kb.get_stats()["backend"] == "ivf"
+    assert isinstance(kb._retriever, IVFRetriever)
+    assert kb.search("华为的配色", top_k=2)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("n", [10_000, 100_000, 300_000])
+def test_recall_latency_benchmark(n):
+    """recall@10 与单次查询延迟：IVF（默认 nprobe）vs 精确矩阵检索，384 维"""
+    dim = 384
+    vectors, centers = _clustered(n, dim=dim, clusters=max(200, n // 150))
+    start = time.perf_counter()
+    exact, ivf, embedder = _pair(vectors, chunk=10_000)
+    build = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    queries = centers[rng.integers(0, len(centers), 200)] + _noise(rng, (200, dim))
+    for i, q in enumerate(queries):
+        embedder.queries[f"q{i}"] = q
+
+    timings = {}
+    for name, retriever in (("exact", exact), ("ivf", ivf)):
+        start = time.perf_counter()
+        for i in range(len(queries)):
+            retriever.search(f"q{i}", top_k=10)
+        timings[name] = (time.perf_counter() - start) / len(queries)
+    recall = _recall(exact, ivf, embedder, queries)
+
+    print(
+        f"\n[ivf retriever] n={n}: recall@10 {recall:.3f}, "
+        f"ivf {timings['ivf'] * 1000:.2f}ms / query, 精确 {timings['exact'] * 1000:.2f}ms / query, "
+        f"nlist={len(ivf._lists.sizes)}, nprobe={ivf.nprobe}, 建索引 {build:.1f}s"
+    )
+    assert recall >= 0.9
+    if n >= 100_000:
+        assert timings["ivf"] < timings["exact"]
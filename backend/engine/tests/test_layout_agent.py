@@ -0,0 +1,108 @@
+"""
+Layout Agent 测试
+测试多策略模式：一次 LLM 调用生成 DSL，本地按 布局策略 × 字体风格 排出多个候选
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.agents.layout import (
+    arun_layout_agent_multi,
+    plan_layout_variants,
+    run_layout_agent_multi,
+)
+from app.services.renderer import VALID_STRATEGIES
+from app.services.renderer.font_registry import VALID_FONT_STYLES
+
+
+BRIEF = {"title": "夏日音乐节", "subtitle": "外滩滨江草坪", "background_color": "#1A1A2E"}
+ASSETS = {"background_layer": {"src": "https://example.com/bg.jpg"}}
+
+DSL = {
+    "layout_strategy": "bottom_heavy",
+    "font_style": "serif",
+    "dsl_instructions": [
+        {"command": "add_image", "src": "ASSET_BG", "layer_type": "background"},
+        {"command": "add_title", "content": "夏日音乐节", "font_size": 96, "color": "#FFFFFF"},
+        {"command": "add_subtitle", "content": "外滩滨江草坪 · 七月", "font_size": 48, "color": "#FFFFFF"},
+        {"command": "add_cta", "content": "立即购票", "font_size": 40, "color": "#FFD700"},
+    ],
+}
+
+
+def _agent(payload):
+    response = SimpleNamespace(text=json.dumps(payload, ensure_ascii=False))
+    agent = MagicMock()
+    agent.invoke.return_value = response
+    agent.ainvoke = AsyncMock(return_value=response)
+    return agent
+
+
+# ============================================================================
+# 1. 组合规划
+# ============================================================================
+
+class TestPlanVariants:
+
+    def test_llm_choice_first_then_other_strategies(self):
+        plan = plan_layout_variants("diagonal", "rounded", len(VALID_STRATEGIES))
+        assert plan[0] == ("diagonal", "rounded")
+        assert sorted(s for s, _ in plan) == sorted(VALID_STRATEGIES)
+        assert {f for _, f in plan} == {"rounded"}
+
+    def test_extends_to_other_font_styles(self):
+        plan = plan_layout_variants("centered", "sans", len(VALID_STRATEGIES) + 2)
+        assert len(set(plan)) == len(plan)
+        assert plan[-1][1] != "sans"
+
+    def test_invalid_font_style_falls_back(self):
+        plan = plan_layout_variants("centered", "comic", 1)
+        assert plan[0][1] in VALID_FONT_STYLES
+
+
+# ============================================================================
+# 2. 一次 LLM 调用 → N 个候选
+# ============================================================================
+
+class TestMultiStrategy:
+
+    def test_single_llm_call_produces_distinct_layouts(self):
+        agent = _agent(DSL)
+        with patch("app.agents.base.AgentFactory.get_layout_agent", return_value=agent):
+            posters = run_layout_agent_multi(BRIEF, ASSETS, 1080, 1920, count=6)
+
+        assert agent.invoke.call_count == 1
+        assert len(posters) == 6
+        assert posters[0]["layout_strategy"] == "bottom_heavy"
+        assert posters[0]["font_style"] == "serif"
+        assert len({p["layout_strategy"] for p in posters}) == 6
+
+        title_ys = {next(l["y"] for l in p["layers"] if l["type"] == "text") for p in posters}
+        assert len(title_ys) > 1
+
+    def test_asset_placeholder_replaced_in_every_variant(self):
+        agent = _agent(DSL)
+        with patch("app.agents.base.AgentFactory.get_layout_agent", return_value=agent):
+            posters = run_layout_agent_multi(BRIEF, ASSETS, 1080, 1920, count=3)
+
+        for p in posters:
+            images = [l for l in p["layers"] if l["type"] == "image"]
+            assert images and all(l["src"] == "https://example.com/bg.jpg" for l in images)
+
+    def test_async_variant(self):
+        agent = _agent(DSL)
+        with patch("app.agents.base.AgentFactory.get_layout_agent", return_value=agent):
+            posters = asyncio.run(arun_layout_agent_multi(BRIEF, ASSETS, 1080, 1920, count=4))
+
+        assert agent.ainvoke.await_count == 1
+        assert [p["layout_strategy"] for p in posters][0] == "bottom_heavy"
+        assert len(posters) == 4
+
+    def test_invalid_response_returns_empty(self):
+        agent = MagicMock()
+        agent.invoke.return_value = SimpleNamespace(text="not json")
+        with patch("app.agents.base.AgentFactory.get_layout_agent", return_value=agent):
+            assert run_layout_agent_multi(BRIEF, ASSETS, 1080, 1920, count=3) == []
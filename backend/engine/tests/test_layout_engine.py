@@ -4,8 +4,13 @@ OOP Layout Engine + LayoutBuilder 集成测试
 测试两层：
 1. 基础层：OOP 布局引擎组件（TextBlock, ImageBlock, ShapeBlock, Container）
 2. 集成层：LayoutBuilder 将语义 DSL → OOP 容器 → 扁平元素列表
+3. 性能：slots 元素树的构建耗时与内存峰值（10k 个版式）
 """
+import gc
 import sys
+import time
+import tracemalloc
+
 import pytest
 from app.core.layout import (
     Element,
@@ -210,6 +215,18 @@ class TestNestedContainers:
         elems = main.get_all_elements()
         assert len(elems) == 3
 
+    def test_flatten_keeps_document_order(self):
+        inner = VerticalContainer(width=400)
+        inner.add(ImageBlock(src="b.jpg", width=100, height=100))
+        inner.add(HorizontalContainer().add(ImageBlock(src="c.jpg", width=10, height=10)))
+        outer = VerticalContainer(width=600)
+        outer.add(ImageBlock(src="a.jpg", width=100, height=100))
+        outer.add(inner)
+        outer.add(ImageBlock(src="d.jpg", width=100, height=100))
+
+        assert outer.leaf_count() == 4
+        assert [e["src"] for e in outer.get_all_elements()] == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+
 
 # ============================================================================
 # 二、LayoutBuilder 集成测试
@@ -436,3 +453,69 @@ class TestLayoutBuilder:
             elif elem["type"] == "rect":
                 assert "subtype" in elem
                 assert "backgroundColor" in elem
+
+
+# ============================================================================
+# 三、性能：slots 元素树
+# ============================================================================
+
+def _build_layout() -> VerticalContainer:
+    ctr = VerticalContainer(x=0, y=400, width=1080, padding=48, gap=16, style=Style(text_align="left"))
+    ctr.add(TextBlock("夏日音乐节", font_size=96, max_width=984,
+                      style=Style(font_size=96, font_weight="bold"), role="title"))
+    ctr.add(ShapeBlock(width=200, height=4, subtype="divider"))
+    ctr.add(TextBlock("外滩滨江草坪 · 七月十二日", font_size=48, max_width=984,
+                      style=Style(font_size=48), role="subtitle"))
+    ctr.add(TextBlock("连续三晚 十二组乐队轮番登场", font_size=32, max_width=984,
+                      style=Style(font_size=32), role="body"))
+    ctr.add(ImageBlock(src="asset://subject", width=400, height=300))
+    ctr.arrange()
+    return ctr
+
+
+class TestSlottedTree:
+
+    def test_no_instance_dict(self):
+        ctr = _build_layout()
+        for obj in [ctr, ctr.style, *ctr.elements, *(e.style for e in ctr.elements)]:
+            assert not hasattr(obj, "__dict__"), type(obj).__name__
+
+    def test_bounds(self):
+        img = ImageBlock(src="a.jpg", width=100, height=50, x=10, y=20)
+        assert img.get_bounds() == (10, 20, 100, 50, 110, 70)
+        assert (img.right, img.bottom) == (110, 70)
+
+    def test_default_style_shared_by_non_text_elements(self):
+        a = ImageBlock(src="a.jpg", width=1, height=1)
+        b = ShapeBlock(width=1, height=1)
+        assert a.style is b.style
+        assert TextBlock("x").style is not TextBlock("y").style
+
+    @pytest.mark.slow
+    def test_build_10k_layouts(self):
+        n = 10_000
+        _build_layout()  # 预热文字测量缓存
+
+        gc.collect()
+        start = time.perf_counter()
+        trees = [_build_layout() for _ in range(n)]
+        build_cost = (time.perf_counter() - start) / n
+
+        start = time.perf_counter()
+        for ctr in trees:
+            ctr.get_all_elements()
+        export_cost = (time.perf_counter() - start) / n
+
+        del trees
+        gc.collect()
+        tracemalloc.start()
+        trees = [_build_layout() for _ in range(n)]
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(
+            f"\n[layout] build {build_cost * 1e6:.1f}µs / layout, export {export_cost * 1e6:.1f}µs / layout, "
+            f"peak {peak / n:.0f} B / layout"
+        )
+        assert len(trees) == n
+        assert peak / n < 2048
@@ -0,0 +1,255 @@
+"""
+增量重排测试
+测试布局树与构建结果的对应、颜色 / 内容 / 字号编辑只重排脏容器、与完整重建结果一致，以及 /api/layout/patch 路由
+"""
+import copy
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app
+from app.models.layout_tree import LayerEdit
+from app.services.renderer import LayoutBuilder, SchemaConverter
+from app.services.renderer.layout_patch import patch_layout
+
+client = TestClient(app)
+
+
+def _dsl(body="连续三晚，十二组乐队轮番登场。"):
+    return [
+        {"command": "add_image", "src": "https://example.com/bg.jpg", "layer_type": "background"},
+        {"command": "add_overlay"},
+        {"command": "add_title", "content": "城市夏日音乐节", "font_size": 96},
+        {"command": "add_divider", "width_ratio": 0.4},
+        {"command": "add_subtitle", "content": "外滩滨江草坪", "font_size": 44},
+        {"command": "add_text", "content": body, "font_size": 32},
+        {"command": "add_cta", "content": "立即购票", "font_size": 40},
+    ]
+
+
+def _poster(dsl, strategy):
+    builder = LayoutBuilder()
+    elements = builder.build(copy.deepcopy(dsl), strategy, 1080, 1920)
+    poster = SchemaConverter().convert(elements, canvas_width=1080, canvas_height=1920).model_dump()
+    poster["layout_strategy"] = strategy
+    return poster, builder.describe_tree(dsl, strategy)
+
+
+def _apply(poster, ops):
+    poster = copy.deepcopy(poster)
+    for op in ops:
+        _, _, index, key = op["path"].split("/")
+        poster["layers"][int(index)][key] = op["value"]
+    return poster
+
+
+def _layer(poster, layer_id):
+    return next(layer for layer in poster["layers"] if layer["id"] == layer_id)
+
+
+@pytest.fixture
+def no_fit():
+    """关闭排版自适应，使完整重建与增量重排可直接比较"""
+    with patch("app.services.renderer.layout_builder.settings.layout_fit.ENABLED", False):
+        yield
+
+
+# ============================================================================
+# 1. 布局树
+# ============================================================================
+
+class TestDescribeTree:
+
+    @pytest.mark.parametrize("strategy", ["centered", "diagonal"])
+    def test_tree_matches_built_layers(self, strategy):
+        poster, tree = _poster(_dsl(), strategy)
+        ids = {layer["id"]: layer for layer in poster["layers"]}
+
+        assert tree.overlays == ["rect_1"] and ids["rect_1"]["subtype"] == "overlay"
+        for group in tree.groups:
+            assert all(lid in ids for lid in group.layers)
+        assert ids[next(k for k, v in tree.roles.items() if v == "title")]["content"] == "城市夏日音乐节"
+        assert ids[next(k for k, v in tree.roles.items() if v == "cta")]["content"] == "立即购票"
+
+    def test_cta_group_only_with_cta_region(self):
+        _, centered = _poster(_dsl(), "centered")
+        _, diagonal = _poster(_dsl(), "diagonal")
+        assert [g.name for g in centered.groups] == ["content"]
+        assert [g.name for g in diagonal.groups] == ["content", "cta"]
+
+
+# ============================================================================
+# 2. 增量重排
+# ============================================================================
+
+class TestPatchLayout:
+
+    def test_color_edit_does_not_relayout(self):
+        poster, tree = _poster(_dsl(), "centered")
+        title_id = next(k for k, v in tree.roles.items() if v == "title")
+
+        result = patch_layout(poster, tree, [LayerEdit(layer_id=title_id, color="#FF0000")])
+
+        assert result.relayout == []
+        assert result.changed == [title_id]
+        assert [op["path"].rsplit("/", 1)[1] for op in result.patch] == ["color"]
+
+    def test_content_edit_matches_full_rebuild(self, no_fit):
+        long_body = "连续三晚，十二组乐队轮番登场，现场设有市集与露营区，欢迎携家人朋友一同前来。" * 3
+        poster, tree = _poster(_dsl(), "bottom_heavy")
+        body_id = next(k for k, v in tree.roles.items() if v == "body")
+
+        result = patch_layout(poster, tree, [LayerEdit(layer_id=body_id, content=long_body)])
+        patched = _apply(poster, result.patch)
+        rebuilt, _ = _poster(_dsl(long_body), "bottom_heavy")
+
+        assert result.relayout == ["content"]
+        assert _layer(patched, body_id)["height"] > _layer(poster, body_id)["height"]
+        for before, after in zip(patched["layers"], rebuilt["layers"]):
+            for key in ("x", "y", "width", "height"):
+                assert before[key] == pytest.approx(after[key], abs=2), (before["id"], key)
+
+    def test_only_dirty_container_moves(self):
+        poster, tree = _poster(_dsl(), "diagonal")
+        title_id = next(k for k, v in tree.roles.items() if v == "title")
+        cta_id = next(k for k, v in tree.roles.items() if v == "cta")
+
+        result = patch_layout(poster, tree, [LayerEdit(layer_id=title_id, font_size=40)])
+
+        assert result.relayout == ["content"]
+        assert cta_id not in result.changed
+        assert _apply(poster, result.patch)["layers"] != poster["layers"]
+
+    def test_overlay_follows_content(self):
+        poster, tree = _poster(_dsl(), "centered")
+        body_id = next(k for k, v in tree.roles.items() if v == "body")
+
+        result = patch_layout(poster, tree, [LayerEdit(layer_id=body_id, content="短句。" * 60)])
+        patched = _apply(poster, result.patch)
+
+        overlay = _layer(patched, "rect_1")
+        texts = [layer for layer in patched["layers"] if layer["type"] == "text"]
+        assert overlay["y"] <= min(t["y"] for t in texts)
+        assert overlay["y"] + overlay["height"] >= max(t["y"] + t["height"] for t in texts)
+
+    def test_invalid_edits_rejected(self):
+        from app.core.exceptions import ValidationException
+
+        poster, tree = _poster(_dsl(), "centered")
+        with pytest.raises(ValidationException):
+            patch_layout(poster, tree, [LayerEdit(layer_id="text_99", content="x")])
+        with pytest.raises(ValidationException):
+            patch_layout(poster, tree, [LayerEdit(layer_id="image_0", content="x")])
+
+    def test_constraint_engine(self):
+        pytest.importorskip("kiwisolver")
+        with patch("app.services.renderer.layout_builder.settings.layout_engine.MODE", "constraint"):
+            poster, tree = _poster(_dsl(), "centered")
+            title_id = next(k for k, v in tree.roles.items() if v == "title")
+            result = patch_layout(poster, tree, [LayerEdit(layer_id=title_id, content="城市夏日音乐节 · 外滩滨江草坪专场")])
+
+        assert tree.engine == "constraint"
+        assert result.relayout == ["content"]
+        patched = _apply(poster, result.patch)
+        assert _layer(patched, title_id)["height"] > _layer(poster, title_id)["height"]
+
+    def test_constraint_engine_clamps_wide_shapes(self):
+        pytest.importorskip("kiwisolver")
+        with patch("app.services.renderer.layout_builder.settings.layout_engine.MODE", "constraint"):
+            poster, tree = _poster(_dsl(), "centered")
+            divider = next(layer for layer in poster["layers"] if layer.get("subtype") == "divider")
+            divider["x"], divider["width"] = 0, 1080
+            title_id = next(k for k, v in tree.roles.items() if v == "title")
+            result = patch_layout(poster, tree, [LayerEdit(layer_id=title_id, content="城市夏日音乐节 · 外滩滨江草坪专场")])
+
+        patched = _layer(_apply(poster, result.patch), divider["id"])
+        margin = 0.045 * 1080
+        assert patched["x"] >= margin - 1 and patched["x"] + patched["width"] <= 1080 - margin + 1
+
+    def test_empty_group_rejected(self):
+        from app.core.exceptions import ValidationException
+        from app.models.layout_tree import LayoutGroup, LayoutTree
+
+        poster, tree = _poster(_dsl(), "centered")
+        broken = LayoutTree.model_construct(**{**dict(tree), "groups": tree.groups + [LayoutGroup(name="cta")]})
+        title_id = next(k for k, v in tree.roles.items() if v == "title")
+        with pytest.raises(ValidationException):
+            patch_layout(poster, broken, [LayerEdit(layer_id=title_id, content="新标题")])
+
+    @pytest.mark.slow
+    def test_patch_cost_vs_full_build(self):
+        dsl = _dsl()
+        poster, tree = _poster(dsl, "bottom_heavy")
+        body_id = next(k for k, v in tree.roles.items() if v == "body")
+        runs = 50
+
+        def patch_once(i):
+            patch_layout(poster, tree, [LayerEdit(layer_id=body_id, content=f"第 {i} 版活动介绍文字，欢迎光临。")])
+
+        def rebuild_once(i):
+            dsl[5]["content"] = f"第 {i} 版活动介绍文字，欢迎光临。"
+            elements = LayoutBuilder().build(copy.deepcopy(dsl), "bottom_heavy", 1080, 1920)
+            SchemaConverter().convert(elements, canvas_width=1080, canvas_height=1920).model_dump()
+
+        def best_of(fn, rounds=5):
+            costs = []
+            for r in range(rounds):
+                start = time.perf_counter()
+                for i in range(runs):
+                    fn(r * runs + i)
+                costs.append((time.perf_counter() - start) / runs)
+            return min(costs)
+
+        patch_cost, build_cost = best_of(patch_once), best_of(rebuild_once)
+
+        print(f"\n[layout_patch] patch {patch_cost * 1000:.2f}ms, full rebuild {build_cost * 1000:.2f}ms")
+        assert patch_cost < build_cost
+
+
+# ============================================================================
+# 3. 路由
+# ============================================================================
+
+class TestLayoutPatchRoute:
+
+    def test_patch_route(self):
+        poster, tree = _poster(_dsl(), "centered")
+        title_id = next(k for k, v in tree.roles.items() if v == "title")
+
+        response = client.post("/api/layout/patch", json={
+            "poster": poster,
+            "layout_tree": tree.model_dump(),
+            "edits": [{"layer_id": title_id, "content": "城市夏日音乐节 2025 · 外滩滨江草坪"}],
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert title_id in data["changed"]
+        assert all(op["op"] == "replace" for op in data["patch"])
+
+    def test_unknown_layer_is_400(self):
+        poster, tree = _poster(_dsl(), "centered")
+        response = client.post("/api/layout/patch", json={
+            "poster": poster, "layout_tree": tree.model_dump(),
+            "edits": [{"layer_id": "text_99", "color": "#FFFFFF"}],
+        })
+        assert response.status_code == 400
+
+    def test_empty_group_is_422(self):
+        poster, tree = _poster(_dsl(), "centered")
+        layout_tree = tree.model_dump()
+        layout_tree["groups"].append({"name": "cta", "layers": []})
+        response = client.post("/api/layout/patch", json={
+            "poster": poster, "layout_tree": layout_tree,
+            "edits": [{"layer_id": "text_2", "color": "#FFFFFF"}],
+        })
+        assert response.status_code == 422
+
+    def test_empty_edits_is_422(self):
+        poster, tree = _poster(_dsl(), "centered")
+        response = client.post("/api/layout/patch", json={
+            "poster": poster, "layout_tree": tree.model_dump(), "edits": [],
+        })
+        assert response.status_code == 422
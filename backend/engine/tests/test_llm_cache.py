@@ -0,0 +1,245 @@
+"""
+LLM 响应缓存测试
+测试内容寻址键、LRU / SQLite 两级存储、TTL、温度旁路与客户端代理
+"""
+import asyncio
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.core.llm_cache import (
+    CachedLLMClient,
+    CachedResponse,
+    LLMResponseCache,
+    make_cache_key,
+    unwrap_client,
+)
+
+
+def _openai_response(content: str) -> Mock:
+    response = Mock()
+    response.choices = [Mock(message=Mock(content=content))]
+    return response
+
+
+def _mock_openai_client(content: str = '{"ok": true}') -> Mock:
+    client = Mock(spec=["chat"])
+    client.chat.completions.create.return_value = _openai_response(content)
+    return client
+
+
+class TestCacheKey:
+    """缓存键测试"""
+
+    def test_same_request_same_key(self):
+        req = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.1}
+        assert make_cache_key("openai", "chat.completions", req) == make_cache_key(
+            "OpenAI", "chat.completions", dict(reversed(list(req.items())))
+        )
+
+    def test_key_depends_on_content_fields(self):
+        base = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.1}
+        key = make_cache_key("openai", "chat.completions", base)
+        assert key != make_cache_key("openai", "chat.completions", {**base, "temperature": 0.2})
+        assert key != make_cache_key("openai", "chat.completions", {**base, "model": "m2"})
+        assert key != make_cache_key("deepseek", "chat.completions", base)
+        assert key != make_cache_key(
+            "openai", "chat.completions", {**base, "response_format": {"type": "json_object"}}
+        )
+
+    def test_transport_kwargs_ignored(self):
+        base = {"model": "m", "messages": []}
+        assert make_cache_key("openai", "chat.completions", base) == make_cache_key(
+            "openai", "chat.completions", {**base, "timeout": 30}
+        )
+
+
+class TestLLMResponseCache:
+    """两级缓存测试"""
+
+    def test_lru_eviction(self):
+        cache = LLMResponseCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+
+    def test_namespace_ttl_expiry(self):
+        cache = LLMResponseCache(namespace_ttls={"planner": 10})
+        with patch("app.core.llm_cache.time.time", return_value=1000.0):
+            cache.set("k", "v", "planner")
+        with patch("app.core.llm_cache.time.time", return_value=1005.0):
+            assert cache.get("k", "planner") == "v"
+        with patch("app.core.llm_cache.time.time", return_value=1011.0):
+            assert cache.get("k", "planner") is None
+
+    def test_bypass_rules(self):
+        cache = LLMResponseCache(namespace_ttls={"layout": 0}, max_temperature=0.7)
+        assert cache.should_bypass("critic", 0.9)
+        assert not cache.should_bypass("critic", 0.7)
+        assert not cache.should_bypass("critic", None)
+        assert cache.should_bypass("layout", 0.0)
+
+    def test_sqlite_tier_survives_new_instance(self, tmp_path):
+        db = str(tmp_path / "cache" / "llm.sqlite3")
+        LLMResponseCache(sqlite_path=db).set("k", "persisted")
+
+        fresh = LLMResponseCache(sqlite_path=db)
+        assert fresh.get("k") == "persisted"
+        assert fresh.get_stats()["sqlite_enabled"] is True
+
+    def test_stats(self):
+        cache = LLMResponseCache()
+        cache.set("k", "v", "critic")
+        cache.get("k", "critic")
+        cache.get("missing", "critic")
+        cache.record_bypass("layout")
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["bypassed"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["namespaces"]["critic"] == {"hits": 1, "misses": 1, "bypassed": 0}
+
+
+class TestCachedLLMClient:
+    """客户端代理测试"""
+
+    def test_second_identical_call_served_from_cache(self):
+        raw = _mock_openai_client('{"status": "PASS"}')
+        client = CachedLLMClient(raw, "deepseek", LLMResponseCache(), "critic")
+        kwargs = dict(model="m", messages=[{"role": "user", "content": "x"}], temperature=0.0)
+
+        first = client.chat.completions.create(**kwargs)
+        second = client.chat.completions.create(**kwargs)
+
+        assert raw.chat.completions.create.call_count == 1
+        assert first.choices[0].message.content == '{"status": "PASS"}'
+        assert isinstance(second, CachedResponse)
+        assert second.choices[0].message.content == '{"status": "PASS"}'
+        assert second.text == '{"status": "PASS"}'
+
+    def test_high_temperature_bypasses_cache(self):
+        raw = _mock_openai_client()
+        cache = LLMResponseCache(max_temperature=0.7)
+        client = CachedLLMClient(raw, "deepseek", cache, "planner")
+
+        for _ in range(2):
+            client.chat.completions.create(model="m", messages=[], temperature=0.9)
+
+        assert raw.chat.completions.create.call_count == 2
+        assert cache.get_stats()["bypassed"] == 2
+
+    def test_gemini_generate_content_cached(self):
+        raw = Mock(spec=["models"])
+        raw.models.generate_content.return_value = Mock(spec=["text"], text='{"dsl": []}')
+        client = CachedLLMClient(raw, "gemini", LLMResponseCache(), "layout")
+
+        client.models.generate_content(model="g", contents="brief")
+        response = client.models.generate_content(model="g", contents="brief")
+
+        assert raw.models.generate_content.call_count == 1
+        assert response.text == '{"dsl": []}'
+
+    def test_async_client_cached(self):
+        raw = Mock(spec=["chat"])
+        raw.chat.completions.create = AsyncMock(return_value=_openai_response("ok"))
+        client = CachedLLMClient(raw, "openai", LLMResponseCache(), "critic", is_async=True)
+
+        async def run():
+            await client.chat.completions.create(model="m", messages=[], temperature=0.0)
+            return await client.chat.completions.create(model="m", messages=[], temperature=0.0)
+
+        response = asyncio.run(run())
+        assert raw.chat.completions.create.await_count == 1
+        assert response.choices[0].message.content == "ok"
+
+    def test_non_string_content_not_cached(self):
+        raw = Mock(spec=["chat"])
+        raw.chat.completions.create.return_value = Mock()
+        cache = LLMResponseCache()
+        client = CachedLLMClient(raw, "openai", cache, "critic")
+
+        client.chat.completions.create(model="m", messages=[])
+        client.chat.completions.create(model="m", messages=[])
+
+        assert raw.chat.completions.create.call_count == 2
+        assert cache.get_stats()["memory_entries"] == 0
+
+    def test_malformed_json_not_cached(self):
+        raw = _mock_openai_client('{"status": "PASS", "issues": [')
+        cache = LLMResponseCache()
+        client = CachedLLMClient(raw, "deepseek", cache, "critic")
+        kwargs = dict(model="m", messages=[], temperature=0.0, response_format={"type": "json_object"})
+
+        client.chat.completions.create(**kwargs)
+        raw.chat.completions.create.return_value = _openai_response('```json\n{"status": "PASS"}\n```')
+        client.chat.completions.create(**kwargs)
+        response = client.chat.completions.create(**kwargs)
+
+        assert raw.chat.completions.create.call_count == 2
+        assert response.choices[0].message.content == '```json\n{"status": "PASS"}\n```'
+
+    def test_gemini_json_mime_type_validated(self):
+        raw = Mock(spec=["models"])
+        raw.models.generate_content.return_value = Mock(spec=["text"], text='{"dsl": [')
+        client = CachedLLMClient(raw, "gemini", LLMResponseCache(), "layout")
+        from google.genai import types
+        config = types.GenerateContentConfig(response_mime_type="application/json", temperature=0.1)
+
+        client.models.generate_content(model="g", contents="brief", config=config)
+        client.models.generate_content(model="g", contents="brief", config=config)
+
+        assert raw.models.generate_content.call_count == 2
+
+    def test_truncated_response_not_cached(self):
+        raw = _mock_openai_client("部分输出")
+        raw.chat.completions.create.return_value.choices[0].finish_reason = "length"
+        client = CachedLLMClient(raw, "deepseek", LLMResponseCache(), "planner")
+
+        for _ in range(2):
+            client.chat.completions.create(model="m", messages=[], temperature=0.0)
+
+        assert raw.chat.completions.create.call_count == 2
+
+    def test_unwrap_client(self):
+        raw = _mock_openai_client()
+        assert unwrap_client(CachedLLMClient(raw, "openai", LLMResponseCache())) is raw
+        assert unwrap_client(raw) is raw
+
+
+class TestFactoryIntegration:
+    """LLMClientFactory 接入测试"""
+
+    def test_namespace_returns_cached_wrapper(self):
+        from app.core.llm import LLMClientFactory
+
+        with patch("app.core.llm.OpenAI", return_value=_mock_openai_client()):
+            LLMClientFactory._clients.pop("openai_sk-cachete", None)
+            plain = LLMClientFactory.get_client("openai", "sk-cachetest", "http://x")
+            wrapped = LLMClientFactory.get_client(
+                "openai", "sk-cachetest", "http://x", cache_namespace="planner"
+            )
+            LLMClientFactory._clients.pop("openai_sk-cachete", None)
+
+        assert not isinstance(plain, CachedLLMClient)
+        assert isinstance(wrapped, CachedLLMClient)
+        assert wrapped.raw is plain
+        assert wrapped.namespace == "planner"
+
+    def test_cache_disabled_returns_raw_client(self):
+        from app.core.llm import LLMClientFactory
+
+        with patch("app.core.llm.get_llm_cache", return_value=None), \
+             patch("app.core.llm.OpenAI", return_value=_mock_openai_client()):
+            LLMClientFactory._clients.pop("openai_sk-cachete", None)
+            client = LLMClientFactory.get_client(
+                "openai", "sk-cachetest", "http://x", cache_namespace="planner"
+            )
+            LLMClientFactory._clients.pop("openai_sk-cachete", None)
+
+        assert not isinstance(client, CachedLLMClient)
@@ -49,6 +49,35 @@ class TestBrandKnowledgeBase:
         assert doc_id is not None
         assert rag.get_stats()["total_documents"] == initial + 1
 
+    def test_generated_ids_are_stable_and_distinct(self, rag):
+        import hashlib
+
+        from app.knowledge.rag import make_document_id
+
+        meta = {"brand": "测试", "category": "配色方案"}
+        texts = [f"测试品牌规范第 {i} 条" for i in range(300)]
+        doc_ids = rag.add_documents([{"text": t, "metadata": meta} for t in texts])
+
+        assert len(set(doc_ids)) == len(texts)
+        assert doc_ids == [make_document_id(t, meta) for t in texts]
+        digest = hashlib.sha256(f"测试|配色方案|{texts[0]}".encode("utf-8")).hexdigest()
+        assert doc_ids[0] == f"测试_配色方案_{digest}"
+
+    def test_add_documents(self, rag):
+        """测试批量添加文档"""
+        initial = rag.get_stats()["total_documents"]
+
+        doc_ids = rag.add_documents([
+            {"text": "测试品牌的主色是绿色", "metadata": {"brand": "测试"}, "id": "batch_1"},
+            {"text": "测试品牌的口号是向前"},
+        ])
+
+        assert doc_ids[0] == "batch_1"
+        assert len(doc_ids) == 2
+        assert rag.get_stats()["total_documents"] == initial + 2
+        results = rag.search("绿色", top_k=5, filter_metadata={"brand": "测试"})
+        assert all(r["metadata"]["brand"] == "测试" for r in results)
+
     def test_search_basic(self, rag):
         """测试基本搜索"""
         rag.add_document(
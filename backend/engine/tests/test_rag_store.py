@@ -0,0 +1,204 @@
+"""
+RAG 持久化存储测试
+嵌入缓存（内存映射 .npy + SQLite）、知识库热启动、上传文档恢复
+"""
+import time
+import zlib
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.knowledge.rag import BaseEmbedder, BrandKnowledgeBase, Document, EmbeddingStore, text_hash
+
+DIM = 32
+MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+
+class CountingEmbedder(BaseEmbedder):
+    """确定性随机向量，记录编码过的文本数"""
+
+    def __init__(self):
+        self.encoded = 0
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    def encode(self, text):
+        self.encoded += 1
+        return np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(DIM)
+
+    def encode_batch(self, texts, batch_size=32):
+        return [self.encode(t) for t in texts]
+
+
+@pytest.fixture
+def embedder():
+    e = CountingEmbedder()
+    with patch("app.knowledge.rag.knowledge_base.create_embedder", return_value=e):
+        yield e
+
+
+def _kb(store_dir, **kwargs):
+    return BrandKnowledgeBase(use_chromadb=False, embedding_model=MODEL, store_directory=str(store_dir), **kwargs)
+
+
+class TestEmbeddingStore:
+    """存储本身"""
+
+    def test_roundtrip_and_growth(self, tmp_path):
+        store = EmbeddingStore(str(tmp_path), MODEL)
+        docs = [Document(id=f"d{i}", text=f"文本 {i}", embedding=np.full(DIM, i, dtype=np.float32)) for i in range(600)]
+        assert store.put_embeddings(docs) == 600
+        assert store.put_embeddings(docs[:10]) == 0
+        store.close()
+
+        reopened = EmbeddingStore(str(tmp_path), MODEL)
+        assert reopened.embedding_count == 600
+        found = reopened.lookup([text_hash("文本 599"), text_hash("不存在")])
+        assert list(found) == [text_hash("文本 599")]
+        assert np.allclose(found[text_hash("文本 599")], 599)
+
+    def test_models_are_separate(self, tmp_path):
+        a = EmbeddingStore(str(tmp_path), "model-a")
+        a.put_embeddings([Document(id="x", text="同一文本", embedding=np.ones(DIM))])
+        b = EmbeddingStore(str(tmp_path), "org/model-b")
+        assert b.lookup([text_hash("同一文本")]) == {}
+        assert b.path.parent == tmp_path
+
+    def test_documents_roundtrip(self, tmp_path):
+        store = EmbeddingStore(str(tmp_path), MODEL)
+        store.save_documents([
+            Document(id="a", text="华为主色红色", metadata={"brand": "华为"}, embedding=np.ones(DIM)),
+            Document(id="b", text="小米主色橙色", metadata={"brand": "小米"}),
+        ])
+        store.save_documents([Document(id="a", text="华为主色红色（更新）", metadata={"brand": "华为"})])
+
+        docs = EmbeddingStore(str(tmp_path), MODEL).load_documents()
+        assert [d.id for d in docs] == ["b", "a"]
+        assert docs[1].text == "华为主色红色（更新）"
+        assert docs[0].metadata == {"brand": "小米"}
+        assert docs[0].embedding is None
+
+    def test_truncated_vectors_reset(self, tmp_path):
+        store = EmbeddingStore(str(tmp_path), MODEL)
+        store.put_embeddings([Document(id="a", text="a", embedding=np.ones(DIM))])
+        store.close()
+        np.save(str(store.path / "embeddings.npy"), np.zeros((0, DIM), dtype=np.float32))
+
+        reopened = EmbeddingStore(str(tmp_path), MODEL)
+        assert reopened.embedding_count == 0
+        assert reopened.lookup([text_hash("a")]) == {}
+
+
+class TestKnowledgeBaseWarmStart:
+    """知识库热启动"""
+
+    def test_second_start_skips_encoding(self, tmp_path, embedder):
+        kb = _kb(tmp_path)
+        first = embedder.encoded
+        assert first == kb.get_stats()["total_documents"] > 0
+
+        embedder.encoded = 0
+        kb2 = _kb(tmp_path)
+        assert embedder.encoded == 0
+        assert kb2.get_stats()["total_documents"] == first
+        assert kb2.search("华为的配色", top_k=2) == kb.search("华为的配色", top_k=2)
+
+    def test_changed_default_document_reencoded(self, tmp_path, embedder):
+        kb = _kb(tmp_path)
+        docs = kb.loader.load()
+        docs[0].text += "（修订）"
+
+        embedder.encoded = 0
+        with patch.object(type(kb.loader), "load", return_value=docs):
+            _kb(tmp_path)
+        assert embedder.encoded == 1
+
+    def test_uploads_survive_restart(self, tmp_path, embedder):
+        kb = _kb(tmp_path, load_default_data=False)
+        kb.add_document("测试品牌的主色是蓝色", {"brand": "测试"}, "upload_1")
+        kb.add_documents([{"text": "测试品牌的口号是向前", "metadata": {"brand": "测试"}, "id": "upload_2"}])
+
+        embedder.encoded = 0
+        kb2 = _kb(tmp_path, load_default_data=False)
+        assert embedder.encoded == 0
+        assert [d["id"] for d in kb2.get_all_documents()] == ["upload_1", "upload_2"]
+        results = kb2.search("测试品牌的主色是蓝色", top_k=1, filter_metadata={"brand": "测试"})
+        assert results[0]["text"] == "测试品牌的主色是蓝色"
+
+    def test_colliding_legacy_ids_survive_restart(self, tmp_path, embedder):
+        # 旧的 ID 方案 f"{品牌}_{类别}_{hash(text) % 10000}" 下会冲突的两条文档
+        seen = {}
+        for i in range(10_000):
+            text = f"测试品牌规范第 {i} 条"
+            first = seen.setdefault(hash(text) % 10000, text)
+            if first != text:
+                break
+        texts = [first, text]
+        meta = {"brand": "测试", "category": "配色方案", "type": "user_upload"}
+
+        kb = _kb(tmp_path, load_default_data=False)
+        kb.add_documents([{"text": t, "metadata": meta} for t in texts])
+
+        kb2 = _kb(tmp_path, load_default_data=False)
+        assert sorted(d["text"] for d in kb2.get_all_documents()) == sorted(texts)
+
+    def test_duplicate_upload_kept_once(self, tmp_path, embedder):
+        kb = _kb(tmp_path, load_default_data=False)
+        meta = {"brand": "测试", "category": "配色方案"}
+        first = kb.add_document("测试品牌的主色是蓝色", meta)
+        second = kb.add_documents([{"text": "测试品牌的主色是蓝色", "metadata": meta}] * 2)
+
+        assert second == [first, first]
+        assert kb.get_stats()["total_documents"] == 1
+        assert len(kb.search("测试品牌的主色是蓝色", top_k=5)) == 1
+        assert _kb(tmp_path, load_default_data=False).get_stats()["total_documents"] == 1
+
+    def test_restored_upload_matching_default_not_duplicated(self, tmp_path, embedder):
+        default = _kb(tmp_path, load_default_data=False).loader.load()[0]
+        kb = _kb(tmp_path, load_default_data=False)
+        kb.add_document(default.text, default.metadata, default.id)
+
+        kb2 = _kb(tmp_path)
+        ids = [d["id"] for d in kb2.get_all_documents()]
+        assert ids.count(default.id) == 1
+        assert len(ids) == len(set(ids)) == len(kb2.loader.load())
+
+    def test_clear_drops_saved_uploads(self, tmp_path, embedder):
+        kb = _kb(tmp_path, load_default_data=False)
+        kb.add_document("待清空文档", {"brand": "测试"}, "upload_1")
+        kb.clear()
+        assert _kb(tmp_path, load_default_data=False).get_stats()["total_documents"] == 0
+
+    def test_store_disabled(self, tmp_path, embedder):
+        kb = BrandKnowledgeBase(use_chromadb=False, embedding_model=MODEL, store_directory="")
+        embedder.encoded = 0
+        BrandKnowledgeBase(use_chromadb=False, embedding_model=MODEL, store_directory="")
+        assert embedder.encoded == kb.get_stats()["total_documents"]
+        assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.slow
+def test_warm_start_benchmark(tmp_path):
+    """冷启动（全部编码）vs 热启动（读内存映射嵌入），编码按 2ms / 条模拟模型开销"""
+
+    class SlowEmbedder(CountingEmbedder):
+        def encode_batch(self, texts, batch_size=32):
+            time.sleep(0.002 * len(texts))
+            return super().encode_batch(texts, batch_size)
+
+    items = [{"text": f"品牌规范第 {i} 条", "metadata": {"brand": "测试"}, "id": f"doc_{i}"} for i in range(2000)]
+    with patch("app.knowledge.rag.knowledge_base.create_embedder", return_value=SlowEmbedder()):
+        start = time.perf_counter()
+        _kb(tmp_path, load_default_data=False).add_documents(items)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        kb = _kb(tmp_path, load_default_data=False)
+        warm = time.perf_counter() - start
+
+    assert kb.get_stats()["total_documents"] == len(items)
+    print(f"\n[rag store] {len(items)} 条: 冷启动 {cold * 1000:.0f}ms, 热启动 {warm * 1000:.0f}ms ({cold / warm:.0f}x)")
+    assert warm < cold
@@ -0,0 +1,146 @@
+"""
+嵌入模型后台加载测试
+启动不导入 torch、加载期间关键词兜底、就绪后切换向量检索、/health 就绪状态
+"""
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.knowledge.rag import BrandKnowledgeBase, SentenceTransformerEmbedder
+from app.knowledge.rag.embedder import SENTENCE_TRANSFORMERS_AVAILABLE
+
+pytestmark = pytest.mark.skipif(not SENTENCE_TRANSFORMERS_AVAILABLE, reason="sentence-transformers 未安装")
+
+ENGINE_DIR = Path(__file__).resolve().parent.parent
+
+
+class FakeModel:
+    """与 SentenceTransformer.encode 接口一致的确定性模型"""
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        def one(text):
+            return np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(32)
+        return one(texts) if isinstance(texts, str) else np.stack([one(t) for t in texts])
+
+
+@pytest.fixture
+def gated_model():
+    """模型加载阻塞到 release.set() 为止"""
+    release = threading.Event()
+
+    def _load(model_name):
+        release.wait(10)
+        return FakeModel()
+
+    with patch("app.knowledge.rag.embedder._load_model", side_effect=_load):
+        yield release
+    release.set()
+
+
+def _kb(**kwargs):
+    return BrandKnowledgeBase(use_chromadb=False, store_directory="", background_load=True, **kwargs)
+
+
+def test_import_does_not_load_torch():
+    code = "import sys, app.knowledge.rag; print('torch' in sys.modules or 'sentence_transformers' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ENGINE_DIR, capture_output=True, text=True, timeout=120)
+    assert out.stdout.strip().splitlines()[-1] == "False"
+
+
+class TestBackgroundLoad:
+    """后台加载"""
+
+    def test_keyword_fallback_then_vector(self, gated_model):
+        kb = _kb()
+        assert kb.get_stats()["backend"] == "keyword"
+        assert kb.readiness()["ready"] is False
+        assert kb.search("华为", top_k=2)
+
+        kb.add_document("测试品牌的主色是蓝色", {"brand": "测试"}, "during_load")
+        gated_model.set()
+        assert kb.embedder.wait(5)
+        deadline = time.time() + 5
+        while kb.get_stats()["backend"] != "sentence-transformers" and time.time() < deadline:
+            time.sleep(0.01)
+
+        status = kb.readiness()
+        assert status == {**status, "ready": True, "embedder": "ready", "backend": "sentence-transformers"}
+        assert "during_load" in [d["id"] for d in kb.get_all_documents()]
+        results = kb.search("测试品牌的主色是蓝色", top_k=1, filter_metadata={"brand": "测试"})
+        assert results[0]["text"] == "测试品牌的主色是蓝色"
+
+    def test_load_failure_keeps_keyword(self):
+        with patch("app.knowledge.rag.embedder._load_model", side_effect=OSError("offline")):
+            kb = _kb()
+            assert kb.embedder.wait(5) is False
+        assert kb.readiness()["ready"] is True
+        assert kb.readiness()["embedder"] == "failed"
+        assert kb.get_stats()["backend"] == "keyword"
+
+    def test_on_ready_after_load_runs_immediately(self):
+        with patch("app.knowledge.rag.embedder._load_model", return_value=FakeModel()):
+            embedder = SentenceTransformerEmbedder("fake")
+        calls = []
+        embedder.on_ready(lambda: calls.append(1))
+        assert calls == [1]
+        assert embedder.state == "ready"
+        assert embedder.load_seconds is not None
+
+
+class TestHealthReadiness:
+    """/health 就绪状态"""
+
+    def test_health_reports_rag(self, gated_model):
+        from fastapi.testclient import TestClient
+        from app.core import dependencies
+        from app.main import app
+
+        dependencies._cache.pop("knowledge_base", None)
+        try:
+            client = TestClient(app)
+            assert client.get("/health").json()["rag"]["embedder"] == "not_started"
+
+            dependencies._cache["knowledge_base"] = _kb(load_default_data=False)
+            body = client.get("/health").json()
+            assert body["status"] == "ok"
+            assert body["rag"]["ready"] is False
+            assert body["rag"]["backend"] == "keyword"
+        finally:
+            dependencies._cache.pop("knowledge_base", None)
+
+
+@pytest.mark.slow
+def test_cold_start_and_first_query_latency():
+    """模型加载按 1.5s 模拟：同步加载阻塞首个请求，后台加载立即可用（关键词兜底）"""
+
+    def _slow_load(model_name):
+        time.sleep(1.5)
+        return FakeModel()
+
+    with patch("app.knowledge.rag.embedder._load_model", side_effect=_slow_load):
+        start = time.perf_counter()
+        sync_kb = BrandKnowledgeBase(use_chromadb=False, store_directory="")
+        sync_kb.search("华为的配色", top_k=2)
+        sync_first = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bg_kb = _kb()
+        init = time.perf_counter() - start
+        bg_kb.search("华为的配色", top_k=2)
+        bg_first = time.perf_counter() - start
+        bg_kb.embedder.wait(10)
+
+    print(
+        f"\n[rag warmup] 同步加载: 首个查询 {sync_first * 1000:.0f}ms；"
+        f"后台加载: 初始化 {init * 1000:.0f}ms, 首个查询 {bg_first * 1000:.0f}ms, "
+        f"模型就绪 {bg_kb.embedder.load_seconds:.1f}s"
+    )
+    assert bg_first < sync_first
+    assert bg_first < 0.5
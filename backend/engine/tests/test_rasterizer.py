@@ -0,0 +1,249 @@
+"""
+引擎内海报光栅化测试
+- 与 Node 渲染服务的像素一致性（tests/data/render_parity 下的参考渲染图）
+- 审核分辨率缩放、图片缓存、asset:// 引用、Critic 视觉审核接入
+
+参考图来源记录在 reference.json：当前提交的参考图由渲染服务生成的 SVG 经 resvg 光栅化
+（而非 sharp），文字统一按 DejaVu Sans 绘制，因此只能验证图形 / 图片语义与排版位置；
+cjk_text（不替换字体的中文排版）没有参考图时跳过。
+
+重新生成参考图（需启动 backend/render 渲染服务，且本机安装 Noto CJK）：
+    python -m tests.test_rasterizer http://localhost:3000
+"""
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image, ImageColor
+from unittest.mock import patch
+
+from app.core.blob_store import store_bytes
+from app.services.renderer import rasterizer
+from app.services.renderer.rasterizer import rasterize_poster, rasterize_poster_to_bytes
+
+
+PARITY_DIR = Path(__file__).parent / "data" / "render_parity"
+FIXTURES = json.loads((PARITY_DIR / "fixtures.json").read_text(encoding="utf-8"))
+REFERENCE = json.loads((PARITY_DIR / "reference.json").read_text(encoding="utf-8"))
+
+TEXT_FIXTURES = {"text", "layout_engine", "cjk_text"}
+# 使用本机解析到的字体绘制（不替换为参考图字体）的中文用例
+CJK_FIXTURES = {"cjk_text"}
+
+# (平均绝对误差上限, 差异 > 32 的像素占比上限)；文字受字形抗锯齿差异影响，阈值放宽
+TOLERANCE = {"default": (1.0, 0.002), "text": (3.0, 0.03)}
+
+
+@pytest.fixture(autouse=True)
+def _fresh_image_cache():
+    rasterizer.clear_image_cache()
+    yield
+    rasterizer.clear_image_cache()
+
+
+def _font_path(file_name: str):
+    from app.services.renderer.font_registry import _font_file_index
+
+    return _font_file_index().get(file_name.lower())
+
+
+def _has_cjk_font() -> bool:
+    """中文字体兜底链中只有 DejaVu 不含 CJK 字形"""
+    path = rasterizer.resolve_font_file("PingFang SC")
+    return path is not None and not os.path.basename(path).lower().startswith("dejavu")
+
+
+def _diff(name: str, img: Image.Image):
+    ref = np.asarray(Image.open(PARITY_DIR / f"{name}.png").convert("RGB"), dtype=np.int16)
+    got = np.asarray(img, dtype=np.int16)
+    assert got.shape == ref.shape
+    delta = np.abs(ref - got)
+    return float(delta.mean()), float((delta.max(axis=-1) > 32).mean())
+
+
+# ============================================================================
+# 1. 与 Node 渲染服务的一致性
+# ============================================================================
+
+class TestRenderParity:
+
+    @pytest.mark.parametrize("name", sorted(FIXTURES))
+    def test_matches_reference(self, name):
+        if not (PARITY_DIR / f"{name}.png").exists():
+            pytest.skip(f"{name} 没有参考图（需用渲染服务生成）")
+        if name in CJK_FIXTURES and not _has_cjk_font():
+            pytest.skip("本机没有中文字体")
+
+        reference_font = REFERENCE.get("text_font")
+        if name in TEXT_FIXTURES and name not in CJK_FIXTURES and reference_font:
+            font_path = _font_path(reference_font)
+            if font_path is None:
+                pytest.skip(f"参考字体 {reference_font} 不存在")
+            font_patch = patch.object(rasterizer, "resolve_font_file", return_value=font_path)
+        else:
+            font_patch = patch.object(rasterizer, "resolve_font_file", wraps=rasterizer.resolve_font_file)
+
+        with font_patch:
+            mae, outliers = _diff(name, rasterize_poster(FIXTURES[name]))
+
+        max_mae, max_outliers = TOLERANCE["text" if name in TEXT_FIXTURES else "default"]
+        assert mae <= max_mae, f"{name}: mae={mae:.2f}"
+        assert outliers <= max_outliers, f"{name}: outliers={outliers:.4f}"
+
+
+# ============================================================================
+# 2. 光栅化行为
+# ============================================================================
+
+class TestRasterizer:
+
+    def test_review_resolution(self):
+        poster = {"canvas": {"width": 1080, "height": 1920, "backgroundColor": "#336699"}, "layers": []}
+        img = rasterize_poster(poster, max_edge=512)
+
+        assert img.size == (288, 512)
+        assert img.getpixel((10, 10)) == (0x33, 0x66, 0x99)
+
+    def test_scaled_render_close_to_downsampled_full_render(self):
+        poster = FIXTURES["images"]
+        full = rasterize_poster(poster).resize((180, 320), Image.LANCZOS)
+        half = rasterize_poster(poster, max_edge=320)
+
+        delta = np.abs(np.asarray(full, dtype=np.int16) - np.asarray(half, dtype=np.int16))
+        assert delta.mean() < 4
+
+    def test_invalid_canvas_colour_is_black(self):
+        poster = {"canvas": {"width": 10, "height": 10, "backgroundColor": "white"}, "layers": []}
+        assert rasterize_poster(poster).getpixel((5, 5)) == (0, 0, 0)
+
+    def test_asset_ref_and_cache(self):
+        buf = io.BytesIO()
+        Image.new("RGB", (40, 40), (255, 0, 0)).save(buf, format="PNG")
+        ref = store_bytes(buf.getvalue(), "image/png")
+        poster = {
+            "canvas": {"width": 100, "height": 100, "backgroundColor": "#000000"},
+            "layers": [{"id": "bg", "type": "image", "src": ref, "x": 0, "y": 0, "width": 100, "height": 100}],
+        }
+
+        with patch.object(rasterizer, "_load_source", wraps=rasterizer._load_source) as load:
+            first = rasterize_poster(poster)
+            rasterize_poster(poster)
+
+        assert first.getpixel((50, 50)) == (255, 0, 0)
+        assert load.call_count == 1
+
+    def test_broken_layer_is_skipped(self):
+        poster = {
+            "canvas": {"width": 50, "height": 50, "backgroundColor": "#FFFFFF"},
+            "layers": [
+                {"id": "bad", "type": "image", "src": "data:image/png;base64,AAAA", "x": 0, "y": 0,
+                 "width": 50, "height": 50},
+                {"id": "r", "type": "rect", "x": 0, "y": 0, "width": 25, "height": 50, "backgroundColor": "#000000"},
+            ],
+        }
+        img = rasterize_poster(poster)
+        assert img.getpixel((10, 25)) == (0, 0, 0)
+        assert img.getpixel((40, 25)) == (255, 255, 255)
+
+    def test_cjk_fixture_resolves_cjk_font_first(self):
+        from app.services.renderer import font_registry
+
+        index = {
+            "dejavusans.ttf": "/fonts/DejaVuSans.ttf",
+            "notosanscjk-regular.ttc": "/fonts/NotoSansCJK-Regular.ttc",
+        }
+        font_registry.clear_font_file_cache()
+        try:
+            with patch.object(font_registry, "_font_file_index", return_value=index):
+                families = {layer["fontFamily"] for layer in FIXTURES["cjk_text"]["layers"] if layer["type"] == "text"}
+                assert {font_registry.resolve_font_file(f) for f in families} == {"/fonts/NotoSansCJK-Regular.ttc"}
+        finally:
+            font_registry.clear_font_file_cache()
+
+    def test_cjk_fixture_draws_text_unpatched(self):
+        poster = FIXTURES["cjk_text"]
+        img = np.asarray(rasterize_poster(poster), dtype=np.int16)
+        background = np.array(ImageColor.getrgb(poster["canvas"]["backgroundColor"]), dtype=np.int16)
+
+        title = next(layer for layer in poster["layers"] if layer["id"] == "t1")
+        region = img[title["y"]:title["y"] + title["height"], title["x"]:title["x"] + title["width"]]
+        assert (np.abs(region - background).max(axis=-1) > 64).mean() > 0.02
+
+    def test_encoded_output(self):
+        data = rasterize_poster_to_bytes(FIXTURES["shapes"], max_edge=320, fmt="jpeg", quality=80)
+        img = Image.open(io.BytesIO(data))
+        assert img.format == "JPEG"
+        assert img.size == (180, 320)
+
+    @pytest.mark.slow
+    def test_review_render_speed(self):
+        from app.services.renderer import LayoutBuilder, SchemaConverter
+
+        photo = FIXTURES["images"]["layers"][0]["src"]
+        dsl = [
+            {"command": "add_image", "src": photo, "layer_type": "background"},
+            {"command": "add_overlay"},
+            {"command": "add_title", "content": "Night Market", "font_size": 96},
+            {"command": "add_subtitle", "content": "Food, music and lights"},
+            {"command": "add_cta", "content": "Join us"},
+        ]
+        elements = LayoutBuilder().build(dsl, "bottom_heavy", 1080, 1920)
+        poster = SchemaConverter().convert(elements).model_dump()
+        rasterize_poster(poster, max_edge=1024)  # 预热字体 / 图片缓存
+
+        start = time.perf_counter()
+        for _ in range(5):
+            rasterize_poster_to_bytes(poster, max_edge=1024, fmt="jpeg")
+        per_render = (time.perf_counter() - start) / 5
+
+        print(f"\n[rasterizer] {per_render * 1000:.1f}ms / render @1024")
+        assert per_render < 0.5
+
+
+# ============================================================================
+# 3. Critic 视觉审核接入
+# ============================================================================
+
+class TestCriticIntegration:
+
+    def test_python_renderer_skips_render_service(self):
+        from app.agents import critic
+
+        with patch.object(critic.settings.critic, "VISUAL_RENDERER", "python"), \
+             patch("app.tools.render_client.render_poster_to_image") as node_render:
+            image_bytes = critic._render_for_review(FIXTURES["shapes"])
+
+        node_render.assert_not_called()
+        assert max(Image.open(io.BytesIO(image_bytes)).size) <= critic.settings.critic.VISUAL_RENDER_MAX_EDGE
+
+    def test_node_renderer_option(self):
+        from app.agents import critic
+
+        with patch.object(critic.settings.critic, "VISUAL_RENDERER", "node"), \
+             patch("app.tools.render_client.render_poster_to_image", return_value=b"png") as node_render:
+            assert critic._render_for_review(FIXTURES["shapes"]) == b"png"
+        node_render.assert_called_once()
+
+
+if __name__ == "__main__":
+    # 用运行中的 Node 渲染服务重新生成参考图
+    import sys
+
+    import httpx
+
+    render_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:3000"
+    for fixture_name, poster_data in FIXTURES.items():
+        resp = httpx.post(f"{render_url}/api/render/image?format=png", json=poster_data, timeout=60)
+        resp.raise_for_status()
+        Image.open(io.BytesIO(resp.content)).convert("RGB").save(PARITY_DIR / f"{fixture_name}.png", optimize=True)
+        print(f"✅ {fixture_name}")
+
+    # 渲染服务按本机字体绘制文字，比对时不再替换字体
+    (PARITY_DIR / "reference.json").write_text(
+        json.dumps({"renderer": "node", "render_url": render_url}, ensure_ascii=False, indent=1) + "\n",
+        encoding="utf-8",
+    )
@@ -1,6 +1,6 @@
 """
 Renderer Service 测试
-测试 DSL 解析（绝对坐标模式）、Schema 转换
+测试 DSL 解析（绝对坐标模式）、Schema 转换、排版结果缓存
 """
 import pytest
 from app.services.renderer import RendererService, create_simple_poster_from_text
@@ -150,3 +150,91 @@ class TestCreateSimplePosterFromText:
         )
         text_layers = [l for l in poster.layers if l.model_dump().get("type") == "text"]
         assert len(text_layers) >= 2
+
+
+class TestLayoutMemo:
+    """build_poster 排版结果缓存"""
+
+    DSL = [
+        {"command": "add_image", "src": "data:image/png;base64," + "A" * 4096, "layer_type": "background"},
+        {"command": "add_title", "content": "夏日音乐节", "font_size": 96},
+        {"command": "add_subtitle", "content": "外滩滨江草坪", "font_size": 48},
+    ]
+    BRIEF = {"title": "夏日音乐节", "main_color": "#FFFFFF", "background_color": "#1A1A2E"}
+
+    @pytest.fixture(autouse=True)
+    def memo(self):
+        from app.services.renderer.layout_memo import get_layout_memo, reset_layout_memo
+
+        reset_layout_memo()
+        yield get_layout_memo()
+        reset_layout_memo()
+
+    def _build(self, **overrides):
+        import copy
+
+        kwargs = dict(
+            dsl_instructions=copy.deepcopy(self.DSL), layout_strategy="centered",
+            canvas_width=1080, canvas_height=1920, design_brief=self.BRIEF,
+        )
+        kwargs.update(overrides)
+        return RendererService().build_poster(**kwargs)
+
+    def test_repeat_hits_cache(self, memo):
+        first = self._build()
+        second = self._build()
+
+        assert second == first
+        stats = memo.get_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_returns_independent_copies(self, memo):
+        first = self._build()
+        first.layers[1].content = "改过的标题"
+        assert self._build().layers[1].content != "改过的标题"
+
+    @pytest.mark.parametrize("overrides", [
+        {"layout_strategy": "bottom_heavy"},
+        {"font_style": "serif"},
+        {"canvas_width": 1080, "canvas_height": 1080},
+        {"design_brief": {"title": "夏日音乐节", "main_color": "#FF0000", "background_color": "#1A1A2E"}},
+        {"design_brief": {"title": "夏日音乐节", "kg_rules": {"color_palettes": {"accent": ["#00FF00"]}}}},
+    ])
+    def test_relevant_inputs_change_key(self, memo, overrides):
+        self._build()
+        self._build(**overrides)
+        assert memo.get_stats()["misses"] == 2
+
+    def test_irrelevant_brief_fields_ignored(self, memo):
+        self._build()
+        self._build(design_brief={**self.BRIEF, "user_prompt": "另一种说法"})
+        assert memo.get_stats()["hits"] == 1
+
+    def test_image_src_digest_in_key(self):
+        from app.services.renderer.layout_memo import make_layout_key
+
+        a = make_layout_key(self.DSL, "centered", None, 1080, 1920)
+        dsl_b = [{**self.DSL[0], "src": self.DSL[0]["src"] + "B"}] + self.DSL[1:]
+        assert a != make_layout_key(dsl_b, "centered", None, 1080, 1920)
+
+    def test_lru_eviction(self):
+        from app.services.renderer.layout_memo import LayoutMemo
+
+        memo = LayoutMemo(max_entries=2)
+        poster = self._build()
+        for key in ("a", "b", "c"):
+            memo.set(key, poster)
+
+        assert memo.get("a") is None
+        assert memo.get("c") is not None
+        assert memo.get_stats()["evictions"] == 1
+
+    def test_metrics_endpoint(self, memo):
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        self._build()
+        self._build()
+        body = TestClient(app).get("/metrics").json()
+        assert body["layout_memo"]["hits"] == 1
@@ -0,0 +1,201 @@
+"""
+多尺寸派生测试
+测试宽高比 → 策略映射、DSL 换算、主体感知裁剪、本地派生（不调用 LLM），以及 /api/step/resize 只为规则审核不通过的尺寸调用 LLM
+"""
+import io
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.agents.layout import derive_poster_sizes, run_layout_agent_multi
+from app.core.blob_store import resolve_asset_ref, store_bytes
+from app.main import app
+from app.services.renderer.resize import (
+    aspect_class,
+    crop_background,
+    crop_box,
+    resize_strategy,
+    scale_instructions,
+)
+from app.services.renderer.subject_bbox import focal_point
+
+client = TestClient(app)
+
+BRIEF = {"title": "夏日音乐节", "subtitle": "外滩滨江草坪", "background_color": "#1A1A2E"}
+SIZES = [(1080, 1920), (1080, 1080), (1920, 1080), (1200, 300)]
+
+DSL = {
+    "layout_strategy": "bottom_heavy",
+    "font_style": "sans",
+    "dsl_instructions": [
+        {"command": "add_image", "src": "ASSET_BG", "layer_type": "background"},
+        {"command": "add_title", "content": "夏日音乐节", "font_size": 96, "color": "#FFFFFF"},
+        {"command": "add_subtitle", "content": "外滩滨江草坪 · 七月", "font_size": 48, "color": "#FFFFFF"},
+        {"command": "add_cta", "content": "立即购票", "font_size": 40, "color": "#FFD700"},
+    ],
+}
+
+
+def _background(width=900, height=1600, subject_at=(0.75, 0.3)):
+    """平滑渐变背景，在 subject_at 处放一块高细节的"主体" """
+    rng = np.random.default_rng(0)
+    img = np.tile(np.linspace(40, 90, width, dtype=np.float32), (height, 1))
+    cx, cy = int(subject_at[0] * width), int(subject_at[1] * height)
+    img[cy - 80:cy + 80, cx - 80:cx + 80] = rng.integers(0, 255, (160, 160))
+    buf = io.BytesIO()
+    Image.fromarray(img.astype(np.uint8)).convert("RGB").save(buf, format="PNG")
+    return store_bytes(buf.getvalue(), "image/png")
+
+
+def _source_poster(bg_src):
+    response = SimpleNamespace(text=json.dumps(DSL, ensure_ascii=False))
+    agent = MagicMock()
+    agent.invoke.return_value = response
+    with patch("app.agents.base.AgentFactory.get_layout_agent", return_value=agent):
+        return run_layout_agent_multi(BRIEF, {"background_layer": {"src": bg_src}}, 1080, 1920, count=1)[0]
+
+
+# ============================================================================
+# 1. 策略映射 / DSL 换算
+# ============================================================================
+
+class TestStrategyMapping:
+
+    def test_aspect_classes(self):
+        assert [aspect_class(w, h) for w, h in SIZES] == ["portrait", "square", "landscape", "banner"]
+
+    def test_portrait_keeps_strategy(self):
+        assert resize_strategy("bottom_heavy", 1080, 1920) == "bottom_heavy"
+
+    def test_wide_sizes_use_taller_content_region(self):
+        assert resize_strategy("bottom_heavy", 1920, 1080) == "left_aligned"
+        assert resize_strategy("centered", 1200, 300) == "left_aligned"
+        assert resize_strategy("unknown", 1080, 1080) == "centered"
+
+    def test_scale_by_short_side(self):
+        dsl = [
+            {"command": "add_title", "content": "标题", "font_size": 96},
+            {"command": "add_shape", "height": 80},
+            {"command": "add_image", "src": "x", "layer_type": "subject", "x": 0, "y": 960, "width": 1080, "height": 960},
+        ]
+        scaled = scale_instructions(dsl, (1080, 1920), (1200, 300))
+
+        assert scaled[0]["font_size"] == round(96 * 300 / 1080)
+        assert scaled[1]["height"] == round(80 * 300 / 1080)
+        assert (scaled[2]["y"], scaled[2]["width"]) == (150, 1200)
+        assert dsl[0]["font_size"] == 96  # 不修改原指令
+
+
+# ============================================================================
+# 2. 主体感知裁剪
+# ============================================================================
+
+class TestSubjectAwareCrop:
+
+    def test_focal_point_follows_detail(self):
+        data, _ = resolve_asset_ref(_background(subject_at=(0.75, 0.3)))
+        fx, fy = focal_point(Image.open(io.BytesIO(data)))
+        assert fx == pytest.approx(0.75, abs=0.08)
+        assert fy == pytest.approx(0.3, abs=0.08)
+
+    def test_crop_box_clamped_to_image(self):
+        assert crop_box((900, 1600), (1920, 1080), (0.5, 0.0)) == (0, 0, 900, 506)
+        left, top, right, bottom = crop_box((900, 1600), (300, 1200), (1.0, 0.5))
+        assert right == 900 and (right - left) == 400
+
+    def test_landscape_crop_keeps_subject(self):
+        src = _background(subject_at=(0.5, 0.2))
+        ref = crop_background(src, 1920, 1080)
+        data, mime = resolve_asset_ref(ref)
+        img = Image.open(io.BytesIO(data))
+
+        assert ref != src and mime == "image/jpeg"
+        assert img.width / img.height == pytest.approx(1920 / 1080, abs=0.01)
+        # 主体位于原图 20% 高度处，居中裁剪（35%~65%）会把它裁掉
+        lum = np.asarray(img.convert("L"), dtype=np.float32)
+        assert np.abs(np.diff(lum, axis=1)).max() > 100
+
+    def test_unreadable_src_unchanged(self):
+        assert crop_background("asset://" + "0" * 64, 1080, 1080) == "asset://" + "0" * 64
+
+
+# ============================================================================
+# 3. 本地派生
+# ============================================================================
+
+class TestDerivePosterSizes:
+
+    def test_bundle_without_llm(self):
+        poster = _source_poster(_background())
+        with patch("app.agents.base.AgentFactory.get_layout_agent", side_effect=AssertionError("LLM called")):
+            bundle = derive_poster_sizes(poster, BRIEF, SIZES)
+
+        assert [(p["canvas"]["width"], p["canvas"]["height"]) for p in bundle] == SIZES
+        assert [p["layout_strategy"] for p in bundle] == ["bottom_heavy", "bottom_heavy", "left_aligned", "left_aligned"]
+        for p in bundle:
+            cw, ch = p["canvas"]["width"], p["canvas"]["height"]
+            texts = [l for l in p["layers"] if l["type"] == "text"]
+            assert len(texts) == 3
+            assert all(t["x"] + t["width"] <= cw and t["y"] + t["height"] <= ch for t in texts)
+            assert p["dsl_instructions"] and p["layout_tree"]
+
+    def test_background_recropped_per_size(self):
+        bg = _background()
+        bundle = derive_poster_sizes(_source_poster(bg), BRIEF, SIZES)
+        srcs = [next(l["src"] for l in p["layers"] if l["type"] == "image") for p in bundle]
+        assert srcs[0] == bg  # 900x1600 与 1080x1920 宽高比一致，不裁剪
+        assert len(set(srcs[1:]) - {bg}) == 3
+
+
+# ============================================================================
+# 4. 路由
+# ============================================================================
+
+class TestStepResizeRoute:
+
+    def test_no_llm_when_rules_pass(self):
+        poster = _source_poster(_background())
+        with patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock) as mock_agent:
+            response = client.post("/api/step/resize", json={
+                "poster": poster, "design_brief": BRIEF,
+                "sizes": [{"width": 1080, "height": 1080}, {"width": 1920, "height": 1080}],
+            })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["step"] == "resize"
+        assert [s["aspect"] for s in data["sizes"]] == ["square", "landscape"]
+        flagged = [s for s in data["sizes"] if s["review"]["status"] == "REJECT"]
+        assert mock_agent.await_count == len(flagged)
+
+    def test_llm_only_for_flagged_size(self):
+        from app.agents.rule_critic import RuleIssue, RuleReview
+
+        poster = _source_poster(_background())
+
+        def fake_review(p):
+            if p["canvas"]["width"] == 1200 and "regenerated" not in p:
+                return RuleReview(issues=[RuleIssue("margin", "error", "文字贴边")])
+            return RuleReview()
+
+        regenerated = {**derive_poster_sizes(poster, BRIEF, [(1200, 300)])[0], "regenerated": True}
+        with patch("app.api.routes.steps.evaluate_layout", side_effect=fake_review), \
+             patch("app.api.routes.steps.arun_layout_agent", new_callable=AsyncMock, return_value=regenerated) as mock_agent:
+            response = client.post("/api/step/resize", json={"poster": poster, "design_brief": BRIEF})
+
+        data = response.json()
+        assert mock_agent.await_count == 1
+        assert mock_agent.await_args.kwargs["canvas_width"] == 1200
+        assert mock_agent.await_args.kwargs["review_feedback"]["status"] == "REJECT"
+        assert [s["regenerated"] for s in data["sizes"]] == [False, False, False, True]
+
+    def test_missing_dsl_is_400(self):
+        response = client.post("/api/step/resize", json={
+            "poster": {"canvas": {"width": 1080, "height": 1920}, "layers": []}, "design_brief": BRIEF,
+        })
+        assert response.status_code == 400
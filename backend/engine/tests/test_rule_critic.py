@@ -0,0 +1,206 @@
+"""
+规则预审（Rule Critic）测试
+测试几何 / 对比度 / 字号层级 / 页边距 / CTA 检查，以及在 Critic Agent 中短路 LLM 调用
+"""
+import asyncio
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from app.agents.rule_critic import (
+    contrast_ratio,
+    evaluate_layout,
+    get_rule_critic_stats,
+    run_rule_critic,
+)
+
+
+def _text(id_, content, x, y, w, h, size, color="#FFFFFF", weight="normal"):
+    return {
+        "id": id_, "type": "text", "content": content,
+        "x": x, "y": y, "width": w, "height": h,
+        "fontSize": size, "color": color, "fontWeight": weight,
+    }
+
+
+def _poster(texts, bg="#1A1A2E", under=None):
+    return {
+        "canvas": {"width": 1080, "height": 1920, "backgroundColor": bg},
+        "layers": list(under or []) + texts,
+    }
+
+
+@pytest.fixture
+def clean_texts():
+    return [
+        _text("title", "夏日音乐节", 80, 600, 920, 140, 96, weight="bold"),
+        _text("sub", "2025.07.12 上海", 80, 780, 920, 60, 32),
+        _text("cta", "立即购票", 80, 1600, 920, 60, 28, color="#FFD700", weight="bold"),
+    ]
+
+
+BG_IMAGE = {"id": "bg", "type": "image", "src": "asset://x", "x": 0, "y": 0, "width": 1080, "height": 1920}
+
+
+# ============================================================================
+# 1. 单项检查
+# ============================================================================
+
+class TestEvaluateLayout:
+
+    def test_clean_layout_passes(self, clean_texts):
+        review = evaluate_layout(_poster(clean_texts))
+        assert review.verdict == "PASS"
+        assert review.issues == []
+
+    def test_structure_errors(self):
+        assert evaluate_layout({"canvas": {}, "layers": []}).verdict == "REJECT"
+        assert evaluate_layout(_poster([], under=[BG_IMAGE])).verdict == "REJECT"
+
+    def test_heavy_text_overlap_rejects(self, clean_texts):
+        clean_texts[1]["y"] = 620
+        review = evaluate_layout(_poster(clean_texts))
+
+        assert review.verdict == "REJECT"
+        assert any(i.rule == "overlap" for i in review.issues)
+
+    def test_same_colour_rejects(self, clean_texts):
+        review = evaluate_layout(_poster(clean_texts, bg="#FFFFFF"))
+
+        assert review.verdict == "REJECT"
+        assert {i.layer_id for i in review.issues if i.rule == "contrast"} >= {"title", "sub"}
+
+    def test_moderate_contrast_warns(self, clean_texts):
+        clean_texts[1]["color"] = "#777777"
+        review = evaluate_layout(_poster(clean_texts, bg="#333333"))
+
+        assert review.verdict == "UNSURE"
+        assert [i.rule for i in review.issues] == ["contrast"]
+
+    def test_text_over_image_is_unsure(self, clean_texts):
+        review = evaluate_layout(_poster(clean_texts, under=[BG_IMAGE]))
+
+        assert review.issues == []
+        assert not review.contrast_known
+        assert review.verdict == "UNSURE"
+
+    def test_opaque_overlay_makes_contrast_known(self, clean_texts):
+        overlay = {"id": "ov", "type": "rect", "x": 0, "y": 0, "width": 1080, "height": 1920,
+                   "backgroundColor": "#000000", "opacity": 0.9}
+        review = evaluate_layout(_poster(clean_texts, under=[BG_IMAGE, overlay]))
+        assert review.verdict == "PASS"
+
+    def test_translucent_overlay_blends_with_canvas(self, clean_texts):
+        overlay = {"id": "ov", "type": "rect", "x": 0, "y": 0, "width": 1080, "height": 1920,
+                   "backgroundColor": "#FFFFFF", "opacity": 0.5}
+        review = evaluate_layout(_poster(clean_texts, bg="#000000", under=[overlay]))
+        assert any(i.rule == "contrast" for i in review.issues)
+
+    def test_reading_order(self, clean_texts):
+        clean_texts[0]["y"] = 1200
+        clean_texts.insert(0, _text("eyebrow", "LIVE", 80, 400, 920, 50, 24))
+        review = evaluate_layout(_poster(clean_texts))
+        assert "reading_order" in {i.rule for i in review.issues}
+
+    def test_flat_hierarchy_and_tiny_text(self, clean_texts):
+        for t in clean_texts:
+            t["fontSize"] = 12
+        rules = {i.rule for i in evaluate_layout(_poster(clean_texts)).issues}
+        assert {"hierarchy", "font_size"} <= rules
+
+    def test_margins(self, clean_texts):
+        clean_texts[1]["x"] = 4
+        assert evaluate_layout(_poster(clean_texts)).verdict == "UNSURE"
+
+        clean_texts[1]["x"] = 400
+        assert evaluate_layout(_poster(clean_texts)).verdict == "REJECT"
+
+    def test_cta_above_title(self, clean_texts):
+        clean_texts[2]["y"] = 200
+        issues = evaluate_layout(_poster(clean_texts)).issues
+        assert [i.rule for i in issues] == ["cta"]
+
+    def test_contrast_ratio_reference_values(self):
+        assert contrast_ratio((0, 0, 0), (255, 255, 255)) == pytest.approx(21.0)
+        assert contrast_ratio((119, 119, 119), (255, 255, 255)) == pytest.approx(4.48, abs=0.01)
+
+    def test_layout_builder_output_passes(self):
+        from app.services.renderer.layout_builder import LayoutBuilder, STRATEGIES
+        from app.services.renderer.schema_converter import SchemaConverter
+
+        dsl = [
+            {"command": "add_title", "content": "夏日音乐节", "font_size": 96, "color": "#FFFFFF"},
+            {"command": "add_subtitle", "content": "2025.07.12 上海", "color": "#FFFFFF"},
+            {"command": "add_cta", "content": "立即购票", "color": "#FFD700"},
+        ]
+        brief = {"background_color": "#1A1A2E"}
+        for strategy in STRATEGIES:
+            elements = LayoutBuilder().build(dsl, strategy, 1080, 1920, brief)
+            poster = SchemaConverter().convert(elements, brief).model_dump()
+            assert evaluate_layout(poster).verdict == "PASS", strategy
+
+
+# ============================================================================
+# 2. 短路 LLM 审核
+# ============================================================================
+
+class TestShortCircuit:
+
+    def test_review_shape(self, clean_texts):
+        clean_texts[1]["y"] = 620
+        review = run_rule_critic(_poster(clean_texts))
+
+        assert review["status"] == "REJECT"
+        assert review["review_path"] == "rule"
+        assert all(isinstance(i, str) for i in review["issues"])
+        assert review["rule_issues"][0]["severity"] == "error"
+
+    def test_disabled(self, clean_texts):
+        with patch("app.agents.rule_critic.settings.rule_critic.ENABLED", False):
+            assert run_rule_critic(_poster(clean_texts)) is None
+
+    def test_pass_short_circuit_configurable(self, clean_texts):
+        with patch("app.agents.rule_critic.settings.rule_critic.SHORT_CIRCUIT_PASS", False):
+            assert run_rule_critic(_poster(clean_texts)) is None
+
+    def test_sync_critic_skips_llm(self, clean_texts):
+        from app.agents.critic import run_critic_agent
+
+        with patch("app.agents.critic._run_json_review") as mock_json, \
+             patch("app.agents.critic._run_visual_review") as mock_vis:
+            result = run_critic_agent(_poster(clean_texts))
+
+        assert result["status"] == "PASS"
+        assert result["review_path"] == "rule"
+        mock_json.assert_not_called()
+        mock_vis.assert_not_called()
+
+    def test_async_critic_defers_unsure(self, clean_texts):
+        from app.agents.critic import arun_critic_agent
+
+        json_r = {"status": "PASS", "feedback": "OK", "issues": []}
+        with patch("app.agents.critic._arun_json_review", new_callable=AsyncMock, return_value=json_r) as mock_json, \
+             patch("app.agents.critic.settings.critic.ENABLE_VISUAL_REVIEW", False):
+            result = asyncio.run(arun_critic_agent(_poster(clean_texts, under=[BG_IMAGE])))
+
+        assert result["review_path"] == "json_only"
+        mock_json.assert_awaited_once()
+
+    def test_stats_report_avoided_share(self, clean_texts):
+        run_rule_critic(_poster(clean_texts))
+        run_rule_critic(_poster(clean_texts, bg="#FFFFFF"))
+        run_rule_critic(_poster(clean_texts, under=[BG_IMAGE]))
+        run_rule_critic(_poster(clean_texts, under=[BG_IMAGE]))
+
+        stats = get_rule_critic_stats()
+        assert stats["evaluated"] == 4
+        assert (stats["pass"], stats["reject"], stats["deferred"]) == (1, 1, 2)
+        assert stats["llm_avoided_ratio"] == 0.5
+
+    def test_metrics_endpoint(self, clean_texts):
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        run_rule_critic(_poster(clean_texts))
+        body = TestClient(app).get("/metrics").json()
+        assert body["rule_critic"]["llm_calls_avoided"] == 1
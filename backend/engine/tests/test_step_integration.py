@@ -8,7 +8,7 @@ Mock 外部服务（LLM API、Pexels/Flux），保留内部逻辑。
 import io
 import json
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 try:
     from fastapi.testclient import TestClient
@@ -62,7 +62,7 @@ def sample_png_bytes():
 class TestStepAssetsTextOnly:
     """Text Only: 无图片上传，直接搜索背景"""
 
-    @patch("app.services.asset_service.search_assets_multiple")
+    @patch("app.services.asset_service.asearch_assets_multiple", new_callable=AsyncMock)
     def test_returns_candidates(self, mock_search, client, sample_design_brief):
         mock_search.return_value = [
             "https://example.com/bg1.jpg",
@@ -84,7 +84,33 @@ class TestStepAssetsTextOnly:
         assert body["step"] == "assets"
         assert len(body["candidates"]) == 2
         assert body["keywords_used"] == ["tech", "modern"]
-        mock_search.assert_called_once()
+        mock_search.assert_awaited_once()
+
+
+    def test_reuses_pooled_client_across_requests(self, client, sample_design_brief):
+        """素材抓取在应用事件循环上执行：不新建事件循环，连续请求复用同一个异步连接池"""
+        from app.core import http_client
+        from app.tools import asset_db
+
+        seen = []
+
+        def _track():
+            seen.append(http_client.get_async_http_client())
+            return seen[-1]
+
+        with patch.object(asset_db, "FLUX_API_KEY", ""), patch.object(asset_db, "PEXELS_API_KEY", ""), \
+                patch.object(asset_db, "get_async_http_client", side_effect=_track), \
+                patch("asyncio.run", side_effect=AssertionError("请求路径不应调用 asyncio.run")):
+            for _ in range(2):
+                resp = client.post(
+                    "/api/step/assets",
+                    data={"design_brief_json": json.dumps(sample_design_brief), "count": "1"},
+                )
+                assert resp.status_code == 200
+
+        assert len(seen) == 2
+        assert seen[0] is seen[1]
+        assert not seen[0].is_closed
 
 
 # ============================================================================
@@ -95,7 +121,7 @@ class TestStepAssetsTextOnly:
 class TestStepAssetsStyleReference:
     """Style Reference: 上传背景参考图，分析后搜索匹配背景"""
 
-    @patch("app.services.asset_service.search_assets_multiple")
+    @patch("app.services.asset_service.asearch_assets_multiple", new_callable=AsyncMock)
     @patch("app.services.asset_service.understand_image")
     def test_enriches_design_brief(
         self, mock_understand, mock_search, client, sample_design_brief, sample_png_bytes
@@ -149,7 +175,7 @@ class TestStepAssetsStyleReference:
 class TestStepAssetsWithMaterial:
     """With Material: 上传主体素材"""
 
-    @patch("app.services.asset_service.search_assets_multiple")
+    @patch("app.services.asset_service.asearch_assets_multiple", new_callable=AsyncMock)
     @patch("app.services.asset_service.understand_image")
     def test_returns_subject_info(
         self, mock_understand, mock_search, client, sample_design_brief, sample_png_bytes
@@ -215,6 +241,40 @@ class TestStepAssetsWithMaterial:
 
         assert resp.status_code == 200
         body = resp.json()
-        # 候选列表应只有一个（用户上传的背景 base64）
+        # 候选列表应只有一个（用户上传的背景，以 asset:// 引用返回）
         assert len(body["candidates"]) == 1
-        assert body["candidates"][0].startswith("data:image")
+        assert body["candidates"][0].startswith("asset://")
+
+        # 引用可通过 /api/assets/{sha256} 取回原始字节
+        digest = body["candidates"][0][len("asset://"):]
+        asset_resp = client.get(f"/api/assets/{digest}")
+        assert asset_resp.status_code == 200
+        assert asset_resp.content == sample_png_bytes
+        assert asset_resp.headers["content-type"] == "image/png"
+
+    @patch("app.services.asset_service.understand_image")
+    def test_user_jpeg_served_as_jpeg(self, mock_understand, client, sample_design_brief, sample_png_bytes):
+        """用户上传的 JPEG 背景按实际格式保存，/api/assets 返回 image/jpeg"""
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.new("RGB", (100, 100), color="blue").save(buf, format="JPEG")
+        mock_understand.return_value = {"understanding": {}, "suggestions": {}}
+
+        resp = client.post(
+            "/api/step/assets",
+            data={
+                "design_brief_json": json.dumps(sample_design_brief),
+                "canvas_width": "1080",
+                "canvas_height": "1920",
+                "count": "1",
+            },
+            files={
+                "image_subject": ("subject.png", sample_png_bytes, "image/png"),
+                "image_bg": ("bg.jpg", buf.getvalue(), "image/jpeg"),
+            },
+        )
+
+        digest = resp.json()["candidates"][0][len("asset://"):]
+        asset_resp = client.get(f"/api/assets/{digest}")
+        assert asset_resp.headers["content-type"] == "image/jpeg"
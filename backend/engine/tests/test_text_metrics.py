@@ -0,0 +1,218 @@
+"""
+文字测量测试
+测试字形宽度、CJK / 拉丁断行规则、避头尾、TextBlock 高度计算，以及预计算字形宽度表
+"""
+import json
+import os
+import random
+import string
+import time
+
+import pytest
+from unittest.mock import patch
+
+from app.core.layout import TextBlock, Style, measure_text, measure_text_width
+from app.core.layout import glyph_tables, text_metrics
+from app.core.layout.glyph_tables import FALLBACK_NARROW_EM, build_glyph_tables, get_glyph_table
+from app.core.layout.text_metrics import clear_text_metrics_cache
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    clear_text_metrics_cache()
+    yield
+    clear_text_metrics_cache()
+
+
+@pytest.fixture
+def no_font_file():
+    """强制使用兜底估算宽度，使断行结果与本机字体无关"""
+    with patch("app.services.renderer.font_registry.resolve_font_file", return_value=None):
+        clear_text_metrics_cache()
+        yield
+
+
+# ============================================================================
+# 1. 宽度测量
+# ============================================================================
+
+class TestWidth:
+
+    def test_cjk_is_one_em(self):
+        assert measure_text_width("夏日音乐节", 96) == 96 * 5
+
+    def test_latin_uses_glyph_advances(self):
+        narrow = measure_text_width("iiiiiiii", 48)
+        wide = measure_text_width("WWWWWWWW", 48)
+        assert narrow < wide
+
+    def test_fallback_without_font_file(self, no_font_file):
+        assert measure_text_width("abcd", 100) == pytest.approx(4 * 100 * FALLBACK_NARROW_EM)
+
+    def test_width_cache(self):
+        measure_text("Summer Night Market", 48, 400)
+        before = text_metrics._run_width.cache_info().hits
+        measure_text("Summer Night Market", 48, 600)
+        assert text_metrics._run_width.cache_info().hits > before
+
+
+# ============================================================================
+# 2. 断行
+# ============================================================================
+
+class TestLineBreaking:
+
+    def test_cjk_breaks_between_characters(self):
+        m = measure_text("一二三四五六七八九十", 100, 450)
+        assert m.lines == ("一二三四", "五六七八", "九十")
+        assert m.width <= 450
+
+    def test_latin_words_not_split(self, no_font_file):
+        m = measure_text("aaa bbb ccc", 100, 300)
+        assert m.lines == ("aaa", "bbb", "ccc")
+
+    def test_overlong_word_is_force_broken(self, no_font_file):
+        m = measure_text("abcdefghij", 100, 300)
+        assert all(w <= 300 for w in m.line_widths)
+        assert "".join(m.lines) == "abcdefghij"
+
+    def test_closing_punctuation_never_starts_line(self):
+        m = measure_text("一二三四，五六", 100, 400)
+        assert m.lines == ("一二三", "四，五六")
+
+    def test_opening_punctuation_never_ends_line(self):
+        m = measure_text("一二三《四五》", 100, 400)
+        assert not m.lines[0].endswith("《")
+
+    def test_mixed_script(self, no_font_file):
+        m = measure_text("音乐节 Live 2025", 100, 500)
+        assert m.lines[0] == "音乐节"
+        assert m.line_count == 2
+
+    def test_explicit_newlines(self):
+        m = measure_text("第一行\n\n第三行", 40, 1000)
+        assert m.lines == ("第一行", "", "第三行")
+
+
+# ============================================================================
+# 3. TextBlock 接入
+# ============================================================================
+
+class TestTextBlockHeight:
+
+    def test_cjk_title_measured_at_full_em(self):
+        # 5 个汉字 @96px 宽 480px：旧算法按 0.7em 估算为 1 行，实际需要 2 行
+        block = TextBlock("夏日音乐节", font_size=96, max_width=460)
+        assert block.height == 2 * 96 * 1.5
+
+    def test_bold_font_measured_with_style(self):
+        text = "Summer Music Festival"
+        regular = TextBlock(text, font_size=80, max_width=2000, style=Style(font_size=80))
+        bold = TextBlock(text, font_size=80, max_width=2000, style=Style(font_size=80, font_weight="bold"))
+        assert bold.measure().width >= regular.measure().width
+
+    def test_update_content_remeasures(self):
+        block = TextBlock("短", font_size=40, max_width=200)
+        h0 = block.height
+        block.update_content("很长很长很长很长很长很长的内容")
+        assert block.height > h0
+
+
+# ============================================================================
+# 4. 预计算字形宽度表
+# ============================================================================
+
+@pytest.fixture(scope="module")
+def glyph_table_dir(tmp_path_factory):
+    from app.services.renderer.font_registry import resolve_font_file
+
+    if resolve_font_file("PingFang SC") is None:
+        pytest.skip("本机没有可用字体文件")
+    out_dir = str(tmp_path_factory.mktemp("glyph_tables"))
+    build_glyph_tables(out_dir)
+    return out_dir
+
+
+@pytest.fixture
+def use_tables(glyph_table_dir):
+    with patch("app.core.config.settings.render.GLYPH_TABLE_DIR", glyph_table_dir):
+        clear_text_metrics_cache()
+        yield glyph_table_dir
+
+
+def _font_file():
+    return text_metrics._font_path("PingFang SC", "normal")
+
+
+class TestGlyphTables:
+
+    def test_manifest_covers_registry_families(self, glyph_table_dir):
+        manifest = json.loads(open(os.path.join(glyph_table_dir, "manifest.json"), encoding="utf-8").read())
+        families = {f for entry in manifest["fonts"].values() for f in entry["families"]}
+        assert "PingFang SC/normal" in families
+        assert "PingFang SC/bold" in families
+
+    def test_loaded_lazily(self, use_tables):
+        assert glyph_tables._load_manifest.cache_info().currsize == 0
+        measure_text("Hello", 48, 900)
+        assert get_glyph_table(_font_file()) is not None
+
+    def test_matches_font_measurement(self, use_tables):
+        text = "Summer Night Market, AVATAR & Typography 2025"
+        table_w = measure_text_width(text, 64)
+
+        with patch("app.core.config.settings.render.GLYPH_TABLE_DIR", "/nonexistent"):
+            clear_text_metrics_cache()
+            font_w = measure_text_width(text, 64)
+
+        assert table_w == pytest.approx(font_w, rel=0.005)
+
+    def test_kerning_applied(self, use_tables):
+        table = get_glyph_table(_font_file())
+        pair = table.char_advances("AV")
+        assert pair[0] <= table.char_advances("A")[0]
+
+    def test_vectorized_gather(self, use_tables):
+        table = get_glyph_table(_font_file())
+        adv = table.char_advances("ab夏😀")
+        assert adv.shape == (4,)
+        assert adv[3] == pytest.approx(1.0)  # 未收录码位块按兜底字宽
+
+    def test_font_mismatch_ignored(self, use_tables, tmp_path):
+        manifest_path = os.path.join(use_tables, "manifest.json")
+        manifest = json.loads(open(manifest_path, encoding="utf-8").read())
+        for entry in manifest["fonts"].values():
+            entry["bytes"] += 1
+        stale_dir = tmp_path / "stale"
+        stale_dir.mkdir()
+        (stale_dir / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+
+        with patch("app.core.config.settings.render.GLYPH_TABLE_DIR", str(stale_dir)):
+            clear_text_metrics_cache()
+            assert get_glyph_table(_font_file()) is None
+            assert measure_text("夏日音乐节", 96, 460).line_count == 2
+
+    @pytest.mark.slow
+    def test_textblock_measurement_cost(self, glyph_table_dir):
+        rnd = random.Random(0)
+        words = ["".join(rnd.choice(string.ascii_letters) for _ in range(rnd.randint(2, 9))) for _ in range(4000)]
+        cjk = [chr(0x4E00 + i) for i in range(3000)]
+        texts = [
+            " ".join(rnd.sample(words, 8)) + " " + "".join(rnd.sample(cjk, 12))
+            for _ in range(1000)
+        ]
+
+        def per_block(table_dir):
+            with patch("app.core.config.settings.render.GLYPH_TABLE_DIR", table_dir):
+                clear_text_metrics_cache()
+                measure_text("warm up", 48, 900)
+                start = time.perf_counter()
+                for t in texts:
+                    TextBlock(t, font_size=48, max_width=900)
+                return (time.perf_counter() - start) / len(texts)
+
+        font_cost = per_block("/nonexistent")
+        table_cost = per_block(glyph_table_dir)
+
+        print(f"\n[text_metrics] font {font_cost * 1e6:.0f}µs / TextBlock, table {table_cost * 1e6:.0f}µs / TextBlock")
+        assert table_cost < font_cost
@@ -0,0 +1,205 @@
+"""
+排版自适应测试
+测试字号 / 间距求解：放不下时等比压缩并保持层级、有余量时放大填充、极端情况截断，以及 LayoutBuilder 接入
+"""
+import pytest
+from unittest.mock import patch
+
+from app.core.layout import TextBlock, ShapeBlock, VerticalContainer, Style
+from app.services.renderer.layout_builder import LayoutBuilder, STRATEGIES
+from app.services.renderer.schema_converter import SchemaConverter
+from app.services.renderer.typography_fit import fit_container
+
+
+LONG_BODY = "这是一段很长的活动介绍文字，包含时间地点嘉宾和各种注意事项，" * 6
+
+
+def _ctr(*blocks, gap=20):
+    ctr = VerticalContainer(width=1000, padding=40, gap=gap)
+    for b in blocks:
+        ctr.add(b)
+    ctr.arrange()
+    return ctr
+
+
+def _truncate_enabled():
+    return patch("app.services.renderer.typography_fit.settings.layout_fit.TRUNCATE", True)
+
+
+def _text(content, size, role):
+    return TextBlock(content=content, font_size=size, max_width=920, style=Style(font_size=size), role=role)
+
+
+# ============================================================================
+# 1. 求解器
+# ============================================================================
+
+class TestFitContainer:
+
+    def test_overflow_shrinks_proportionally(self):
+        title = _text("夏日音乐节", 96, "title")
+        body = _text(LONG_BODY, 40, "body")
+        ctr = _ctr(title, body)
+        assert ctr.height > 700
+
+        result = fit_container(ctr, 700, base_gap=20, min_font_size=16)
+
+        assert result.fits
+        assert ctr.height <= 700.5
+        assert 16 <= body.font_size < 40
+        assert title.font_size >= body.font_size * 96 / 40 - 1
+
+    def test_hierarchy_preserved(self):
+        title = _text("Summer Music Festival " * 3, 80, "title")
+        sub = _text("Live on the Bund " * 4, 40, "subtitle")
+        body = _text(LONG_BODY, 30, "body")
+        ctr = _ctr(title, sub, body)
+
+        result = fit_container(ctr, 600, base_gap=20, min_font_size=16)
+
+        assert result.fits
+        assert result.truncated == 0
+        assert body.font_size >= 16
+        assert sub.font_size >= body.font_size * 1.2 - 1
+        assert title.font_size >= sub.font_size * 1.2 - 1
+
+    def test_gap_compressed_before_fonts(self):
+        title = _text("标题", 60, "title")
+        sub = _text("副标题", 30, "subtitle")
+        ctr = _ctr(title, sub, gap=100)
+        natural = ctr.height
+
+        result = fit_container(ctr, natural - 40, base_gap=100, min_font_size=16)
+
+        assert result.fits
+        assert result.shrunk == 0
+        assert 50 <= result.gap < 100
+        assert title.font_size == 60
+
+    def test_spare_room_scales_up_and_stretches_gap(self):
+        title = _text("标题", 60, "title")
+        sub = _text("副标题", 30, "subtitle")
+        divider = ShapeBlock(width=200, height=4, subtype="divider")
+        ctr = _ctr(title, divider, sub)
+
+        result = fit_container(ctr, 1000, base_gap=20, min_font_size=16)
+
+        assert result.scale == pytest.approx(1.25)
+        assert (title.font_size, sub.font_size) == (75, 37)
+        assert result.gap == pytest.approx(40)
+        assert divider.height == 4
+
+    def test_partial_upscale_fills_region(self):
+        title = _text("夏日音乐节", 96, "title")
+        body = _text(LONG_BODY, 28, "body")
+        ctr = _ctr(title, body)
+        region = ctr.height * 1.1
+
+        result = fit_container(ctr, region, base_gap=20, min_font_size=16)
+
+        assert 1.0 <= result.scale < 1.25
+        assert region * 0.9 < ctr.height <= region + 0.5
+
+    def test_truncates_when_min_size_cannot_fit(self):
+        title = _text("夏日音乐节", 96, "title")
+        body = _text(LONG_BODY * 4, 24, "body")
+        ctr = _ctr(title, body)
+
+        with _truncate_enabled():
+            result = fit_container(ctr, 400, base_gap=20, min_font_size=16)
+
+        assert result.fits
+        assert result.truncated == 1
+        assert body.content.endswith("…")
+        assert body.truncated
+        assert body.font_size == 16
+        assert title.content == "夏日音乐节"
+        assert not title.truncated
+
+    def test_no_truncation_by_default(self):
+        body = _text(LONG_BODY * 4, 24, "body")
+        ctr = _ctr(_text("夏日音乐节", 96, "title"), body)
+
+        result = fit_container(ctr, 400, base_gap=20, min_font_size=16)
+
+        assert not result.fits
+        assert result.truncated == 0
+        assert body.content == LONG_BODY * 4
+
+    def test_title_and_cta_never_truncated(self):
+        title = _text(LONG_BODY * 2, 96, "title")
+        cta = _text(LONG_BODY, 40, "cta")
+        ctr = _ctr(title, cta)
+
+        with _truncate_enabled():
+            result = fit_container(ctr, 300, base_gap=20, min_font_size=16)
+
+        assert result.truncated == 0
+        assert title.content == LONG_BODY * 2
+        assert cta.content == LONG_BODY
+
+    def test_deterministic(self):
+        def run():
+            ctr = _ctr(_text("Summer Music Festival", 90, "title"), _text(LONG_BODY, 36, "body"))
+            fit_container(ctr, 650, base_gap=20, min_font_size=16)
+            return [(e.font_size, e.y, e.height) for e in ctr.elements]
+
+        assert run() == run()
+
+
+# ============================================================================
+# 2. LayoutBuilder 接入
+# ============================================================================
+
+def _heavy_dsl():
+    return [
+        {"command": "add_title", "content": "2025 城市夏日音乐节 · 外滩滨江草坪专场", "font_size": 120, "color": "#FFFFFF"},
+        {"command": "add_subtitle", "content": "七月十二日至十四日 连续三晚 十二组乐队轮番登场", "font_size": 56, "color": "#FFFFFF"},
+        {"command": "add_text", "content": LONG_BODY, "font_size": 40, "color": "#FFFFFF"},
+        {"command": "add_cta", "content": "立即购票", "font_size": 40, "color": "#FFD700"},
+    ]
+
+
+class TestLayoutBuilderFit:
+
+    @pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+    def test_content_stays_inside_region(self, strategy):
+        elements = LayoutBuilder().build(_heavy_dsl(), strategy, 1080, 1920)
+        cfg = STRATEGIES[strategy]
+        texts = [e for e in elements if e["type"] == "text"]
+
+        regions = [cfg.content_region] + ([cfg.cta_region] if cfg.cta_region else [])
+        lo = min(r.y_start for r in regions) * 1920
+        hi = max(r.y_end for r in regions) * 1920
+        for t in texts:
+            assert t["y"] >= lo - 1
+            assert t["y"] + t["height"] <= hi + 1, f"{strategy}: {t['content'][:8]} 超出区域"
+
+    def test_single_response_passes_rule_critic(self):
+        from app.agents.rule_critic import evaluate_layout
+
+        brief = {"background_color": "#1A1A2E"}
+        elements = LayoutBuilder().build(_heavy_dsl(), "bottom_heavy", 1080, 1920, brief)
+        poster = SchemaConverter().convert(elements, brief).model_dump()
+
+        review = evaluate_layout(poster)
+        assert review.verdict != "REJECT", review.issues
+
+    def test_disabled_keeps_llm_sizes(self):
+        with patch("app.services.renderer.layout_builder.settings.layout_fit.ENABLED", False):
+            elements = LayoutBuilder().build(_heavy_dsl(), "bottom_heavy", 1080, 1920)
+        sizes = [e["fontSize"] for e in elements if e["type"] == "text"]
+        assert sizes == [120, 56, 40, 40]
+
+    def test_truncation_surfaces_to_rule_critic(self):
+        from app.agents.rule_critic import evaluate_layout
+
+        dsl = _heavy_dsl()
+        dsl[2]["content"] = LONG_BODY * 12
+        with _truncate_enabled():
+            elements = LayoutBuilder().build(dsl, "bottom_heavy", 1080, 1920)
+        poster = SchemaConverter().convert(elements).model_dump()
+
+        truncated = [layer for layer in poster["layers"] if layer.get("truncated")]
+        assert [layer["content"][-1] for layer in truncated] == ["…"]
+        assert any(i.rule == "truncation" for i in evaluate_layout(poster).issues)
@@ -0,0 +1,251 @@
+"""
+VectorRetriever 测试
+矩阵化向量检索：归一化存储、argpartition top-k、元数据掩码过滤
+"""
+import time
+import zlib
+
+import numpy as np
+import pytest
+
+from app.knowledge.rag import (
+    BaseEmbedder,
+    Document,
+    SentenceTransformerEmbedder,
+    VectorRetriever,
+    create_embedder,
+)
+
+DIM = 384  # 与 paraphrase-multilingual-MiniLM-L12-v2 相同的维度
+
+
+class HashEmbedder(BaseEmbedder):
+    """按文本哈希生成确定性随机向量（不加载模型）"""
+
+    def __init__(self, dim: int = DIM):
+        self.dim = dim
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    def encode(self, text):
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        return rng.standard_normal(self.dim)
+
+    def encode_batch(self, texts, batch_size=32):
+        return [self.encode(t) for t in texts]
+
+
+class CountingEmbedder(HashEmbedder):
+    """记录 encode / encode_batch 调用次数"""
+
+    def __init__(self, dim: int = DIM):
+        super().__init__(dim)
+        self.single_calls = 0
+        self.batch_sizes = []
+
+    def encode(self, text):
+        self.single_calls += 1
+        return super().encode(text)
+
+    def encode_batch(self, texts, batch_size=32):
+        self.batch_sizes.append(len(texts))
+        return [HashEmbedder.encode(self, t) for t in texts]
+
+
+BRANDS = ["华为", "小米", "苹果", "OPPO", "vivo"]
+CATEGORIES = ["配色方案", "设计风格", "字体", "标语"]
+
+
+def _retriever(n: int, dim: int = DIM) -> VectorRetriever:
+    retriever = VectorRetriever(HashEmbedder(dim))
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    for i in range(n):
+        retriever.add(Document(
+            id=f"doc_{i}",
+            text=f"品牌知识 {i}",
+            metadata={"brand": BRANDS[i % len(BRANDS)], "category": CATEGORIES[i % len(CATEGORIES)]},
+            embedding=vectors[i],
+        ))
+    return retriever
+
+
+def _reference(retriever: VectorRetriever, query: str, top_k: int, filter_metadata=None):
+    """逐文档计算余弦相似度的朴素实现"""
+    q = retriever.embedder.encode(query)
+    scored = []
+    for doc in retriever.documents:
+        if filter_metadata and any(doc.metadata.get(k) != v for k, v in filter_metadata.items()):
+            continue
+        e = np.asarray(doc.embedding, dtype=np.float64)
+        scored.append((doc.id, float(np.dot(q, e) / (np.linalg.norm(q) * np.linalg.norm(e)))))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:top_k]
+
+
+class TestVectorRetriever:
+    """矩阵化检索结果与朴素实现一致"""
+
+    def test_matches_reference(self):
+        retriever = _retriever(500)
+        results = retriever.search("华为的配色", top_k=5)
+        expected = _reference(retriever, "华为的配色", 5)
+        assert [r.document_id for r in results] == [doc_id for doc_id, _ in expected]
+        for r, (_, score) in zip(results, expected):
+            assert r.score == pytest.approx(score, abs=1e-5)
+
+    def test_filter_mask(self):
+        retriever = _retriever(500)
+        flt = {"brand": "小米", "category": "字体"}
+        results = retriever.search("字体", top_k=3, filter_metadata=flt)
+        expected = _reference(retriever, "字体", 3, flt)
+        assert [r.document_id for r in results] == [doc_id for doc_id, _ in expected]
+        assert all(r.metadata["brand"] == "小米" and r.metadata["category"] == "字体" for r in results)
+
+    def test_filter_without_match(self):
+        retriever = _retriever(50)
+        assert retriever.search("字体", top_k=3, filter_metadata={"brand": "不存在"}) == []
+        assert retriever.search("字体", top_k=3, filter_metadata={"missing_key": 1}) == []
+
+    def test_unhashable_filter_value(self):
+        retriever = VectorRetriever(HashEmbedder())
+        retriever.add(Document(id="a", text="标签 a", metadata={"tags": ["科技", "简约"]}))
+        retriever.add(Document(id="b", text="标签 b", metadata={"tags": ["复古"]}))
+        results = retriever.search("标签", top_k=5, filter_metadata={"tags": ["复古"]})
+        assert [r.document_id for r in results] == ["b"]
+
+    def test_top_k_larger_than_corpus(self):
+        retriever = _retriever(3)
+        results = retriever.search("查询", top_k=10)
+        assert len(results) == 3
+        scores = [r.score for r in results]
+        assert scores == sorted(scores, reverse=True)
+        assert retriever.search("查询", top_k=0) == []
+
+    def test_capacity_growth_keeps_rows(self):
+        retriever = _retriever(VectorRetriever._INITIAL_CAPACITY * 3 + 1)
+        assert retriever._matrix.shape[0] >= retriever.document_count
+        assert retriever._matrix.dtype == np.float32
+        norms = np.linalg.norm(retriever._matrix[:retriever._size], axis=1)
+        assert np.allclose(norms, 1.0, atol=1e-5)
+        # 自身文本的向量与查询向量相同 → 排第一
+        doc = Document(id="self", text="自查询文本")
+        retriever.add(doc)
+        assert retriever.search("自查询文本", top_k=1)[0].document_id == "self"
+
+    def test_documents_without_embedding_not_scored(self):
+        class Unavailable(HashEmbedder):
+            @property
+            def is_available(self):
+                return False
+
+        retriever = VectorRetriever(Unavailable())
+        retriever.add(Document(id="a", text="无嵌入文档"))
+        assert retriever.document_count == 1
+        assert retriever._size == 0
+        assert retriever.search("查询", top_k=2) == []
+
+    def test_dimension_mismatch_skipped(self):
+        retriever = _retriever(10)
+        retriever.add(Document(id="bad", text="维度不对", embedding=np.ones(8)))
+        assert retriever.document_count == 11
+        assert retriever._size == 10
+
+    def test_clear(self):
+        retriever = _retriever(100)
+        retriever.clear()
+        assert retriever.document_count == 0
+        assert retriever.search("查询", top_k=2) == []
+        retriever.add(Document(id="x", text="新文档", metadata={"brand": "华为"}))
+        assert [r.document_id for r in retriever.search("新文档", top_k=2, filter_metadata={"brand": "华为"})] == ["x"]
+
+
+class TestAddBatch:
+    """批量入库"""
+
+    def test_encodes_in_batches(self):
+        embedder = CountingEmbedder()
+        retriever = VectorRetriever(embedder)
+        docs = [Document(id=f"d{i}", text=f"品牌段落 {i}") for i in range(70)]
+        retriever.add_batch(docs, batch_size=32)
+
+        assert embedder.single_calls == 0
+        assert embedder.batch_sizes == [32, 32, 6]
+        assert retriever.document_count == 70
+        assert retriever._size == 70
+
+    def test_matches_single_add(self):
+        docs = [(f"d{i}", f"品牌段落 {i}", {"brand": BRANDS[i % 5]}) for i in range(100)]
+        single = VectorRetriever(HashEmbedder())
+        for doc_id, text, meta in docs:
+            single.add(Document(id=doc_id, text=text, metadata=meta))
+        batched = VectorRetriever(HashEmbedder())
+        batched.add_batch([Document(id=d, text=t, metadata=m) for d, t, m in docs], batch_size=16)
+
+        for flt in (None, {"brand": "苹果"}):
+            a = single.search("品牌段落 7", top_k=5, filter_metadata=flt)
+            b = batched.search("品牌段落 7", top_k=5, filter_metadata=flt)
+            assert [r.document_id for r in a] == [r.document_id for r in b]
+
+    def test_keeps_precomputed_embeddings(self):
+        embedder = CountingEmbedder()
+        retriever = VectorRetriever(embedder)
+        retriever.add_batch([
+            Document(id="a", text="已有嵌入", embedding=np.ones(DIM)),
+            Document(id="b", text="需要编码"),
+        ])
+        assert embedder.batch_sizes == [1]
+        assert retriever._size == 2
+
+
+@pytest.mark.slow
+def test_add_batch_benchmark():
+    """真实模型下批量编码 vs 逐条编码（模型不可用时跳过）"""
+    embedder = create_embedder()
+    if not isinstance(embedder, SentenceTransformerEmbedder):
+        pytest.skip("嵌入模型不可用")
+
+    texts = [f"品牌规范第 {i} 条：主色、辅助色与字体的使用场景说明" for i in range(256)]
+    start = time.perf_counter()
+    single = VectorRetriever(embedder)
+    for i, text in enumerate(texts):
+        single.add(Document(id=f"s{i}", text=text))
+    per_doc = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = VectorRetriever(embedder)
+    batched.add_batch([Document(id=f"b{i}", text=t) for i, t in enumerate(texts)], batch_size=32)
+    batch = time.perf_counter() - start
+
+    print(f"\n[add_batch] {len(texts)} 条: 逐条 {per_doc * 1000:.0f}ms, 批量 {batch * 1000:.0f}ms ({per_doc / batch:.1f}x)")
+    assert batch < per_doc
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("n", [1_000, 10_000, 100_000])
+def test_search_benchmark(n):
+    """矩阵检索 vs 逐文档循环"""
+    retriever = _retriever(n)
+    flt = {"brand": "华为"}
+    retriever.search("预热", top_k=5, filter_metadata=flt)
+
+    runs = 20
+    start = time.perf_counter()
+    for i in range(runs):
+        results = retriever.search(f"查询 {i}", top_k=5, filter_metadata=flt)
+    per_query = (time.perf_counter() - start) / runs
+
+    loop_runs = 2 if n >= 100_000 else 5
+    start = time.perf_counter()
+    for i in range(loop_runs):
+        _reference(retriever, f"查询 {i}", 5, flt)
+    per_loop = (time.perf_counter() - start) / loop_runs
+
+    assert len(results) == 5
+    print(
+        f"\n[vector retriever] n={n}: {per_query * 1000:.2f}ms / query"
+        f"（逐文档循环 {per_loop * 1000:.1f}ms, {per_loop / per_query:.0f}x）"
+    )
+    assert per_query < per_loop
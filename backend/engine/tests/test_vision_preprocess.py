@@ -0,0 +1,115 @@
+"""
+Vision 图片预处理测试
+测试缩放、重新编码、透明通道处理、复用缓存，以及压缩前后的体积 / 耗时基准
+"""
+import base64
+import io
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.tools import vision
+from app.tools.vision import image_to_vision_data_url, prepare_image_for_vision
+
+
+def _png_bytes(width: int, height: int, mode: str = "RGB", noise: bool = True) -> bytes:
+    channels = 4 if mode == "RGBA" else 3
+    if noise:
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 256, size=(height, width, channels), dtype=np.uint8)
+    else:
+        pixels = np.full((height, width, channels), 200, dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels, mode).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class TestPrepareImageForVision:
+    """预处理测试"""
+
+    def test_downscales_to_longest_edge(self):
+        data, mime = prepare_image_for_vision(_png_bytes(1080, 1920), max_edge=512, fmt="jpeg", quality=80)
+
+        img = Image.open(io.BytesIO(data))
+        assert mime == "image/jpeg"
+        assert img.format == "JPEG"
+        assert max(img.size) == 512
+        assert img.size == (288, 512)
+
+    def test_webp_output(self):
+        data, mime = prepare_image_for_vision(_png_bytes(800, 600), max_edge=400, fmt="webp", quality=70)
+
+        assert mime == "image/webp"
+        assert Image.open(io.BytesIO(data)).format == "WEBP"
+
+    def test_rgba_flattened_for_jpeg(self):
+        data, _ = prepare_image_for_vision(_png_bytes(600, 600, mode="RGBA"), max_edge=300, fmt="jpeg")
+        assert Image.open(io.BytesIO(data)).mode == "RGB"
+
+    def test_small_image_kept_when_reencode_is_larger(self):
+        original = _png_bytes(16, 16, noise=False)
+        data, mime = prepare_image_for_vision(original, max_edge=1024, fmt="jpeg", quality=100)
+
+        assert data is original
+        assert mime == "image/png"
+
+    def test_invalid_bytes_passthrough(self):
+        data, mime = prepare_image_for_vision(b"not an image", max_edge=512)
+        assert data == b"not an image"
+        assert mime == "image/png"
+
+    def test_failed_preprocess_keeps_original_mime(self):
+        buf = io.BytesIO()
+        Image.new("RGB", (64, 64), (10, 20, 30)).save(buf, format="JPEG")
+        truncated = buf.getvalue()[:-40]   # 文件头完整、像素数据不全，解码失败
+        data, mime = prepare_image_for_vision(truncated, max_edge=32)
+
+        assert data == truncated
+        assert mime == "image/jpeg"
+
+    def test_result_reused(self):
+        original = _png_bytes(1200, 800)
+        first = prepare_image_for_vision(original, max_edge=600, fmt="jpeg", quality=85)
+        second = prepare_image_for_vision(original, max_edge=600, fmt="jpeg", quality=85)
+
+        assert first[0] is second[0]
+
+    def test_data_url(self):
+        url = image_to_vision_data_url(_png_bytes(2000, 1000))
+        header, payload = url.split(",", 1)
+
+        assert header == "data:image/jpeg;base64"
+        assert max(Image.open(io.BytesIO(base64.b64decode(payload))).size) == 1024
+
+
+@pytest.mark.slow
+class TestVisionPayloadBenchmark:
+    """压缩前后 Vision 请求体积与端到端耗时基准（模拟 10 Mbps 上行）"""
+
+    UPLINK_BYTES_PER_SEC = 10 * 1024 * 1024 / 8
+
+    def _end_to_end(self, build_url) -> tuple:
+        start = time.perf_counter()
+        url = build_url()
+        encode_sec = time.perf_counter() - start
+        upload_sec = len(url) / self.UPLINK_BYTES_PER_SEC
+        return len(url), encode_sec + upload_sec
+
+    def test_render_sized_payload(self):
+        poster_png = _png_bytes(1080, 1920)
+
+        raw_bytes, raw_sec = self._end_to_end(
+            lambda: f"data:image/png;base64,{base64.b64encode(poster_png).decode()}"
+        )
+        vision._vision_payload_cache.clear()  # 测真实压缩耗时，不走复用缓存
+        small_bytes, small_sec = self._end_to_end(lambda: image_to_vision_data_url(poster_png))
+
+        print(
+            f"\n[vision payload] raw={raw_bytes / 1024:.0f}KB ({raw_sec * 1000:.0f}ms) "
+            f"→ preprocessed={small_bytes / 1024:.0f}KB ({small_sec * 1000:.0f}ms)"
+        )
+        assert small_bytes < raw_bytes / 4
+        assert small_sec < raw_sec
+
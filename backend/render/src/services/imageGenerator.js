@@ -1,8 +1,7 @@
 // PNG/JPG 图片生成服务
 
 const sharp = require('sharp');
-const fetch = require('node-fetch');
-const { hexToRgb } = require('../utils/helpers');
+const { hexToRgb, loadImageBuffer } = require('../utils/helpers');
 
 // 处理图片图层
 async function loadAndResizeImage(layer) {
@@ -12,21 +11,8 @@ async function loadAndResizeImage(layer) {
   }
 
   try {
-    let imageBuffer = null;
-
-    // 判断是 base64 还是 URL
-    if (layer.src.startsWith('data:image')) {
-      const base64Data = layer.src.split(',')[1];
-      imageBuffer = Buffer.from(base64Data, 'base64');
-    } else if (layer.src.startsWith('http://') || layer.src.startsWith('https://')) {
-      const response = await fetch(layer.src);
-      if (!response.ok) {
-        throw new Error(`下载失败: ${response.status}`);
-      }
-      imageBuffer = Buffer.from(await response.arrayBuffer());
-    } else {
-      throw new Error('不支持的图片格式');
-    }
+    // base64 / URL / asset:// 引用
+    const imageBuffer = await loadImageBuffer(layer.src);
 
     // 使用 sharp 调整大小并保持透明度
     const resizedBuffer = await sharp(imageBuffer)
@@ -2,9 +2,8 @@
 
 const agPsd = require('ag-psd');
 const sharp = require('sharp');
-const fetch = require('node-fetch');
 const archiver = require('archiver');
-const { hexToRgb, createImageData } = require('../utils/helpers');
+const { hexToRgb, createImageData, loadImageBuffer } = require('../utils/helpers');
 
 // 字体显示名称到 PostScript 名称的映射
 // 与 backend font_registry.py 的 FONT_REGISTRY 保持同步
@@ -111,25 +110,10 @@ async function processImageLayer(layer) {
       throw new Error('图片 src 为空');
     }
 
-    let imageBuffer = null;
-
-    // 判断是 base64 还是 URL
-    if (layer.src.startsWith('data:image')) {
-      console.log(`   📥 检测到 base64 图片，正在解码...`);
-      const base64Data = layer.src.split(',')[1];
-      imageBuffer = Buffer.from(base64Data, 'base64');
-      console.log(`   ✅ Base64 解码成功，大小: ${imageBuffer.length} bytes`);
-    } else if (layer.src.startsWith('http://') || layer.src.startsWith('https://')) {
-      console.log(`   📥 检测到 URL 图片，正在下载: ${layer.src.substring(0, 80)}...`);
-      const response = await fetch(layer.src);
-      if (!response.ok) {
-        throw new Error(`下载失败: ${response.status} ${response.statusText}`);
-      }
-      imageBuffer = Buffer.from(await response.arrayBuffer());
-      console.log(`   ✅ 图片下载成功，大小: ${imageBuffer.length} bytes`);
-    } else {
-      throw new Error(`不支持的图片格式: ${layer.src.substring(0, 50)}`);
-    }
+    // base64 / URL / asset:// 引用
+    console.log(`   📥 正在读取图片: ${layer.src.substring(0, 80)}...`);
+    const imageBuffer = await loadImageBuffer(layer.src);
+    console.log(`   ✅ 图片读取成功，大小: ${imageBuffer.length} bytes`);
 
     // 使用 sharp 处理图片
     console.log(`   🔄 正在处理图片: ${layer.width}x${layer.height}`);
@@ -1,5 +1,11 @@
 // 辅助工具函数
 
+const fetch = require('node-fetch');
+
+// asset://<sha256> 引用由引擎的 GET /api/assets/{sha256} 提供字节
+const ASSET_SCHEME = 'asset://';
+const ASSET_BASE_URL = (process.env.ASSET_BASE_URL || 'http://localhost:8000').replace(/\/$/, '');
+
 // 十六进制转 RGB
 function hexToRgb(hex) {
   const result = /^#?([a-f\d]{2})([a-f\d]{2})([a-f\d]{2})$/i.exec(hex);
@@ -22,8 +28,34 @@ function createImageData(width, height, color = { r: 255, g: 255, b: 255 }) {
   return { data, width, height };
 }
 
+// 读取图层图片：支持 base64 data URL、http(s) URL 与 asset:// 引用
+async function loadImageBuffer(src) {
+  if (src.startsWith('data:image')) {
+    const base64Data = src.split(',')[1];
+    return Buffer.from(base64Data, 'base64');
+  }
+
+  let url = src;
+  if (src.startsWith(ASSET_SCHEME)) {
+    const digest = src.slice(ASSET_SCHEME.length);
+    if (!/^[0-9a-f]{64}$/.test(digest)) {
+      throw new Error(`非法的 asset 引用: ${src.substring(0, 80)}`);
+    }
+    url = `${ASSET_BASE_URL}/api/assets/${digest}`;
+  } else if (!src.startsWith('http://') && !src.startsWith('https://')) {
+    throw new Error(`不支持的图片格式: ${src.substring(0, 50)}`);
+  }
+
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`下载失败: ${response.status} ${response.statusText}`);
+  }
+  return Buffer.from(await response.arrayBuffer());
+}
+
 module.exports = {
   hexToRgb,
   createImageData,
+  loadImageBuffer,
 };
 
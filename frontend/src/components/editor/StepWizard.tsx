@@ -11,7 +11,7 @@ import React, { useState, useCallback, useRef, useEffect } from 'react';
 import type { PosterData } from '../../types/PosterSchema';
 import type { ExtractedData } from '../../types/EditorTypes';
 import type { DesignBrief } from '../../services/api';
-import { stepPlan, stepAssets, stepLayouts, stepFinalize } from '../../services/api';
+import { stepPlan, stepAssets, stepLayouts, stepFinalize, resolveAssetUrl } from '../../services/api';
 import { EditorCanvas } from './canvas';
 
 // ============================================================================
@@ -326,7 +326,7 @@ const AssetPicker: React.FC<{
             }`}
           >
             <div className="w-full bg-gray-100" style={{ height: 'clamp(160px, calc(100vh - 340px), 460px)' }}>
-              <img src={src} alt={`Candidate ${i + 1}`} className="w-full h-full object-cover" />
+              <img src={resolveAssetUrl(src)} alt={`Candidate ${i + 1}`} className="w-full h-full object-cover" />
             </div>
             {selectedIndex === i && (
               <div className="absolute top-3 right-3 w-7 h-7 bg-violet-500 rounded-full flex items-center justify-center shadow-lg">
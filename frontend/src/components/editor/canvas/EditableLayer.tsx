@@ -7,6 +7,7 @@
 import React, { useState, useRef, useCallback, type CSSProperties } from 'react';
 import type { Layer, ShapeLayer } from '../../../types/PosterSchema';
 import type { ResizeDirection } from '../../../types/EditorTypes';
+import { resolveAssetUrl } from '../../../services/api';
 
 interface EditableLayerProps {
   layer: Layer;
@@ -196,7 +197,7 @@ export const EditableLayer: React.FC<EditableLayerProps> = ({
     if (layer.type === 'image') {
       return (
         <img
-          src={layer.src}
+          src={resolveAssetUrl(layer.src)}
           alt={layer.name}
           style={{
             width: '100%',
@@ -45,6 +45,20 @@ function handleResponseError(error: AxiosError<Record<string, unknown>>) {
 apiClient.interceptors.response.use((r) => r, handleResponseError);
 renderClient.interceptors.response.use((r) => r, handleResponseError);
 
+// ============================================================================
+// 图片引用
+// ============================================================================
+
+const ASSET_SCHEME = 'asset://';
+
+/** 把后端返回的 asset://<sha256> 引用转成可直接用于 <img> 的 URL，其他值原样返回 */
+export function resolveAssetUrl(src: string | undefined): string | undefined {
+  if (src && src.startsWith(ASSET_SCHEME)) {
+    return `${API_BASE_URL}/api/assets/${src.slice(ASSET_SCHEME.length)}`;
+  }
+  return src;
+}
+
 // ============================================================================
 // 渲染导出 API
 // ============================================================================